@@ -1,11 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
 import logging
-from typing import List
+import orjson
+from collections import Counter
+from typing import List, Optional, Tuple
 
-from app.database import get_db
-from app.api.schemas import BulkSyncRequest, ProfileCreate
-from app.services.matching_service import sync_profile_to_matching_partner
+from app.config import settings
+from app.content_encoding import (
+    read_decoded_body, CorruptPayloadError, PayloadTooLargeError, UnsupportedEncodingError
+)
+from app.database import get_db, SessionLocal
+from app.json_codec import RawJSON
+from app.profilers import maybe_profile
+from app.profiling import profiling_registry
+from app.tracing import Span, SpanContext, TRACEPARENT_HEADER, parse_traceparent, start_span
+from app.msgpack_codec import is_msgpack, unpackb, MessagePackDecodeError
+from app.api.partner_sync_api import require_internal_token
+from app.api.schemas import BulkSyncRequest, PoolManifestRequest, PoolManifestResult, ProfileCreate
+from app.services.change_log import record_change
+from app.services.admission import AdmissionRejected, bulk_admission
+from app.services.sharded_ingest import ShardValidationError, sharded_ingestor
+from app.services.partner_dispatcher import BULK, PRIORITY_HEADER, RECONCILIATION, partner_dispatcher
+from app.services.partner_replay import push_change_logs
+from app.services.pool_manifest import apply_pool_manifest
+from app.services.geo_index import candidate_geo_index
+from app.services.profile_cache import profile_cache
+from app.services.profile_documents import store_profile_document
+from app.services.term_index import candidate_term_index
+from app.services.job_offer_stats import (
+    apply_status_delta, status_counts_from_data, status_counts_from_db, status_delta
+)
+from app.services.trusted_ingest import (
+    is_trusted_sender, parse_trusted_bulk, parse_trusted_document, TrustedPayloadError
+)
 from app.models.profile import (
     User, CVProfile, CVAddress, Experience, Education, Hobby, 
     Language, SoftSkill, Certificate, TalentPoolMembership,
@@ -17,60 +45,324 @@ logger = logging.getLogger(__name__)
 
 @router.post("/bulk", status_code=202)
 async def receive_bulk_data(
-    bulk_data: BulkSyncRequest, 
-    background_tasks: BackgroundTasks,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Bulk API to receive talent pool data, including member details and job match feedback.
     This endpoint processes the data asynchronously and syncs relevant changes to the matching partner.
+    
+    The body is a BulkSyncRequest. Authenticated internal senders (X-Internal-Token) take
+    a fast path that skips Pydantic validation in favour of a precompiled schema check
+    and reuses the encoded profile JSON for the change log and partner push.
+    
+    Bodies are JSON or, with Content-Type application/msgpack, MessagePack. They
+    may be sent with Content-Encoding gzip or zstd; they are decompressed
+    while streaming in, up to BULK_MAX_DECOMPRESSED_BYTES.
+    
+    With BULK_INGEST_PROCESSES set, large requests are validated and written by
+    worker processes sharded by cvId.
+    
+    Under load the request is refused before its body is read, with 429 (too many
+    profiles in flight) or 503 (partner outbox backlog or database pool saturated)
+    and a Retry-After header.
+    
+    Partner pushes are queued in the bulk lane, or the lane a trusted sender names
+    in X-Sync-Priority, behind interactive profile changes.
     """
-    try:
-        for profile_data in bulk_data.profiles:
-            # Process each profile
-            process_profile(db, profile_data, background_tasks)
+    parent = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+    lane = request_lane(request.headers)
+    admit(bulk_admission.check)
+    with maybe_profile(profiling_registry, "bulk") as capture, \
+            start_span("bulk.ingest", parent) as ingest_span:
+        with start_span("bulk.decode", ingest_span.context) as decode_span:
+            body = await read_bulk_body(request)
+            profile_docs = shardable_profiles(body, request.headers)
+            if profile_docs is None:
+                profiles = parse_bulk_body(body, request.headers)
+            decode_span.set(bytes=len(body), profiles=len(profile_docs if profile_docs is not None else profiles))
+        if capture is not None:
+            capture.attributes.update(traceId=ingest_span.trace_id, bytes=len(body), sharded=profile_docs is not None)
+        
+        if profile_docs is not None:
+            return await ingest_sharded(
+                db, profile_docs, is_trusted_sender(request.headers), lane, ingest_span
+            )
         
-        return {"message": "Bulk data received and processing started"}
+        # Each profile stays in flight until its partner push, queued below, has run
+        admit(bulk_admission.acquire, len(profiles))
+        queued = 0
+        try:
+            for profile_data, raw_payload in profiles:
+                # Process each profile
+                process_profile(
+                    db, profile_data, lane,
+                    raw_payload=raw_payload, trace_parent=ingest_span.context
+                )
+                queued += 1
+            
+            return {"message": "Bulk data received and processing started"}
+        except Exception as e:
+            bulk_admission.release(len(profiles) - queued)
+            logger.error(f"Error processing bulk data: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error processing bulk data: {str(e)}")
+
+def request_lane(headers) -> str:
+    """Partner push lane of a bulk request; only trusted senders may choose another than bulk"""
+    lane = headers.get(PRIORITY_HEADER)
+    if lane == RECONCILIATION and is_trusted_sender(headers):
+        return RECONCILIATION
+    return BULK
+
+def release_admitted_profile():
+    bulk_admission.release(1)
+
+def shardable_profiles(body: bytes, headers) -> Optional[list]:
+    """
+    The undecoded profile documents of a request for sharded ingest, or None to
+    ingest in this process: sharding is off, the request is small, or the body is
+    malformed (left to parse_bulk_body to report)
+    """
+    if not sharded_ingestor.enabled:
+        return None
+    try:
+        document = unpackb(body) if is_msgpack(headers.get("content-type")) else orjson.loads(body)
+    except (MessagePackDecodeError, orjson.JSONDecodeError):
+        return None
+    profile_docs = document.get("profiles") if isinstance(document, dict) else None
+    if not isinstance(profile_docs, list) or len(profile_docs) < settings.BULK_INGEST_MIN_PROFILES:
+        return None
+    return profile_docs
+
+async def ingest_sharded(
+    db: Session,
+    profile_docs: list,
+    trusted: bool,
+    lane: str,
+    ingest_span: Span
+) -> dict:
+    """Validate and write a bulk request in the sharded worker processes and aggregate their results"""
+    admit(bulk_admission.acquire, len(profile_docs))
+    try:
+        shard_results = await sharded_ingestor.ingest(profile_docs, trusted, ingest_span.traceparent)
+    except ShardValidationError as e:
+        bulk_admission.release(len(profile_docs))
+        raise HTTPException(status_code=422, detail=e.detail)
     except Exception as e:
+        bulk_admission.release(len(profile_docs))
         logger.error(f"Error processing bulk data: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing bulk data: {str(e)}")
+    
+    operations = {"INSERT": 0, "UPDATE": 0}
+    for result in shard_results:
+        for profile in result.profiles:
+            operations[profile.operation] += 1
+            profile_cache.invalidate(profile.cv_id)
+            candidate_geo_index.index_entry(profile.cv_id, profile.geo_entry)
+            candidate_term_index.index_terms(profile.cv_id, set(profile.terms))
+            partner_dispatcher.submit(
+                lane, profile.cv_id, profile.operation,
+                raw_payload=profile.raw_payload,
+                traceparent=profile.traceparent,
+                on_done=release_admitted_profile
+            )
+    written = operations["INSERT"] + operations["UPDATE"]
+    ingest_span.set(shards=len(shard_results), profiles=written)
+    
+    errors = [result.error for result in shard_results if result.error]
+    if errors:
+        # The profiles written before the error keep their queued partner pushes
+        bulk_admission.release(len(profile_docs) - written)
+        logger.error(f"Error processing bulk data: {errors[0]}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing bulk data: {written} of {len(profile_docs)} profiles written, {errors[0]}"
+        )
+    bulk_admission.release(len(profile_docs) - written)
+    return {
+        "message": "Bulk data received and processing started",
+        "profiles": written,
+        "inserted": operations["INSERT"],
+        "updated": operations["UPDATE"],
+        "shards": len(shard_results),
+    }
+
+@router.get("/bulk/admission")
+async def bulk_admission_status():
+    """Load signals and limits of bulk admission control in this process"""
+    return bulk_admission.status()
+
+@router.post(
+    "/bulk/manifests", response_model=PoolManifestResult, dependencies=[Depends(require_internal_token)]
+)
+async def receive_pool_manifest(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Full-sync manifest of a talent pool: the cvIds of all its members in a sync run.
+    Memberships of the pool not listed are removed; profiles left in no pool are
+    tombstoned and deleted at the matching partner. A run's manifest is applied once.
+    Bodies are JSON or MessagePack, optionally gzip / zstd encoded, like /bulk.
+    """
+    body = await read_bulk_body(request)
+    try:
+        if is_msgpack(request.headers.get("content-type")):
+            manifest = PoolManifestRequest.parse_obj(unpackb(body))
+        else:
+            manifest = PoolManifestRequest.parse_raw(body)
+    except MessagePackDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    
+    parent = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+    with start_span("bulk.manifest", parent, talentPoolId=manifest.talentPoolId) as span:
+        result = apply_pool_manifest(
+            db, manifest.talentPoolId, manifest.runId, manifest.cvIds, traceparent=span.traceparent
+        )
+        span.set(removed=result.removed, tombstoned=result.tombstoned)
+    if result.change_log_ids:
+        background_tasks.add_task(push_manifest_changes, result.change_log_ids)
+    return PoolManifestResult(
+        talentPoolId=manifest.talentPoolId, runId=manifest.runId, applied=result.applied,
+        members=result.members, removed=result.removed, tombstoned=result.tombstoned
+    )
+
+def push_manifest_changes(log_entry_ids):
+    """Background task; uses its own session since the request session is closed by then"""
+    db = SessionLocal()
+    try:
+        push_change_logs(
+            db, log_entry_ids,
+            rate_per_second=settings.PARTNER_REPLAY_RATE_PER_SECOND,
+            concurrency=settings.PARTNER_REPLAY_CONCURRENCY,
+            batch_size=settings.PARTNER_REPLAY_BATCH_SIZE
+        )
+    except Exception:
+        logger.exception(f"Partner push of {len(log_entry_ids)} manifest changes failed")
+    finally:
+        db.close()
+
+def admit(check, *args):
+    """Run an admission check, mapping a refusal to 429 / 503 with Retry-After"""
+    try:
+        return check(*args)
+    except AdmissionRejected as e:
+        logger.warning(f"Bulk request refused with {e.status_code}: {e.reason}")
+        raise HTTPException(
+            status_code=e.status_code, detail=e.reason, headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def read_bulk_body(request: Request) -> bytes:
+    """Read and decompress the request body, mapping decoding failures to HTTP errors"""
+    try:
+        return await read_decoded_body(request, settings.BULK_MAX_DECOMPRESSED_BYTES)
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except CorruptPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_bulk_body(body: bytes, headers) -> List[tuple]:
+    """
+    Parse a bulk request body into (profile, raw payload) pairs.
+    The body is JSON unless Content-Type names MessagePack.
+    """
+    document = None
+    if is_msgpack(headers.get("content-type")):
+        try:
+            document = unpackb(body)
+        except MessagePackDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if is_trusted_sender(headers):
+        try:
+            if document is not None:
+                return parse_trusted_document(document)
+            return parse_trusted_bulk(body)
+        except TrustedPayloadError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        if document is not None:
+            bulk_data = BulkSyncRequest.parse_obj(document)
+        else:
+            bulk_data = BulkSyncRequest.parse_raw(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    return [(profile_data, None) for profile_data in bulk_data.profiles]
 
-def process_profile(db: Session, profile_data: ProfileCreate, background_tasks: BackgroundTasks):
+def process_profile(
+    db: Session,
+    profile_data: ProfileCreate,
+    lane: str = BULK,
+    raw_payload: Optional[RawJSON] = None,
+    trace_parent: Optional[SpanContext] = None
+):
+    
+    """
+    Process individual profile data from bulk request.
+    raw_payload is the already-encoded profile JSON from the trusted fast path, if any.
+    The profile's span context is stored on the change log and handed to the partner push,
+    which is queued in lane and releases the profile's admission once it has run.
+    """
+    operation, traceparent = write_profile(db, profile_data, raw_payload, trace_parent)
     
-    """Process individual profile data from bulk request"""
+    # Keep in-process caches and search indexes current
+    profile_cache.invalidate(profile_data.cvId)
+    candidate_geo_index.index_profile(profile_data)
+    candidate_term_index.index_profile(profile_data)
+    
+    # Queue the sync to the matching partner
+    partner_dispatcher.submit(
+        lane, profile_data.cvId, operation,
+        raw_payload=raw_payload,
+        traceparent=traceparent,
+        on_done=release_admitted_profile
+    )
+
+def write_profile(
+    db: Session,
+    profile_data: ProfileCreate,
+    raw_payload: Optional[RawJSON] = None,
+    trace_parent: Optional[SpanContext] = None
+) -> Tuple[str, str]:
+    """Insert or update a profile and log the change; returns the operation and the change's traceparent"""
+    span = Span("bulk.profile", trace_parent, cvId=profile_data.cvId)
     
     # Check if profile exists
     profile = db.query(CVProfile).filter(CVProfile.cv_id == profile_data.cvId).first()
     
     if profile:
-        # Update existing profile
+        # Update existing profile; a tombstoned one was deleted at the partner, so it is inserted again
+        operation = "INSERT" if profile.tombstoned_at is not None else "UPDATE"
         update_profile(db, profile, profile_data)
-        operation = "UPDATE"
     else:
         # Create new profile
         profile = create_profile(db, profile_data)
         operation = "INSERT"
     
-    # Log the change
-    log_entry = ProfileChangeLog(
-        cv_id=profile_data.cvId,
-        operation=operation,
-        synced_to_matching_partner=False,
-        payload=profile_data.dict()
-    )
-    db.add(log_entry)
-    db.commit()
+    # Materialized document, committed together with the normalized rows
+    store_profile_document(profile, profile_data)
     
-    # Trigger sync to matching partner in background
-    background_tasks.add_task(
-        sync_profile_to_matching_partner, 
-        profile_id=profile.cv_id, 
-        operation=operation,
-        db=db
+    # Log the change as a delta against the previous version where possible
+    log_entry = record_change(
+        db, profile_data.cvId, operation,
+        document=profile_data.dict() if raw_payload is None else None,
+        raw_payload=raw_payload,
+        traceparent=span.traceparent
     )
+    db.commit()
+    span.set(payloadKind=log_entry.payload_kind)
+    span.set(operation=operation)
+    span.finish()
+    return operation, span.traceparent
 
 def create_profile(db: Session, profile_data: ProfileCreate) -> CVProfile:
-    """Create a new profile from request data"""
+    """Create a new profile from request data; committed by write_profile"""
     
     # Create user
     user = User(
@@ -87,7 +379,8 @@ def create_profile(db: Session, profile_data: ProfileCreate) -> CVProfile:
         user_id=user.id,
         working_hours=profile_data.cvProfile.workingHours,
         willing_to_travel=profile_data.cvProfile.willingToTravel,
-        visible_in_talent_pool=profile_data.visibleInTalentPool
+        visible_in_talent_pool=profile_data.visibleInTalentPool,
+        content_hash=profile_data.contentHash
     )
     db.add(profile)
     db.flush()  # Flush to get the profile ID
@@ -100,6 +393,14 @@ def create_profile(db: Session, profile_data: ProfileCreate) -> CVProfile:
         )
         db.add(address)
     
+    add_profile_items(db, profile, profile_data)
+    apply_status_delta(db, status_counts_from_data(profile_data))
+    
+    return profile
+
+def add_profile_items(db: Session, profile: CVProfile, profile_data: ProfileCreate):
+    """Insert the CV items, memberships, application statuses and match feedbacks of a profile"""
+    
     # Process CV items
     if profile_data.cvItems:
         # Add experiences
@@ -203,18 +504,20 @@ def create_profile(db: Session, profile_data: ProfileCreate) -> CVProfile:
                 match_status=feedback_data.matchStatus
             )
             db.add(feedback)
-    
-    db.commit()
-    return profile
 
 def update_profile(db: Session, profile: CVProfile, profile_data: ProfileCreate):
-    """Update an existing profile with new data"""
+    """Update an existing profile with new data; committed by write_profile"""
+    
+    # A tombstoned profile's statuses were taken out of the job offer aggregates
+    was_tombstoned = profile.tombstoned_at is not None
     
     # Update basic profile info
     profile.last_modified_dt = profile_data.lastModifiedDt
     profile.working_hours = profile_data.cvProfile.workingHours
     profile.willing_to_travel = profile_data.cvProfile.willingToTravel
     profile.visible_in_talent_pool = profile_data.visibleInTalentPool
+    profile.content_hash = profile_data.contentHash
+    profile.tombstoned_at = None
     
     # Update user info
     if profile.user:
@@ -232,6 +535,9 @@ def update_profile(db: Session, profile: CVProfile, profile_data: ProfileCreate)
             )
             db.add(address)
     
+    # Status counts before the rewrite, to update the job offer aggregates by difference
+    previous_counts = Counter() if was_tombstoned else status_counts_from_db(db, profile.id)
+    
     db.query(Experience).filter(Experience.profile_id == profile.id).delete()
     db.query(Education).filter(Education.profile_id == profile.id).delete()
     db.query(Hobby).filter(Hobby.profile_id == profile.id).delete()
@@ -243,28 +549,7 @@ def update_profile(db: Session, profile: CVProfile, profile_data: ProfileCreate)
     db.query(MatchFeedback).filter(MatchFeedback.profile_id == profile.id).delete()
     
     # Re-add all items using the same logic as in create_profile
-    if profile_data.cvItems:
-        # Add experiences
-        if "experience" in profile_data.cvItems:
-            for exp_data in profile_data.cvItems["experience"]:
-                exp = Experience(
-                    profile_id=profile.id,
-                    profession_nm=exp_data["professionNm"],
-                    company=exp_data["company"],
-                    start_d=exp_data.get("startD"),
-                    end_d=exp_data.get("endD"),
-                    location=exp_data.get("location"),
-                    description=exp_data.get("description")
-                )
-                db.add(exp)
-        
-        # Add educations, hobbies, languages, soft skills, certificates...
-        # (Similar code as in create_profile for each type)
-        # ...
+    add_profile_items(db, profile, profile_data)
+    apply_status_delta(db, status_delta(previous_counts, status_counts_from_data(profile_data)))
     
-    # Add talent pool memberships, application statuses, match feedbacks
-    # (Similar code as in create_profile for each type)
-    # ...
-    
-    db.commit()
     return profile
\ No newline at end of file
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+import logging
+import re
+
+from app.database import get_db
+from app.api.partner_sync_api import require_internal_token
+from app.api.schemas import (
+    MerkleRoot, MerkleNodesRequest, MerkleNodes, MerkleBucketsRequest, MerkleBucketProfiles
+)
+from app.services.merkle import DEPTH, profile_hash_rows, profile_tree_cache
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+_PREFIX = re.compile("^[0-9a-f]*$")
+
+def check_prefixes(prefixes, length_ok, what):
+    for prefix in prefixes:
+        if not _PREFIX.match(prefix) or not length_ok(len(prefix)):
+            raise HTTPException(status_code=400, detail=f"Invalid {what} '{prefix}' for a tree of depth {DEPTH}")
+
+@router.get("/consistency/merkle", response_model=MerkleRoot, dependencies=[Depends(require_internal_token)])
+def merkle_root(db: Session = Depends(get_db)):
+    """Root hash of the tree over (cvId, contentHash) of all profiles"""
+    tree = profile_tree_cache.get(db)
+    return MerkleRoot(depth=tree.depth, root=tree.root, profiles=tree.count)
+
+@router.post("/consistency/merkle/nodes", response_model=MerkleNodes, dependencies=[Depends(require_internal_token)])
+def merkle_nodes(request: MerkleNodesRequest, db: Session = Depends(get_db)):
+    """Hashes of the children of the given inner nodes; null for empty subtrees"""
+    check_prefixes(request.prefixes, lambda n: n < DEPTH, "node")
+    tree = profile_tree_cache.get(db)
+    nodes = {}
+    for prefix in request.prefixes:
+        nodes.update(tree.children(prefix))
+    return MerkleNodes(nodes=nodes)
+
+@router.post(
+    "/consistency/merkle/buckets", response_model=MerkleBucketProfiles, dependencies=[Depends(require_internal_token)]
+)
+def merkle_bucket_profiles(request: MerkleBucketsRequest, db: Session = Depends(get_db)):
+    """The current (cvId, contentHash) of the profiles in the given leaf buckets"""
+    check_prefixes(request.buckets, lambda n: n == DEPTH, "bucket")
+    if not request.buckets:
+        return MerkleBucketProfiles(profiles=[])
+    rows = profile_hash_rows(db, request.buckets)
+    return {"profiles": [{"cvId": cv_id, "contentHash": content_hash} for cv_id, content_hash in rows]}
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+import logging
+
+from app.database import get_read_db
+from app.api.schemas import JobOfferStats
+from app.services.job_offer_stats import get_job_offer_stats, APPLICATION_STATUS, MATCH_STATUS
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/job-offers/{job_offer_code}/stats", response_model=JobOfferStats)
+async def job_offer_stats(job_offer_code: str, db: Session = Depends(get_read_db)):
+    """
+    Number of candidates per application status and match status for a job offer,
+    read from the incrementally maintained counters.
+    """
+    stats = get_job_offer_stats(db, job_offer_code)
+    return JobOfferStats(
+        jobOfferCode=job_offer_code,
+        applicationStatus=stats[APPLICATION_STATUS],
+        matchStatus=stats[MATCH_STATUS]
+    )
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from app.config import settings
+from app.database import get_read_db, SessionLocal
+from app.api.schemas import DeadLetterEntry, DeadLetterSummary, DeadLetterReplayRequest, DeadLetterReplayStatus
+from app.models.partner_sync import PartnerSyncDeadLetter
+from app.services.partner_dispatcher import partner_dispatcher
+from app.services.partner_replay import dead_letter_query, dead_letter_counts, replay_dead_letters, replay_registry
+from app.services.trusted_ingest import is_trusted_sender
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def require_internal_token(request: Request):
+    if not is_trusted_sender(request.headers):
+        raise HTTPException(status_code=403, detail="Internal token required")
+
+def run_replay(progress, filters: DeadLetterReplayRequest):
+    """Background task; uses its own session since the request session is closed by then"""
+    db = SessionLocal()
+    try:
+        query = dead_letter_query(
+            db, since=filters.since, until=filters.until,
+            error_classes=filters.errorClass, cv_ids=filters.cvId
+        )
+        replay_dead_letters(
+            db, query,
+            rate_per_second=filters.ratePerSecond or settings.PARTNER_REPLAY_RATE_PER_SECOND,
+            concurrency=filters.concurrency or settings.PARTNER_REPLAY_CONCURRENCY,
+            batch_size=filters.batchSize or settings.PARTNER_REPLAY_BATCH_SIZE,
+            progress=progress
+        )
+    except Exception as e:
+        logger.exception(f"Dead letter replay {progress.replay_id} failed")
+        progress.status = "error"
+        progress.error = str(e)
+        progress.finished_at = datetime.utcnow()
+    finally:
+        db.close()
+
+@router.get(
+    "/partner-sync/dead-letters",
+    response_model=DeadLetterSummary,
+    dependencies=[Depends(require_internal_token)]
+)
+async def list_dead_letters(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    error_class: Optional[List[str]] = Query(None),
+    cv_id: Optional[List[str]] = Query(None),
+    include_resolved: bool = False,
+    limit: int = Query(100, ge=0, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """Matching partner deliveries that failed after all retries, oldest failures first"""
+    query = dead_letter_query(db, since, until, error_class, cv_id, include_resolved)
+    counts = dead_letter_counts(query)
+    entries = query.order_by(PartnerSyncDeadLetter.last_failed_at).limit(limit).all()
+    return DeadLetterSummary(
+        total=sum(counts.values()),
+        byErrorClass=counts,
+        entries=[
+            DeadLetterEntry(
+                changeLogId=str(d.change_log_id),
+                cvId=d.cv_id,
+                operation=d.operation,
+                errorClass=d.error_class,
+                errorMessage=d.error_message,
+                lastStatusCode=d.last_status_code,
+                attemptCount=d.attempt_count,
+                replayCount=d.replay_count,
+                firstFailedAt=d.first_failed_at,
+                lastFailedAt=d.last_failed_at,
+                resolvedAt=d.resolved_at,
+                resolution=d.resolution
+            )
+            for d in entries
+        ]
+    )
+
+@router.post(
+    "/partner-sync/dead-letters/replay",
+    status_code=202,
+    response_model=DeadLetterReplayStatus,
+    dependencies=[Depends(require_internal_token)]
+)
+async def replay_dead_letter_entries(filters: DeadLetterReplayRequest, background_tasks: BackgroundTasks):
+    """
+    Re-drive unresolved dead letters matching the filters through the rate-capped
+    concurrent sender. Poll the returned replay id for progress.
+    """
+    progress = replay_registry.start()
+    background_tasks.add_task(run_replay, progress, filters)
+    return progress.to_dict()
+
+@router.get(
+    "/partner-sync/replays/{replay_id}",
+    response_model=DeadLetterReplayStatus,
+    dependencies=[Depends(require_internal_token)]
+)
+async def replay_status(replay_id: str):
+    """Progress of a replay started through the API in this process"""
+    progress = replay_registry.get(replay_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Replay not found")
+    return progress.to_dict()
+
+@router.get("/partner-sync/lanes", dependencies=[Depends(require_internal_token)])
+async def partner_sync_lanes():
+    """Queue depth, wait and end-to-end latency of the partner push lanes in this process"""
+    return partner_dispatcher.status()
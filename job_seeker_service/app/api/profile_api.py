@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 import logging
 from typing import Dict, Any
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.api.schemas import ProfileChangeNotification
-from app.models.profile import CVProfile, ProfileChangeLog
-from app.services.matching_service import sync_profile_to_matching_partner
+from app.models.profile import CVProfile
+from app.services.change_log import record_change
+from app.services.partner_dispatcher import INTERACTIVE, partner_dispatcher
+from app.services.geo_index import candidate_geo_index
+from app.services.term_index import candidate_term_index
+from app.services.profile_cache import profile_cache
+from app.tracing import TRACEPARENT_HEADER, format_traceparent, parse_traceparent
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -14,33 +19,48 @@ logger = logging.getLogger(__name__)
 @router.post("/profiles/changes", status_code=202)
 async def notify_profile_change(
     notification: ProfileChangeNotification,
-    background_tasks: BackgroundTasks,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     API endpoint that is called when a Job Seeker profile is created, updated, or deleted.
-    This triggers synchronization with the matching partner.
+    This triggers synchronization with the matching partner, queued in the interactive
+    lane ahead of bulk sync pushes.
     """
     try:
-        # Log the change
-        log_entry = ProfileChangeLog(
-            cv_id=notification.cvId,
-            operation=notification.operation,
-            synced_to_matching_partner=False,
-            payload=notification.profile if notification.profile else None
+        # Log the change, continuing the caller's trace if it sent one
+        parent = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+        traceparent = format_traceparent(parent) if parent else None
+        record_change(
+            db, notification.cvId, notification.operation,
+            document=notification.profile if notification.profile else None,
+            traceparent=traceparent
         )
-        db.add(log_entry)
         db.commit()
         
-        # Trigger sync to matching partner in background
-        background_tasks.add_task(
-            sync_profile_to_matching_partner, 
-            profile_id=notification.cvId, 
-            operation=notification.operation,
-            db=db
+        if notification.operation == "DELETE":
+            candidate_geo_index.remove_profile(notification.cvId)
+            candidate_term_index.remove_profile(notification.cvId)
+        
+        # Queue the sync to the matching partner
+        partner_dispatcher.submit(
+            INTERACTIVE, notification.cvId, notification.operation, traceparent=traceparent
         )
         
         return {"message": f"Profile change notification received and processing started for {notification.cvId}"}
     except Exception as e:
         logger.error(f"Error processing profile change notification: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing change notification: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error processing change notification: {str(e)}")
+
+@router.get("/profiles/cache/stats")
+async def profile_cache_stats():
+    """Hit, miss and eviction statistics of the profile document cache"""
+    return profile_cache.stats()
+
+@router.get("/profiles/{cv_id}")
+async def get_profile(cv_id: str, db: Session = Depends(get_read_db)):
+    """Return the assembled profile document, served from the profile cache when possible"""
+    document = profile_cache.get_or_load(db, cv_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=bytes(document), media_type="application/json")
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+import hmac
+import logging
+
+from app.config import settings
+from app.api.schemas import ProfilingArmRequest, ProfilingArmedTarget, ProfilingStatus
+from app.profiling import capture_info, profiling_registry
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+# Code paths that can be armed
+PROFILING_TARGETS = ("bulk",)
+
+def require_admin_token(request: Request):
+    token = request.headers.get(ADMIN_TOKEN_HEADER)
+    if not settings.ADMIN_API_TOKEN or not token or \
+            not hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_API_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin_token)])
+async def profiling_status():
+    """Armed targets and the captures held by this process, newest first"""
+    return ProfilingStatus(
+        targets=list(PROFILING_TARGETS),
+        armed=profiling_registry.armed(),
+        captures=[capture_info(capture) for capture in profiling_registry.captures()]
+    )
+
+@router.post(
+    "/admin/profiling/arm",
+    response_model=ProfilingArmedTarget,
+    dependencies=[Depends(require_admin_token)]
+)
+async def arm_profiling(arm_request: ProfilingArmRequest):
+    """Profile the next `count` executions of a target; replaces an earlier arming of it"""
+    if arm_request.target not in PROFILING_TARGETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown target '{arm_request.target}', expected one of {', '.join(PROFILING_TARGETS)}"
+        )
+    logger.info(f"Profiling armed for {arm_request.count} {arm_request.mode} runs of {arm_request.target}")
+    return profiling_registry.arm(arm_request.target, arm_request.count, arm_request.mode, arm_request.intervalMs)
+
+@router.delete("/admin/profiling/arm/{target}", status_code=204, dependencies=[Depends(require_admin_token)])
+async def disarm_profiling(target: str):
+    profiling_registry.disarm(target)
+    return Response(status_code=204)
+
+@router.get("/admin/profiling/captures/{capture_id}", dependencies=[Depends(require_admin_token)])
+async def download_capture(capture_id: str, format: str = Query("collapsed", regex="^(collapsed|pstats)$")):
+    """
+    A capture as collapsed stacks (input for flamegraph.pl, speedscope or inferno),
+    or for deterministic captures as a pstats dump
+    """
+    capture = profiling_registry.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    filename = f"{capture.target}-{capture.capture_id}"
+    if format == "pstats":
+        if capture.pstats is None:
+            raise HTTPException(status_code=404, detail="Only deterministic captures have pstats output")
+        return Response(
+            capture.pstats,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.prof"'}
+        )
+    return Response(
+        capture.collapsed,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.folded"'}
+    )
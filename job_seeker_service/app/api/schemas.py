@@ -1,4 +1,4 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
 import uuid
@@ -73,6 +73,8 @@ class ProfileCreate(BaseModel):
     memberOf: Optional[List[TalentPoolMembershipBase]] = []
     applicationStatus: Optional[List[ApplicationStatusBase]] = []
     matchFeedback: Optional[List[MatchFeedbackBase]] = []
+    # Talent pool's hash of the member document, compared by drift detection
+    contentHash: Optional[str] = None
 
 class BulkSyncRequest(BaseModel):
     profiles: List[ProfileCreate]
@@ -80,4 +82,147 @@ class BulkSyncRequest(BaseModel):
 class ProfileChangeNotification(BaseModel):
     cvId: str
     operation: str  # INSERT, UPDATE, DELETE
-    profile: Optional[dict] = None
\ No newline at end of file
+    profile: Optional[dict] = None
+
+
+class GeoCandidate(BaseModel):
+    cvId: str
+    geoLocation: List[float]
+    distanceKm: Optional[float] = None
+    talentPoolIds: List[str] = []
+    willingToTravel: bool
+
+class GeoSearchResponse(BaseModel):
+    count: int
+    candidates: List[GeoCandidate]
+
+
+class TermSearchResponse(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    cvIds: List[str]
+
+
+class JobOfferStats(BaseModel):
+    jobOfferCode: str
+    applicationStatus: Dict[str, int]
+    matchStatus: Dict[str, int]
+
+
+class DeadLetterEntry(BaseModel):
+    changeLogId: str
+    cvId: str
+    operation: str
+    errorClass: str
+    errorMessage: Optional[str] = None
+    lastStatusCode: Optional[int] = None
+    attemptCount: int
+    replayCount: int
+    firstFailedAt: datetime
+    lastFailedAt: datetime
+    resolvedAt: Optional[datetime] = None
+    resolution: Optional[str] = None
+
+
+class DeadLetterSummary(BaseModel):
+    total: int
+    byErrorClass: Dict[str, int]
+    entries: List[DeadLetterEntry]
+
+
+class DeadLetterReplayRequest(BaseModel):
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    errorClass: Optional[List[str]] = None
+    cvId: Optional[List[str]] = None
+    ratePerSecond: Optional[float] = Field(None, gt=0)
+    concurrency: Optional[int] = Field(None, ge=1, le=64)
+    batchSize: Optional[int] = Field(None, ge=1, le=5000)
+
+
+class DeadLetterReplayStatus(BaseModel):
+    replayId: str
+    status: str
+    total: int
+    processed: int
+    replayed: int
+    superseded: int
+    failed: int
+    ratePerSecond: float
+    error: Optional[str] = None
+    startedAt: datetime
+    finishedAt: Optional[datetime] = None
+
+
+class ProfilingArmRequest(BaseModel):
+    target: str
+    count: int = Field(1, ge=1, le=100)
+    mode: str = Field("sampling", regex="^(sampling|deterministic)$")
+    intervalMs: float = Field(5, ge=1, le=1000)
+
+
+class ProfilingArmedTarget(BaseModel):
+    target: str
+    remaining: int
+    mode: str
+    intervalMs: float
+
+
+class ProfileCaptureInfo(BaseModel):
+    captureId: str
+    target: str
+    mode: str
+    startedAt: datetime
+    durationMs: float
+    stacks: int
+    hasPstats: bool
+    attributes: Dict[str, Any] = {}
+
+
+class ProfilingStatus(BaseModel):
+    targets: List[str]
+    armed: List[ProfilingArmedTarget]
+    captures: List[ProfileCaptureInfo]
+
+
+class MerkleRoot(BaseModel):
+    depth: int
+    root: Optional[str] = None
+    profiles: int
+
+
+class MerkleNodesRequest(BaseModel):
+    prefixes: List[str] = Field(..., max_items=4096)
+
+
+class MerkleNodes(BaseModel):
+    nodes: Dict[str, Optional[str]]
+
+
+class MerkleBucketsRequest(BaseModel):
+    buckets: List[str] = Field(..., max_items=4096)
+
+
+class ProfileContentHash(BaseModel):
+    cvId: str
+    contentHash: Optional[str] = None
+
+
+class MerkleBucketProfiles(BaseModel):
+    profiles: List[ProfileContentHash]
+
+
+class PoolManifestRequest(BaseModel):
+    talentPoolId: str
+    runId: str
+    cvIds: List[str]
+
+
+class PoolManifestResult(BaseModel):
+    talentPoolId: str
+    runId: str
+    applied: bool
+    members: int
+    removed: int
+    tombstoned: int
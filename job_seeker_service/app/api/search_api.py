@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+import logging
+from typing import List, Optional
+
+from app.database import get_read_db
+from app.api.schemas import GeoCandidate, GeoSearchResponse, TermSearchResponse
+from app.services.geo_index import candidate_geo_index
+from app.services.term_index import candidate_term_index, parse_term
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _to_candidate(entry, distance: Optional[float] = None) -> GeoCandidate:
+    return GeoCandidate(
+        cvId=entry.cv_id,
+        geoLocation=[entry.lat, entry.lon],
+        distanceKm=round(distance, 3) if distance is not None else None,
+        talentPoolIds=sorted(entry.talent_pool_ids),
+        willingToTravel=entry.willing_to_travel
+    )
+
+@router.get("/candidates/search/geo", response_model=GeoSearchResponse)
+async def search_candidates_by_location(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=1000),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    talent_pool_id: Optional[str] = None,
+    visible_in_talent_pool: Optional[bool] = True,
+    willing_to_travel: Optional[bool] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Find candidates near a point (lat, lon, radius_km) or inside a bounding box
+    (min_lat, min_lon, max_lat, max_lon), served from the in-process geo index.
+    """
+    radius_params = (lat, lon, radius_km)
+    bbox_params = (min_lat, min_lon, max_lat, max_lon)
+    use_radius = all(p is not None for p in radius_params)
+    use_bbox = all(p is not None for p in bbox_params)
+    
+    if use_radius == use_bbox:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either lat, lon and radius_km or min_lat, min_lon, max_lat and max_lon"
+        )
+    if use_bbox and (min_lat > max_lat or min_lon > max_lon):
+        raise HTTPException(status_code=400, detail="Bounding box minimum must not exceed maximum")
+    
+    candidate_geo_index.ensure_fresh(db)
+    filters = {
+        "talent_pool_id": talent_pool_id,
+        "visible_in_talent_pool": visible_in_talent_pool,
+        "willing_to_travel": willing_to_travel,
+        "limit": limit,
+    }
+    
+    if use_radius:
+        results = candidate_geo_index.grid.query_radius(lat, lon, radius_km, **filters)
+        candidates = [_to_candidate(entry, distance) for entry, distance in results]
+    else:
+        results = candidate_geo_index.grid.query_bbox(min_lat, min_lon, max_lat, max_lon, **filters)
+        candidates = [_to_candidate(entry) for entry in results]
+    
+    return GeoSearchResponse(count=len(candidates), candidates=candidates)
+
+
+@router.get("/candidates/search/terms", response_model=TermSearchResponse)
+async def search_candidates_by_terms(
+    all_of: List[str] = Query([], alias="all", description="Terms that must all match, e.g. skill:python"),
+    any_of: List[str] = Query([], alias="any", description="Terms of which at least one must match"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Find candidates by skill, language, certificate and profession terms,
+    served from the in-process inverted index.
+    Terms are written as field:value, for example language:dutch.
+    """
+    if not all_of and not any_of:
+        raise HTTPException(status_code=400, detail="Provide at least one 'all' or 'any' term")
+    try:
+        all_terms = [parse_term(term) for term in all_of]
+        any_terms = [parse_term(term) for term in any_of]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    candidate_term_index.ensure_fresh(db)
+    total, cv_ids = candidate_term_index.index.search(all_terms, any_terms, offset=offset, limit=limit)
+    
+    return TermSearchResponse(total=total, offset=offset, limit=limit, cvIds=cv_ids)
@@ -0,0 +1,69 @@
+"""
+Load historical profiles into an empty or new-region database with COPY (PostgreSQL only).
+
+    python -m app.commands.backfill_profiles profiles.ndjson
+    python -m app.commands.backfill_profiles sync_bodies.ndjson --format bulk --defer-indexes
+    python -m app.commands.backfill_profiles profiles.ndjson --restart  # ignore the recorded offset
+
+Rerunning with the same file (or --source) resumes after the last merged chunk.
+"""
+import argparse
+import logging
+import os
+import sys
+
+from app.database import SessionLocal
+from app.services.backfill import CHUNK_SIZE, INPUT_FORMATS, PROFILES_FORMAT, backfill
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill profiles with COPY into staging tables and set-based merges")
+    parser.add_argument("path", help="NDJSON input")
+    parser.add_argument("--format", choices=INPUT_FORMATS, default=PROFILES_FORMAT,
+                        help="one profile per line, or one /api/bulk body per line")
+    parser.add_argument("--source", default=None, help="progress key; defaults to the absolute input path")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="profiles per transaction")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="drop non-unique indexes while loading and build them at the end")
+    parser.add_argument("--restart", action="store_true", help="start at the beginning of the file")
+    args = parser.parse_args(argv)
+
+    size = os.path.getsize(args.path)
+
+    def report(result):
+        print(
+            f"offset {result.end:,}/{size:,} ({result.end / size:.1%}): {result.staged:,} profiles, "
+            f"{result.inserted:,} new, {result.rejected:,} rejected; "
+            f"{result.staged / result.seconds:,.0f} profiles/s, {result.rows / result.seconds:,.0f} rows/s",
+            flush=True
+        )
+
+    db = SessionLocal()
+    try:
+        totals = backfill(
+            db, args.path, args.format,
+            source=args.source or os.path.abspath(args.path),
+            chunk_size=args.chunk_size,
+            defer_indexes=args.defer_indexes,
+            restart=args.restart,
+            on_chunk=report,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    load_seconds = totals["loadSeconds"] or 1e-9
+    print(
+        f"Loaded bytes {totals['startOffset']:,}-{totals['endOffset']:,}: {totals['profiles']:,} profiles "
+        f"({totals['inserted']:,} new, {totals['rejected']:,} rejected), {totals['rows']:,} rows in "
+        f"{totals['seconds']:.1f}s; {totals['profiles'] / load_seconds:,.0f} profiles/s, "
+        f"{totals['rows'] / load_seconds:,.0f} rows/s while loading"
+    )
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
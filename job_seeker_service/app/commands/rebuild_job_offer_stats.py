@@ -0,0 +1,35 @@
+"""
+Recount the job offer status counters from the source tables.
+
+    python -m app.commands.rebuild_job_offer_stats          # rebuild
+    python -m app.commands.rebuild_job_offer_stats --check  # report drift only
+"""
+import argparse
+import logging
+import sys
+
+from app.database import SessionLocal
+from app.services.job_offer_stats import rebuild_job_offer_stats
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild or check the job offer status counters")
+    parser.add_argument("--check", action="store_true", help="only report mismatches, do not rewrite")
+    args = parser.parse_args(argv)
+    
+    db = SessionLocal()
+    try:
+        mismatches = rebuild_job_offer_stats(db, check_only=args.check)
+    finally:
+        db.close()
+    
+    for (job_offer_code, dimension, status), (stored, expected) in sorted(mismatches.items()):
+        print(f"{job_offer_code}\t{dimension}\t{status}\tstored={stored}\texpected={expected}")
+    print(f"{len(mismatches)} mismatched counters")
+    
+    return 1 if args.check and mismatches else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Report and migrate primary keys to time-ordered UUIDs.
+
+    python -m app.commands.rekey_tables                    # report key versions and index sizes
+    python -m app.commands.rekey_tables --rekey --reindex  # rewrite random keys, rebuild the indexes
+    python -m app.commands.rekey_tables --rekey --table experiences --batch-size 2000
+"""
+import argparse
+import logging
+import sys
+
+from app.database import Base, SessionLocal
+from app.services.key_migration import (
+    key_versions, primary_key_index_bytes, referenced_tables, rekey_table, rekeyable_tables, reindex_primary_key
+)
+import app.models  # noqa: F401  (registers all tables on Base.metadata)
+
+logger = logging.getLogger(__name__)
+
+def print_tables(db, tables):
+    print(f"{'table':<28}{'rows':>12}{'time-ordered':>14}{'random':>12}{'pk index':>14}")
+    for table in tables:
+        versions = key_versions(db, table)
+        index_bytes = primary_key_index_bytes(db, table)
+        size = f"{index_bytes / 1024 / 1024:.1f} MiB" if index_bytes is not None else "-"
+        print(f"{table.name:<28}{versions['rows']:>12,}{versions['timeOrdered']:>14,}{versions['random']:>12,}{size:>14}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate primary keys to time-ordered UUIDs")
+    parser.add_argument("--table", action="append", help="only this table (repeatable)")
+    parser.add_argument("--rekey", action="store_true", help="rewrite random keys of unreferenced tables")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the primary key indexes afterwards")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    
+    tables = rekeyable_tables(Base.metadata, args.table)
+    referenced = sorted(referenced_tables(Base.metadata) & set(args.table or Base.metadata.tables))
+    db = SessionLocal()
+    try:
+        print_tables(db, tables)
+        if referenced:
+            print(f"\nKept (referenced by foreign keys, new rows only): {', '.join(referenced)}")
+        
+        if args.rekey:
+            for table in tables:
+                rekeyed = rekey_table(
+                    db, table, args.batch_size,
+                    on_batch=lambda name, count: print(f"{name}: {count:,} rows rekeyed", flush=True)
+                )
+                if rekeyed and args.reindex:
+                    reindex_primary_key(db, table)
+            print()
+            print_tables(db, tables)
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
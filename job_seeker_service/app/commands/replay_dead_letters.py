@@ -0,0 +1,66 @@
+"""
+Re-drive failed matching partner deliveries recorded as dead letters.
+
+    python -m app.commands.replay_dead_letters --dry-run
+    python -m app.commands.replay_dead_letters --since 2025-01-29T00:00 --error-class http_5xx
+    python -m app.commands.replay_dead_letters --cv-id CV-1 --cv-id CV-2 --rate 20
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.partner_replay import dead_letter_query, dead_letter_counts, replay_dead_letters
+
+logger = logging.getLogger(__name__)
+
+def print_progress(progress):
+    state = progress.to_dict()
+    print(
+        f"{state['processed']}/{state['total']} processed: {state['replayed']} replayed, "
+        f"{state['superseded']} superseded, {state['failed']} failed ({state['ratePerSecond']}/s)",
+        flush=True
+    )
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay dead-lettered matching partner syncs")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="last failure at or after this time")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="last failure before this time")
+    parser.add_argument("--error-class", action="append", help="e.g. http_5xx, timeout; repeatable")
+    parser.add_argument("--cv-id", action="append", help="repeatable")
+    parser.add_argument("--rate", type=float, default=settings.PARTNER_REPLAY_RATE_PER_SECOND, help="requests per second")
+    parser.add_argument("--concurrency", type=int, default=settings.PARTNER_REPLAY_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=settings.PARTNER_REPLAY_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only count the selected entries")
+    args = parser.parse_args(argv)
+    
+    db = SessionLocal()
+    try:
+        query = dead_letter_query(
+            db, since=args.since, until=args.until, error_classes=args.error_class, cv_ids=args.cv_id
+        )
+        if args.dry_run:
+            counts = dead_letter_counts(query)
+            for error_class, count in sorted(counts.items()):
+                print(f"{error_class}\t{count}")
+            print(f"{sum(counts.values())} dead letters selected")
+            return 0
+        
+        progress = replay_dead_letters(
+            db, query,
+            rate_per_second=args.rate,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            on_progress=print_progress
+        )
+    finally:
+        db.close()
+    
+    print_progress(progress)
+    return 1 if progress.failed else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+End-to-end and per-stage latency percentiles from exported spans.
+
+    python -m app.commands.trace_report spans.jsonl
+    python -m app.commands.trace_report talent-pool-spans.jsonl job-seeker-spans.jsonl
+"""
+import argparse
+import logging
+import sys
+
+from app.services.trace_stats import (
+    FINAL_STAGE, end_to_end_latencies, load_spans, stage_latencies, summarize
+)
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (50, 90, 95, 99)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report latency percentiles per sync stage")
+    parser.add_argument("paths", nargs="+", help="span files written with TRACE_EXPORTER=file")
+    args = parser.parse_args(argv)
+    
+    spans = load_spans(args.paths)
+    if not spans:
+        print("No spans found")
+        return 1
+    
+    latencies = stage_latencies(spans)
+    latencies[f"end-to-end (root to {FINAL_STAGE})"] = end_to_end_latencies(spans)
+    
+    header = f"{'stage':<45}{'count':>8}" + "".join(f"{'p' + str(q):>11}" for q in QUANTILES) + f"{'max':>11}"
+    print(header)
+    for row in summarize(latencies, QUANTILES):
+        print(
+            f"{row['stage']:<45}{row['count']:>8}"
+            + "".join(f"{row['p' + str(q)]:>11.1f}" for q in QUANTILES)
+            + f"{row['max']:>11.1f}"
+        )
+    print(f"\n{len(spans)} spans, latencies in ms")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
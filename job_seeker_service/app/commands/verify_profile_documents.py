@@ -0,0 +1,49 @@
+"""
+Check the stored profile documents (PROFILE_DOCUMENT_STORAGE) against the normalized tables.
+
+    python -m app.commands.verify_profile_documents           # report mismatches
+    python -m app.commands.verify_profile_documents --repair  # rewrite them
+
+Repaired documents are dropped from the shared (Redis) profile cache tier; the
+local tiers of running workers keep a stale copy until the profile changes.
+"""
+import argparse
+import logging
+import sys
+
+from app.database import SessionLocal
+from app.services.profile_cache import profile_cache
+from app.services.profile_documents import DOCUMENT_BATCH_SIZE, verify_profile_documents
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verify stored profile documents against the normalized tables")
+    parser.add_argument("--repair", action="store_true", help="rewrite missing, stale and undecodable documents")
+    parser.add_argument("--batch-size", type=int, default=DOCUMENT_BATCH_SIZE, help="profiles loaded per query")
+    args = parser.parse_args(argv)
+
+    def report(checked, mismatched):
+        logger.info(f"{checked} profiles checked, {mismatched} mismatched")
+
+    db = SessionLocal()
+    try:
+        mismatches = verify_profile_documents(db, repair=args.repair, batch_size=args.batch_size, on_batch=report)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    if args.repair:
+        for cv_id in mismatches:
+            profile_cache.invalidate(cv_id)
+    for cv_id, reason in sorted(mismatches.items()):
+        print(f"{cv_id}\t{reason}")
+    print(f"{len(mismatches)} mismatched documents" + (" rewritten" if args.repair else ""))
+
+    return 1 if mismatches and not args.repair else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
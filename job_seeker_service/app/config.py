@@ -14,6 +14,92 @@ class Settings:
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "job_seeker_db")
     DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
     
+    # Read replicas for read-only sessions (comma-separated URLs), the replication lag above
+    # which a replica is skipped, how often the lag is measured, and the connect timeout
+    # of replica connections; see app.db_routing
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+    REPLICA_CONNECT_TIMEOUT_SECONDS: int = int(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", "2"))
+    
     MATCHING_PARTNER_API_URL: str = os.getenv("MATCHING_PARTNER_API_URL", "http://matching-service/api/profiles")
+    
+    # Whether the matching partner accepts JSON Patch deltas against the version it holds
+    MATCHING_PARTNER_SUPPORTS_DELTAS: bool = os.getenv("MATCHING_PARTNER_SUPPORTS_DELTAS", "false").lower() == "true"
+    
+    # Change log payloads: a full snapshot every N versions of a profile, and when a
+    # delta would be larger than this share of the full document
+    CHANGE_LOG_SNAPSHOT_INTERVAL: int = int(os.getenv("CHANGE_LOG_SNAPSHOT_INTERVAL", "20"))
+    CHANGE_LOG_MAX_DELTA_RATIO: float = float(os.getenv("CHANGE_LOG_MAX_DELTA_RATIO", "0.5"))
+    
+    # How long the Merkle tree served to the talent pool's drift detection is reused
+    MERKLE_TREE_TTL_SECONDS: float = float(os.getenv("MERKLE_TREE_TTL_SECONDS", "60"))
+    
+    # Dead letter replay: partner requests per second, concurrent senders, entries per batch
+    PARTNER_REPLAY_RATE_PER_SECOND: float = float(os.getenv("PARTNER_REPLAY_RATE_PER_SECOND", "50"))
+    PARTNER_REPLAY_CONCURRENCY: int = int(os.getenv("PARTNER_REPLAY_CONCURRENCY", "8"))
+    PARTNER_REPLAY_BATCH_SIZE: int = int(os.getenv("PARTNER_REPLAY_BATCH_SIZE", "200"))
+    
+    # Partner push lanes: sender threads, weights of the interactive, bulk and reconciliation
+    # lanes, and the wait after which a push is sent ahead of the weights
+    PARTNER_DISPATCH_WORKERS: int = int(os.getenv("PARTNER_DISPATCH_WORKERS", "4"))
+    PARTNER_LANE_WEIGHTS: str = os.getenv("PARTNER_LANE_WEIGHTS", "interactive=8,bulk=2,reconciliation=1")
+    PARTNER_LANE_MAX_WAIT_SECONDS: float = float(os.getenv("PARTNER_LANE_MAX_WAIT_SECONDS", "300"))
+    
+    # Shared secret for internal senders (talent pool service); enables the trusted bulk fast path
+    INTERNAL_API_TOKEN: str = os.getenv("INTERNAL_API_TOKEN", "")
+    
+    # Token for admin endpoints (X-Admin-Token); they are disabled while it is unset
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+    
+    # On-demand profiling: captures kept per process
+    PROFILING_MAX_CAPTURES: int = int(os.getenv("PROFILING_MAX_CAPTURES", "20"))
+    
+    # Span export: none, file (JSON lines at TRACE_FILE_PATH) or http (batches to TRACE_COLLECTOR_URL),
+    # and the service name spans are tagged with
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "job-seeker-service")
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE_PATH: str = os.getenv("TRACE_FILE_PATH", "spans.jsonl")
+    TRACE_COLLECTOR_URL: str = os.getenv("TRACE_COLLECTOR_URL", "")
+    
+    # /api/bulk admission control: profiles being ingested per process (429 above it),
+    # unsynced change log entries and share of DB pool connections checked out (503 above
+    # them), how often the backlog is counted, and the Retry-After range. 0 disables a limit.
+    ADMISSION_MAX_IN_FLIGHT_PROFILES: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT_PROFILES", "20000"))
+    ADMISSION_MAX_OUTBOX_BACKLOG: int = int(os.getenv("ADMISSION_MAX_OUTBOX_BACKLOG", "100000"))
+    ADMISSION_MAX_POOL_SATURATION: float = float(os.getenv("ADMISSION_MAX_POOL_SATURATION", "0.9"))
+    ADMISSION_BACKLOG_REFRESH_SECONDS: float = float(os.getenv("ADMISSION_BACKLOG_REFRESH_SECONDS", "5"))
+    ADMISSION_RETRY_AFTER_SECONDS: float = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+    ADMISSION_MAX_RETRY_AFTER_SECONDS: float = float(os.getenv("ADMISSION_MAX_RETRY_AFTER_SECONDS", "300"))
+    
+    # Sharded bulk ingest: worker processes (0 ingests in the API process), smallest
+    # request sent to them, and how they are started (spawn, forkserver or fork)
+    BULK_INGEST_PROCESSES: int = int(os.getenv("BULK_INGEST_PROCESSES", "0"))
+    BULK_INGEST_MIN_PROFILES: int = int(os.getenv("BULK_INGEST_MIN_PROFILES", "200"))
+    BULK_INGEST_START_METHOD: str = os.getenv("BULK_INGEST_START_METHOD", "spawn")
+    
+    # Upper bound on a /api/bulk body after gzip / zstd decompression
+    BULK_MAX_DECOMPRESSED_BYTES: int = int(os.getenv("BULK_MAX_DECOMPRESSED_BYTES", str(256 * 1024 * 1024)))
+    
+    # Change log polling by in-process indexes and caches: rows are re-read this
+    # far behind the newest timestamp seen, to catch transactions that commit late
+    CHANGE_FEED_LAG_SECONDS: float = float(os.getenv("CHANGE_FEED_LAG_SECONDS", "60"))
+    
+    # In-process candidate geo index
+    GEO_INDEX_CELL_SIZE_DEG: float = float(os.getenv("GEO_INDEX_CELL_SIZE_DEG", "0.1"))
+    GEO_INDEX_REFRESH_SECONDS: float = float(os.getenv("GEO_INDEX_REFRESH_SECONDS", "5"))
+    
+    # In-process skill / language / certificate / profession term index
+    TERM_INDEX_REFRESH_SECONDS: float = float(os.getenv("TERM_INDEX_REFRESH_SECONDS", "5"))
+    
+    # Read-through profile document cache (local LRU, optional shared Redis tier)
+    PROFILE_CACHE_MAX_ENTRIES: int = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "50000"))
+    PROFILE_CACHE_MAX_BYTES: int = int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    PROFILE_CACHE_REFRESH_SECONDS: float = float(os.getenv("PROFILE_CACHE_REFRESH_SECONDS", "2"))
+    PROFILE_CACHE_REDIS_URL: str = os.getenv("PROFILE_CACHE_REDIS_URL", "")
+    PROFILE_CACHE_REDIS_TTL_SECONDS: int = int(os.getenv("PROFILE_CACHE_REDIS_TTL_SECONDS", "3600"))
+    
+    # Materialized profile documents on cv_profiles: off, json or zstd (compressed JSON)
+    PROFILE_DOCUMENT_STORAGE: str = os.getenv("PROFILE_DOCUMENT_STORAGE", "off")
 
 settings = Settings()
\ No newline at end of file
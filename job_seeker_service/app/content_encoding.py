@@ -0,0 +1,208 @@
+"""
+Streaming Content-Encoding support for request bodies.
+
+Bodies are decompressed chunk by chunk as they arrive, and decoding stops as
+soon as the output passes a size limit. This way, a small compressed payload
+cannot expand into unbounded memory.
+"""
+import zlib
+
+import zstandard
+
+# Upper bound on decompressed bytes produced per zlib call
+_GZIP_OUTPUT_STEP = 256 * 1024
+
+# zstd frame format (RFC 8878)
+_ZSTD_MAGIC = 0xFD2FB528
+_ZSTD_SKIPPABLE_MAGIC = 0x184D2A50  # low four bits are free
+_ZSTD_RLE_BLOCK = 1
+
+
+class ContentDecodingError(ValueError):
+    """Base class for request bodies that cannot be decoded"""
+
+
+class UnsupportedEncodingError(ContentDecodingError):
+    pass
+
+
+class CorruptPayloadError(ContentDecodingError):
+    pass
+
+
+class PayloadTooLargeError(ContentDecodingError):
+    pass
+
+
+class _LimitedBuffer:
+    """Collects decoded output and raises once it exceeds max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._parts = []
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise PayloadTooLargeError(f"Decoded request body exceeds {self.max_bytes} bytes")
+        self._parts.append(data)
+        return len(data)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class IdentityDecoder:
+    def __init__(self, max_bytes: int):
+        self._out = _LimitedBuffer(max_bytes)
+
+    def feed(self, chunk: bytes):
+        self._out.write(chunk)
+
+    def finish(self) -> bytes:
+        return self._out.getvalue()
+
+
+class GzipDecoder:
+    def __init__(self, max_bytes: int):
+        self._out = _LimitedBuffer(max_bytes)
+        self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def feed(self, chunk: bytes):
+        try:
+            data = self._inflater.decompress(chunk, _GZIP_OUTPUT_STEP)
+            self._out.write(data)
+            while self._inflater.unconsumed_tail:
+                data = self._inflater.decompress(self._inflater.unconsumed_tail, _GZIP_OUTPUT_STEP)
+                self._out.write(data)
+        except zlib.error as e:
+            raise CorruptPayloadError(f"Invalid gzip body: {e}")
+
+    def finish(self) -> bytes:
+        if not self._inflater.eof:
+            raise CorruptPayloadError("Truncated gzip body")
+        return self._out.getvalue()
+
+
+class _ZstdFrameTracker:
+    """
+    Follows the frame and block headers of a zstd stream without decoding it,
+    to tell whether the input ended after a complete frame. The stream writer
+    does not report that.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self._pending = b""
+        self._need = 4
+        self._skip = 0
+        self._step = self._magic
+        self._checksum = False
+
+    @property
+    def complete(self) -> bool:
+        return self.frames > 0 and self._step == self._magic and not self._pending and not self._skip
+
+    def feed(self, chunk: bytes):
+        position = 0
+        while position < len(chunk):
+            if self._skip:
+                skipped = min(self._skip, len(chunk) - position)
+                self._skip -= skipped
+                position += skipped
+                continue
+            taken = min(self._need - len(self._pending), len(chunk) - position)
+            self._pending += chunk[position:position + taken]
+            position += taken
+            if len(self._pending) == self._need:
+                header, self._pending = self._pending, b""
+                self._step(header)
+
+    def _magic(self, header: bytes):
+        magic = int.from_bytes(header, "little")
+        if magic & 0xFFFFFFF0 == _ZSTD_SKIPPABLE_MAGIC:
+            self._step, self._need = self._skippable_size, 4
+        elif magic == _ZSTD_MAGIC:
+            self._step, self._need = self._frame_descriptor, 1
+        else:
+            raise CorruptPayloadError("Invalid zstd body: unknown frame magic number")
+
+    def _skippable_size(self, header: bytes):
+        self.frames += 1
+        self._skip = int.from_bytes(header, "little")
+        self._step, self._need = self._magic, 4
+
+    def _frame_descriptor(self, header: bytes):
+        descriptor = header[0]
+        content_size_flag, single_segment = descriptor >> 6, descriptor >> 5 & 1
+        self._checksum = bool(descriptor >> 2 & 1)
+        window_size = 0 if single_segment else 1
+        dictionary_id = (0, 1, 2, 4)[descriptor & 3]
+        content_size = (single_segment, 2, 4, 8)[content_size_flag]
+        self._skip = window_size + dictionary_id + content_size
+        self._step, self._need = self._block, 3
+
+    def _block(self, header: bytes):
+        block = int.from_bytes(header, "little")
+        last, block_type, size = block & 1, block >> 1 & 3, block >> 3
+        self._skip = 1 if block_type == _ZSTD_RLE_BLOCK else size
+        if last:
+            self.frames += 1
+            self._skip += 4 if self._checksum else 0
+            self._step, self._need = self._magic, 4
+
+
+class ZstdDecoder:
+    def __init__(self, max_bytes: int):
+        self._out = _LimitedBuffer(max_bytes)
+        # The writer hands output to the buffer in bounded pieces, so the limit
+        # applies while a frame is being decoded
+        self._writer = zstandard.ZstdDecompressor().stream_writer(self._out, write_return_read=True)
+        self._frames = _ZstdFrameTracker()
+
+    def feed(self, chunk: bytes):
+        try:
+            self._writer.write(chunk)
+        except zstandard.ZstdError as e:
+            raise CorruptPayloadError(f"Invalid zstd body: {e}")
+        self._frames.feed(chunk)
+
+    def finish(self) -> bytes:
+        if not self._frames.complete:
+            raise CorruptPayloadError("Truncated zstd body")
+        return self._out.getvalue()
+
+
+DECODERS = {
+    "identity": IdentityDecoder,
+    "gzip": GzipDecoder,
+    "x-gzip": GzipDecoder,
+    "zstd": ZstdDecoder,
+}
+
+
+def make_decoder(content_encoding: str, max_bytes: int):
+    encoding = (content_encoding or "identity").strip().lower()
+    decoder = DECODERS.get(encoding)
+    if decoder is None:
+        raise UnsupportedEncodingError(
+            f"Unsupported Content-Encoding '{content_encoding}', expected one of {', '.join(DECODERS)}"
+        )
+    return decoder(max_bytes)
+
+
+async def read_decoded_body(request, max_bytes: int) -> bytes:
+    """Read a request body, decompressing it per its Content-Encoding as it streams in"""
+    decoder = make_decoder(request.headers.get("content-encoding"), max_bytes)
+    async for chunk in request.stream():
+        if chunk:
+            decoder.feed(chunk)
+    return decoder.finish()
+
+
+def decode_body(body: bytes, content_encoding: str, max_bytes: int) -> bytes:
+    """Decode an already buffered body"""
+    decoder = make_decoder(content_encoding, max_bytes)
+    decoder.feed(body)
+    return decoder.finish()
@@ -3,11 +3,34 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from app.db_routing import ReplicaRouter, RoutingSession
+from app.json_codec import json_serializer, loads
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _create_engine(url: str, **kwargs):
+    return create_engine(
+        url,
+        json_serializer=json_serializer,
+        json_deserializer=loads,
+        **kwargs,
+    )
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+replica_router = ReplicaRouter(
+    [
+        _create_engine(url.strip(), connect_args={"connect_timeout": settings.REPLICA_CONNECT_TIMEOUT_SECONDS})
+        for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+    ],
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_LAG_CHECK_SECONDS,
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+# Sessions whose reads may be served by a replica; see app.db_routing
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession,
+    router=replica_router, read_only=True,
+)
 
 Base = declarative_base()
 
@@ -17,4 +40,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for read-only endpoints
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,194 @@
+"""
+Routing of read-only sessions to read replicas.
+
+Sessions from ReadSessionLocal (get_read_db in endpoints) send their SELECTs
+to one of the replicas in DATABASE_REPLICA_URLS. A background thread measures
+each replica's replication lag every REPLICA_LAG_CHECK_SECONDS; a replica that
+lags more than REPLICA_MAX_LAG_SECONDS, or cannot be reached, is skipped until
+a later check finds it caught up. Choosing a replica only reads the result of
+the last check, so an unreachable replica never holds up a request. Until the
+first check and when no replica qualifies, reads go to the primary. A
+session sticks to one replica, and to the primary for the rest of its life
+once it writes (a flush, an INSERT / UPDATE / DELETE, a SELECT ... FOR UPDATE
+or a textual statement), so a request reads its own writes.
+Sessions from SessionLocal always use the primary.
+
+Each service is built and deployed from its own directory, so both keep a
+copy of this module; the copies are kept identical (test_shared_copies in
+the job seeker service checks them).
+"""
+import itertools
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+
+def measure_replica_lag(engine: Engine) -> float:
+    """
+    Seconds the replica's replayed WAL is behind the primary; 0 for a server
+    that is not in recovery or has replayed everything it received, and for
+    databases other than PostgreSQL, which have no streaming replicas
+    """
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as connection:
+        lag = connection.execute(text(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        )).scalar()
+    return float(lag or 0.0)
+
+
+class Replica:
+    """A replica engine with its last measured lag"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked = False
+        self.healthy = False
+        self.reads = 0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaRouter:
+    """
+    Chooses a replica for read-only sessions, skipping lagging or unreachable
+    ones. With monitor set, the lag checks run in a background thread started
+    by the first choose(); otherwise check_replicas() is called by the owner.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Engine],
+        max_lag_seconds: float,
+        check_interval: float,
+        lag_probe: Callable[[Engine], float] = measure_replica_lag,
+        monitor: bool = True,
+    ):
+        self.replicas = [Replica(engine) for engine in replicas]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self.monitor = monitor
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.primary_reads = 0
+
+    def _measure(self, replica: Replica):
+        """Probe one replica; runs without the lock, since a probe may wait for a connect timeout"""
+        try:
+            lag, error = self.lag_probe(replica.engine), None
+        except Exception as e:
+            lag, error = None, str(e)
+        healthy = error is None and lag <= self.max_lag_seconds
+        with self._lock:
+            first_check, was_healthy = not replica.checked, replica.healthy
+            replica.lag, replica.error, replica.healthy, replica.checked = lag, error, healthy, True
+        if healthy != was_healthy or (first_check and not healthy):
+            if healthy:
+                logger.info(f"Replica {replica.name} is serving reads (lag {lag:.1f}s)")
+            else:
+                reason = error or f"lag {lag:.1f}s above {self.max_lag_seconds}s"
+                logger.warning(f"Replica {replica.name} skipped, reads fall back to the primary: {reason}")
+
+    def check_replicas(self):
+        """Measure the lag of every replica once"""
+        for replica in self.replicas:
+            self._measure(replica)
+
+    def _run_monitor(self):
+        while not self._stopping.is_set():
+            self.check_replicas()
+            self._stopping.wait(self.check_interval)
+
+    def _start_monitor(self):
+        if self._monitor_thread is not None or not self.monitor or self._stopping.is_set():
+            return
+        self._monitor_thread = threading.Thread(target=self._run_monitor, name="replica-lag-monitor", daemon=True)
+        self._monitor_thread.start()
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stop the lag checks; sessions keep using the replicas found healthy last"""
+        self._stopping.set()
+        with self._lock:
+            thread, self._monitor_thread = self._monitor_thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def choose(self) -> Optional[Engine]:
+        """A replica to read from, or None to read from the primary"""
+        if not self.replicas:
+            return None
+        with self._lock:
+            self._start_monitor()
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            if not healthy:
+                self.primary_reads += 1
+                return None
+            replica = healthy[next(self._next) % len(healthy)]
+            replica.reads += 1
+            return replica.engine
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "maxLagSeconds": self.max_lag_seconds,
+                "primaryFallbacks": self.primary_reads,
+                "replicas": [
+                    {
+                        "url": replica.name,
+                        "healthy": replica.healthy,
+                        "lagSeconds": replica.lag,
+                        "error": replica.error,
+                        "sessions": replica.reads,
+                    }
+                    for replica in self.replicas
+                ],
+            }
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the SELECTs of a read-only session to a replica chosen
+    by its router, until the session writes; see the module docstring.
+    """
+
+    def __init__(self, *args, router: Optional[ReplicaRouter] = None, read_only: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self.read_only = read_only
+        self.wrote = False
+        self._replica: Optional[Engine] = None
+        self._replica_chosen = False
+
+    @property
+    def read_from_replica(self) -> bool:
+        """Whether the session's reads so far may have been served by a replica"""
+        return self._replica is not None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if not self.read_only or self.router is None or self.wrote:
+            return primary
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            self.wrote = True
+            return primary
+        if not self._replica_chosen:
+            self._replica = self.router.choose()
+            self._replica_chosen = True
+        return self._replica or primary
@@ -0,0 +1,29 @@
+import orjson
+
+
+class RawJSON(bytes):
+    """
+    A JSON document that has already been encoded.
+    Values of this type are written to JSON columns and request bodies as-is,
+    so the same bytes are never serialized twice.
+    """
+
+
+def dumps(value) -> bytes:
+    """Encode a value to JSON bytes, passing pre-encoded documents through untouched"""
+    if isinstance(value, RawJSON):
+        return bytes(value)
+    return orjson.dumps(value)
+
+
+def loads(data):
+    """Decode JSON from bytes, str or a pre-encoded document"""
+    if isinstance(data, RawJSON):
+        # orjson only accepts exact bytes, not subclasses
+        data = bytes(data)
+    return orjson.loads(data)
+
+
+def json_serializer(value) -> str:
+    """Serializer for SQLAlchemy JSON columns"""
+    return dumps(value).decode("utf-8")
@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
-from app.api import bulk_api, profile_api
-from app.database import Base, engine
+from app.api import (
+    bulk_api, profile_api, search_api, job_offer_api, partner_sync_api, profiling_api, consistency_api
+)
+from app.database import Base, engine, replica_router
+from app.services.partner_dispatcher import partner_dispatcher
+from app.services.sharded_ingest import sharded_ingestor
 
 # Configure logging
 logging.basicConfig(
@@ -11,9 +15,6 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(title="Job Seeker Service")
 
 # Configure CORS
@@ -28,6 +29,28 @@ app.add_middleware(
 # Include routers
 app.include_router(bulk_api.router, prefix="/api", tags=["bulk"])
 app.include_router(profile_api.router, prefix="/api", tags=["profiles"])
+app.include_router(search_api.router, prefix="/api", tags=["search"])
+app.include_router(job_offer_api.router, prefix="/api", tags=["job-offers"])
+app.include_router(partner_sync_api.router, prefix="/api", tags=["partner-sync"])
+app.include_router(profiling_api.router, prefix="/api", tags=["admin"])
+app.include_router(consistency_api.router, prefix="/api", tags=["consistency"])
+
+@app.on_event("startup")
+def create_tables():
+    # On startup rather than at import, so importing the app needs no database
+    Base.metadata.create_all(bind=engine)
+
+@app.on_event("shutdown")
+def stop_ingest_workers():
+    sharded_ingestor.shutdown()
+
+@app.on_event("shutdown")
+def drain_partner_pushes():
+    partner_dispatcher.shutdown(timeout=30)
+
+@app.on_event("shutdown")
+def stop_replica_lag_checks():
+    replica_router.shutdown(timeout=5)
 
 @app.get("/", tags=["health"])
 async def health_check():
@@ -5,4 +5,8 @@ from app.models.profile import (
     Hobby, Language, SoftSkill, Certificate, 
     TalentPoolMembership, ApplicationStatus, MatchFeedback,
     ProfileChangeLog
-)
\ No newline at end of file
+)
+from app.models.job_offer_stats import JobOfferStatusCount
+from app.models.partner_sync import PartnerSyncDeadLetter
+from app.models.pool_manifest import PoolManifest, PoolManifestEntry
+from app.models.backfill import BackfillProgress
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+
+from app.database import Base
+
+class BackfillProgress(Base):
+    """
+    How far a backfill got through one input file. Updated in the transaction
+    that merges a chunk, so a restarted backfill resumes after the last merged line.
+    """
+    __tablename__ = "backfill_progress"
+
+    source = Column(String, primary_key=True)
+    # Byte offset of the first line not merged yet
+    file_offset = Column(BigInteger, nullable=False, default=0)
+    profiles = Column(BigInteger, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer
+
+from app.database import Base
+
+class JobOfferStatusCount(Base):
+    """
+    Number of profiles per job offer with a given application or match status.
+    Maintained incrementally by the bulk writer; see app.services.job_offer_stats.
+    """
+    __tablename__ = "job_offer_status_counts"
+    
+    job_offer_code = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)  # application_status, match_status
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
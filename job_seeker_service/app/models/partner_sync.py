@@ -0,0 +1,29 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Uuid
+
+from app.database import Base
+
+class PartnerSyncDeadLetter(Base):
+    """
+    A change log entry that could not be delivered to the matching partner.
+    One row per change log entry; replays update the row in place.
+    """
+    __tablename__ = "partner_sync_dead_letters"
+    
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    change_log_id = Column(Uuid, ForeignKey("profile_change_logs.id"), unique=True, nullable=False)
+    cv_id = Column(String, index=True, nullable=False)
+    operation = Column(String, nullable=False)
+    # http_4xx, http_5xx, timeout, connection, profile_not_found, error
+    error_class = Column(String, index=True, nullable=False)
+    error_message = Column(String, nullable=True)
+    last_status_code = Column(Integer, nullable=True)
+    attempt_count = Column(Integer, nullable=False, default=0)
+    replay_count = Column(Integer, nullable=False, default=0)
+    first_failed_at = Column(DateTime, default=datetime.utcnow)
+    last_failed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Set once the entry was delivered by a replay or superseded by a newer synced change
+    resolved_at = Column(DateTime, nullable=True, index=True)
+    resolution = Column(String, nullable=True)  # replayed, superseded
@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, UniqueConstraint, Uuid
+
+from app.database import Base
+
+class PoolManifest(Base):
+    """
+    A full-sync manifest of one talent pool: the cvIds of all its members in one
+    sync run. Applying it removes the memberships of profiles not listed.
+    """
+    __tablename__ = "pool_manifests"
+    __table_args__ = (
+        # A manifest resent for the same run is applied once
+        UniqueConstraint("run_id", "talent_pool_id", name="uq_pool_manifests_run_pool"),
+    )
+    
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    talent_pool_id = Column(String, index=True, nullable=False)
+    run_id = Column(String, nullable=False)
+    member_count = Column(Integer, nullable=False, default=0)
+    removed_count = Column(Integer, nullable=False, default=0)
+    tombstoned_count = Column(Integer, nullable=False, default=0)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class PoolManifestEntry(Base):
+    """Staging rows of a manifest being applied; deleted once it is applied"""
+    __tablename__ = "pool_manifest_entries"
+    
+    manifest_id = Column(Uuid, ForeignKey("pool_manifests.id"), primary_key=True)
+    cv_id = Column(String, primary_key=True)
@@ -1,15 +1,14 @@
-import uuid
-from sqlalchemy import Boolean, Column, String, Integer, Float, ARRAY, ForeignKey, DateTime, JSON
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, String, Integer, Float, ARRAY, ForeignKey, DateTime, JSON, Index, LargeBinary, Uuid, text
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 
 from app.database import Base
+from app.ids import uuid7
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid7)
     user_id = Column(String, unique=True, index=True)
     candidate_code = Column(String, index=True)
     
@@ -17,14 +16,27 @@ class User(Base):
 
 class CVProfile(Base):
     __tablename__ = "cv_profiles"
+    __table_args__ = (
+        # Merkle leaf buckets of drift detection; see app.services.merkle
+        Index("ix_cv_profiles_merkle_bucket", text("substr(md5(cv_id), 1, 3)")).ddl_if(dialect="postgresql"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid7)
     cv_id = Column(String, unique=True, index=True)
     last_modified_dt = Column(DateTime, default=datetime.utcnow)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    user_id = Column(Uuid, ForeignKey("users.id"))
     working_hours = Column(Integer)
     willing_to_travel = Column(Boolean, default=False)
     visible_in_talent_pool = Column(Boolean, default=True)
+    # contentHash of the last talent pool document applied; see app.services.merkle
+    content_hash = Column(String, nullable=True)
+    # Set when a pool manifest removed the profile's last talent pool membership;
+    # cleared when the talent pool sends the profile again
+    tombstoned_at = Column(DateTime, nullable=True)
+    # Materialized profile document (PROFILE_DOCUMENT_STORAGE), written in the transaction
+    # of the normalized rows; see app.services.profile_documents
+    document = deferred(Column(LargeBinary, nullable=True))
+    document_encoding = Column(String, nullable=True)
     
     user = relationship("User", back_populates="profile")
     address = relationship("CVAddress", back_populates="profile", uselist=False)
@@ -41,17 +53,18 @@ class CVProfile(Base):
 class CVAddress(Base):
     __tablename__ = "cv_addresses"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
-    geo_location = Column(ARRAY(Float), nullable=True)
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
+    # JSON lists on SQLite, which has no arrays (tests)
+    geo_location = Column(ARRAY(Float).with_variant(JSON, "sqlite"), nullable=True)
     
     profile = relationship("CVProfile", back_populates="address")
 
 class Experience(Base):
     __tablename__ = "experiences"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     profession_nm = Column(String)
     company = Column(String)
     start_d = Column(String, nullable=True)
@@ -64,8 +77,8 @@ class Experience(Base):
 class Education(Base):
     __tablename__ = "educations"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     educational_institution_nm = Column(String)
     degree_code = Column(String)
     degree_code_job_digger = Column(String)
@@ -81,8 +94,8 @@ class Education(Base):
 class Hobby(Base):
     __tablename__ = "hobbies"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     hobby_nm = Column(String)
     
     profile = relationship("CVProfile", back_populates="hobbies")
@@ -90,8 +103,8 @@ class Hobby(Base):
 class Language(Base):
     __tablename__ = "languages"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     skill_nm = Column(String)
     rating = Column(Integer, nullable=True)
     
@@ -100,11 +113,11 @@ class Language(Base):
 class SoftSkill(Base):
     __tablename__ = "soft_skills"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     skill_id = Column(String)
     skill_nm = Column(String)
-    related_line_item_type = Column(ARRAY(String), nullable=True)
+    related_line_item_type = Column(ARRAY(String).with_variant(JSON, "sqlite"), nullable=True)
     rating = Column(Integer, nullable=True)
     
     profile = relationship("CVProfile", back_populates="soft_skills")
@@ -112,8 +125,8 @@ class SoftSkill(Base):
 class Certificate(Base):
     __tablename__ = "certificates"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     certificate_id = Column(String)
     skill_nm = Column(String)
     
@@ -122,8 +135,8 @@ class Certificate(Base):
 class TalentPoolMembership(Base):
     __tablename__ = "talent_pool_memberships"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     talent_pool_id = Column(String)
     talent_pool_name = Column(String)
     
@@ -132,8 +145,8 @@ class TalentPoolMembership(Base):
 class ApplicationStatus(Base):
     __tablename__ = "application_statuses"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     job_offer_code = Column(String)
     application_status = Column(String)
     
@@ -142,8 +155,8 @@ class ApplicationStatus(Base):
 class MatchFeedback(Base):
     __tablename__ = "match_feedbacks"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    profile_id = Column(UUID(as_uuid=True), ForeignKey("cv_profiles.id"))
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    profile_id = Column(Uuid, ForeignKey("cv_profiles.id"), index=True)
     job_offer_code = Column(String)
     match_status = Column(String)
     
@@ -152,9 +165,26 @@ class MatchFeedback(Base):
 class ProfileChangeLog(Base):
     __tablename__ = "profile_change_logs"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid7)
     cv_id = Column(String, index=True)
     operation = Column(String)  # INSERT, UPDATE, DELETE
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     synced_to_matching_partner = Column(Boolean, default=False)
-    payload = Column(JSON, nullable=True)
\ No newline at end of file
+    payload = Column(JSON, nullable=True)
+    # Per-profile sequence; payload is the full document of this version (snapshot)
+    # or JSON Patch operations against base_version (delta)
+    version = Column(Integer, nullable=True)
+    payload_kind = Column(String, default="snapshot")  # snapshot, delta
+    base_version = Column(Integer, nullable=True)
+    # W3C traceparent of the span that wrote the change; continued by the partner push
+    traceparent = Column(String, nullable=True)
+    
+    __table_args__ = (
+        # One row per profile version; see app.services.change_log
+        Index("ix_profile_change_logs_cv_id_version", "cv_id", "version", unique=True),
+        # Keeps the unsynced backlog count used by bulk admission control cheap
+        Index(
+            "ix_profile_change_logs_unsynced", "timestamp",
+            postgresql_where=synced_to_matching_partner == False
+        ),
+    )
@@ -0,0 +1,27 @@
+import msgpack
+
+# Media types accepted for MessagePack request bodies
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class MessagePackDecodeError(ValueError):
+    pass
+
+
+def is_msgpack(content_type) -> bool:
+    """Whether a Content-Type header names MessagePack, ignoring parameters"""
+    if not content_type:
+        return False
+    return content_type.split(";", 1)[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+
+def unpackb(data: bytes):
+    """
+    Decode a MessagePack document into plain dicts and lists.
+    Timestamp extension values decode to timezone-aware datetimes, which the
+    bulk schemas accept as they are.
+    """
+    try:
+        return msgpack.unpackb(data, timestamp=3)
+    except Exception as e:
+        raise MessagePackDecodeError(f"Invalid MessagePack body: {e}")
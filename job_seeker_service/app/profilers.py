@@ -0,0 +1,194 @@
+"""
+Stack sampling and cProfile capture of a block of code, shared by the
+on-demand profiling of both services (see app.profiling for the arming).
+
+Captures are downloadable as collapsed stacks ("frame;frame;frame weight"
+lines), which flamegraph.pl, speedscope and inferno read.
+- "sampling": a background thread samples the executing thread's stack every
+  few milliseconds. Low overhead; weights are sample counts.
+- "deterministic": cProfile. Exact call counts, higher overhead; also
+  available as a pstats dump. Its collapsed stacks are reconstructed from the
+  caller graph, so time is split across callers proportionally.
+"""
+import cProfile
+import logging
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sampling", "deterministic")
+
+# Stack depth and per-path time (seconds) below which the cProfile graph walk stops
+_MAX_GRAPH_DEPTH = 128
+_MIN_GRAPH_SECONDS = 1e-6
+
+
+def _label(name: str, filename: str, lineno: int) -> str:
+    # ';' separates frames and ' ' the weight in collapsed stacks
+    label = name if filename == "~" else f"{name} ({filename}:{lineno})"
+    return label.replace(";", ":").replace("\n", " ")
+
+
+def _stack_key(frame) -> str:
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_label(code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def render_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {weight}\n" for stack, weight in sorted(stacks.items()) if weight > 0)
+
+
+class SamplingProfiler:
+    """Samples the stack of the thread that calls start() from a background thread"""
+
+    mode = "sampling"
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[_stack_key(frame)] += 1
+            del frame
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def collapsed(self) -> str:
+        return render_collapsed(self.stacks)
+
+    def pstats_dump(self) -> Optional[bytes]:
+        return None
+
+
+class DeterministicProfiler:
+    """cProfile, with collapsed stacks in microseconds derived from its caller graph"""
+
+    mode = "deterministic"
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self.stats: Dict[tuple, tuple] = {}
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+        self.stats = pstats.Stats(self._profile).stats
+
+    def collapsed(self) -> str:
+        return render_collapsed(collapse_call_graph(self.stats))
+
+    def pstats_dump(self) -> Optional[bytes]:
+        # Same format as pstats.Stats.dump_stats; load with pstats.Stats(path)
+        return marshal.dumps(self.stats)
+
+
+def collapse_call_graph(stats: Dict[tuple, tuple]) -> Counter:
+    """
+    Collapsed stacks from cProfile stats. Walking down from the functions without
+    callers, each call edge receives its share of the caller's path time in
+    proportion to the edge's cumulative time. Recursive edges are not followed.
+    """
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+
+    stacks = Counter()
+    pending = [(func, (), frozenset(), entry[3]) for func, entry in stats.items() if not entry[4]]
+    while pending:
+        func, path, seen, budget = pending.pop()
+        _, _, own_time, cumulative, _ = stats[func]
+        if cumulative <= 0 or budget < _MIN_GRAPH_SECONDS:
+            continue
+        path = path + (_label(func[2], func[0], func[1]),)
+        scale = min(1.0, budget / cumulative)
+        stacks[";".join(path)] += round(own_time * scale * 1e6)
+        if len(path) >= _MAX_GRAPH_DEPTH:
+            continue
+        seen = seen | {func}
+        for callee, edge_time in callees.get(func, ()):
+            if callee not in seen:
+                pending.append((callee, path, seen, edge_time * scale))
+    return stacks
+
+
+def make_profiler(mode: str, interval_ms: float):
+    if mode == "deterministic":
+        return DeterministicProfiler()
+    return SamplingProfiler(interval_ms / 1000)
+
+
+class ProfileCapture:
+    """One profiled execution of a target"""
+
+    def __init__(self, target: str, mode: str, attributes: Optional[dict] = None):
+        self.capture_id = str(uuid.uuid4())
+        self.target = target
+        self.mode = mode
+        self.attributes = attributes or {}
+        self.started_at = datetime.utcnow()
+        self.duration_ms = 0.0
+        self.collapsed = ""
+        self.pstats: Optional[bytes] = None
+
+    @property
+    def stacks(self) -> int:
+        return self.collapsed.count("\n")
+
+
+@contextmanager
+def maybe_profile(registry, target: str, **attributes):
+    """
+    Profile the enclosed block if target is armed; yields the capture or None.
+    registry.claim(target) returns None or a plan with "mode" and "interval_ms",
+    and registry.add(capture) keeps the finished capture.
+    """
+    plan = registry.claim(target)
+    if plan is None:
+        yield None
+        return
+
+    capture = ProfileCapture(target, plan["mode"], attributes)
+    profiler = make_profiler(plan["mode"], plan["interval_ms"])
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield capture
+    finally:
+        profiler.stop()
+        capture.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        try:
+            capture.collapsed = profiler.collapsed()
+            capture.pstats = profiler.pstats_dump()
+        except Exception:
+            logger.exception(f"Could not render profile of {target}")
+        registry.add(capture)
+        logger.info(f"Captured {capture.mode} profile {capture.capture_id} of {target} ({capture.duration_ms} ms)")
@@ -0,0 +1,83 @@
+"""
+On-demand profiling of the next N executions of a code path.
+
+An admin arms a target (e.g. "bulk") with a count and a mode. Each of the
+next N executions of the target is profiled, and the result is kept as a
+capture. The profilers and the capture format are in app.profilers.
+
+Unarmed, a target costs one dict lookup per execution. Arming and captures
+are per process.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.profilers import ProfileCapture
+
+
+def capture_info(capture: ProfileCapture) -> dict:
+    """Metadata of a capture, as listed by the admin API"""
+    return {
+        "captureId": capture.capture_id,
+        "target": capture.target,
+        "mode": capture.mode,
+        "startedAt": capture.started_at,
+        "durationMs": capture.duration_ms,
+        "stacks": capture.stacks,
+        "hasPstats": capture.pstats is not None,
+        "attributes": capture.attributes,
+    }
+
+
+class ProfilingRegistry:
+    """Armed targets and the most recent captures of this process"""
+
+    def __init__(self, max_captures: int = 20):
+        self.max_captures = max_captures
+        self._armed: Dict[str, dict] = {}
+        self._captures: "OrderedDict[str, ProfileCapture]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def arm(self, target: str, count: int, mode: str, interval_ms: float) -> dict:
+        with self._lock:
+            self._armed[target] = {"remaining": count, "mode": mode, "intervalMs": interval_ms}
+            return dict(self._armed[target], target=target)
+
+    def disarm(self, target: str):
+        with self._lock:
+            self._armed.pop(target, None)
+
+    def armed(self) -> List[dict]:
+        with self._lock:
+            return [dict(plan, target=target) for target, plan in self._armed.items()]
+
+    def claim(self, target: str) -> Optional[dict]:
+        """Take one armed execution of target, or None if it is not armed"""
+        if target not in self._armed:
+            return None
+        with self._lock:
+            plan = self._armed.get(target)
+            if plan is None:
+                return None
+            plan["remaining"] -= 1
+            if plan["remaining"] <= 0:
+                del self._armed[target]
+            return {"mode": plan["mode"], "interval_ms": plan["intervalMs"]}
+
+    def add(self, capture: ProfileCapture):
+        with self._lock:
+            self._captures[capture.capture_id] = capture
+            while len(self._captures) > self.max_captures:
+                self._captures.popitem(last=False)
+
+    def captures(self) -> List[ProfileCapture]:
+        with self._lock:
+            return list(reversed(self._captures.values()))
+
+    def get(self, capture_id: str) -> Optional[ProfileCapture]:
+        with self._lock:
+            return self._captures.get(capture_id)
+
+
+profiling_registry = ProfilingRegistry(settings.PROFILING_MAX_CAPTURES)
@@ -0,0 +1,169 @@
+import logging
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import ReadSessionLocal, engine
+from app.models.profile import ProfileChangeLog
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """A bulk request refused under load; status is 429 or 503"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def unsynced_backlog(session_factory, limit: int) -> int:
+    """Unsynced change log entries, counted up to limit"""
+    db = session_factory()
+    try:
+        pending = select(ProfileChangeLog.id)\
+            .where(ProfileChangeLog.synced_to_matching_partner == False)\
+            .limit(limit)\
+            .subquery()
+        return db.execute(select(func.count()).select_from(pending)).scalar_one()
+    finally:
+        db.close()
+
+
+def pool_saturation(pool) -> float:
+    """Share of the engine's connections checked out, overflow included; 0 for pools without a limit"""
+    try:
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        return pool.checkedout() / capacity if capacity > 0 else 0.0
+    except AttributeError:
+        return 0.0
+
+
+class AdmissionController:
+    """
+    Admission control for /api/bulk. A request is refused with
+    - 429 while the profiles accepted by this process and not yet pushed to the
+      matching partner exceed max_in_flight,
+    - 503 while the unsynced change log (the matching partner outbox) exceeds
+      max_backlog, or the database pool is saturated.
+    Retry-After grows with how far the backlog is past its limit. The backlog is
+    counted at most every refresh_seconds, and only up to four times its limit.
+    A limit of 0 disables its check.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_backlog: int,
+        max_pool_saturation: float,
+        refresh_seconds: float,
+        retry_after_seconds: float,
+        max_retry_after_seconds: float,
+        backlog_counter: Optional[Callable[[int], int]] = None,
+        pool=None,
+        clock=time.monotonic,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_backlog = max_backlog
+        self.max_pool_saturation = max_pool_saturation
+        self.refresh_seconds = refresh_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.max_retry_after_seconds = max_retry_after_seconds
+        self.backlog_counter = backlog_counter
+        self.pool = pool
+        self._clock = clock
+        self.in_flight = 0
+        self.backlog = 0
+        self._backlog_checked_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _retry_after(self, factor: float = 1.0) -> int:
+        return max(1, min(int(self.max_retry_after_seconds), math.ceil(self.retry_after_seconds * factor)))
+
+    def _refresh_backlog(self):
+        if not self.max_backlog or self.backlog_counter is None:
+            return
+        now = self._clock()
+        if self._backlog_checked_at is not None and now - self._backlog_checked_at < self.refresh_seconds:
+            return
+        # One request refreshes the count; the others use the previous value meanwhile
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self.backlog = self.backlog_counter(self.max_backlog * 4)
+            self._backlog_checked_at = now
+        except Exception as e:
+            logger.warning(f"Could not count the partner sync backlog: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def check(self):
+        """Refuse a request before its body is read; raises AdmissionRejected"""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            raise AdmissionRejected(
+                429, self._retry_after(),
+                f"{self.in_flight} bulk profiles in flight, limit is {self.max_in_flight}"
+            )
+
+        self._refresh_backlog()
+        if self.max_backlog and self.backlog > self.max_backlog:
+            raise AdmissionRejected(
+                503, self._retry_after(self.backlog / self.max_backlog),
+                f"{self.backlog} profile changes waiting for the matching partner, limit is {self.max_backlog}"
+            )
+
+        if self.max_pool_saturation and self.pool is not None:
+            saturation = pool_saturation(self.pool)
+            if saturation >= self.max_pool_saturation:
+                raise AdmissionRejected(
+                    503, self._retry_after(),
+                    f"Database pool {saturation:.0%} checked out, limit is {self.max_pool_saturation:.0%}"
+                )
+
+    def acquire(self, profiles: int):
+        """Count profiles as in flight; raises AdmissionRejected past the limit"""
+        with self._lock:
+            # A single request larger than the limit is admitted when nothing else is in flight
+            if self.max_in_flight and self.in_flight and self.in_flight + profiles > self.max_in_flight:
+                raise AdmissionRejected(
+                    429, self._retry_after(),
+                    f"{self.in_flight} bulk profiles in flight, {profiles} more exceed the limit of {self.max_in_flight}"
+                )
+            self.in_flight += profiles
+
+    def release(self, profiles: int):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - profiles)
+
+    def status(self) -> dict:
+        return {
+            "inFlightProfiles": self.in_flight,
+            "maxInFlightProfiles": self.max_in_flight,
+            "outboxBacklog": self.backlog,
+            "maxOutboxBacklog": self.max_backlog,
+            "poolSaturation": round(pool_saturation(self.pool), 3) if self.pool is not None else None,
+            "maxPoolSaturation": self.max_pool_saturation,
+        }
+
+
+def _create_controller() -> AdmissionController:
+    return AdmissionController(
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT_PROFILES,
+        max_backlog=settings.ADMISSION_MAX_OUTBOX_BACKLOG,
+        max_pool_saturation=settings.ADMISSION_MAX_POOL_SATURATION,
+        refresh_seconds=settings.ADMISSION_BACKLOG_REFRESH_SECONDS,
+        retry_after_seconds=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        max_retry_after_seconds=settings.ADMISSION_MAX_RETRY_AFTER_SECONDS,
+        backlog_counter=lambda limit: unsynced_backlog(ReadSessionLocal, limit),
+        pool=engine.pool,
+    )
+
+
+bulk_admission = _create_controller()
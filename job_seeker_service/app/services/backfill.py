@@ -0,0 +1,442 @@
+"""
+Initial backfill of profiles with PostgreSQL COPY.
+
+Loading a region's history through /api/bulk costs an ORM round trip per
+row. The backfill reads line-based input instead: NDJSON with one profile
+document per line, or one /api/bulk request body ({"profiles": [...]}) per
+line, the form the talent pool's sync jobs hold. Lines are validated like
+/api/bulk input and taken in chunks. Every chunk runs in one transaction:
+its rows are streamed with COPY into UNLOGGED staging tables (backfill_*),
+merged into users, cv_profiles, cv_addresses and the child tables with one
+INSERT ... SELECT per table, and the byte offset after its last line is
+recorded in backfill_progress. A restarted backfill continues from there.
+
+Keys are time-ordered UUIDs assigned while staging, so child rows reference
+their profile without a lookup. The last line of a cvId wins within a chunk;
+profiles already in the database are left alone (the next sync updates
+them). With defer_indexes the non-unique indexes of the target tables are
+dropped before loading and built once at the end, which only suits a
+database that is not serving traffic yet. The job offer counters are
+recounted at the end. The in-process geo and term indexes and profile caches
+of running workers do not see backfilled profiles until they restart.
+"""
+import io
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import Column, Index, Integer, LargeBinary, MetaData, String, Table, Text, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.api.schemas import ProfileCreate
+from app.ids import uuid7
+from app.json_codec import dumps
+from app.models.backfill import BackfillProgress
+from app.models.profile import (
+    ApplicationStatus, CVAddress, CVProfile, Certificate, Education, Experience, Hobby, Language,
+    MatchFeedback, SoftSkill, TalentPoolMembership, User
+)
+from app.services.job_offer_stats import rebuild_job_offer_stats
+from app.services.profile_documents import document_from_data, document_storage, encode_document
+
+logger = logging.getLogger(__name__)
+
+PROFILES_FORMAT = "profiles"  # one profile document per line
+BULK_FORMAT = "bulk"  # one /api/bulk request body per line
+INPUT_FORMATS = (PROFILES_FORMAT, BULK_FORMAT)
+
+# Profiles per chunk; a chunk is copied, merged and committed as one transaction
+CHUNK_SIZE = 20000
+
+CHILD_MODELS = (
+    Experience, Education, Hobby, Language, SoftSkill, Certificate,
+    TalentPoolMembership, ApplicationStatus, MatchFeedback,
+)
+TARGET_TABLES = [model.__table__ for model in (User, CVProfile, CVAddress) + CHILD_MODELS]
+
+_staging_metadata = MetaData()
+
+# One row per input profile, with its user and address; seq orders duplicate cvIds
+STAGED_PROFILES = Table(
+    "backfill_profiles", _staging_metadata,
+    Column("seq", Integer),
+    Column("id", CVProfile.id.type),
+    Column("cv_id", String),
+    Column("last_modified_dt", CVProfile.last_modified_dt.type),
+    Column("user_row_id", User.id.type),
+    Column("user_id", String),
+    Column("candidate_code", String),
+    Column("working_hours", Integer),
+    Column("willing_to_travel", CVProfile.willing_to_travel.type),
+    Column("visible_in_talent_pool", CVProfile.visible_in_talent_pool.type),
+    Column("content_hash", String),
+    Column("address_id", CVAddress.id.type),
+    Column("geo_location", CVAddress.geo_location.type),
+    Column("document", LargeBinary),
+    Column("document_encoding", Text),
+    prefixes=["UNLOGGED"],
+)
+# Child rows with the columns of their target table
+STAGED_CHILDREN = {
+    model.__tablename__: Table(
+        f"backfill_{model.__tablename__}", _staging_metadata,
+        *(Column(column.name, column.type) for column in model.__table__.columns),
+        prefixes=["UNLOGGED"],
+    )
+    for model in CHILD_MODELS
+}
+
+
+class Chunk(NamedTuple):
+    """Profiles parsed from the lines between two byte offsets of the input"""
+    start: int
+    end: int
+    profiles: List[ProfileCreate]
+    rejected: int
+
+
+class ChunkResult(NamedTuple):
+    start: int
+    end: int
+    staged: int  # valid profiles in the chunk
+    inserted: int  # profiles new to the database
+    rows: int  # rows copied into the staging tables
+    rejected: int
+    seconds: float
+
+
+# Escapes of the COPY text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _array_literal(values) -> str:
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            elements.append(repr(value))
+        else:
+            elements.append('"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(elements) + "}"
+
+
+def copy_value(value) -> str:
+    """One field in the COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return "\\\\x" + value.hex()
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value).translate(_COPY_ESCAPES)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_text(rows: List[tuple]) -> str:
+    return "".join("\t".join(copy_value(value) for value in row) + "\n" for row in rows)
+
+
+def parse_line(line: bytes, input_format: str) -> Tuple[List[ProfileCreate], int, Optional[str]]:
+    """Valid profiles of one input line, the number rejected and the first error"""
+    try:
+        value = orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return [], 1, f"invalid JSON: {e}"
+    documents = value.get("profiles") if input_format == BULK_FORMAT and isinstance(value, dict) else [value]
+    if not isinstance(documents, list):
+        return [], 1, "expected a /api/bulk body with a profiles list"
+    profiles, rejected, error = [], 0, None
+    for document in documents:
+        try:
+            profiles.append(ProfileCreate.parse_obj(document))
+        except ValidationError as e:
+            rejected += 1
+            error = error or f"{document.get('cvId') if isinstance(document, dict) else None}: {e.errors()}"
+    return profiles, rejected, error
+
+
+def read_chunks(path: str, start: int, input_format: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Chunk]:
+    """Chunks of about chunk_size profiles from byte offset start, ending on line boundaries"""
+    if input_format not in INPUT_FORMATS:
+        raise ValueError(f"Unknown backfill input format '{input_format}', expected one of {', '.join(INPUT_FORMATS)}")
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = chunk_start = start
+        profiles: List[ProfileCreate] = []
+        rejected = 0
+        for line in iter(f.readline, b""):
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            parsed, line_rejected, error = parse_line(line, input_format)
+            if line_rejected:
+                logger.warning(f"Backfill: {line_rejected} profiles rejected at offset {line_offset}: {error}")
+            profiles.extend(parsed)
+            rejected += line_rejected
+            if len(profiles) >= chunk_size:
+                yield Chunk(chunk_start, offset, profiles, rejected)
+                chunk_start, profiles, rejected = offset, [], 0
+        if offset > chunk_start:
+            yield Chunk(chunk_start, offset, profiles, rejected)
+
+
+def child_rows(profile_data: ProfileCreate) -> Dict[str, List[dict]]:
+    """Rows of the child tables for a profile, keyed by table name, as add_profile_items writes them"""
+    items = profile_data.cvItems or {}
+    return {
+        Experience.__tablename__: [
+            {
+                "profession_nm": exp["professionNm"], "company": exp["company"],
+                "start_d": exp.get("startD"), "end_d": exp.get("endD"),
+                "location": exp.get("location"), "description": exp.get("description"),
+            }
+            for exp in items.get("experience", ())
+        ],
+        Education.__tablename__: [
+            {
+                "educational_institution_nm": edu["educationalInstitutionNm"],
+                "degree_code": edu["degreeCode"],
+                "degree_code_job_digger": edu["degreeCodeJobDigger"],
+                "field_of_study_nm": edu["fieldOfStudyNm"],
+                "educational_institution_location": edu["educationalInstitutionLocation"],
+                "start_d": edu.get("startD"), "end_d": edu.get("endD"),
+                "education_completed": edu.get("educationCompleted"),
+                "education_specialization_description": edu.get("educationSpecializationDescription"),
+            }
+            for edu in items.get("education", ())
+        ],
+        Hobby.__tablename__: [{"hobby_nm": hobby["hobbyNm"]} for hobby in items.get("hobby", ())],
+        Language.__tablename__: [
+            {"skill_nm": lang["skillNm"], "rating": lang.get("rating")}
+            for lang in items.get("language", ())
+        ],
+        SoftSkill.__tablename__: [
+            {
+                "skill_id": skill["skillId"], "skill_nm": skill["skillNm"],
+                "related_line_item_type": skill.get("relatedLineItemType"), "rating": skill.get("rating"),
+            }
+            for skill in items.get("softSkillKnowledge", ())
+        ],
+        Certificate.__tablename__: [
+            {"certificate_id": cert["certificateId"], "skill_nm": cert["skillNm"]}
+            for cert in items.get("certificate", ())
+        ],
+        TalentPoolMembership.__tablename__: [
+            {"talent_pool_id": m.talentPoolId, "talent_pool_name": m.talentPoolName}
+            for m in profile_data.memberOf or ()
+        ],
+        ApplicationStatus.__tablename__: [
+            {"job_offer_code": s.jobOfferCode, "application_status": s.applicationStatus}
+            for s in profile_data.applicationStatus or ()
+        ],
+        MatchFeedback.__tablename__: [
+            {"job_offer_code": f.jobOfferCode, "match_status": f.matchStatus}
+            for f in profile_data.matchFeedback or ()
+        ],
+    }
+
+
+def stage_rows(profiles: List[ProfileCreate], encoding: Optional[str] = None) -> Dict[str, List[tuple]]:
+    """Rows of every staging table for a chunk, in staging column order, with new keys"""
+    staged = {STAGED_PROFILES.name: []}
+    staged.update({table.name: [] for table in STAGED_CHILDREN.values()})
+    for seq, profile_data in enumerate(profiles):
+        profile_id = uuid7()
+        geo_location = profile_data.cvAddress.geoLocation if profile_data.cvAddress else None
+        last_modified_dt = profile_data.lastModifiedDt
+        if last_modified_dt is not None and last_modified_dt.tzinfo is not None:
+            # As the timestamp column stores it
+            last_modified_dt = last_modified_dt.replace(tzinfo=None)
+        document = None
+        if encoding is not None:
+            document = encode_document(dumps(document_from_data(profile_data, geo_location)), encoding)
+        staged[STAGED_PROFILES.name].append((
+            seq, profile_id, profile_data.cvId, last_modified_dt,
+            uuid7(), profile_data.user.userId, profile_data.user.candidateCode,
+            profile_data.cvProfile.workingHours, profile_data.cvProfile.willingToTravel,
+            profile_data.visibleInTalentPool, profile_data.contentHash,
+            uuid7() if geo_location else None, geo_location or None,
+            document, encoding if document is not None else None,
+        ))
+        for table_name, rows in child_rows(profile_data).items():
+            table = STAGED_CHILDREN[table_name]
+            for row in rows:
+                row.update(id=uuid7(), profile_id=profile_id)
+                staged[table.name].append(tuple(row.get(column.name) for column in table.columns))
+    return staged
+
+
+def _columns(table: Table, prefix: str = "") -> str:
+    return ", ".join(f"{prefix}{column.name}" for column in table.columns)
+
+
+def merge_statements() -> List[Tuple[str, str]]:
+    """(target, SQL) merging the staged chunk, in foreign key order"""
+    users, profiles, addresses = User.__table__, CVProfile.__table__, CVAddress.__table__
+    statements = [
+        # Last staged line per cvId, for profiles not in the database yet
+        ("backfill_new", f"""
+            CREATE TEMPORARY TABLE backfill_new ON COMMIT DROP AS
+            SELECT DISTINCT ON (s.cv_id) s.* FROM {STAGED_PROFILES.name} s
+            WHERE NOT EXISTS (SELECT 1 FROM {profiles.name} p WHERE p.cv_id = s.cv_id)
+            ORDER BY s.cv_id, s.seq DESC
+        """),
+        (users.name, f"""
+            INSERT INTO {users.name} (id, user_id, candidate_code)
+            SELECT n.user_row_id, n.user_id, n.candidate_code FROM backfill_new n
+            ON CONFLICT (user_id) DO NOTHING
+        """),
+        (profiles.name, f"""
+            INSERT INTO {profiles.name} (
+                id, cv_id, last_modified_dt, user_id, working_hours, willing_to_travel,
+                visible_in_talent_pool, content_hash, document, document_encoding
+            )
+            SELECT n.id, n.cv_id, n.last_modified_dt, u.id, n.working_hours, n.willing_to_travel,
+                n.visible_in_talent_pool, n.content_hash, n.document, n.document_encoding
+            FROM backfill_new n JOIN {users.name} u ON u.user_id = n.user_id
+            ON CONFLICT (cv_id) DO NOTHING
+        """),
+        (addresses.name, f"""
+            INSERT INTO {addresses.name} (id, profile_id, geo_location)
+            SELECT n.address_id, n.id, n.geo_location
+            FROM backfill_new n JOIN {profiles.name} p ON p.id = n.id
+            WHERE n.geo_location IS NOT NULL
+        """),
+    ]
+    # Child rows of staged profiles that were inserted; their keys are new, so the
+    # join leaves out losing duplicates and cvIds that were already present
+    for table_name, staging in STAGED_CHILDREN.items():
+        statements.append((table_name, f"""
+            INSERT INTO {table_name} ({_columns(staging)})
+            SELECT {_columns(staging, "s.")} FROM {staging.name} s
+            JOIN {profiles.name} p ON p.id = s.profile_id
+        """))
+    return statements
+
+
+def _copy(connection, table: Table, rows: List[tuple]):
+    if not rows:
+        return
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({_columns(table)}) FROM STDIN", io.StringIO(copy_text(rows)))
+    finally:
+        cursor.close()
+
+
+def _save_progress(db: Session, source: str, chunk: Chunk, inserted: int):
+    table = BackfillProgress.__table__
+    stmt = pg_insert(table).values(
+        source=source, file_offset=chunk.end, profiles=inserted, rejected=chunk.rejected,
+        updated_at=datetime.utcnow(),
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.source],
+        set_={
+            "file_offset": stmt.excluded.file_offset,
+            "profiles": table.c.profiles + stmt.excluded.profiles,
+            "rejected": table.c.rejected + stmt.excluded.rejected,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+def load_chunk(db: Session, source: str, chunk: Chunk, encoding: Optional[str] = None) -> ChunkResult:
+    """Copy, merge and commit one chunk together with the offset to resume from"""
+    started = time.perf_counter()
+    staged = stage_rows(chunk.profiles, encoding)
+    connection = db.connection()
+    staging_tables = [STAGED_PROFILES, *STAGED_CHILDREN.values()]
+    db.execute(text(f"TRUNCATE {', '.join(table.name for table in staging_tables)}"))
+    for table in staging_tables:
+        _copy(connection, table, staged[table.name])
+    inserted = 0
+    for target, statement in merge_statements():
+        result = db.execute(text(statement))
+        if target == CVProfile.__tablename__:
+            inserted = result.rowcount
+    _save_progress(db, source, chunk, inserted)
+    db.commit()
+    return ChunkResult(
+        chunk.start, chunk.end, len(chunk.profiles), inserted,
+        sum(len(rows) for rows in staged.values()), chunk.rejected, time.perf_counter() - started,
+    )
+
+
+def resume_offset(db: Session, source: str) -> int:
+    progress = db.get(BackfillProgress, source)
+    return progress.file_offset if progress is not None else 0
+
+
+def secondary_indexes() -> List[Index]:
+    """Non-unique indexes of the target tables; unique ones back the merge's conflict checks"""
+    return [index for table in TARGET_TABLES for index in table.indexes if not index.unique]
+
+
+def drop_secondary_indexes(db: Session):
+    connection = db.connection()
+    for index in secondary_indexes():
+        index.drop(connection, checkfirst=True)
+    db.commit()
+
+
+def create_secondary_indexes(db: Session):
+    connection = db.connection()
+    for index in secondary_indexes():
+        logger.info(f"Backfill: building {index.name}")
+        index.create(connection, checkfirst=True)
+    db.commit()
+
+
+def backfill(
+    db: Session,
+    path: str,
+    input_format: str = PROFILES_FORMAT,
+    source: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    defer_indexes: bool = False,
+    restart: bool = False,
+    on_chunk: Optional[Callable[[ChunkResult], None]] = None,
+) -> dict:
+    """Load path from where the last run of the same source stopped; returns the run's totals"""
+    if db.get_bind().dialect.name != "postgresql":
+        raise ValueError("The backfill loads with COPY and needs PostgreSQL")
+    source = source or path
+    encoding = document_storage()
+    _staging_metadata.create_all(db.connection())
+    db.commit()
+    start = 0 if restart else resume_offset(db, source)
+    if defer_indexes:
+        drop_secondary_indexes(db)
+
+    totals = {"startOffset": start, "endOffset": start, "profiles": 0, "inserted": 0, "rows": 0, "rejected": 0}
+    started = time.perf_counter()
+    for chunk in read_chunks(path, start, input_format, chunk_size):
+        result = load_chunk(db, source, chunk, encoding)
+        totals["endOffset"] = result.end
+        totals["profiles"] += result.staged
+        totals["inserted"] += result.inserted
+        totals["rows"] += result.rows
+        totals["rejected"] += result.rejected
+        if on_chunk is not None:
+            on_chunk(result)
+    totals["loadSeconds"] = time.perf_counter() - started
+
+    if defer_indexes:
+        create_secondary_indexes(db)
+    if totals["inserted"]:
+        rebuild_job_offer_stats(db)
+    _staging_metadata.drop_all(db.connection())
+    db.execute(text(f"ANALYZE {', '.join(table.name for table in TARGET_TABLES)}"))
+    db.commit()
+    totals["seconds"] = time.perf_counter() - started
+    return totals
@@ -0,0 +1,131 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.profile import ProfileChangeLog
+
+logger = logging.getLogger(__name__)
+
+REFRESH_BATCH_SIZE = 1000
+
+
+class ChangeLogCursor:
+    """
+    Follows ProfileChangeLog by timestamp so in-process indexes can catch up
+    with writes made by other workers.
+
+    A row's timestamp is taken when it is written, not when its transaction
+    commits, so a row can become visible after newer ones were polled. Each
+    poll therefore re-reads lag_window seconds behind the watermark and
+    returns only the rows it has not returned before.
+    """
+
+    def __init__(self, poll_interval: float, lag_window: float = settings.CHANGE_FEED_LAG_SECONDS):
+        self.poll_interval = poll_interval
+        self.lag_window = timedelta(seconds=lag_window)
+        self.watermark: Optional[datetime] = None
+        self._last_poll = 0.0
+        # Ids and timestamps of the rows returned within the lag window
+        self._seen: Dict[object, datetime] = {}
+
+    def start_at(self, watermark: Optional[datetime]):
+        """Set the position after a full load"""
+        self.watermark = watermark
+        self._last_poll = time.monotonic()
+        self._seen = {}
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_poll >= self.poll_interval
+
+    def poll(self, db: Session) -> Dict[str, str]:
+        """
+        Return the latest operation per cv_id among the rows not returned yet.
+        The first poll after start_at also returns the rows of the lag window
+        before it; consumers apply changes idempotently.
+        """
+        self._last_poll = time.monotonic()
+        query = db.query(
+            ProfileChangeLog.id, ProfileChangeLog.cv_id, ProfileChangeLog.operation, ProfileChangeLog.timestamp
+        )
+        if self.watermark is not None:
+            query = query.filter(ProfileChangeLog.timestamp >= self.watermark - self.lag_window)
+
+        changes = {}
+        for row_id, cv_id, operation, timestamp in query.order_by(ProfileChangeLog.timestamp).yield_per(1000):
+            if row_id in self._seen:
+                continue
+            self._seen[row_id] = timestamp
+            changes[cv_id] = operation
+            if self.watermark is None or timestamp > self.watermark:
+                self.watermark = timestamp
+        if self.watermark is not None:
+            horizon = self.watermark - self.lag_window
+            self._seen = {row_id: timestamp for row_id, timestamp in self._seen.items() if timestamp >= horizon}
+        return changes
+
+
+def latest_change_timestamp(db: Session) -> Optional[datetime]:
+    """Timestamp of the newest change log row, used as the starting watermark"""
+    row = db.query(ProfileChangeLog.timestamp).order_by(ProfileChangeLog.timestamp.desc()).first()
+    return row[0] if row else None
+
+
+class ChangeLogIndex(ABC):
+    """
+    Base for process-wide indexes that are loaded lazily on first use, updated
+    directly by process_profile and caught up from ProfileChangeLog for writes
+    handled by other workers.
+    Subclasses implement reset(), load() and remove_profile().
+    """
+
+    name = "index"
+
+    def __init__(self, refresh_interval: float):
+        self.cursor = ChangeLogCursor(refresh_interval)
+        self.loaded = False
+        self._load_lock = threading.Lock()
+
+    @abstractmethod
+    def reset(self):
+        """Drop everything indexed"""
+
+    @abstractmethod
+    def load(self, db: Session, cv_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        """Index profiles from the database (all if cv_ids is None); return the cv_ids indexed"""
+
+    @abstractmethod
+    def remove_profile(self, cv_id: str):
+        """Drop one profile from the index"""
+
+    def ensure_fresh(self, db: Session):
+        """Load the index on first use, then apply changes logged since the last refresh"""
+        with self._load_lock:
+            if not self.loaded:
+                # Take the watermark first so writes during the load are replayed
+                watermark = latest_change_timestamp(db)
+                self.reset()
+                indexed = self.load(db)
+                self.cursor.start_at(watermark)
+                self.loaded = True
+                logger.info(f"Loaded {self.name} with {len(indexed)} profiles")
+                return
+
+            if not self.cursor.due():
+                return
+            changes = self.cursor.poll(db)
+            for cv_id, operation in changes.items():
+                if operation == "DELETE":
+                    self.remove_profile(cv_id)
+            upserted = [cv_id for cv_id, operation in changes.items() if operation != "DELETE"]
+            for start in range(0, len(upserted), REFRESH_BATCH_SIZE):
+                batch = upserted[start:start + REFRESH_BATCH_SIZE]
+                indexed = self.load(db, batch)
+                # Profiles that no longer have anything to index
+                for cv_id in set(batch) - indexed:
+                    self.remove_profile(cv_id)
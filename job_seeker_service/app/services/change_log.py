@@ -0,0 +1,221 @@
+"""
+Versioned ProfileChangeLog payloads.
+
+Each change of a profile gets the next version number. Its payload is either
+the full document (a snapshot) or JSON Patch operations against the previous
+version (a delta). A snapshot is written for the first change, after a
+DELETE, every CHANGE_LOG_SNAPSHOT_INTERVAL versions, and when the delta would
+not be much smaller than the document. Any version can then be rebuilt by
+replaying at most one interval of rows.
+
+Versions are unique per profile. A writer locks the profile row before it
+reads the latest version, so concurrent changes of one profile, from several
+uvicorn workers or ingest shards, get consecutive versions. A change of a
+profile without a row (e.g. a notification about a profile not stored here)
+cannot be locked; it retries with the next version when the unique index
+rejects its insert.
+"""
+import logging
+from typing import Any, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.json_codec import RawJSON, dumps, loads
+from app.models.profile import CVProfile, ProfileChangeLog
+from app.services.json_patch import JsonPatchError, apply_patch, diff
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+# Inserts of a change of an unlocked profile before the version conflict is raised
+VERSION_ATTEMPTS = 3
+
+
+class ChangeLogGapError(ValueError):
+    """A delta without the snapshot it builds on"""
+
+
+def normalize_document(document) -> Any:
+    """The document as it reads back from a JSON column (datetimes as ISO strings)"""
+    return loads(dumps(document))
+
+
+def replay(entries: List[ProfileChangeLog]) -> Optional[Any]:
+    """The document after a snapshot and the deltas following it, ordered by version"""
+    document = None
+    for entry in entries:
+        if entry.payload_kind == DELTA:
+            if document is None:
+                raise ChangeLogGapError(f"Delta version {entry.version} of {entry.cv_id} has no base document")
+            document = apply_patch(document, entry.payload)
+        else:
+            # Copied, since deltas are applied in place
+            document = normalize_document(entry.payload) if entry.payload is not None else None
+    return document
+
+
+def entries_since_snapshot(db: Session, cv_id: str, version: Optional[int] = None) -> List[ProfileChangeLog]:
+    """The latest snapshot of a profile up to version and the deltas after it, ordered by version"""
+    query = db.query(ProfileChangeLog)\
+        .filter(ProfileChangeLog.cv_id == cv_id)\
+        .filter(ProfileChangeLog.version.isnot(None))
+    if version is not None:
+        query = query.filter(ProfileChangeLog.version <= version)
+    snapshot_version = query.filter(ProfileChangeLog.payload_kind != DELTA)\
+        .with_entities(func.max(ProfileChangeLog.version))\
+        .scalar()
+    if snapshot_version is None:
+        return []
+    return query.filter(ProfileChangeLog.version >= snapshot_version)\
+        .order_by(ProfileChangeLog.version, ProfileChangeLog.timestamp)\
+        .all()
+
+
+def latest_version(db: Session, cv_id: str) -> int:
+    """Version of the latest change of a profile, 0 for a profile without versioned changes"""
+    return db.query(func.max(ProfileChangeLog.version)).filter(ProfileChangeLog.cv_id == cv_id).scalar() or 0
+
+
+def lock_profiles(db: Session, cv_ids: List[str]) -> int:
+    """
+    Lock the rows of the profiles until the transaction ends (SELECT ... FOR
+    UPDATE, in cv_id order); returns the number of rows locked
+    """
+    rows = db.execute(
+        select(CVProfile.id).where(CVProfile.cv_id.in_(cv_ids)).order_by(CVProfile.cv_id).with_for_update()
+    )
+    return len(rows.all())
+
+
+def materialize(db: Session, cv_id: str, version: Optional[int] = None) -> Optional[Any]:
+    """
+    The profile document as of version (default: the latest), or None when it is
+    unknown or deleted. Rows logged before versioning are used as snapshots.
+    """
+    entries = entries_since_snapshot(db, cv_id, version)
+    if entries:
+        return replay(entries)
+    legacy = db.query(ProfileChangeLog.payload)\
+        .filter(ProfileChangeLog.cv_id == cv_id)\
+        .filter(ProfileChangeLog.version.is_(None))\
+        .order_by(ProfileChangeLog.timestamp.desc())\
+        .first()
+    return normalize_document(legacy[0]) if legacy and legacy[0] is not None else None
+
+
+def delta_between(db: Session, cv_id: str, base_version: int, version: int) -> Optional[list]:
+    """
+    JSON Patch operations taking a profile from base_version to version, or None
+    when either version cannot be rebuilt or has no document (deleted), or when
+    the operations would not be much smaller than the document
+    """
+    try:
+        base = materialize(db, cv_id, base_version)
+        current = materialize(db, cv_id, version)
+    except (ChangeLogGapError, JsonPatchError) as e:
+        logger.warning(f"Could not rebuild versions {base_version} and {version} of {cv_id}: {e}")
+        return None
+    if base is None or current is None:
+        return None
+    ops = diff(base, current)
+    if len(dumps(ops)) > len(dumps(current)) * settings.CHANGE_LOG_MAX_DELTA_RATIO:
+        return None
+    return ops
+
+
+def plan_payload(
+    entries: List[ProfileChangeLog],
+    document,
+    snapshot_interval: int,
+    max_delta_ratio: float,
+    raw_payload: Optional[RawJSON] = None,
+):
+    """
+    Payload kind, payload and base version for the next change of a profile,
+    given its entries since the latest snapshot
+    """
+    full_payload = raw_payload if raw_payload is not None else document
+    if full_payload is None or not entries or len(entries) >= snapshot_interval:
+        return SNAPSHOT, full_payload, None
+    try:
+        previous = replay(entries)
+    except (ChangeLogGapError, JsonPatchError) as e:
+        logger.warning(f"Writing a snapshot, previous version could not be rebuilt: {e}")
+        return SNAPSHOT, full_payload, None
+    if previous is None:
+        return SNAPSHOT, full_payload, None
+
+    current = loads(raw_payload) if raw_payload is not None else normalize_document(document)
+    ops = diff(previous, current)
+    full_size = len(raw_payload) if raw_payload is not None else len(dumps(current))
+    if len(dumps(ops)) > full_size * max_delta_ratio:
+        return SNAPSHOT, full_payload, None
+    return DELTA, ops, entries[-1].version
+
+
+def record_change(
+    db: Session,
+    cv_id: str,
+    operation: str,
+    document=None,
+    raw_payload: Optional[RawJSON] = None,
+    traceparent: Optional[str] = None,
+) -> ProfileChangeLog:
+    """
+    Add the change log entry for a profile change; the caller commits.
+    The profile is given as a dict (document) or already encoded (raw_payload),
+    or neither when it is unknown. Pending changes of the session are flushed
+    first, so a profile created in this transaction is locked too.
+    """
+    db.flush()
+    if lock_profiles(db, [cv_id]):
+        log_entry = _new_change(db, cv_id, operation, document, raw_payload, traceparent)
+        db.add(log_entry)
+        return log_entry
+
+    for attempt in range(1, VERSION_ATTEMPTS + 1):
+        log_entry = _new_change(db, cv_id, operation, document, raw_payload, traceparent)
+        try:
+            with db.begin_nested():
+                db.add(log_entry)
+            return log_entry
+        except IntegrityError:
+            if attempt == VERSION_ATTEMPTS:
+                raise
+            logger.info(f"Version {log_entry.version} of {cv_id} was taken by a concurrent change, retrying")
+
+
+def _new_change(
+    db: Session,
+    cv_id: str,
+    operation: str,
+    document,
+    raw_payload: Optional[RawJSON],
+    traceparent: Optional[str],
+) -> ProfileChangeLog:
+    entries = entries_since_snapshot(db, cv_id)
+    version = (entries[-1].version if entries else latest_version(db, cv_id)) + 1
+
+    if operation == "DELETE":
+        payload_kind, payload, base_version = SNAPSHOT, None, None
+    else:
+        payload_kind, payload, base_version = plan_payload(
+            entries, document, settings.CHANGE_LOG_SNAPSHOT_INTERVAL,
+            settings.CHANGE_LOG_MAX_DELTA_RATIO, raw_payload
+        )
+
+    return ProfileChangeLog(
+        cv_id=cv_id,
+        operation=operation,
+        synced_to_matching_partner=False,
+        payload=payload,
+        version=version,
+        payload_kind=payload_kind,
+        base_version=base_version,
+        traceparent=traceparent
+    )
@@ -0,0 +1,242 @@
+import logging
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.profile import CVProfile, CVAddress, TalentPoolMembership
+from app.services.change_feed import ChangeLogIndex
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+class GeoEntry(NamedTuple):
+    cv_id: str
+    lat: float
+    lon: float
+    talent_pool_ids: FrozenSet[str]
+    visible_in_talent_pool: bool
+    willing_to_travel: bool
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGridIndex:
+    """
+    In-process uniform grid over candidate locations.
+    Each cell holds the entries whose coordinates fall inside it, so radius and
+    bounding-box queries only touch the cells overlapping the search area.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.1):
+        self.cell_size = cell_size_deg
+        self._cells: Dict[Tuple[int, int], Dict[str, GeoEntry]] = defaultdict(dict)
+        self._entries: Dict[str, GeoEntry] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def upsert(self, entry: GeoEntry):
+        with self._lock:
+            self._discard(entry.cv_id)
+            self._entries[entry.cv_id] = entry
+            self._cells[self._cell(entry.lat, entry.lon)][entry.cv_id] = entry
+
+    def remove(self, cv_id: str):
+        with self._lock:
+            self._discard(cv_id)
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._entries.clear()
+
+    def _discard(self, cv_id: str):
+        old = self._entries.pop(cv_id, None)
+        if old is None:
+            return
+        cell_key = self._cell(old.lat, old.lon)
+        cell = self._cells.get(cell_key)
+        if cell is not None:
+            cell.pop(cv_id, None)
+            if not cell:
+                del self._cells[cell_key]
+
+    def _scan(self, min_lat, min_lon, max_lat, max_lon) -> Iterable[GeoEntry]:
+        lat_lo, lon_lo = self._cell(min_lat, min_lon)
+        lat_hi, lon_hi = self._cell(max_lat, max_lon)
+        for lat_cell in range(lat_lo, lat_hi + 1):
+            for lon_cell in range(lon_lo, lon_hi + 1):
+                cell = self._cells.get((lat_cell, lon_cell))
+                if cell:
+                    yield from cell.values()
+
+    @staticmethod
+    def _matches(entry: GeoEntry, talent_pool_id, visible_in_talent_pool, willing_to_travel) -> bool:
+        if talent_pool_id is not None and talent_pool_id not in entry.talent_pool_ids:
+            return False
+        if visible_in_talent_pool is not None and entry.visible_in_talent_pool != visible_in_talent_pool:
+            return False
+        if willing_to_travel is not None and entry.willing_to_travel != willing_to_travel:
+            return False
+        return True
+
+    def query_radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        talent_pool_id: Optional[str] = None,
+        visible_in_talent_pool: Optional[bool] = True,
+        willing_to_travel: Optional[bool] = None,
+        limit: int = 100,
+    ) -> List[Tuple[GeoEntry, float]]:
+        """Entries within radius_km of (lat, lon), nearest first"""
+        d_lat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        d_lon = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+        min_lat, max_lat = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+
+        results = []
+        with self._lock:
+            for entry in self._scan(min_lat, lon - d_lon, max_lat, lon + d_lon):
+                if not (min_lat <= entry.lat <= max_lat):
+                    continue
+                if not self._matches(entry, talent_pool_id, visible_in_talent_pool, willing_to_travel):
+                    continue
+                distance = haversine_km(lat, lon, entry.lat, entry.lon)
+                if distance <= radius_km:
+                    results.append((entry, distance))
+        results.sort(key=lambda item: item[1])
+        return results[:limit]
+
+    def query_bbox(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        talent_pool_id: Optional[str] = None,
+        visible_in_talent_pool: Optional[bool] = True,
+        willing_to_travel: Optional[bool] = None,
+        limit: int = 100,
+    ) -> List[GeoEntry]:
+        """Entries inside the bounding box, ordered by cv_id"""
+        results = []
+        with self._lock:
+            for entry in self._scan(min_lat, min_lon, max_lat, max_lon):
+                if not (min_lat <= entry.lat <= max_lat and min_lon <= entry.lon <= max_lon):
+                    continue
+                if self._matches(entry, talent_pool_id, visible_in_talent_pool, willing_to_travel):
+                    results.append(entry)
+        results.sort(key=lambda entry: entry.cv_id)
+        return results[:limit]
+
+
+def entry_from_profile_data(profile_data) -> Optional[GeoEntry]:
+    """Build an index entry from a bulk ProfileCreate, or None if it has no location"""
+    geo_location = profile_data.cvAddress.geoLocation if profile_data.cvAddress else None
+    if not geo_location or len(geo_location) < 2:
+        return None
+    return GeoEntry(
+        cv_id=profile_data.cvId,
+        lat=float(geo_location[0]),
+        lon=float(geo_location[1]),
+        talent_pool_ids=frozenset(m.talentPoolId for m in profile_data.memberOf or []),
+        visible_in_talent_pool=bool(profile_data.visibleInTalentPool),
+        willing_to_travel=bool(profile_data.cvProfile.willingToTravel),
+    )
+
+
+def load_entries(db: Session, cv_ids: Optional[Iterable[str]] = None) -> Iterable[GeoEntry]:
+    """
+    Stream index entries from the normalized tables, optionally for a subset of
+    profiles; tombstoned profiles are left out
+    """
+    query = db.query(
+        CVProfile.id, CVProfile.cv_id, CVProfile.visible_in_talent_pool,
+        CVProfile.willing_to_travel, CVAddress.geo_location
+    ).join(CVAddress, CVAddress.profile_id == CVProfile.id)\
+        .filter(CVProfile.tombstoned_at.is_(None))
+    memberships = db.query(TalentPoolMembership.profile_id, TalentPoolMembership.talent_pool_id)
+    if cv_ids is not None:
+        cv_ids = list(cv_ids)
+        query = query.filter(CVProfile.cv_id.in_(cv_ids))
+        memberships = memberships.join(CVProfile, CVProfile.id == TalentPoolMembership.profile_id)\
+            .filter(CVProfile.cv_id.in_(cv_ids))
+
+    pools_by_profile = defaultdict(set)
+    for profile_id, talent_pool_id in memberships.yield_per(5000):
+        pools_by_profile[profile_id].add(talent_pool_id)
+
+    for profile_id, cv_id, visible, willing, geo_location in query.yield_per(5000):
+        if not geo_location or len(geo_location) < 2:
+            continue
+        yield GeoEntry(
+            cv_id=cv_id,
+            lat=float(geo_location[0]),
+            lon=float(geo_location[1]),
+            talent_pool_ids=frozenset(pools_by_profile.get(profile_id, ())),
+            visible_in_talent_pool=bool(visible),
+            willing_to_travel=bool(willing),
+        )
+
+
+class CandidateGeoIndex(ChangeLogIndex):
+    """Process-wide geo index over candidate addresses"""
+
+    name = "geo index"
+
+    def __init__(self, cell_size_deg: float, refresh_interval: float):
+        super().__init__(refresh_interval)
+        self.grid = GeoGridIndex(cell_size_deg)
+
+    def reset(self):
+        self.grid.clear()
+
+    def load(self, db: Session, cv_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        indexed = set()
+        for entry in load_entries(db, cv_ids):
+            self.grid.upsert(entry)
+            indexed.add(entry.cv_id)
+        return indexed
+
+    def remove_profile(self, cv_id: str):
+        self.grid.remove(cv_id)
+
+    def index_profile(self, profile_data):
+        if not self.loaded:
+            return
+        self.index_entry(profile_data.cvId, entry_from_profile_data(profile_data))
+
+    def index_entry(self, cv_id: str, entry: Optional[GeoEntry]):
+        """Apply an entry built elsewhere, e.g. by a sharded ingest worker; None removes the profile"""
+        if not self.loaded:
+            return
+        if entry is None:
+            self.grid.remove(cv_id)
+        else:
+            self.grid.upsert(entry)
+
+
+candidate_geo_index = CandidateGeoIndex(
+    cell_size_deg=settings.GEO_INDEX_CELL_SIZE_DEG,
+    refresh_interval=settings.GEO_INDEX_REFRESH_SECONDS,
+)
@@ -0,0 +1,169 @@
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.profile import ApplicationStatus, CVProfile, MatchFeedback
+from app.models.job_offer_stats import JobOfferStatusCount
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_STATUS = "application_status"
+MATCH_STATUS = "match_status"
+
+# (job_offer_code, dimension, status)
+StatusKey = Tuple[str, str, str]
+
+
+def status_counts_from_data(profile_data) -> Counter:
+    """Status counts contributed by one incoming profile"""
+    counts = Counter()
+    for status in profile_data.applicationStatus or []:
+        counts[(status.jobOfferCode, APPLICATION_STATUS, status.applicationStatus)] += 1
+    for feedback in profile_data.matchFeedback or []:
+        counts[(feedback.jobOfferCode, MATCH_STATUS, feedback.matchStatus)] += 1
+    return counts
+
+
+def status_counts_from_db(db: Session, profile_id) -> Counter:
+    """Status counts currently stored for one profile"""
+    counts = Counter()
+    rows = db.query(ApplicationStatus.job_offer_code, ApplicationStatus.application_status)\
+        .filter(ApplicationStatus.profile_id == profile_id)
+    for job_offer_code, status in rows:
+        counts[(job_offer_code, APPLICATION_STATUS, status)] += 1
+    rows = db.query(MatchFeedback.job_offer_code, MatchFeedback.match_status)\
+        .filter(MatchFeedback.profile_id == profile_id)
+    for job_offer_code, status in rows:
+        counts[(job_offer_code, MATCH_STATUS, status)] += 1
+    return counts
+
+
+def status_counts_of_profiles(db: Session, cv_ids: Iterable[str]) -> Counter:
+    """Status counts currently stored for a set of profiles, summed"""
+    cv_ids = list(cv_ids)
+    counts = Counter()
+    if not cv_ids:
+        return counts
+    for model, dimension, column in (
+        (ApplicationStatus, APPLICATION_STATUS, ApplicationStatus.application_status),
+        (MatchFeedback, MATCH_STATUS, MatchFeedback.match_status),
+    ):
+        rows = db.query(model.job_offer_code, column, func.count())\
+            .join(CVProfile, CVProfile.id == model.profile_id)\
+            .filter(CVProfile.cv_id.in_(cv_ids))\
+            .group_by(model.job_offer_code, column)
+        for job_offer_code, status, count in rows:
+            counts[(job_offer_code, dimension, status)] += count
+    return counts
+
+
+def status_delta(before: Counter, after: Counter) -> Dict[StatusKey, int]:
+    """Signed per-key difference between two count sets, without zero entries"""
+    delta = {}
+    for key in set(before) | set(after):
+        change = after.get(key, 0) - before.get(key, 0)
+        if change:
+            delta[key] = change
+    return delta
+
+
+def apply_status_delta(db: Session, delta: Dict[StatusKey, int]):
+    """
+    Add a delta to the aggregate counters inside the caller's transaction,
+    so counters and the rewritten rows become visible together.
+    """
+    if not delta:
+        return
+
+    table = JobOfferStatusCount.__table__
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    # Sorted to take row locks in a consistent order across concurrent writers
+    for (job_offer_code, dimension, status), change in sorted(delta.items()):
+        if is_postgres:
+            stmt = pg_insert(table).values(
+                job_offer_code=job_offer_code, dimension=dimension, status=status, count=change
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.job_offer_code, table.c.dimension, table.c.status],
+                set_={"count": table.c.count + stmt.excluded.count},
+            ))
+            continue
+
+        updated = db.query(JobOfferStatusCount).filter(
+            JobOfferStatusCount.job_offer_code == job_offer_code,
+            JobOfferStatusCount.dimension == dimension,
+            JobOfferStatusCount.status == status,
+        ).update({JobOfferStatusCount.count: JobOfferStatusCount.count + change}, synchronize_session=False)
+        if not updated:
+            db.add(JobOfferStatusCount(
+                job_offer_code=job_offer_code, dimension=dimension, status=status, count=change
+            ))
+            # Sessions run without autoflush; make the row visible to the next UPDATE
+            db.flush()
+
+
+def get_job_offer_stats(db: Session, job_offer_code: str) -> Dict[str, Dict[str, int]]:
+    """Counters for one job offer, grouped by dimension"""
+    stats = {APPLICATION_STATUS: {}, MATCH_STATUS: {}}
+    rows = db.query(JobOfferStatusCount)\
+        .filter(JobOfferStatusCount.job_offer_code == job_offer_code)\
+        .filter(JobOfferStatusCount.count != 0)
+    for row in rows:
+        stats.setdefault(row.dimension, {})[row.status] = row.count
+    return stats
+
+
+def compute_status_counts(db: Session) -> Counter:
+    """Recompute all counters with GROUP BY over the source tables; tombstoned profiles are not counted"""
+    counts = Counter()
+    rows = db.query(
+        ApplicationStatus.job_offer_code, ApplicationStatus.application_status, func.count()
+    ).join(CVProfile, CVProfile.id == ApplicationStatus.profile_id)\
+        .filter(CVProfile.tombstoned_at.is_(None))\
+        .group_by(ApplicationStatus.job_offer_code, ApplicationStatus.application_status)
+    for job_offer_code, status, count in rows:
+        counts[(job_offer_code, APPLICATION_STATUS, status)] = count
+    rows = db.query(
+        MatchFeedback.job_offer_code, MatchFeedback.match_status, func.count()
+    ).join(CVProfile, CVProfile.id == MatchFeedback.profile_id)\
+        .filter(CVProfile.tombstoned_at.is_(None))\
+        .group_by(MatchFeedback.job_offer_code, MatchFeedback.match_status)
+    for job_offer_code, status, count in rows:
+        counts[(job_offer_code, MATCH_STATUS, status)] = count
+    return counts
+
+
+def rebuild_job_offer_stats(db: Session, check_only: bool = False) -> Dict[StatusKey, Tuple[int, int]]:
+    """
+    Compare the incremental counters with a full recount.
+    Returns the mismatches as {key: (stored, expected)}; unless check_only is
+    set, the counters are replaced with the recount in one transaction.
+    """
+    if not check_only and db.get_bind().dialect.name == "postgresql":
+        # Block concurrent counter updates so the recount and the replacement agree
+        db.execute(text(f"LOCK TABLE {JobOfferStatusCount.__tablename__} IN EXCLUSIVE MODE"))
+
+    expected = compute_status_counts(db)
+    stored = Counter({
+        (row.job_offer_code, row.dimension, row.status): row.count
+        for row in db.query(JobOfferStatusCount)
+    })
+    mismatches = {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(stored) | set(expected)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+
+    if not check_only:
+        db.query(JobOfferStatusCount).delete()
+        db.bulk_insert_mappings(JobOfferStatusCount, [
+            {"job_offer_code": code, "dimension": dimension, "status": status, "count": count}
+            for (code, dimension, status), count in expected.items()
+        ])
+        db.commit()
+        logger.info(f"Rebuilt job offer stats: {len(expected)} counters, {len(mismatches)} corrected")
+    return mismatches
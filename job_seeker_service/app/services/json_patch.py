@@ -0,0 +1,110 @@
+"""
+Structural diffs of JSON documents as RFC 6902 (JSON Patch) operations.
+
+diff() emits add / remove / replace operations only. Objects are compared key
+by key. Lists are compared element by element, with elements added or
+removed at the end, which suits the append-mostly lists of a profile.
+"""
+from typing import Any, List
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def _escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[dict]:
+    """Operations that turn old into new"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in old.items():
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+            else:
+                ops.extend(diff(value, new[key], f"{path}/{_escape(key)}"))
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ops.extend(diff(old[i], new[i], f"{path}/{i}"))
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+        # Remove from the end so the indexes stay valid
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        return ops
+
+    # bool is an int subclass; True and 1 must not compare equal here
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _parent(document: Any, path: str):
+    """The container holding the target of path, and the target's key or index"""
+    if not path.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer '{path}'")
+    tokens = [_unescape(token) for token in path[1:].split("/")]
+    container = document
+    for token in tokens[:-1]:
+        try:
+            container = container[int(token)] if isinstance(container, list) else container[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise JsonPatchError(f"Path '{path}' does not exist")
+    key = tokens[-1]
+    if isinstance(container, list):
+        if key == "-":
+            return container, len(container)
+        try:
+            return container, int(key)
+        except ValueError:
+            raise JsonPatchError(f"Invalid list index in '{path}'")
+    if not isinstance(container, dict):
+        raise JsonPatchError(f"Path '{path}' does not exist")
+    return container, key
+
+
+def apply_patch(document: Any, ops: List[dict]) -> Any:
+    """
+    Apply add / remove / replace operations, in place where possible. Returns
+    the patched document; the whole document is replaced by an operation on "".
+    """
+    for op in ops:
+        kind, path = op.get("op"), op.get("path")
+        if path == "":
+            if kind not in ("add", "replace"):
+                raise JsonPatchError(f"Unsupported operation '{kind}' on the document root")
+            document = op["value"]
+            continue
+        container, key = _parent(document, path)
+        if kind == "add":
+            if isinstance(container, list):
+                if not 0 <= key <= len(container):
+                    raise JsonPatchError(f"Index out of range in '{path}'")
+                container.insert(key, op["value"])
+            else:
+                container[key] = op["value"]
+        elif kind in ("remove", "replace"):
+            try:
+                if kind == "remove":
+                    del container[key]
+                else:
+                    container[key]  # must exist
+                    container[key] = op["value"]
+            except (KeyError, IndexError):
+                raise JsonPatchError(f"Path '{path}' does not exist")
+        else:
+            raise JsonPatchError(f"Unsupported operation '{kind}'")
+    return document
@@ -0,0 +1,101 @@
+"""
+Migration of existing primary keys to time-ordered UUIDs (see app.ids).
+
+New rows get version 7 keys from the model defaults. The child tables of a
+profile are deleted and re-inserted on every update, so they converge by
+themselves; rekey_table rewrites the remaining random keys of tables that no
+foreign key points at, in batches, assigning keys in the order of the rows'
+current primary key. Tables that are referenced (users, cv_profiles,
+profile_change_logs) keep their existing keys, since rewriting them would
+cascade through every child row; their new rows are still time-ordered.
+Rewriting keys leaves the old index pages behind, so the primary key index
+is rebuilt afterwards (REINDEX ... CONCURRENTLY on PostgreSQL).
+"""
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import MetaData, String, Table, bindparam, cast, func, select, text, update
+from sqlalchemy.orm import Session
+
+from app.ids import uuid7
+
+logger = logging.getLogger(__name__)
+
+
+def referenced_tables(metadata: MetaData) -> set:
+    """Names of the tables some foreign key points at"""
+    return {fk.column.table.name for table in metadata.tables.values() for fk in table.foreign_keys}
+
+
+def rekeyable_tables(metadata: MetaData, table_names: Optional[List[str]] = None) -> List[Table]:
+    """Tables with a single UUID primary key column that no foreign key references"""
+    referenced = referenced_tables(metadata)
+    tables = []
+    for table in metadata.sorted_tables:
+        if table_names is not None and table.name not in table_names:
+            continue
+        key = list(table.primary_key.columns)
+        if table.name in referenced or len(key) != 1 or key[0].name != "id":
+            continue
+        tables.append(table)
+    return tables
+
+
+def _random_key(table: Table):
+    # Version nibble of the canonical text form: 8-4-[v]xxx-...
+    return func.substr(cast(table.c.id, String), 15, 1) != "7"
+
+
+def key_versions(db: Session, table: Table) -> Dict[str, int]:
+    """Rows with time-ordered and with other (random) keys"""
+    total, random_keys = db.execute(
+        select(func.count(), func.count().filter(_random_key(table))).select_from(table)
+    ).one()
+    return {"rows": total, "timeOrdered": total - random_keys, "random": random_keys}
+
+
+def primary_key_index_bytes(db: Session, table: Table) -> Optional[int]:
+    """Size of the table's primary key index on PostgreSQL, else None"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    return db.execute(
+        text(
+            "SELECT pg_relation_size(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = CAST(:table AS regclass) AND i.indisprimary"
+        ),
+        {"table": table.name},
+    ).scalar()
+
+
+def rekey_table(db: Session, table: Table, batch_size: int = 5000, on_batch=None) -> int:
+    """Give every row with a random key a version 7 key; commits per batch, returns rows rekeyed"""
+    statement = update(table).where(table.c.id == bindparam("old_id")).values(id=bindparam("new_id"))
+    rekeyed = 0
+    last_id = None
+    while True:
+        query = select(table.c.id).where(_random_key(table)).order_by(table.c.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        old_ids = db.execute(query).scalars().all()
+        if not old_ids:
+            break
+        last_id = old_ids[-1]
+        db.execute(statement, [{"old_id": old_id, "new_id": uuid7()} for old_id in old_ids])
+        db.commit()
+        rekeyed += len(old_ids)
+        if on_batch is not None:
+            on_batch(table.name, rekeyed)
+    return rekeyed
+
+
+def reindex_primary_key(db: Session, table: Table):
+    """Rebuild the primary key index after a rekey, without blocking writes on PostgreSQL"""
+    dialect = db.get_bind().dialect.name
+    index_name = table.primary_key.name or f"{table.name}_pkey"
+    if dialect == "postgresql":
+        # CONCURRENTLY cannot run inside a transaction block
+        with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(f'REINDEX INDEX CONCURRENTLY "{index_name}"'))
+    else:
+        db.execute(text(f'REINDEX "{table.name}"'))
+        db.commit()
@@ -1,19 +1,199 @@
 import requests
 import logging
 import time
+from datetime import datetime
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sqlalchemy import update
-import json
+from typing import NamedTuple, Optional, Tuple
 
 from app.config import settings
-from app.models.profile import CVProfile, ProfileChangeLog
+from app.json_codec import RawJSON, dumps
+from app.models.profile import ProfileChangeLog
+from app.models.partner_sync import PartnerSyncDeadLetter
+from app.services.change_log import DELTA, ChangeLogGapError, delta_between, materialize
+from app.services.json_patch import JsonPatchError
+from app.services.profile_cache import profile_cache
+from app.services.profile_documents import profile_exists
+from app.tracing import TRACEPARENT_HEADER, epoch_seconds, parse_traceparent, record_span, start_span
 
 logger = logging.getLogger(__name__)
 
-def sync_profile_to_matching_partner(profile_id: str, operation: str, db: Session):
+PARTNER_SUCCESS_CODES = (200, 201, 202, 204)
+# A partner refuses a delta whose base version it does not hold
+DELTA_REFUSED_CODES = (409, 412)
+DELTA_IDEMPOTENCY_SUFFIX = "_delta"
+
+class PartnerSendResult(NamedTuple):
+    ok: bool
+    status_code: Optional[int] = None
+    error_class: Optional[str] = None
+    error_message: Optional[str] = None
+
+def build_partner_body(profile_id: str, operation: str, profile=None, version: Optional[int] = None) -> bytes:
+    """
+    Encode the matching partner request body.
+    version is the change log version the profile is sent as, which later deltas
+    name as their baseVersion; None for changes logged before versioning.
+    A RawJSON profile is spliced in as-is instead of being decoded and re-encoded.
+    """
+    body = b'{"cvId":' + dumps(profile_id) + b',"operation":' + dumps(operation)
+    if version is not None:
+        body += b',"version":' + dumps(version)
+    if operation != "DELETE":
+        body += b',"profile":' + dumps(profile)
+    return body + b"}"
+
+def build_partner_delta_body(profile_id: str, operation: str, patch: list, base_version: int, version: int) -> bytes:
+    """Encode a matching partner request carrying JSON Patch operations against base_version"""
+    return dumps({
+        "cvId": profile_id,
+        "operation": operation,
+        "baseVersion": base_version,
+        "version": version,
+        "patch": patch,
+    })
+
+def acknowledged_version(db: Session, cv_id: str, before: int) -> Optional[int]:
+    """The latest version of a profile below before that the partner accepted"""
+    return db.query(func.max(ProfileChangeLog.version))\
+        .filter(ProfileChangeLog.cv_id == cv_id)\
+        .filter(ProfileChangeLog.synced_to_matching_partner == True)\
+        .filter(ProfileChangeLog.version < before)\
+        .scalar()
+
+def partner_delta(db: Session, log_entry: ProfileChangeLog) -> Optional[Tuple[int, list]]:
+    """
+    Base version and patch taking the partner from the latest version it
+    acknowledged to the version of log_entry, covering the versions in between
+    that it never received. None when a full push is needed: the partner
+    acknowledged no earlier version, the profile was deleted there, or the
+    patch would not be much smaller than the profile.
+    """
+    base_version = acknowledged_version(db, log_entry.cv_id, log_entry.version)
+    if base_version is None:
+        return None
+    if log_entry.payload_kind == DELTA and log_entry.base_version == base_version:
+        return base_version, log_entry.payload
+    patch = delta_between(db, log_entry.cv_id, base_version, log_entry.version)
+    return (base_version, patch) if patch is not None else None
+
+def build_partner_request(
+    db: Session,
+    log_entry: ProfileChangeLog,
+    raw_payload: Optional[RawJSON] = None,
+    allow_delta: bool = False
+) -> Optional[Tuple[bytes, dict]]:
+    """
+    Body and headers for delivering one change log entry, or None when the
+    profile of an INSERT / UPDATE no longer exists.
+    With allow_delta, and if the partner supports deltas, the entry is sent as a
+    patch against the version the partner acknowledged last (see partner_delta).
+    """
+    is_delta = log_entry.payload_kind == DELTA
+    delta = None
+    if allow_delta and settings.MATCHING_PARTNER_SUPPORTS_DELTAS and \
+            log_entry.operation != "DELETE" and log_entry.version is not None:
+        delta = partner_delta(db, log_entry)
+    send_delta = delta is not None
+    if log_entry.operation == "DELETE":
+        body = build_partner_body(log_entry.cv_id, log_entry.operation, version=log_entry.version)
+    elif send_delta:
+        base_version, patch = delta
+        body = build_partner_delta_body(log_entry.cv_id, log_entry.operation, patch, base_version, log_entry.version)
+    else:
+        # Prefer the payload stored with the change; fall back to the assembled profile
+        profile_payload = None
+        if raw_payload is not None:
+            profile_payload = raw_payload
+        elif is_delta:
+            try:
+                profile_payload = materialize(db, log_entry.cv_id, log_entry.version)
+            except (ChangeLogGapError, JsonPatchError) as e:
+                logger.warning(f"Could not rebuild version {log_entry.version} of {log_entry.cv_id}: {e}")
+        elif log_entry.payload is not None:
+            profile_payload = log_entry.payload
+        
+        if profile_payload is None:
+            profile_payload = profile_cache.get_or_load(db, log_entry.cv_id)
+            if profile_payload is None:
+                return None
+        elif not profile_exists(db, log_entry.cv_id):
+            return None
+        body = build_partner_body(log_entry.cv_id, log_entry.operation, profile_payload, log_entry.version)
+    
+    # Add idempotency key to prevent duplicate processing; a full resend of a
+    # refused delta must not be taken for a duplicate
+    idempotency_key = f"{log_entry.cv_id}_{log_entry.operation}_{log_entry.id}"
+    headers = {
+        "Content-Type": "application/json",
+        "X-Idempotency-Key": f"{idempotency_key}{DELTA_IDEMPOTENCY_SUFFIX}" if send_delta else idempotency_key
+    }
+    return body, headers
+
+def post_to_partner(body: bytes, headers: dict, http=requests) -> PartnerSendResult:
+    """
+    Send one request to the matching partner and classify the outcome.
+    http is the requests module or a requests.Session shared by a sender.
+    """
+    try:
+        response = http.post(settings.MATCHING_PARTNER_API_URL, data=body, headers=headers, timeout=10)
+    except requests.Timeout as e:
+        return PartnerSendResult(False, None, "timeout", str(e))
+    except requests.ConnectionError as e:
+        return PartnerSendResult(False, None, "connection", str(e))
+    except Exception as e:
+        return PartnerSendResult(False, None, "error", str(e))
+    
+    if response.status_code in PARTNER_SUCCESS_CODES:
+        return PartnerSendResult(True, response.status_code)
+    error_class = "http_5xx" if response.status_code >= 500 else "http_4xx"
+    return PartnerSendResult(
+        False, response.status_code, error_class,
+        f"API returned status code {response.status_code}: {response.text}"
+    )
+
+def record_dead_letter(db: Session, log_entry: ProfileChangeLog, result: PartnerSendResult, attempts: int):
+    """Create or update the dead letter of a change log entry; the caller commits"""
+    now = datetime.utcnow()
+    dead_letter = db.query(PartnerSyncDeadLetter)\
+        .filter(PartnerSyncDeadLetter.change_log_id == log_entry.id)\
+        .first()
+    if dead_letter is None:
+        dead_letter = PartnerSyncDeadLetter(
+            change_log_id=log_entry.id,
+            cv_id=log_entry.cv_id,
+            operation=log_entry.operation,
+            attempt_count=0,
+            replay_count=0,
+            first_failed_at=now
+        )
+        db.add(dead_letter)
+    dead_letter.error_class = result.error_class
+    dead_letter.error_message = result.error_message
+    dead_letter.last_status_code = result.status_code
+    dead_letter.attempt_count += attempts
+    dead_letter.last_failed_at = now
+    dead_letter.resolved_at = None
+    dead_letter.resolution = None
+    return dead_letter
+
+def sync_profile_to_matching_partner(
+    profile_id: str,
+    operation: str,
+    db: Session,
+    raw_payload: Optional[RawJSON] = None,
+    traceparent: Optional[str] = None
+):
     """
     Sync profile changes to the third-party matching partner.
     Implements retry logic and idempotency.
+    raw_payload, when given, is the encoded profile already stored on the change log.
+    Only the latest unsynced change is sent; as a delta it is computed from the
+    version the partner acknowledged last, so skipped versions are included.
+    Changes that still fail after the retries are recorded as dead letters.
+    The push continues the trace of the change (traceparent, else the one on the
+    change log) with a span for the time queued since the change was logged and
+    one for the delivery including retries.
     """
     MAX_RETRIES = 3
     RETRY_DELAY = 5  # seconds
@@ -30,61 +210,74 @@ def sync_profile_to_matching_partner(profile_id: str, operation: str, db: Sessio
         logger.warning(f"No unsynchronized change log found for profile {profile_id}, operation {operation}")
         return
     
-    # If this is a DELETE operation, we only need the profile ID
-    if operation == "DELETE":
-        payload = {"cvId": profile_id, "operation": "DELETE"}
-    else:
-        # For INSERT or UPDATE operations, get the full profile data
-        profile = db.query(CVProfile).filter(CVProfile.cv_id == profile_id).first()
-        if not profile:
+    # Pushes of one profile may be queued in different lanes; never send an older
+    # change after a newer one was delivered
+    newer_synced = db.query(ProfileChangeLog.id)\
+        .filter(ProfileChangeLog.cv_id == profile_id)\
+        .filter(ProfileChangeLog.synced_to_matching_partner == True)\
+        .filter(ProfileChangeLog.timestamp > log_entry.timestamp)\
+        .first()
+    if newer_synced is not None:
+        logger.info(f"Change of profile {profile_id} was superseded by a newer synced change")
+        log_entry.synced_to_matching_partner = True
+        db.commit()
+        return
+    
+    parent = parse_traceparent(traceparent or log_entry.traceparent)
+    if log_entry.timestamp is not None:
+        record_span(
+            "partner.queue", parent,
+            start=epoch_seconds(log_entry.timestamp),
+            end=time.time(),
+            cvId=profile_id
+        )
+    
+    with start_span("partner.push", parent, cvId=profile_id, operation=operation) as span:
+        request = build_partner_request(db, log_entry, raw_payload, allow_delta=True)
+        if request is None:
             logger.error(f"Profile {profile_id} not found for {operation} operation")
+            record_dead_letter(db, log_entry, PartnerSendResult(
+                False, None, "profile_not_found", f"Profile {profile_id} not found for {operation} operation"
+            ), attempts=0)
+            db.commit()
+            span.set(outcome="profile_not_found")
             return
+        body, headers = request
+        headers[TRACEPARENT_HEADER] = span.traceparent
         
+        # Try to send the notification with retries
+        result = None
+        retries = 0
         
-        payload = {
-            "cvId": profile_id,
-            "operation": operation,
-            "profile": json.loads(log_entry.payload) if log_entry.payload else None
-        }
-    
-    # Add idempotency key to prevent duplicate processing
-    idempotency_key = f"{profile_id}_{operation}_{log_entry.id}"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Idempotency-Key": idempotency_key
-    }
-    
-    # Try to send the notification with retries
-    success = False
-    retries = 0
-    last_error = None
-    
-    while not success and retries < MAX_RETRIES:
-        try:
-            response = requests.post(
-                settings.MATCHING_PARTNER_API_URL,
-                json=payload,
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code in (200, 201, 202, 204):
-                success = True
+        while retries < MAX_RETRIES:
+            result = post_to_partner(body, headers)
+            if result.ok:
                 logger.info(f"Successfully synced profile {profile_id} to matching partner")
-            else:
-                last_error = f"API returned status code {response.status_code}: {response.text}"
-                logger.warning(f"Failed to sync profile {profile_id}: {last_error}")
-                retries += 1
-                time.sleep(RETRY_DELAY)
-        except Exception as e:
-            last_error = str(e)
-            logger.exception(f"Error syncing profile {profile_id} to matching partner")
+                break
+            if result.status_code in DELTA_REFUSED_CODES and headers["X-Idempotency-Key"].endswith(DELTA_IDEMPOTENCY_SUFFIX):
+                # The partner is behind; resend the full profile without counting a retry
+                logger.info(f"Matching partner refused the delta of profile {profile_id}, sending the full profile")
+                request = build_partner_request(db, log_entry, raw_payload)
+                if request is None:
+                    break
+                body, headers = request
+                headers[TRACEPARENT_HEADER] = span.traceparent
+                span.set(deltaRefused=True)
+                continue
+            logger.warning(f"Failed to sync profile {profile_id}: {result.error_message}")
             retries += 1
-            time.sleep(RETRY_DELAY)
-    
-    # Update the log entry
-    if success:
-        log_entry.synced_to_matching_partner = True
+            if retries < MAX_RETRIES:
+                time.sleep(RETRY_DELAY)
+        
+        # Update the log entry
+        if result.ok:
+            log_entry.synced_to_matching_partner = True
+        else:
+            logger.error(f"Failed to sync profile {profile_id} after {MAX_RETRIES} retries: {result.error_message}")
+            record_dead_letter(db, log_entry, result, attempts=retries)
         db.commit()
-    else:
-        logger.error(f"Failed to sync profile {profile_id} after {MAX_RETRIES} retries: {last_error}")
\ No newline at end of file
+        span.set(
+            outcome="synced" if result.ok else "dead_letter",
+            attempts=retries + (1 if result.ok else 0),
+            statusCode=result.status_code
+        )
@@ -0,0 +1,151 @@
+"""
+Merkle summaries of the profile set, for drift detection against the talent pool.
+
+Profiles are bucketed by the first DEPTH hex digits of md5(cvId), which
+Postgres computes as well, so a bucket's profiles can be selected in SQL. A
+leaf's hash is the XOR of blake2b(cvId, contentHash) over its profiles; an
+inner node hashes its 16 children. Nodes are named by their hex prefix, the
+root being "". The talent pool service keeps the same tree over what it
+sends, and compares the trees top-down (see its reconcile_with_job_seeker
+task). When nothing drifted, the comparison costs one root hash.
+"""
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.profile import CVProfile
+
+DEPTH = 3
+FANOUT = "0123456789abcdef"
+_DIGEST_SIZE = 16
+
+
+def bucket_of(cv_id: str, depth: int = DEPTH) -> str:
+    return hashlib.md5(cv_id.encode("utf-8")).hexdigest()[:depth]
+
+
+def entry_digest(cv_id: str, content_hash: Optional[str]) -> int:
+    digest = hashlib.blake2b(
+        f"{cv_id}\0{content_hash or ''}".encode("utf-8"), digest_size=_DIGEST_SIZE
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+class MerkleTree:
+    """Fixed-depth hash tree over (cvId, contentHash) pairs, in any order"""
+
+    def __init__(self, depth: int = DEPTH):
+        self.depth = depth
+        self.count = 0
+        self._leaves: Dict[str, int] = {}
+        self._nodes: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, Optional[str]]], depth: int = DEPTH) -> "MerkleTree":
+        tree = cls(depth)
+        for cv_id, content_hash in entries:
+            tree.add(cv_id, content_hash)
+        return tree
+
+    def add(self, cv_id: str, content_hash: Optional[str]):
+        bucket = bucket_of(cv_id, self.depth)
+        self._leaves[bucket] = self._leaves.get(bucket, 0) ^ entry_digest(cv_id, content_hash)
+        self.count += 1
+        self._nodes = None
+
+    def _compute(self) -> Dict[str, str]:
+        nodes = {bucket: value.to_bytes(_DIGEST_SIZE, "big").hex() for bucket, value in self._leaves.items()}
+        empty = bytes(_DIGEST_SIZE)
+        level = set(nodes)
+        for _ in range(self.depth):
+            parents = {prefix[:-1] for prefix in level}
+            for parent in parents:
+                children = b"".join(
+                    bytes.fromhex(nodes[parent + c]) if parent + c in nodes else empty for c in FANOUT
+                )
+                nodes[parent] = hashlib.blake2b(children, digest_size=_DIGEST_SIZE).hexdigest()
+            level = parents
+        return nodes
+
+    def node(self, prefix: str) -> Optional[str]:
+        """Hash of a node, or None for a subtree without profiles"""
+        if self._nodes is None:
+            self._nodes = self._compute()
+        return self._nodes.get(prefix)
+
+    @property
+    def root(self) -> Optional[str]:
+        return self.node("")
+
+    def children(self, prefix: str) -> Dict[str, Optional[str]]:
+        if len(prefix) >= self.depth:
+            raise ValueError(f"Node '{prefix}' is a leaf at depth {self.depth}")
+        return {prefix + c: self.node(prefix + c) for c in FANOUT}
+
+
+def mismatched_buckets(
+    local: MerkleTree,
+    remote_root: Optional[str],
+    fetch_children: Callable[[List[str]], Dict[str, Optional[str]]],
+) -> List[str]:
+    """
+    Leaf buckets whose hashes differ, comparing level by level from the root.
+    fetch_children takes node prefixes and returns the remote hashes of all their children.
+    """
+    if local.root == remote_root:
+        return []
+    differing = [""]
+    for _ in range(local.depth):
+        remote = fetch_children(differing)
+        differing = [
+            child for prefix in differing
+            for child, value in local.children(prefix).items()
+            if remote.get(child) != value
+        ]
+        if not differing:
+            break
+    return sorted(differing)
+
+
+def profile_hash_rows(db: Session, buckets: Optional[List[str]] = None, depth: int = DEPTH):
+    """
+    (cvId, contentHash) of all profiles, or of those in the given leaf buckets.
+    Tombstoned profiles are not sent by the talent pool either, so they are left out.
+    """
+    query = select(CVProfile.cv_id, CVProfile.content_hash)\
+        .where(CVProfile.cv_id.isnot(None))\
+        .where(CVProfile.tombstoned_at.is_(None))
+    if buckets is not None:
+        query = query.where(func.substr(func.md5(CVProfile.cv_id), 1, depth).in_(buckets))
+    return db.execute(query.execution_options(yield_per=10000))
+
+
+class ProfileTreeCache:
+    """The profile tree, rebuilt at most every ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._tree: Optional[MerkleTree] = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> MerkleTree:
+        with self._lock:
+            now = self._clock()
+            if self._tree is None or now - self._built_at >= self.ttl_seconds:
+                self._tree = MerkleTree.build(tuple(row) for row in profile_hash_rows(db))
+                self._built_at = now
+            return self._tree
+
+    def invalidate(self):
+        with self._lock:
+            self._tree = None
+
+
+profile_tree_cache = ProfileTreeCache(settings.MERKLE_TREE_TTL_SECONDS)
@@ -0,0 +1,281 @@
+"""
+Priority lanes for matching partner pushes.
+
+Pushes are queued per lane: interactive (a candidate's own edits, reported
+through /profiles/changes), bulk (the talent pool's sync runs) and
+reconciliation (drift repair resends). Sender threads take the next push by
+weighted fair queueing: every push taken from a lane advances the lane's
+virtual time by 1 / weight, and the non-empty lane with the lowest virtual
+time goes next. Under load the lanes get sends in proportion to their
+weights; a lane that was idle restarts at the current virtual time, so it
+does not bank credit while empty. A lane whose oldest push has waited
+max_wait_seconds is moved back to the current virtual time, so it is served
+next however far its weight had put it behind; a light lane never starves
+behind a heavy one, and a backlog that is old everywhere still leaves the
+interactive lane its turns.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.json_codec import RawJSON
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+RECONCILIATION = "reconciliation"
+# Highest priority first; ties between lanes go to the earlier one
+LANES = (INTERACTIVE, BULK, RECONCILIATION)
+
+# Set by trusted senders on /api/bulk to queue the pushes of a request in another lane
+PRIORITY_HEADER = "X-Sync-Priority"
+
+# Wait and latency samples kept per lane for the percentiles
+LATENCY_WINDOW = 1000
+
+
+def parse_lane_weights(value: str) -> Dict[str, float]:
+    """Weights from "interactive=8,bulk=2,reconciliation=1"; every lane needs a positive weight"""
+    weights = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        lane, _, weight = part.partition("=")
+        weights[lane.strip()] = float(weight)
+    unknown = set(weights) - set(LANES)
+    if unknown:
+        raise ValueError(f"Unknown partner sync lanes: {', '.join(sorted(unknown))}")
+    missing = [lane for lane in LANES if weights.get(lane, 0) <= 0]
+    if missing:
+        raise ValueError(f"Partner sync lanes without a positive weight: {', '.join(missing)}")
+    return weights
+
+
+class PartnerPush:
+    """One queued push of a profile change"""
+
+    __slots__ = ("lane", "cv_id", "operation", "raw_payload", "traceparent", "on_done", "enqueued_at")
+
+    def __init__(
+        self,
+        lane: str,
+        cv_id: str,
+        operation: str,
+        raw_payload: Optional[RawJSON] = None,
+        traceparent: Optional[str] = None,
+        on_done: Optional[Callable[[], None]] = None,
+        enqueued_at: float = 0.0,
+    ):
+        self.lane = lane
+        self.cv_id = cv_id
+        self.operation = operation
+        self.raw_payload = raw_payload
+        self.traceparent = traceparent
+        self.on_done = on_done
+        self.enqueued_at = enqueued_at
+
+
+def _percentiles(samples: Deque[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[int(0.5 * (len(ordered) - 1))], 3),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class LaneStats:
+    """Counters and recent wait / latency samples of one lane"""
+
+    def __init__(self):
+        self.enqueued = 0
+        self.dispatched = 0
+        self.completed = 0
+        self.promoted = 0
+        self.waits: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+
+class LaneScheduler:
+    """Weighted fair choice between the lane queues; not thread-safe, the dispatcher locks around it"""
+
+    def __init__(self, weights: Dict[str, float], max_wait_seconds: float, clock=time.monotonic):
+        self.weights = weights
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self.queues: Dict[str, Deque[PartnerPush]] = {lane: deque() for lane in LANES}
+        self.stats: Dict[str, LaneStats] = {lane: LaneStats() for lane in LANES}
+        self._lane_time: Dict[str, float] = {lane: 0.0 for lane in LANES}
+        self._virtual_time = 0.0
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def push(self, push: PartnerPush):
+        queue = self.queues[push.lane]
+        if not queue:
+            self._lane_time[push.lane] = max(self._lane_time[push.lane], self._virtual_time)
+        push.enqueued_at = self._clock()
+        queue.append(push)
+        self.stats[push.lane].enqueued += 1
+
+    def pop(self) -> Optional[PartnerPush]:
+        """The next push to send, or None when all lanes are empty"""
+        waiting = [lane for lane in LANES if self.queues[lane]]
+        if not waiting:
+            return None
+        now = self._clock()
+        if self.max_wait_seconds:
+            for lane in waiting:
+                starving = now - self.queues[lane][0].enqueued_at >= self.max_wait_seconds
+                if starving and self._lane_time[lane] > self._virtual_time:
+                    self._lane_time[lane] = self._virtual_time
+                    self.stats[lane].promoted += 1
+        lane = min(waiting, key=lambda l: self._lane_time[l])
+
+        self._virtual_time = self._lane_time[lane]
+        self._lane_time[lane] += 1.0 / self.weights[lane]
+        push = self.queues[lane].popleft()
+        stats = self.stats[lane]
+        stats.dispatched += 1
+        stats.waits.append(now - push.enqueued_at)
+        return push
+
+    def completed(self, push: PartnerPush):
+        stats = self.stats[push.lane]
+        stats.completed += 1
+        stats.latencies.append(self._clock() - push.enqueued_at)
+
+    def status(self) -> Dict[str, dict]:
+        now = self._clock()
+        lanes = {}
+        for lane in LANES:
+            queue, stats = self.queues[lane], self.stats[lane]
+            lanes[lane] = {
+                "weight": self.weights[lane],
+                "depth": len(queue),
+                "oldestWaitSeconds": round(now - queue[0].enqueued_at, 3) if queue else 0.0,
+                "enqueued": stats.enqueued,
+                "dispatched": stats.dispatched,
+                "completed": stats.completed,
+                "promoted": stats.promoted,
+                "waitSeconds": _percentiles(stats.waits),
+                "latencySeconds": _percentiles(stats.latencies),
+            }
+        return lanes
+
+
+def deliver_push(push: PartnerPush):
+    """Send one push with its own session; failures end up as dead letters or in the log"""
+    from app.database import SessionLocal
+    from app.services.matching_service import sync_profile_to_matching_partner
+
+    db = SessionLocal()
+    try:
+        sync_profile_to_matching_partner(
+            profile_id=push.cv_id, operation=push.operation, db=db,
+            raw_payload=push.raw_payload, traceparent=push.traceparent
+        )
+    finally:
+        db.close()
+
+
+class PartnerDispatcher:
+    """Sender threads draining the lanes of a LaneScheduler; started on the first push"""
+
+    def __init__(
+        self,
+        weights: Dict[str, float],
+        max_wait_seconds: float,
+        workers: int,
+        send: Callable[[PartnerPush], None] = deliver_push,
+        clock=time.monotonic,
+    ):
+        self.scheduler = LaneScheduler(weights, max_wait_seconds, clock)
+        self.workers = max(1, workers)
+        self.send = send
+        self.in_progress = 0
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def submit(
+        self,
+        lane: str,
+        cv_id: str,
+        operation: str,
+        raw_payload: Optional[RawJSON] = None,
+        traceparent: Optional[str] = None,
+        on_done: Optional[Callable[[], None]] = None,
+    ):
+        """Queue a push; on_done runs once it was sent or given up on"""
+        if lane not in self.scheduler.queues:
+            raise ValueError(f"Unknown partner sync lane '{lane}'")
+        with self._condition:
+            self._start()
+            self.scheduler.push(PartnerPush(lane, cv_id, operation, raw_payload, traceparent, on_done))
+            self._condition.notify()
+
+    def _start(self):
+        if self._threads:
+            return
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"partner-dispatch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and not len(self.scheduler):
+                    self._condition.wait()
+                if self._stopping and not len(self.scheduler):
+                    return
+                push = self.scheduler.pop()
+                self.in_progress += 1
+            try:
+                self.send(push)
+            except Exception:
+                logger.exception(f"Matching partner push of {push.cv_id} ({push.lane}) failed")
+            finally:
+                with self._condition:
+                    self.in_progress -= 1
+                    self.scheduler.completed(push)
+                if push.on_done is not None:
+                    push.on_done()
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stop the senders once the queued pushes were sent"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def status(self) -> dict:
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "inProgress": self.in_progress,
+                "maxWaitSeconds": self.scheduler.max_wait_seconds,
+                "lanes": self.scheduler.status(),
+            }
+
+
+def _create_dispatcher() -> PartnerDispatcher:
+    return PartnerDispatcher(
+        weights=parse_lane_weights(settings.PARTNER_LANE_WEIGHTS),
+        max_wait_seconds=settings.PARTNER_LANE_MAX_WAIT_SECONDS,
+        workers=settings.PARTNER_DISPATCH_WORKERS,
+    )
+
+
+partner_dispatcher = _create_dispatcher()
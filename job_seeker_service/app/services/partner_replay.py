@@ -0,0 +1,296 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.profile import ProfileChangeLog
+from app.models.partner_sync import PartnerSyncDeadLetter
+from app.services.matching_service import (
+    PartnerSendResult, build_partner_request, post_to_partner, record_dead_letter
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe rate limiter allowing bursts of up to burst requests.
+    Each acquire() reserves the next free send slot and sleeps until it.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._next_slot = float("-inf")
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            slot = max(self._next_slot, now - (self.capacity - 1) * self.interval)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            self._sleep(slot - now)
+
+
+class ReplayProgress:
+    """Counters of one replay, readable while it runs"""
+
+    def __init__(self, replay_id: str, total: int = 0):
+        self.replay_id = replay_id
+        self.total = total
+        self.processed = 0
+        self.replayed = 0
+        self.superseded = 0
+        self.failed = 0
+        self.status = "running"  # running, finished, error
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            "replayId": self.replay_id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "replayed": self.replayed,
+            "superseded": self.superseded,
+            "failed": self.failed,
+            "ratePerSecond": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "error": self.error,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+def pooled_session(concurrency: int) -> requests.Session:
+    """HTTP session keeping one connection per concurrent sender"""
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    return http
+
+
+def dead_letter_query(
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    error_classes: Optional[Iterable[str]] = None,
+    cv_ids: Optional[Iterable[str]] = None,
+    include_resolved: bool = False,
+):
+    """Dead letters selected by last failure time, error class and cvId"""
+    query = db.query(PartnerSyncDeadLetter)
+    if not include_resolved:
+        query = query.filter(PartnerSyncDeadLetter.resolved_at.is_(None))
+    if since is not None:
+        query = query.filter(PartnerSyncDeadLetter.last_failed_at >= since)
+    if until is not None:
+        query = query.filter(PartnerSyncDeadLetter.last_failed_at < until)
+    if error_classes:
+        query = query.filter(PartnerSyncDeadLetter.error_class.in_(list(error_classes)))
+    if cv_ids:
+        query = query.filter(PartnerSyncDeadLetter.cv_id.in_(list(cv_ids)))
+    return query
+
+
+def dead_letter_counts(query) -> Dict[str, int]:
+    """Number of selected dead letters per error class"""
+    rows = query.with_entities(PartnerSyncDeadLetter.error_class, func.count())\
+        .group_by(PartnerSyncDeadLetter.error_class)
+    return {error_class: count for error_class, count in rows}
+
+
+def _latest_synced_timestamps(db: Session, cv_ids: List[str]) -> Dict[str, datetime]:
+    rows = db.query(ProfileChangeLog.cv_id, func.max(ProfileChangeLog.timestamp))\
+        .filter(ProfileChangeLog.cv_id.in_(cv_ids))\
+        .filter(ProfileChangeLog.synced_to_matching_partner == True)\
+        .group_by(ProfileChangeLog.cv_id)
+    return dict(rows)
+
+
+def _resolve(dead_letter: PartnerSyncDeadLetter, resolution: str):
+    dead_letter.resolved_at = datetime.utcnow()
+    dead_letter.resolution = resolution
+
+
+def replay_dead_letters(
+    db: Session,
+    query,
+    rate_per_second: float,
+    concurrency: int,
+    batch_size: int,
+    progress: Optional[ReplayProgress] = None,
+    on_progress: Optional[Callable[[ReplayProgress], None]] = None,
+    http=None,
+) -> ReplayProgress:
+    """
+    Re-drive the dead letters selected by query.
+    Entries are read in id-ordered batches. Each batch is sent by a thread pool
+    sharing one pooled HTTP session, with sends paced by a token bucket. Results are
+    committed per batch. An entry whose profile has a newer synced change is resolved
+    as superseded instead of being sent, so a replay never overwrites newer data at
+    the partner.
+    """
+    if progress is None:
+        progress = ReplayProgress(str(uuid.uuid4()))
+    progress.total = query.count()
+    bucket = TokenBucket(rate_per_second)
+
+    if http is None:
+        http = pooled_session(concurrency)
+
+    def send(request):
+        bucket.acquire()
+        return post_to_partner(request[0], request[1], http=http)
+
+    last_id = None
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            batch_query = query.order_by(PartnerSyncDeadLetter.id)
+            if last_id is not None:
+                batch_query = batch_query.filter(PartnerSyncDeadLetter.id > last_id)
+            dead_letters = batch_query.limit(batch_size).all()
+            if not dead_letters:
+                break
+            last_id = dead_letters[-1].id
+
+            log_entries = {
+                entry.id: entry for entry in db.query(ProfileChangeLog)
+                .filter(ProfileChangeLog.id.in_([d.change_log_id for d in dead_letters]))
+            }
+            latest_synced = _latest_synced_timestamps(db, list({d.cv_id for d in dead_letters}))
+
+            # Build requests here; only the HTTP calls run on the pool threads
+            pending = []
+            for dead_letter in dead_letters:
+                log_entry = log_entries.get(dead_letter.change_log_id)
+                synced_at = latest_synced.get(dead_letter.cv_id)
+                if log_entry is None or log_entry.synced_to_matching_partner or \
+                        (synced_at is not None and synced_at > log_entry.timestamp):
+                    _resolve(dead_letter, "superseded")
+                    progress.superseded += 1
+                    continue
+                request = build_partner_request(db, log_entry)
+                if request is None:
+                    record_dead_letter(db, log_entry, PartnerSendResult(
+                        False, None, "profile_not_found", f"Profile {log_entry.cv_id} not found"
+                    ), attempts=0)
+                    dead_letter.replay_count += 1
+                    progress.failed += 1
+                    continue
+                pending.append((dead_letter, log_entry, request))
+
+            results = executor.map(send, [request for _, _, request in pending])
+            for (dead_letter, log_entry, _), result in zip(pending, results):
+                dead_letter.replay_count += 1
+                if result.ok:
+                    log_entry.synced_to_matching_partner = True
+                    _resolve(dead_letter, "replayed")
+                    progress.replayed += 1
+                else:
+                    record_dead_letter(db, log_entry, result, attempts=1)
+                    progress.failed += 1
+
+            db.commit()
+            progress.processed += len(dead_letters)
+            if on_progress is not None:
+                on_progress(progress)
+
+    progress.status = "finished"
+    progress.finished_at = datetime.utcnow()
+    logger.info(
+        f"Dead letter replay {progress.replay_id}: {progress.replayed} replayed, "
+        f"{progress.superseded} superseded, {progress.failed} failed of {progress.total}"
+    )
+    return progress
+
+
+def push_change_logs(
+    db: Session,
+    log_entry_ids: List[uuid.UUID],
+    rate_per_second: float,
+    concurrency: int,
+    batch_size: int,
+    http=None,
+) -> Dict[str, int]:
+    """
+    Send change log entries written in bulk (e.g. by a pool manifest) to the
+    partner, paced and pooled like a replay. Failed entries become dead letters.
+    """
+    bucket = TokenBucket(rate_per_second)
+    if http is None:
+        http = pooled_session(concurrency)
+
+    def send(request):
+        bucket.acquire()
+        return post_to_partner(request[0], request[1], http=http)
+
+    counts = {"sent": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for start in range(0, len(log_entry_ids), batch_size):
+            log_entries = db.query(ProfileChangeLog)\
+                .filter(ProfileChangeLog.id.in_(log_entry_ids[start:start + batch_size]))\
+                .filter(ProfileChangeLog.synced_to_matching_partner == False)\
+                .all()
+            pending = []
+            for log_entry in log_entries:
+                request = build_partner_request(db, log_entry)
+                if request is None:
+                    record_dead_letter(db, log_entry, PartnerSendResult(
+                        False, None, "profile_not_found", f"Profile {log_entry.cv_id} not found"
+                    ), attempts=0)
+                    counts["failed"] += 1
+                    continue
+                pending.append((log_entry, request))
+
+            results = executor.map(send, [request for _, request in pending])
+            for (log_entry, _), result in zip(pending, results):
+                if result.ok:
+                    log_entry.synced_to_matching_partner = True
+                    counts["sent"] += 1
+                else:
+                    record_dead_letter(db, log_entry, result, attempts=1)
+                    counts["failed"] += 1
+            db.commit()
+
+    logger.info(f"Pushed {counts['sent']} change log entries to the partner, {counts['failed']} failed")
+    return counts
+
+
+class ReplayRegistry:
+    """Progress of replays started through the API, newest kept"""
+
+    def __init__(self, max_entries: int = 100):
+        self.max_entries = max_entries
+        self._replays: "OrderedDict[str, ReplayProgress]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self) -> ReplayProgress:
+        progress = ReplayProgress(str(uuid.uuid4()))
+        with self._lock:
+            self._replays[progress.replay_id] = progress
+            while len(self._replays) > self.max_entries:
+                self._replays.popitem(last=False)
+        return progress
+
+    def get(self, replay_id: str) -> Optional[ReplayProgress]:
+        with self._lock:
+            return self._replays.get(replay_id)
+
+
+replay_registry = ReplayRegistry()
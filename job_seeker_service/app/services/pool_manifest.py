@@ -0,0 +1,196 @@
+"""
+Removal of members dropped from talent pools, from full-sync pool manifests.
+
+At the end of a full sync run the talent pool sends, per pool, the cvIds of
+all its members, including those not visible in the talent pool (they are
+still members and must not be dropped). The manifest is staged in
+pool_manifest_entries and applied set-based: one anti-join delete drops the
+pool's memberships of profiles not listed, one update tombstones the profiles
+left without any membership, and their change log entries are inserted in one
+batch (UPDATE for profiles still in another pool, DELETE for tombstoned ones).
+Stored profile documents of those profiles are rewritten, and the job offer
+status counts of tombstoned ones subtracted, in the same transaction.
+Tombstoned profiles are no longer read, searched, counted or hashed for drift
+detection; a later bulk write of the profile brings it back. Applying the same
+run's manifest again is a no-op.
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.ids import uuid7
+from app.models.pool_manifest import PoolManifest, PoolManifestEntry
+from app.models.profile import CVProfile, ProfileChangeLog, TalentPoolMembership
+from app.services.change_log import SNAPSHOT, lock_profiles
+from app.services.geo_index import candidate_geo_index
+from app.services.job_offer_stats import apply_status_delta, status_counts_of_profiles
+from app.services.merkle import profile_tree_cache
+from app.services.profile_cache import profile_cache
+from app.services.profile_documents import refresh_profile_documents
+from app.services.term_index import candidate_term_index
+
+logger = logging.getLogger(__name__)
+
+# Rows per staging insert and cvIds per IN list
+BATCH_SIZE = 10000
+
+
+class ManifestResult(NamedTuple):
+    manifest_id: uuid.UUID
+    applied: bool  # False when the run's manifest had been applied before
+    members: int
+    removed: int
+    tombstoned: int
+    change_log_ids: List[uuid.UUID]
+
+
+def _batches(values: List, size: int = BATCH_SIZE) -> Iterable[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def removal_change_logs(
+    removed: Iterable[str],
+    tombstoned: Iterable[str],
+    latest_versions: Dict[str, Optional[int]],
+    traceparent: Optional[str] = None,
+) -> List[dict]:
+    """
+    Change log rows for profiles whose memberships were removed: a DELETE for
+    tombstoned profiles, an UPDATE (payload assembled when sent) for the others
+    """
+    tombstoned = set(tombstoned)
+    now = datetime.utcnow()
+    return [
+        {
+            "id": uuid7(),
+            "cv_id": cv_id,
+            "operation": "DELETE" if cv_id in tombstoned else "UPDATE",
+            "timestamp": now,
+            "synced_to_matching_partner": False,
+            "payload": None,
+            "version": (latest_versions.get(cv_id) or 0) + 1,
+            "payload_kind": SNAPSHOT,
+            "base_version": None,
+            "traceparent": traceparent,
+        }
+        for cv_id in sorted(set(removed))
+    ]
+
+
+def _latest_versions(db: Session, cv_ids: List[str]) -> Dict[str, Optional[int]]:
+    versions = {}
+    for batch in _batches(cv_ids):
+        rows = db.execute(
+            select(ProfileChangeLog.cv_id, func.max(ProfileChangeLog.version))
+            .where(ProfileChangeLog.cv_id.in_(batch))
+            .group_by(ProfileChangeLog.cv_id)
+        )
+        versions.update(rows.tuples())
+    return versions
+
+
+def _applied_manifest(db: Session, talent_pool_id: str, run_id: str) -> Optional[ManifestResult]:
+    manifest = db.query(PoolManifest)\
+        .filter(PoolManifest.run_id == run_id)\
+        .filter(PoolManifest.talent_pool_id == talent_pool_id)\
+        .first()
+    if manifest is None:
+        return None
+    return ManifestResult(
+        manifest.id, False, manifest.member_count, manifest.removed_count, manifest.tombstoned_count, []
+    )
+
+
+def apply_pool_manifest(
+    db: Session,
+    talent_pool_id: str,
+    run_id: str,
+    cv_ids: List[str],
+    traceparent: Optional[str] = None,
+) -> ManifestResult:
+    """Remove the pool's memberships of profiles not in cv_ids and tombstone orphaned profiles; commits"""
+    existing = _applied_manifest(db, talent_pool_id, run_id)
+    if existing is not None:
+        return existing
+
+    members = sorted(set(cv_ids))
+    manifest = PoolManifest(talent_pool_id=talent_pool_id, run_id=run_id, member_count=len(members))
+    db.add(manifest)
+    try:
+        db.flush()
+    except IntegrityError:
+        # The same manifest is being applied by another request
+        db.rollback()
+        return _applied_manifest(db, talent_pool_id, run_id)
+    for batch in _batches(members):
+        db.execute(insert(PoolManifestEntry.__table__), [{"manifest_id": manifest.id, "cv_id": cv_id} for cv_id in batch])
+
+    # Memberships of the pool whose profile is not in the manifest; Core statements,
+    # so the delete joins cv_profiles (DELETE ... USING) without ORM synchronization
+    memberships, profiles, entries = (
+        TalentPoolMembership.__table__, CVProfile.__table__, PoolManifestEntry.__table__
+    )
+    listed = exists().where(entries.c.manifest_id == manifest.id).where(entries.c.cv_id == profiles.c.cv_id)
+    removed_rows = db.execute(
+        delete(memberships)
+        .where(memberships.c.talent_pool_id == talent_pool_id)
+        .where(memberships.c.profile_id == profiles.c.id)
+        .where(~listed)
+        .returning(profiles.c.cv_id)
+    )
+    removed = sorted({cv_id for (cv_id,) in removed_rows})
+
+    # Of those, the profiles left in no talent pool
+    tombstoned = []
+    now = datetime.utcnow()
+    in_any_pool = exists().where(memberships.c.profile_id == profiles.c.id)
+    for batch in _batches(removed):
+        rows = db.execute(
+            update(profiles)
+            .where(profiles.c.cv_id.in_(batch))
+            .where(~in_any_pool)
+            .values(tombstoned_at=now, visible_in_talent_pool=False)
+            .returning(profiles.c.cv_id)
+        )
+        tombstoned.extend(cv_id for (cv_id,) in rows)
+
+    # Tombstoned profiles keep their rows but leave the job offer aggregates
+    apply_status_delta(db, {key: -count for key, count in status_counts_of_profiles(db, tombstoned).items()})
+
+    # Stored profile documents still list the removed memberships
+    refresh_profile_documents(db, removed)
+
+    # Locked so concurrent writes of these profiles cannot take the versions read here
+    for batch in _batches(removed):
+        lock_profiles(db, batch)
+    log_rows = removal_change_logs(removed, tombstoned, _latest_versions(db, removed), traceparent)
+    for batch in _batches(log_rows):
+        db.execute(insert(ProfileChangeLog.__table__), batch)
+
+    db.execute(delete(entries).where(entries.c.manifest_id == manifest.id))
+    manifest.removed_count = len(removed)
+    manifest.tombstoned_count = len(tombstoned)
+    db.commit()
+
+    # Core inserts bypass the change log insert event that invalidates the cache
+    for cv_id in removed:
+        profile_cache.invalidate(cv_id)
+    # Other workers drop tombstoned profiles when they read the DELETE change logs
+    for cv_id in tombstoned:
+        candidate_geo_index.remove_profile(cv_id)
+        candidate_term_index.remove_profile(cv_id)
+    if tombstoned:
+        profile_tree_cache.invalidate()
+    logger.info(
+        f"Manifest of pool {talent_pool_id} (run {run_id}): {len(members)} members, "
+        f"{len(removed)} removed, {len(tombstoned)} tombstoned"
+    )
+    return ManifestResult(
+        manifest.id, True, len(members), len(removed), len(tombstoned), [row["id"] for row in log_rows]
+    )
@@ -0,0 +1,269 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db_routing import RoutingSession
+from app.json_codec import RawJSON, dumps
+from app.models.profile import ProfileChangeLog
+from app.services.change_feed import ChangeLogCursor, latest_change_timestamp
+from app.services.change_log import latest_version
+from app.services.profile_documents import (
+    assemble_profile_document, document_storage, load_profile, load_stored_document
+)
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "profile-doc:"
+# Keys per Redis DEL when invalidating changes polled from the change log
+REDIS_DELETE_BATCH = 500
+
+
+class LRUDocumentCache:
+    """
+    Size-bounded LRU of encoded profile documents keyed by cv_id.
+    Bounded both by entry count and by total encoded bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, RawJSON]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, cv_id: str, version: Optional[str] = None) -> Optional[Tuple[str, RawJSON]]:
+        with self._lock:
+            item = self._entries.get(cv_id)
+            if item is None or (version is not None and item[0] != version):
+                return None
+            self._entries.move_to_end(cv_id)
+            return item
+
+    def put(self, cv_id: str, version: str, document: RawJSON):
+        if len(document) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(cv_id, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[cv_id] = (version, document)
+            self._bytes += len(document)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, cv_id: str) -> bool:
+        with self._lock:
+            old = self._entries.pop(cv_id, None)
+            if old is None:
+                return False
+            self._bytes -= len(old[1])
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class RedisDocumentTier:
+    """Optional shared tier; failures are logged and treated as misses"""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis  # optional dependency, only needed when PROFILE_CACHE_REDIS_URL is set
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, cv_id: str) -> Optional[Tuple[str, RawJSON]]:
+        try:
+            value = self.client.get(REDIS_KEY_PREFIX + cv_id)
+        except Exception as e:
+            logger.warning(f"Profile cache Redis get failed: {e}")
+            return None
+        if value is None:
+            return None
+        version, _, document = value.partition(b"\n")
+        return version.decode("utf-8"), RawJSON(document)
+
+    def put(self, cv_id: str, version: str, document: RawJSON):
+        try:
+            self.client.set(REDIS_KEY_PREFIX + cv_id, version.encode("utf-8") + b"\n" + document, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Profile cache Redis set failed: {e}")
+
+    def invalidate(self, cv_id: str):
+        try:
+            self.client.delete(REDIS_KEY_PREFIX + cv_id)
+        except Exception as e:
+            logger.warning(f"Profile cache Redis delete failed: {e}")
+
+    def invalidate_many(self, cv_ids: Iterable[str]):
+        keys = [REDIS_KEY_PREFIX + cv_id for cv_id in cv_ids]
+        try:
+            for start in range(0, len(keys), REDIS_DELETE_BATCH):
+                self.client.delete(*keys[start:start + REDIS_DELETE_BATCH])
+        except Exception as e:
+            logger.warning(f"Profile cache Redis delete failed: {e}")
+
+
+class ProfileCache:
+    """
+    Read-through cache of assembled profile documents.
+    Each entry carries the profile's change log version, read before the
+    document was loaded, and is only served while that is still the latest
+    version; a load racing a write therefore leaves an outdated entry rather
+    than a stale read. Documents read from a replica are only kept in the
+    local tier: they are as old as the replica, which must not hold back
+    other workers reading the shared tier. Entries are also dropped by
+    process_profile, by committed ProfileChangeLog inserts in this process,
+    and by polling the change log for writes made by other workers.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, refresh_interval: float, redis_tier=None):
+        self.local = LRUDocumentCache(max_entries, max_bytes)
+        self.shared = redis_tier
+        self.cursor = ChangeLogCursor(refresh_interval)
+        self._cursor_lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stored_reads = 0
+        self.invalidations = 0
+
+    def get(self, cv_id: str, version: Optional[str] = None) -> Optional[RawJSON]:
+        item = self.local.get(cv_id, version)
+        if item is not None:
+            self.hits += 1
+            return item[1]
+        if self.shared is not None:
+            item = self.shared.get(cv_id)
+            if item is not None and (version is None or item[0] == version):
+                self.shared_hits += 1
+                self.local.put(cv_id, item[0], item[1])
+                return item[1]
+        self.misses += 1
+        return None
+
+    def put(self, cv_id: str, version: str, document: RawJSON, shared: bool = True):
+        self.local.put(cv_id, version, document)
+        if shared and self.shared is not None:
+            self.shared.put(cv_id, version, document)
+
+    def invalidate(self, cv_id: str):
+        self.invalidations += 1
+        self.local.invalidate(cv_id)
+        if self.shared is not None:
+            self.shared.invalidate(cv_id)
+
+    def sync_invalidations(self, db: Session):
+        """Drop entries for profiles changed by other workers since the last poll"""
+        with self._cursor_lock:
+            if self.cursor.watermark is None:
+                self.cursor.start_at(latest_change_timestamp(db))
+                return
+            if not self.cursor.due():
+                return
+            changed = self.cursor.poll(db)
+        for cv_id in changed:
+            self.local.invalidate(cv_id)
+        if changed and self.shared is not None:
+            self.shared.invalidate_many(changed)
+
+    def get_or_load(self, db: Session, cv_id: str) -> Optional[RawJSON]:
+        """
+        Return the encoded document for cv_id. On a miss it is read from the
+        profile's stored document when document storage is on, else assembled
+        from the normalized tables, through db, which may read from a replica.
+        """
+        self.sync_invalidations(db)
+        version = str(latest_version(db, cv_id))
+        document = self.get(cv_id, version)
+        if document is not None:
+            return document
+        if document_storage() is not None:
+            exists, document = load_stored_document(db, cv_id)
+            if not exists:
+                return None
+            if document is not None:
+                self.stored_reads += 1
+                self.put(cv_id, version, document, shared=not _read_from_replica(db))
+                return document
+        profile = load_profile(db, cv_id)
+        if profile is None:
+            return None
+        document = RawJSON(dumps(assemble_profile_document(profile)))
+        self.put(cv_id, version, document, shared=not _read_from_replica(db))
+        return document
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self.local),
+            "bytes": self.local.size_bytes,
+            "maxEntries": self.local.max_entries,
+            "maxBytes": self.local.max_bytes,
+            "hits": self.hits,
+            "sharedHits": self.shared_hits,
+            "misses": self.misses,
+            "storedDocumentReads": self.stored_reads,
+            "evictions": self.local.evictions,
+            "invalidations": self.invalidations,
+            "hitRate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            "sharedTier": self.shared is not None,
+        }
+
+
+def _read_from_replica(db: Session) -> bool:
+    return isinstance(db, RoutingSession) and db.read_from_replica
+
+
+def _create_profile_cache() -> ProfileCache:
+    redis_tier = None
+    if settings.PROFILE_CACHE_REDIS_URL:
+        try:
+            redis_tier = RedisDocumentTier(settings.PROFILE_CACHE_REDIS_URL, settings.PROFILE_CACHE_REDIS_TTL_SECONDS)
+        except ImportError:
+            logger.warning("PROFILE_CACHE_REDIS_URL is set but the redis package is not installed; using the local tier only")
+    return ProfileCache(
+        max_entries=settings.PROFILE_CACHE_MAX_ENTRIES,
+        max_bytes=settings.PROFILE_CACHE_MAX_BYTES,
+        refresh_interval=settings.PROFILE_CACHE_REFRESH_SECONDS,
+        redis_tier=redis_tier,
+    )
+
+
+profile_cache = _create_profile_cache()
+
+
+# Invalidate on every committed ProfileChangeLog insert, whichever code path wrote it
+@event.listens_for(ProfileChangeLog, "after_insert")
+def _remember_changed_profile(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_cv_ids", set()).add(target.cv_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_profiles(session):
+    for cv_id in session.info.pop("changed_cv_ids", ()):
+        profile_cache.invalidate(cv_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_profiles(session):
+    session.info.pop("changed_cv_ids", None)
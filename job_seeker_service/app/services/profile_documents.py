@@ -0,0 +1,352 @@
+"""
+Profile documents: the bulk-API shaped view of a profile over cv_profiles,
+users, cv_addresses and the nine child tables.
+
+With PROFILE_DOCUMENT_STORAGE set to json or zstd, every profile written also
+keeps its document on the cv_profiles row (document, document_encoding), set
+in the transaction of the normalized rows. Profile reads and partner pushes
+then fetch that one row instead of eleven tables. The document is stored as
+the encoded JSON bytes (zstd-compressed in zstd mode) rather than as JSONB,
+so it goes into the response body without being decoded and encoded again.
+verify_profile_documents compares the stored documents with the normalized
+tables and, on request, rewrites the ones that differ.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+import zstandard
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload, undefer
+
+from app.config import settings
+from app.json_codec import RawJSON, dumps, loads
+from app.models.profile import CVProfile
+
+logger = logging.getLogger(__name__)
+
+# Encodings of CVProfile.document
+JSON_ENCODING = "json"
+ZSTD_ENCODING = "zstd"
+DOCUMENT_ENCODINGS = (JSON_ENCODING, ZSTD_ENCODING)
+
+# Profiles loaded per query when documents are rebuilt or verified
+DOCUMENT_BATCH_SIZE = 500
+
+# Field mapping of a profile document, shared by the document assembled from the
+# tables and the one built from a request. Each entry is the document key, the
+# CVProfile relationship holding it (None for the profile row itself) and the
+# (document field, column) pairs of its objects.
+PROFILE_SECTIONS = (
+    ("user", "user", (("userId", "user_id"), ("candidateCode", "candidate_code"))),
+    ("cvProfile", None, (("workingHours", "working_hours"), ("willingToTravel", "willing_to_travel"))),
+)
+CV_ITEM_LISTS = (
+    ("experience", "experiences", (
+        ("professionNm", "profession_nm"), ("company", "company"), ("startD", "start_d"),
+        ("endD", "end_d"), ("location", "location"), ("description", "description"),
+    )),
+    ("education", "educations", (
+        ("educationalInstitutionNm", "educational_institution_nm"), ("degreeCode", "degree_code"),
+        ("degreeCodeJobDigger", "degree_code_job_digger"), ("fieldOfStudyNm", "field_of_study_nm"),
+        ("educationalInstitutionLocation", "educational_institution_location"),
+        ("startD", "start_d"), ("endD", "end_d"), ("educationCompleted", "education_completed"),
+        ("educationSpecializationDescription", "education_specialization_description"),
+    )),
+    ("hobby", "hobbies", (("hobbyNm", "hobby_nm"),)),
+    ("language", "languages", (("skillNm", "skill_nm"), ("rating", "rating"))),
+    ("softSkillKnowledge", "soft_skills", (
+        ("skillId", "skill_id"), ("skillNm", "skill_nm"),
+        ("relatedLineItemType", "related_line_item_type"), ("rating", "rating"),
+    )),
+    ("certificate", "certificates", (("certificateId", "certificate_id"), ("skillNm", "skill_nm"))),
+)
+PROFILE_LISTS = (
+    ("memberOf", "talent_pools", (("talentPoolId", "talent_pool_id"), ("talentPoolName", "talent_pool_name"))),
+    ("applicationStatus", "application_statuses", (
+        ("jobOfferCode", "job_offer_code"), ("applicationStatus", "application_status"),
+    )),
+    ("matchFeedback", "match_feedbacks", (("jobOfferCode", "job_offer_code"), ("matchStatus", "match_status"))),
+)
+# Fields holding a list, which is empty rather than null in a document
+LIST_FIELDS = ("relatedLineItemType",)
+
+# Lists whose order the normalized tables do not keep
+UNORDERED_LISTS = tuple(key for key, _, _ in PROFILE_LISTS)
+CV_ITEM_KINDS = tuple(kind for kind, _, _ in CV_ITEM_LISTS)
+
+# Relationships loaded to assemble a full profile document
+PROFILE_RELATIONSHIPS = (
+    CVProfile.user, CVProfile.address, CVProfile.experiences, CVProfile.educations,
+    CVProfile.hobbies, CVProfile.languages, CVProfile.soft_skills, CVProfile.certificates,
+    CVProfile.talent_pools, CVProfile.application_statuses, CVProfile.match_feedbacks,
+)
+
+
+def _section(source, fields, read) -> dict:
+    section = {}
+    for field, column in fields:
+        value = read(source, field, column)
+        section[field] = list(value or []) if field in LIST_FIELDS else value
+    return section
+
+
+def _build_document(cv_id, last_modified_dt, geo_location, visible_in_talent_pool, part, read) -> dict:
+    """
+    Build a profile document from the field mapping. part(key, relationship)
+    returns the object or list behind a document key, read(source, field,
+    column) one value of such an object.
+    """
+    document = {"cvId": cv_id, "lastModifiedDt": last_modified_dt}
+    for key, relationship, fields in PROFILE_SECTIONS:
+        document[key] = _section(part(key, relationship), fields, read)
+    document["cvAddress"] = {"geoLocation": list(geo_location) if geo_location else None}
+    document["cvItems"] = {
+        kind: [_section(item, fields, read) for item in part(kind, relationship) or ()]
+        for kind, relationship, fields in CV_ITEM_LISTS
+    }
+    document["visibleInTalentPool"] = visible_in_talent_pool
+    for key, relationship, fields in PROFILE_LISTS:
+        document[key] = [_section(item, fields, read) for item in part(key, relationship) or ()]
+    return document
+
+
+def _read_column(row, field: str, column: str):
+    return getattr(row, column) if row is not None else None
+
+
+def _read_field(item, field: str, column: str):
+    return item.get(field) if isinstance(item, dict) else getattr(item, field)
+
+
+def assemble_profile_document(profile: CVProfile) -> dict:
+    """Build the bulk-API shaped document for a profile from the normalized tables"""
+    return _build_document(
+        profile.cv_id,
+        profile.last_modified_dt,
+        profile.address.geo_location if profile.address else None,
+        profile.visible_in_talent_pool,
+        lambda key, relationship: profile if relationship is None else getattr(profile, relationship),
+        _read_column,
+    )
+
+
+def load_profile(db: Session, cv_id: str) -> Optional[CVProfile]:
+    """
+    Load a profile with every relationship eagerly, one IN query per collection;
+    None for a profile tombstoned by a pool manifest
+    """
+    return db.query(CVProfile)\
+        .options(*(selectinload(rel) for rel in PROFILE_RELATIONSHIPS))\
+        .filter(CVProfile.cv_id == cv_id)\
+        .filter(CVProfile.tombstoned_at.is_(None))\
+        .first()
+
+
+def profile_exists(db: Session, cv_id: str) -> bool:
+    """Whether a profile exists and is not tombstoned, without loading it"""
+    return db.execute(
+        select(CVProfile.id)
+        .where(CVProfile.cv_id == cv_id)
+        .where(CVProfile.tombstoned_at.is_(None))
+    ).first() is not None
+
+
+def document_storage() -> Optional[str]:
+    """The configured document encoding, or None while document storage is off"""
+    mode = settings.PROFILE_DOCUMENT_STORAGE.lower()
+    if mode in ("", "off"):
+        return None
+    if mode not in DOCUMENT_ENCODINGS:
+        raise ValueError(f"Unknown PROFILE_DOCUMENT_STORAGE '{settings.PROFILE_DOCUMENT_STORAGE}'")
+    return mode
+
+
+def encode_document(document: bytes, encoding: str) -> bytes:
+    if encoding == ZSTD_ENCODING:
+        # Compressors are not thread-safe; one per call is cheap next to the write
+        return zstandard.ZstdCompressor(level=3).compress(document)
+    if encoding == JSON_ENCODING:
+        return document
+    raise ValueError(f"Unknown profile document encoding '{encoding}'")
+
+
+def decode_document(stored: bytes, encoding: str) -> RawJSON:
+    if encoding == ZSTD_ENCODING:
+        return RawJSON(zstandard.ZstdDecompressor().decompress(stored))
+    if encoding == JSON_ENCODING:
+        return RawJSON(stored)
+    raise ValueError(f"Unknown profile document encoding '{encoding}'")
+
+
+def store_document(profile: CVProfile, document: Optional[dict], encoding: Optional[str]):
+    """Set the stored document of a profile; None for either argument clears it"""
+    if document is None or encoding is None:
+        profile.document = None
+        profile.document_encoding = None
+        return
+    profile.document = encode_document(dumps(document), encoding)
+    profile.document_encoding = encoding
+
+
+def document_from_data(profile_data, geo_location: Optional[List[float]]) -> dict:
+    """
+    The document assemble_profile_document returns once profile_data was
+    written, built from the request instead of read back from the tables.
+    geo_location is the address the profile ends up with, since an update
+    without one keeps the stored address.
+    """
+    cv_items = profile_data.cvItems or {}
+    last_modified_dt = profile_data.lastModifiedDt
+    if last_modified_dt is not None and last_modified_dt.tzinfo is not None:
+        # The timestamp column keeps the wall time and drops the offset
+        last_modified_dt = last_modified_dt.replace(tzinfo=None)
+    return _build_document(
+        profile_data.cvId,
+        last_modified_dt,
+        geo_location,
+        profile_data.visibleInTalentPool,
+        lambda key, relationship: cv_items.get(key) if key in CV_ITEM_KINDS else getattr(profile_data, key),
+        _read_field,
+    )
+
+
+def store_profile_document(profile: CVProfile, profile_data):
+    """Store the document of a profile just written from profile_data; does not commit"""
+    encoding = document_storage()
+    if encoding is None:
+        # Cleared, so turning storage back on never serves a document older than the rows
+        store_document(profile, None, None)
+        return
+    geo_location = profile_data.cvAddress.geoLocation if profile_data.cvAddress else None
+    if not geo_location and profile.address is not None:
+        geo_location = profile.address.geo_location
+    store_document(profile, document_from_data(profile_data, geo_location), encoding)
+
+
+def load_stored_document(db: Session, cv_id: str) -> Tuple[bool, Optional[RawJSON]]:
+    """
+    Whether the profile exists (and is not tombstoned), and its stored
+    document; None for a profile without one
+    """
+    row = db.execute(
+        select(CVProfile.document, CVProfile.document_encoding)
+        .where(CVProfile.cv_id == cv_id)
+        .where(CVProfile.tombstoned_at.is_(None))
+    ).first()
+    if row is None:
+        return False, None
+    if row.document is None:
+        return True, None
+    return True, decode_document(row.document, row.document_encoding)
+
+
+def _batches(values: List, size: int = DOCUMENT_BATCH_SIZE) -> Iterable[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _load_profiles(db: Session, cv_ids: List[str]) -> List[CVProfile]:
+    return db.query(CVProfile)\
+        .options(undefer(CVProfile.document), *(selectinload(rel) for rel in PROFILE_RELATIONSHIPS))\
+        .filter(CVProfile.cv_id.in_(cv_ids))\
+        .populate_existing()\
+        .all()
+
+
+def refresh_profile_documents(db: Session, cv_ids: Iterable[str]) -> int:
+    """
+    Rewrite the stored documents of cv_ids from the normalized tables, for
+    writes that change the rows set-based; does not commit. While storage is
+    off the documents are cleared instead. Returns the documents written.
+    """
+    cv_ids = sorted(set(cv_ids))
+    encoding = document_storage()
+    if encoding is None:
+        profiles = CVProfile.__table__
+        for batch in _batches(cv_ids):
+            db.execute(
+                update(profiles)
+                .where(profiles.c.cv_id.in_(batch))
+                .where(profiles.c.document.isnot(None))
+                .values(document=None, document_encoding=None)
+            )
+        return 0
+    written = 0
+    for batch in _batches(cv_ids):
+        for profile in _load_profiles(db, batch):
+            store_document(profile, assemble_profile_document(profile), encoding)
+            written += 1
+    db.flush()
+    return written
+
+
+def _sorted_list(items: List) -> List:
+    return sorted(items, key=lambda item: orjson.dumps(item, option=orjson.OPT_SORT_KEYS))
+
+
+def canonical_document(document: dict) -> dict:
+    """A decoded document with its unordered lists sorted, for comparing two documents"""
+    canonical = dict(document)
+    cv_items = document.get("cvItems") or {}
+    canonical["cvItems"] = {kind: _sorted_list(cv_items.get(kind) or []) for kind in CV_ITEM_KINDS}
+    for key in UNORDERED_LISTS:
+        canonical[key] = _sorted_list(document.get(key) or [])
+    return canonical
+
+
+def document_mismatch(profile: CVProfile) -> Optional[str]:
+    """Why the stored document of a profile differs from its normalized rows, or None if it matches"""
+    if profile.document is None:
+        return "missing"
+    try:
+        stored = loads(decode_document(profile.document, profile.document_encoding))
+    except (ValueError, zstandard.ZstdError) as e:
+        return f"undecodable: {e}"
+    expected = loads(dumps(assemble_profile_document(profile)))
+    if canonical_document(stored) != canonical_document(expected):
+        return "stale"
+    return None
+
+
+def verify_profile_documents(
+    db: Session,
+    repair: bool = False,
+    batch_size: int = DOCUMENT_BATCH_SIZE,
+    on_batch=None,
+) -> Dict[str, str]:
+    """
+    Check every profile's stored document against its normalized rows.
+    Returns {cv_id: reason} for the documents that are missing, stale or
+    undecodable; with repair they are rewritten, committing per batch.
+    """
+    encoding = document_storage()
+    if repair and encoding is None:
+        raise ValueError("PROFILE_DOCUMENT_STORAGE is off; there are no documents to repair")
+    mismatches = {}
+    checked = 0
+    last_cv_id = None
+    while True:
+        query = select(CVProfile.cv_id).order_by(CVProfile.cv_id).limit(batch_size)
+        if last_cv_id is not None:
+            query = query.where(CVProfile.cv_id > last_cv_id)
+        cv_ids = db.execute(query).scalars().all()
+        if not cv_ids:
+            break
+        last_cv_id = cv_ids[-1]
+        for profile in _load_profiles(db, cv_ids):
+            reason = document_mismatch(profile)
+            if reason is None:
+                continue
+            mismatches[profile.cv_id] = reason
+            if repair:
+                store_document(profile, assemble_profile_document(profile), encoding)
+        if repair:
+            db.commit()
+        db.expunge_all()
+        checked += len(cv_ids)
+        if on_batch is not None:
+            on_batch(checked, len(mismatches))
+    if repair and mismatches:
+        logger.info(f"Rewrote {len(mismatches)} of {checked} profile documents")
+    return mismatches
@@ -0,0 +1,233 @@
+"""
+Multi-process bulk ingest, sharded by cvId.
+
+Pydantic validation and ORM work for a large bulk request are CPU-bound and
+would otherwise run on the one core of the uvicorn worker. In sharded mode the
+profiles of a request are partitioned by crc32(cvId) over BULK_INGEST_PROCESSES
+shards. Each shard is owned by a single worker process with its own database
+connection, so the changes to one cvId are applied in request order, also
+across concurrent requests.
+
+A request runs in two phases so a bulk request is still all or nothing at
+validation time: every shard validates its part and holds the parsed
+profiles, then, if no shard reported errors, every shard writes them. The
+worker results are returned to the API process. There, the caches and search
+indexes are updated and the matching partner pushes are queued.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.json_codec import RawJSON
+
+logger = logging.getLogger(__name__)
+
+
+class IngestedProfile(NamedTuple):
+    """What the API process needs from a worker to finish a written profile"""
+    cv_id: str
+    operation: str
+    traceparent: str
+    raw_payload: Optional[RawJSON]
+    geo_entry: Optional[tuple]
+    terms: FrozenSet[str]
+
+
+class ShardResult(NamedTuple):
+    profiles: List[IngestedProfile]
+    error: Optional[str] = None
+
+
+class ShardValidationError(ValueError):
+    """Profiles of a sharded request failed validation; nothing was written"""
+
+    def __init__(self, detail):
+        super().__init__(str(detail))
+        self.detail = detail
+
+
+class ShardBatchLostError(RuntimeError):
+    """A worker holds no validated profiles for a batch, e.g. it was replaced between the phases"""
+
+
+def shard_of(cv_id, shards: int) -> int:
+    if not isinstance(cv_id, str):
+        # Rejected by validation; any shard will do
+        return 0
+    return zlib.crc32(cv_id.encode("utf-8")) % shards
+
+
+def partition(profile_docs: list, shards: int) -> List[List[Tuple[int, dict]]]:
+    """Profile documents with their request index per shard, in request order"""
+    parts = [[] for _ in range(shards)]
+    for index, doc in enumerate(profile_docs):
+        cv_id = doc.get("cvId") if isinstance(doc, dict) else None
+        parts[shard_of(cv_id, shards)].append((index, doc))
+    return parts
+
+
+# Worker process state: profiles validated in phase one, by batch id
+_validated: Dict[str, list] = {}
+
+
+def _init_worker():
+    from app.database import engine
+
+    # Connections inherited through fork belong to the parent process
+    engine.dispose(close=False)
+
+
+def validate_shard(batch_id: str, items: List[Tuple[int, dict]], trusted: bool) -> list:
+    """
+    Phase one, in a worker: validate a shard's profiles and keep them for write_shard.
+    Returns errors as (request index, detail) pairs; a shard with errors keeps nothing.
+    """
+    from app.api.schemas import ProfileCreate
+    from app.services.trusted_ingest import (
+        TrustedPayloadError, encode_trusted_profile, validate_trusted_profile
+    )
+
+    parsed, errors = [], []
+    for index, doc in items:
+        try:
+            if trusted:
+                profile = validate_trusted_profile(doc, f"profiles[{index}]")
+                parsed.append((profile, encode_trusted_profile(profile)))
+            else:
+                parsed.append((ProfileCreate.parse_obj(doc), None))
+        except TrustedPayloadError as e:
+            errors.append((index, str(e)))
+        except ValidationError as e:
+            errors.append((index, [
+                dict(error, loc=("profiles", index) + tuple(error["loc"])) for error in e.errors()
+            ]))
+    if not errors:
+        _validated[batch_id] = parsed
+    return errors
+
+
+def write_shard(batch_id: str, traceparent: Optional[str]) -> ShardResult:
+    """Phase two, in a worker: write the profiles validated for batch_id, in order"""
+    from app.api.bulk_api import write_profile
+    from app.database import SessionLocal
+    from app.services.geo_index import entry_from_profile_data
+    from app.services.term_index import terms_from_profile_data
+    from app.tracing import parse_traceparent
+
+    if batch_id not in _validated:
+        raise ShardBatchLostError(f"Validated profiles of batch {batch_id} are gone; the shard worker was replaced")
+    parsed = _validated.pop(batch_id)
+    parent = parse_traceparent(traceparent)
+    written = []
+    db = SessionLocal()
+    try:
+        for profile_data, raw_payload in parsed:
+            operation, change_traceparent = write_profile(db, profile_data, raw_payload, parent)
+            written.append(IngestedProfile(
+                profile_data.cvId, operation, change_traceparent, raw_payload,
+                entry_from_profile_data(profile_data), frozenset(terms_from_profile_data(profile_data))
+            ))
+    except Exception as e:
+        # Profiles written so far are committed and still need their follow-up work
+        db.rollback()
+        logger.exception(f"Sharded ingest of batch {batch_id} failed after {len(written)} profiles")
+        return ShardResult(written, str(e))
+    finally:
+        db.close()
+    return ShardResult(written)
+
+
+def discard_shard(batch_id: str):
+    _validated.pop(batch_id, None)
+
+
+class ShardedIngestor:
+    """One single-process pool per shard, created on first use"""
+
+    def __init__(self, shards: int, start_method: str = "spawn"):
+        self.shards = shards
+        self.start_method = start_method
+        self._executors: Optional[List[ProcessPoolExecutor]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.shards > 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+        )
+
+    def _pools(self) -> List[ProcessPoolExecutor]:
+        with self._lock:
+            if self._executors is None:
+                self._executors = [self._new_executor() for _ in range(self.shards)]
+            return self._executors
+
+    async def _run(self, shard: int, fn, *args):
+        pools = self._pools()
+        try:
+            return await asyncio.wrap_future(pools[shard].submit(fn, *args))
+        except BrokenProcessPool:
+            # A worker died; later requests get a fresh process for this shard
+            with self._lock:
+                pools[shard] = self._new_executor()
+            raise
+
+    async def ingest(
+        self, profile_docs: list, trusted: bool, traceparent: Optional[str] = None, dry_run: bool = False
+    ) -> List[ShardResult]:
+        """
+        Validate and write profile documents across the shards; raises ShardValidationError.
+        With dry_run the validated profiles are discarded instead of written.
+        A shard whose write fails, including one whose worker lost the validated
+        profiles, reports it in the error of its ShardResult.
+        """
+        batch_id = str(uuid.uuid4())
+        parts = [(shard, items) for shard, items in enumerate(partition(profile_docs, self.shards)) if items]
+
+        shard_errors = await asyncio.gather(*(
+            self._run(shard, validate_shard, batch_id, items, trusted) for shard, items in parts
+        ))
+        errors = sorted((error for errors in shard_errors for error in errors), key=lambda error: error[0])
+        if errors:
+            await asyncio.gather(*(
+                self._run(shard, discard_shard, batch_id)
+                for (shard, _), shard_error in zip(parts, shard_errors) if not shard_error
+            ))
+            if trusted:
+                raise ShardValidationError(errors[0][1])
+            raise ShardValidationError([detail for _, details in errors for detail in details])
+        if dry_run:
+            await asyncio.gather(*(self._run(shard, discard_shard, batch_id) for shard, _ in parts))
+            return []
+
+        results = await asyncio.gather(*(
+            self._run(shard, write_shard, batch_id, traceparent) for shard, _ in parts
+        ), return_exceptions=True)
+        # A failed shard must not hide the profiles the other shards wrote
+        return [
+            ShardResult([], str(result)) if isinstance(result, Exception) else result
+            for result in results
+        ]
+
+    def shutdown(self):
+        with self._lock:
+            executors, self._executors = self._executors, None
+        for executor in executors or []:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+sharded_ingestor = ShardedIngestor(settings.BULK_INGEST_PROCESSES, settings.BULK_INGEST_START_METHOD)
@@ -0,0 +1,236 @@
+import bisect
+import logging
+import re
+import threading
+import unicodedata
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.profile import CVProfile, Experience, Language, SoftSkill, Certificate
+from app.services.change_feed import ChangeLogIndex
+
+logger = logging.getLogger(__name__)
+
+# Searchable term fields and the cvItems entries / columns they are taken from
+TERM_FIELDS = ("skill", "language", "certificate", "profession")
+CV_ITEM_FIELDS = {
+    "softSkillKnowledge": ("skill", "skillNm"),
+    "language": ("language", "skillNm"),
+    "certificate": ("certificate", "skillNm"),
+    "experience": ("profession", "professionNm"),
+}
+TERM_COLUMNS = {
+    "skill": (SoftSkill, SoftSkill.skill_nm),
+    "language": (Language, Language.skill_nm),
+    "certificate": (Certificate, Certificate.skill_nm),
+    "profession": (Experience, Experience.profession_nm),
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_term(value: str) -> str:
+    """Case-fold and collapse whitespace so 'Dutch ' and 'dutch' index to the same term"""
+    value = unicodedata.normalize("NFKC", value)
+    return _WHITESPACE.sub(" ", value).strip().casefold()
+
+
+def make_term(field: str, value: str) -> str:
+    return f"{field}:{normalize_term(value)}"
+
+
+def parse_term(query_term: str) -> str:
+    """Parse a 'field:value' query term into its normalized index key"""
+    field, sep, value = query_term.partition(":")
+    field = field.strip().lower()
+    if not sep or field not in TERM_FIELDS or not value.strip():
+        raise ValueError(f"Invalid search term '{query_term}', expected one of {', '.join(TERM_FIELDS)} as 'field:value'")
+    return make_term(field, value)
+
+
+def terms_from_profile_data(profile_data) -> Set[str]:
+    """Terms for a bulk ProfileCreate"""
+    terms = set()
+    for item_type, (field, key) in CV_ITEM_FIELDS.items():
+        for item in (profile_data.cvItems or {}).get(item_type) or []:
+            value = item.get(key)
+            if value:
+                terms.add(make_term(field, value))
+    return terms
+
+
+def _intersect(left: array, right: array) -> array:
+    """Intersect two sorted posting lists, probing the longer one by binary search"""
+    if len(left) > len(right):
+        left, right = right, left
+    result = array("I")
+    lo = 0
+    for doc_id in left:
+        lo = bisect.bisect_left(right, doc_id, lo)
+        if lo == len(right):
+            break
+        if right[lo] == doc_id:
+            result.append(doc_id)
+    return result
+
+
+def _union(postings: List[array]) -> array:
+    merged = set()
+    for posting in postings:
+        merged.update(posting)
+    return array("I", sorted(merged))
+
+
+class InvertedIndex:
+    """
+    Term -> posting list index over profiles.
+    Profiles get compact integer doc ids and each posting list is a sorted
+    ``array('I')`` of doc ids, so AND queries are sorted-array intersections
+    and results page in stable doc id order.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self._doc_ids: Dict[str, int] = {}
+        self._cv_ids: List[Optional[str]] = []
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_ids.clear()
+            self._cv_ids.clear()
+            self._doc_terms.clear()
+
+    def _doc_id(self, cv_id: str) -> int:
+        doc_id = self._doc_ids.get(cv_id)
+        if doc_id is None:
+            doc_id = len(self._cv_ids)
+            self._doc_ids[cv_id] = doc_id
+            self._cv_ids.append(cv_id)
+        return doc_id
+
+    def update(self, cv_id: str, terms: Iterable[str]):
+        """Replace the indexed terms of a profile, touching only the posting lists that changed"""
+        terms = set(terms)
+        with self._lock:
+            if not terms:
+                self.remove(cv_id)
+                return
+            doc_id = self._doc_id(cv_id)
+            old_terms = self._doc_terms.get(doc_id, set())
+            for term in old_terms - terms:
+                posting = self._postings[term]
+                i = bisect.bisect_left(posting, doc_id)
+                if i < len(posting) and posting[i] == doc_id:
+                    posting.pop(i)
+                if not posting:
+                    del self._postings[term]
+            for term in terms - old_terms:
+                posting = self._postings.setdefault(term, array("I"))
+                i = bisect.bisect_left(posting, doc_id)
+                if i == len(posting) or posting[i] != doc_id:
+                    posting.insert(i, doc_id)
+            self._doc_terms[doc_id] = terms
+
+    def remove(self, cv_id: str):
+        with self._lock:
+            doc_id = self._doc_ids.get(cv_id)
+            if doc_id is None or doc_id not in self._doc_terms:
+                return
+            for term in self._doc_terms.pop(doc_id):
+                posting = self._postings[term]
+                i = bisect.bisect_left(posting, doc_id)
+                if i < len(posting) and posting[i] == doc_id:
+                    posting.pop(i)
+                if not posting:
+                    del self._postings[term]
+
+    def search(
+        self,
+        all_terms: Iterable[str] = (),
+        any_terms: Iterable[str] = (),
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[int, List[str]]:
+        """
+        Profiles matching every term in all_terms and at least one in any_terms.
+        Returns the total number of matches and one page of cv_ids.
+        """
+        all_terms, any_terms = list(all_terms), list(any_terms)
+        with self._lock:
+            candidates = None
+            if all_terms:
+                postings = sorted((self._postings.get(t, array("I")) for t in all_terms), key=len)
+                candidates = postings[0]
+                for posting in postings[1:]:
+                    if not candidates:
+                        break
+                    candidates = _intersect(candidates, posting)
+            if any_terms:
+                alternatives = _union([self._postings[t] for t in any_terms if t in self._postings])
+                candidates = alternatives if candidates is None else _intersect(candidates, alternatives)
+            if candidates is None:
+                return 0, []
+            page = [self._cv_ids[doc_id] for doc_id in candidates[offset:offset + limit]]
+            return len(candidates), page
+
+
+def load_terms(db: Session, cv_ids: Optional[Iterable[str]] = None) -> Dict[str, Set[str]]:
+    """Read searchable terms per cv_id from the normalized tables, leaving out tombstoned profiles"""
+    if cv_ids is not None:
+        cv_ids = list(cv_ids)
+    terms = defaultdict(set)
+    for field, (model, column) in TERM_COLUMNS.items():
+        query = db.query(CVProfile.cv_id, column).join(model, model.profile_id == CVProfile.id)\
+            .filter(CVProfile.tombstoned_at.is_(None))
+        if cv_ids is not None:
+            query = query.filter(CVProfile.cv_id.in_(cv_ids))
+        for cv_id, value in query.yield_per(5000):
+            if value:
+                terms[cv_id].add(make_term(field, value))
+    return terms
+
+
+class CandidateTermIndex(ChangeLogIndex):
+    """Process-wide inverted index over skill, language, certificate and profession terms"""
+
+    name = "term index"
+
+    def __init__(self, refresh_interval: float):
+        super().__init__(refresh_interval)
+        self.index = InvertedIndex()
+
+    def reset(self):
+        self.index.clear()
+
+    def load(self, db: Session, cv_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        terms_by_profile = load_terms(db, cv_ids)
+        for cv_id, terms in terms_by_profile.items():
+            self.index.update(cv_id, terms)
+        return set(terms_by_profile)
+
+    def remove_profile(self, cv_id: str):
+        self.index.remove(cv_id)
+
+    def index_profile(self, profile_data):
+        if not self.loaded:
+            return
+        self.index_terms(profile_data.cvId, terms_from_profile_data(profile_data))
+
+    def index_terms(self, cv_id: str, terms: Set[str]):
+        """Apply terms computed elsewhere, e.g. by a sharded ingest worker"""
+        if not self.loaded:
+            return
+        self.index.update(cv_id, terms)
+
+
+candidate_term_index = CandidateTermIndex(refresh_interval=settings.TERM_INDEX_REFRESH_SECONDS)
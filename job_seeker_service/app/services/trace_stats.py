@@ -0,0 +1,73 @@
+import logging
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Span that marks the end of a profile's journey
+FINAL_STAGE = "partner.push"
+
+
+def load_spans(paths: Iterable[str]) -> List[dict]:
+    """Read spans from JSON-lines files written by the file exporters of both services"""
+    spans = []
+    for path in paths:
+        with open(path, "rb") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    spans.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    logger.warning(f"Skipping malformed span at {path}:{line_no}")
+    return spans
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def stage_latencies(spans: Iterable[dict]) -> Dict[str, List[float]]:
+    """Span durations in milliseconds per 'service/name' stage"""
+    latencies = defaultdict(list)
+    for span in spans:
+        latencies[f"{span['service']}/{span['name']}"].append(span["durationMs"])
+    return latencies
+
+
+def end_to_end_latencies(spans: List[dict], final_stage: str = FINAL_STAGE) -> List[float]:
+    """
+    Milliseconds from the start of each trace's root span (the sync run, or the
+    bulk request for traces started by the job seeker service) to the end of
+    every final-stage span in that trace.
+    """
+    root_start = {}
+    for span in spans:
+        if span["parentId"] is None:
+            trace_id = span["traceId"]
+            root_start[trace_id] = min(span["start"], root_start.get(trace_id, span["start"]))
+    return [
+        (span["end"] - root_start[span["traceId"]]) * 1000
+        for span in spans
+        if span["name"] == final_stage and span["traceId"] in root_start
+    ]
+
+
+def summarize(latencies: Dict[str, List[float]], quantiles=(50, 90, 99)) -> List[dict]:
+    """Count, percentiles and maximum per stage, ordered by stage name"""
+    rows = []
+    for stage, values in sorted(latencies.items()):
+        values = sorted(values)
+        row = {"stage": stage, "count": len(values)}
+        for q in quantiles:
+            row[f"p{q}"] = percentile(values, q)
+        row["max"] = values[-1] if values else 0.0
+        rows.append(row)
+    return rows
@@ -0,0 +1,206 @@
+import hmac
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import orjson
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+
+from app.config import settings
+from app.json_codec import RawJSON
+from app.api.schemas import (
+    ProfileCreate, ExperienceBase, EducationBase, HobbyBase,
+    LanguageBase, SoftSkillBase, CertificateBase
+)
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+# Item types accepted in ``cvItems`` and the schema each item is checked against
+CV_ITEM_MODELS = {
+    "experience": ExperienceBase,
+    "education": EducationBase,
+    "hobby": HobbyBase,
+    "language": LanguageBase,
+    "softSkillKnowledge": SoftSkillBase,
+    "certificate": CertificateBase,
+}
+
+# Python types accepted for each declared field type. Trusted senders emit
+# canonical JSON, so no coercion is attempted.
+_ACCEPTED_TYPES = {
+    str: (str,),
+    int: (int,),
+    float: (float, int),
+    bool: (bool,),
+}
+
+class TrustedPayloadError(ValueError):
+    """Raised when a trusted bulk payload does not match the compiled schema"""
+
+
+def is_trusted_sender(headers) -> bool:
+    """Check whether the request was sent by an authenticated internal service"""
+    token = headers.get(INTERNAL_TOKEN_HEADER)
+    if not settings.INTERNAL_API_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), settings.INTERNAL_API_TOKEN.encode("utf-8"))
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        raise TypeError("expected an ISO 8601 datetime string")
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def _fail(path: str, message: str):
+    raise TrustedPayloadError(f"{path}: {message}")
+
+
+def _compile_scalar(type_) -> Callable:
+    if type_ is datetime:
+        def check_datetime(value, path):
+            try:
+                return _parse_datetime(value)
+            except (TypeError, ValueError) as e:
+                _fail(path, str(e))
+        return check_datetime
+
+    accepted = _ACCEPTED_TYPES.get(type_)
+    if accepted is None:
+        # dict / Any fields are passed through unchecked
+        return lambda value, path: value
+
+    def check_scalar(value, path):
+        # bool is a subclass of int, so compare exact types
+        if type(value) not in accepted:
+            _fail(path, f"expected {type_.__name__}, got {type(value).__name__}")
+        return value
+    return check_scalar
+
+
+def _compile_field(field) -> Callable:
+    type_ = field.type_
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        check_item = compile_model(type_)
+    else:
+        check_item = _compile_scalar(type_)
+
+    if field.shape == SHAPE_SINGLETON:
+        return check_item
+    if field.shape == SHAPE_LIST:
+        def check_list(value, path):
+            if not isinstance(value, list):
+                _fail(path, "expected a list")
+            return [check_item(item, f"{path}[{i}]") for i, item in enumerate(value)]
+        return check_list
+    raise TypeError(f"Unsupported field shape for trusted validation: {field}")
+
+
+def compile_model(model, construct: bool = True) -> Callable:
+    """
+    Compile a Pydantic model into a strict validator function.
+    The returned function checks a decoded JSON object and returns either a
+    model built with ``construct()`` (skipping Pydantic validation) or the
+    checked dict itself.
+    """
+    checks: List[Tuple[str, bool, bool, Callable]] = []
+    for name, field in model.__fields__.items():
+        checks.append((name, field.required, field.allow_none, _compile_field(field)))
+
+    def check_model(value, path):
+        if not isinstance(value, dict):
+            _fail(path, "expected an object")
+        values = {}
+        for name, required, allow_none, check in checks:
+            if name not in value:
+                if required:
+                    _fail(f"{path}.{name}", "field required")
+                continue
+            item = value[name]
+            if item is None:
+                if not allow_none:
+                    _fail(f"{path}.{name}", "none is not an allowed value")
+                values[name] = None
+            else:
+                values[name] = check(item, f"{path}.{name}")
+        if not construct:
+            return value
+        return model.construct(**values)
+    return check_model
+
+
+def _compile_cv_items() -> Callable:
+    item_checks: Dict[str, Callable] = {
+        item_type: compile_model(item_model, construct=False)
+        for item_type, item_model in CV_ITEM_MODELS.items()
+    }
+
+    def check_cv_items(value, path):
+        if not isinstance(value, dict):
+            _fail(path, "expected an object")
+        for item_type, items in value.items():
+            check = item_checks.get(item_type)
+            if check is None:
+                continue
+            if not isinstance(items, list):
+                _fail(f"{path}.{item_type}", "expected a list")
+            for i, item in enumerate(items):
+                check(item, f"{path}.{item_type}[{i}]")
+        return value
+    return check_cv_items
+
+
+def _compile_profile() -> Callable:
+    check_profile = compile_model(ProfileCreate)
+    check_cv_items = _compile_cv_items()
+
+    def check(value, path):
+        profile = check_profile(value, path)
+        check_cv_items(profile.cvItems, f"{path}.cvItems")
+        return profile
+    return check
+
+
+# Compiled once at import time
+validate_trusted_profile = _compile_profile()
+
+
+def encode_trusted_profile(profile: ProfileCreate) -> RawJSON:
+    """
+    Encode a validated profile for the change log and the matching partner push.
+    Built from the model's fields rather than the request document, so keys the
+    schema does not declare are dropped exactly as on the validated path.
+    """
+    return RawJSON(orjson.dumps(profile.dict()))
+
+
+def parse_trusted_bulk(body: bytes) -> List[Tuple[ProfileCreate, RawJSON]]:
+    """
+    Parse and validate a bulk payload from a trusted internal sender.
+    Returns each profile together with its encoded JSON, which is reused for
+    the change log and the matching partner push.
+    """
+    try:
+        document = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise TrustedPayloadError(f"body: invalid JSON ({e})")
+    return parse_trusted_document(document)
+
+
+def parse_trusted_document(document) -> List[Tuple[ProfileCreate, RawJSON]]:
+    """Validate an already decoded bulk payload (JSON or MessagePack) from a trusted sender"""
+    if not isinstance(document, dict) or not isinstance(document.get("profiles"), list):
+        raise TrustedPayloadError("body.profiles: expected a list")
+
+    parsed = []
+    for i, profile_doc in enumerate(document["profiles"]):
+        profile = validate_trusted_profile(profile_doc, f"profiles[{i}]")
+        parsed.append((profile, encode_trusted_profile(profile)))
+    return parsed
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected, pool_saturation
+
+def make_controller(**overrides):
+    options = dict(
+        max_in_flight=100, max_backlog=1000, max_pool_saturation=0.9, refresh_seconds=5,
+        retry_after_seconds=5, max_retry_after_seconds=60, backlog_counter=lambda limit: 0, pool=None,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+def test_in_flight_profiles_past_the_limit_are_refused_with_429():
+    controller = make_controller()
+    controller.acquire(80)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire(30)
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == 5
+    
+    controller.release(80)
+    # An oversized request is still admitted on its own
+    controller.acquire(150)
+    with pytest.raises(AdmissionRejected):
+        controller.check()
+    controller.release(150)
+    controller.check()
+
+def test_backlog_is_refreshed_periodically_and_scales_retry_after():
+    now = [0.0]
+    counts = []
+    backlog = [500]
+    def counter(limit):
+        counts.append(limit)
+        return min(backlog[0], limit)
+    controller = make_controller(backlog_counter=counter, clock=lambda: now[0])
+    
+    controller.check()
+    backlog[0] = 10000
+    controller.check()
+    assert counts == [4000]
+    
+    now[0] = 6.0
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check()
+    assert rejected.value.status_code == 503
+    # The backlog is counted up to four times its limit
+    assert controller.backlog == 4000
+    assert rejected.value.retry_after == 20
+
+def test_saturated_pool_is_refused_with_503():
+    pool = SimpleNamespace(size=lambda: 5, _max_overflow=5, checkedout=lambda: 9)
+    assert pool_saturation(pool) == 0.9
+    with pytest.raises(AdmissionRejected) as rejected:
+        make_controller(pool=pool).check()
+    assert rejected.value.status_code == 503
+    assert pool_saturation(SimpleNamespace()) == 0.0
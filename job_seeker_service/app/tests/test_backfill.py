@@ -0,0 +1,77 @@
+import json
+import os
+
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.dialects import postgresql
+
+from app.services.backfill import (
+    BULK_FORMAT, PROFILES_FORMAT, STAGED_CHILDREN, STAGED_PROFILES, copy_text, copy_value, merge_statements,
+    read_chunks, stage_rows
+)
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "test_data", "bulk_data_sample.json")
+
+def sample_profiles():
+    with open(SAMPLE) as f:
+        return json.load(f)["profiles"]
+
+def test_copy_values_are_escaped_for_the_text_format():
+    assert copy_value(None) == "\\N"
+    assert copy_value(True) == "t"
+    assert copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert copy_value([52.5, 4.25]) == "{52.5,4.25}"
+    assert copy_value(['say "hi"', "back\\slash"]) == '{"say \\\\"hi\\\\"","back\\\\\\\\slash"}'
+    assert copy_value(b"\x01\xff") == "\\\\x01ff"
+    assert copy_text([(1, None), ("x", False)]) == "1\t\\N\nx\tf\n"
+
+def test_read_chunks_split_on_lines_and_resume_at_offsets(tmp_path):
+    profile = sample_profiles()[0]
+    lines = [
+        json.dumps(dict(profile, cvId="cv-1")),
+        "{not json",
+        json.dumps(dict(profile, cvId="cv-2")),
+        json.dumps({"cvId": "cv-3"}),
+        json.dumps(dict(profile, cvId="cv-4")),
+    ]
+    path = tmp_path / "profiles.ndjson"
+    path.write_text("\n".join(lines) + "\n")
+
+    chunks = list(read_chunks(str(path), 0, PROFILES_FORMAT, chunk_size=2))
+
+    assert [[p.cvId for p in c.profiles] for c in chunks] == [["cv-1", "cv-2"], ["cv-4"]]
+    assert [c.rejected for c in chunks] == [1, 1]
+    assert chunks[0].start == 0 and chunks[1].start == chunks[0].end
+    assert chunks[1].end == path.stat().st_size
+    resumed = list(read_chunks(str(path), chunks[0].end, PROFILES_FORMAT, chunk_size=2))
+    assert [[p.cvId for p in c.profiles] for c in resumed] == [["cv-4"]]
+
+def test_bulk_format_reads_request_bodies(tmp_path):
+    profiles = [dict(p, cvId=f"cv-{i}") for i, p in enumerate(sample_profiles() * 3)]
+    path = tmp_path / "bodies.ndjson"
+    path.write_text(json.dumps({"profiles": profiles[:2]}) + "\n" + json.dumps({"profiles": profiles[2:]}) + "\n")
+
+    chunks = list(read_chunks(str(path), 0, BULK_FORMAT, chunk_size=100))
+
+    assert [p.cvId for p in chunks[0].profiles] == [p["cvId"] for p in profiles]
+
+def test_staged_children_reference_their_profile():
+    from app.api.schemas import ProfileCreate
+    profiles = [ProfileCreate.parse_obj(p) for p in sample_profiles()]
+
+    staged = stage_rows(profiles, encoding="zstd")
+
+    staged_profiles = staged[STAGED_PROFILES.name]
+    assert len(staged_profiles) == len(profiles)
+    profile_ids = {row[1] for row in staged_profiles}
+    skills = staged[STAGED_CHILDREN["soft_skills"].name]
+    profile_id_at = [c.name for c in STAGED_CHILDREN["soft_skills"].columns].index("profile_id")
+    assert skills and all(row[profile_id_at] in profile_ids for row in skills)
+    assert all(row[3].tzinfo is None and row[13] and row[14] == "zstd" for row in staged_profiles)
+
+def test_staging_tables_are_unlogged_and_merged_in_foreign_key_order():
+    ddl = str(CreateTable(STAGED_CHILDREN["experiences"]).compile(dialect=postgresql.dialect()))
+    assert ddl.strip().startswith("CREATE UNLOGGED TABLE backfill_experiences")
+
+    targets = [target for target, _ in merge_statements()]
+    assert targets[:4] == ["backfill_new", "users", "cv_profiles", "cv_addresses"]
+    assert set(targets[4:]) == set(STAGED_CHILDREN)
@@ -1,16 +1,16 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, get_db
+from app.database import Base, _create_engine, get_db
 from app.main import app
 import json
 
-# Setup in-memory SQLite database for testing
+# Setup in-memory SQLite database for testing, with the app's JSON column codec
+# so pre-encoded payloads of the trusted fast path are written as in production
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
+engine = _create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
@@ -42,4 +42,93 @@ def test_receive_bulk_data():
     
     # Check response
     assert response.status_code == 202
-    assert "Bulk data received" in response.json()["message"]
\ No newline at end of file
+    assert "Bulk data received" in response.json()["message"]
+
+def test_receive_bulk_data_trusted_fast_path(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "test-internal-token")
+    
+    with open("app/tests/test_data/bulk_data_sample.json", "rb") as f:
+        body = f.read()
+    
+    response = client.post(
+        "/api/bulk",
+        content=body,
+        headers={"Content-Type": "application/json", "X-Internal-Token": "test-internal-token"}
+    )
+    
+    assert response.status_code == 202
+    assert "Bulk data received" in response.json()["message"]
+
+def test_trusted_fast_path_rejects_invalid_cv_item():
+    from app.services.trusted_ingest import parse_trusted_bulk, TrustedPayloadError
+    
+    with open("app/tests/test_data/bulk_data_sample.json") as f:
+        bulk_data = json.load(f)
+    bulk_data["profiles"][0]["cvItems"]["language"][0]["rating"] = "fluent"
+    
+    with pytest.raises(TrustedPayloadError) as exc_info:
+        parse_trusted_bulk(json.dumps(bulk_data).encode())
+    
+    assert "cvItems.language[0].rating" in str(exc_info.value)
+
+def test_trusted_fast_path_encodes_only_schema_fields():
+    import orjson
+    from app.api.schemas import ProfileCreate
+    from app.json_codec import loads
+    from app.services.trusted_ingest import parse_trusted_bulk
+
+    with open("app/tests/test_data/bulk_data_sample.json") as f:
+        bulk_data = json.load(f)
+    profile_doc = bulk_data["profiles"][0]
+    profile_doc["internalNote"] = "not part of the schema"
+    profile_doc["user"]["sessionToken"] = "secret"
+
+    [(profile, raw_payload)] = parse_trusted_bulk(json.dumps({"profiles": [profile_doc]}).encode())
+
+    # Same document as the validated path writes
+    assert bytes(raw_payload) == orjson.dumps(ProfileCreate.parse_obj(profile_doc).dict())
+    document = loads(raw_payload)
+    assert "internalNote" not in document
+    assert "sessionToken" not in document["user"]
+
+def test_receive_bulk_data_gzip_body():
+    import gzip
+    
+    with open("app/tests/test_data/bulk_data_sample.json", "rb") as f:
+        body = f.read()
+    
+    response = client.post(
+        "/api/bulk",
+        content=gzip.compress(body),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    
+    assert response.status_code == 202
+
+def test_receive_bulk_data_rejects_oversized_decompressed_body(monkeypatch):
+    import zstandard
+    from app.config import settings
+    monkeypatch.setattr(settings, "BULK_MAX_DECOMPRESSED_BYTES", 1024)
+    
+    response = client.post(
+        "/api/bulk",
+        content=zstandard.ZstdCompressor().compress(bytes(1024 * 1024)),
+        headers={"Content-Type": "application/json", "Content-Encoding": "zstd"}
+    )
+    
+    assert response.status_code == 413
+
+def test_receive_bulk_data_msgpack_body():
+    import msgpack
+    
+    with open("app/tests/test_data/bulk_data_sample.json") as f:
+        bulk_data = json.load(f)
+    
+    response = client.post(
+        "/api/bulk",
+        content=msgpack.packb(bulk_data),
+        headers={"Content-Type": "application/msgpack"}
+    )
+    
+    assert response.status_code == 202
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.change_feed import ChangeLogCursor, ChangeLogIndex
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+def db_with_rows(rows):
+    """A session whose change log query yields the (id, cv_id, operation, timestamp) rows"""
+    db = MagicMock()
+    query = db.query.return_value
+    query.filter.return_value = query
+    query.order_by.return_value.yield_per.side_effect = lambda size: iter(sorted(rows, key=lambda row: row[3]))
+    return db
+
+def test_poll_returns_rows_that_commit_after_newer_ones_were_polled():
+    rows = [("row-1", "cv-1", "INSERT", T0), ("row-3", "cv-3", "UPDATE", T0 + timedelta(seconds=10))]
+    db = db_with_rows(rows)
+    cursor = ChangeLogCursor(poll_interval=0, lag_window=60)
+    cursor.start_at(T0 - timedelta(seconds=1))
+    
+    assert cursor.poll(db) == {"cv-1": "INSERT", "cv-3": "UPDATE"}
+    assert cursor.watermark == T0 + timedelta(seconds=10)
+    # Written before row-3, committed after it was polled
+    rows.append(("row-2", "cv-2", "DELETE", T0 + timedelta(seconds=5)))
+    assert cursor.poll(db) == {"cv-2": "DELETE"}
+    assert cursor.poll(db) == {}
+    
+    lower_bound = db.query.return_value.filter.call_args[0][0].right.value
+    assert lower_bound == T0 + timedelta(seconds=10) - timedelta(seconds=60)
+
+def test_poll_forgets_rows_that_left_the_lag_window():
+    rows = [("row-1", "cv-1", "INSERT", T0)]
+    db = db_with_rows(rows)
+    cursor = ChangeLogCursor(poll_interval=0, lag_window=60)
+    cursor.start_at(None)
+    
+    assert cursor.poll(db) == {"cv-1": "INSERT"}
+    rows[:] = [("row-2", "cv-1", "UPDATE", T0 + timedelta(seconds=120))]
+    assert cursor.poll(db) == {"cv-1": "UPDATE"}
+    assert list(cursor._seen) == ["row-2"]
+
+def test_change_log_index_subclasses_must_implement_the_index_methods():
+    class Partial(ChangeLogIndex):
+        def reset(self):
+            pass
+    
+    with pytest.raises(TypeError):
+        Partial(refresh_interval=0)
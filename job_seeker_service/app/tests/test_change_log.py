@@ -0,0 +1,133 @@
+import copy
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from unittest.mock import patch
+
+from app.database import _create_engine
+from app.json_codec import RawJSON, dumps
+from app.models.profile import CVProfile, ProfileChangeLog
+from app.services.change_log import DELTA, SNAPSHOT, ChangeLogGapError, plan_payload, record_change, replay
+from app.services.json_patch import JsonPatchError, apply_patch, diff
+
+@pytest.fixture
+def profile():
+    return {
+        "cvId": "cv-1",
+        "firstName": "Anna",
+        "address": {"city": "Utrecht", "postcode": "3511"},
+        "languages": [{"name": "Dutch", "level": "native"}],
+        "applicationStatus": [{"jobId": "job-1", "status": "applied"}],
+        "a/b~c": 1,
+    }
+
+@pytest.fixture
+def db():
+    engine = _create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    for model in (CVProfile, ProfileChangeLog):
+        model.__table__.create(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def entry(version, kind, payload):
+    return SimpleNamespace(cv_id="cv-1", version=version, payload_kind=kind, payload=payload)
+
+def test_diff_and_apply_round_trip(profile):
+    new = copy.deepcopy(profile)
+    new["address"]["city"] = "Amsterdam"
+    del new["firstName"]
+    new["languages"].append({"name": "English", "level": "fluent"})
+    new["applicationStatus"] = []
+    new["a/b~c"] = True
+
+    ops = diff(profile, new)
+    assert {"op": "replace", "path": "/a~1b~0c", "value": True} in ops
+    assert apply_patch(copy.deepcopy(profile), ops) == new
+    assert diff(new, new) == []
+
+def test_apply_rejects_missing_paths(profile):
+    with pytest.raises(JsonPatchError):
+        apply_patch(profile, [{"op": "replace", "path": "/address/street", "value": "x"}])
+    with pytest.raises(JsonPatchError):
+        apply_patch(profile, [{"op": "remove", "path": "/languages/3"}])
+
+def test_plan_payload_writes_small_deltas(profile):
+    entries = [entry(1, SNAPSHOT, profile)]
+    new = copy.deepcopy(profile)
+    new["applicationStatus"][0]["status"] = "interview"
+
+    kind, payload, base_version = plan_payload(entries, new, snapshot_interval=20, max_delta_ratio=0.5)
+
+    assert (kind, base_version) == (DELTA, 1)
+    assert payload == [{"op": "replace", "path": "/applicationStatus/0/status", "value": "interview"}]
+    assert replay(entries + [entry(2, DELTA, payload)]) == new
+
+def test_plan_payload_snapshots(profile):
+    new = dict(profile, firstName="Anne")
+
+    # No previous version
+    assert plan_payload([], new, 20, 0.5)[0] == SNAPSHOT
+    # Interval reached
+    entries = [entry(1, SNAPSHOT, profile)] + [entry(v, DELTA, []) for v in range(2, 5)]
+    assert plan_payload(entries, new, 4, 0.5)[0] == SNAPSHOT
+    assert plan_payload(entries, new, 5, 0.5)[0] == DELTA
+    # Delta not much smaller than the document
+    assert plan_payload([entry(1, SNAPSHOT, profile)], {"cvId": "cv-1"}, 20, 0.5)[0] == SNAPSHOT
+    # Previous version deleted
+    assert plan_payload([entry(1, SNAPSHOT, None)], new, 20, 0.5)[0] == SNAPSHOT
+
+def test_replay_gap_falls_back_to_snapshot(profile):
+    with pytest.raises(ChangeLogGapError):
+        replay([entry(2, DELTA, [])])
+
+    broken = [entry(1, SNAPSHOT, profile), entry(2, DELTA, [{"op": "remove", "path": "/missing"}])]
+    kind, payload, _ = plan_payload(broken, profile, 20, 0.5)
+    assert (kind, payload) == (SNAPSHOT, profile)
+
+def test_plan_payload_trusted_versions(profile):
+    """Two writes through the trusted fast path, which passes the profile pre-encoded"""
+    kind, payload, _ = plan_payload([], None, 20, 0.5, raw_payload=RawJSON(dumps(profile)))
+    assert kind == SNAPSHOT and isinstance(payload, RawJSON)
+    entries = [entry(1, kind, payload)]
+    new = copy.deepcopy(profile)
+    new["applicationStatus"][0]["status"] = "interview"
+
+    kind, payload, base_version = plan_payload(entries, None, 20, 0.5, raw_payload=RawJSON(dumps(new)))
+
+    assert (kind, base_version) == (DELTA, 1)
+    assert replay(entries + [entry(2, DELTA, payload)]) == new
+
+def test_record_change_numbers_the_versions_of_a_profile(db, profile):
+    db.add(CVProfile(cv_id="cv-1"))
+    for rating in (1, 2):
+        record_change(db, "cv-1", "UPDATE", document=dict(profile, rating=rating))
+        db.commit()
+    record_change(db, "cv-1", "DELETE")
+    db.commit()
+    
+    rows = db.query(ProfileChangeLog.version, ProfileChangeLog.payload_kind).order_by(ProfileChangeLog.version).all()
+    assert rows == [(1, SNAPSHOT), (2, DELTA), (3, SNAPSHOT)]
+    db.add(ProfileChangeLog(cv_id="cv-1", operation="UPDATE", version=3))
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+def test_record_change_of_an_unlocked_profile_retries_a_taken_version(db):
+    record_change(db, "cv-unknown", "DELETE")
+    db.commit()
+    
+    # A concurrent change committed version 1 after this writer read the latest version
+    with patch("app.services.change_log.latest_version", side_effect=[0, 1]):
+        log_entry = record_change(db, "cv-unknown", "DELETE")
+    db.commit()
+    
+    assert log_entry.version == 2
+    assert [v for (v,) in db.query(ProfileChangeLog.version).order_by(ProfileChangeLog.version)] == [1, 2]
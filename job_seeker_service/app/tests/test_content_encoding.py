@@ -0,0 +1,44 @@
+import gzip
+
+import pytest
+import zstandard
+
+from app.content_encoding import (
+    decode_body, make_decoder, CorruptPayloadError, PayloadTooLargeError, UnsupportedEncodingError
+)
+
+BODY = b'{"profiles":[' + b",".join([b'{"cvId":"cv-%d","description":"Data analyst"}' % i for i in range(500)]) + b"]}"
+
+@pytest.mark.parametrize("encoding,compress", [
+    ("gzip", gzip.compress),
+    ("zstd", zstandard.ZstdCompressor().compress),
+    ("identity", lambda body: body),
+])
+def test_decoder_round_trips_chunked_input(encoding, compress):
+    compressed = compress(BODY)
+    decoder = make_decoder(encoding, max_bytes=len(BODY))
+    for start in range(0, len(compressed), 1000):
+        decoder.feed(compressed[start:start + 1000])
+    
+    assert decoder.finish() == BODY
+
+@pytest.mark.parametrize("encoding,compress", [
+    ("gzip", gzip.compress),
+    ("zstd", zstandard.ZstdCompressor().compress),
+])
+def test_decoder_stops_at_the_size_limit(encoding, compress):
+    # 64 MB of zeros compresses to a few kilobytes
+    bomb = compress(bytes(64 * 1024 * 1024))
+    
+    with pytest.raises(PayloadTooLargeError):
+        decode_body(bomb, encoding, max_bytes=1024 * 1024)
+
+def test_decoder_rejects_unknown_and_corrupt_bodies():
+    with pytest.raises(UnsupportedEncodingError):
+        make_decoder("br", max_bytes=1024)
+    with pytest.raises(CorruptPayloadError):
+        decode_body(b"not gzip", "gzip", max_bytes=1024)
+    with pytest.raises(CorruptPayloadError):
+        decode_body(gzip.compress(BODY)[:-20], "gzip", max_bytes=len(BODY))
+    with pytest.raises(CorruptPayloadError):
+        decode_body(zstandard.ZstdCompressor().compress(BODY)[:-20], "zstd", max_bytes=len(BODY))
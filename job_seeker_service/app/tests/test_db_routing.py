@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db_routing import ReplicaRouter, RoutingSession
+
+metadata = MetaData()
+notes = Table("notes", metadata, Column("id", Integer, primary_key=True), Column("body", String))
+
+@pytest.fixture
+def databases(tmp_path):
+    """A primary and a replica stand-in, told apart by the row each holds"""
+    engines = {}
+    for name in ("primary", "replica"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        metadata.create_all(engines[name])
+        with engines[name].begin() as connection:
+            connection.execute(insert(notes).values(id=1, body=name))
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+def make_sessions(databases, lag=0.0):
+    lags = {"lag": lag}
+    def probe(engine):
+        if isinstance(lags["lag"], Exception):
+            raise lags["lag"]
+        return lags["lag"]
+    router = ReplicaRouter(
+        [databases["replica"]], max_lag_seconds=5, check_interval=10, lag_probe=probe, monitor=False,
+    )
+    router.check_replicas()
+    read_sessions = sessionmaker(bind=databases["primary"], class_=RoutingSession, router=router, read_only=True)
+    return read_sessions, router, lags
+
+def body(db):
+    return db.execute(select(notes.c.body).where(notes.c.id == 1)).scalar()
+
+def test_read_only_sessions_read_from_the_replica_and_others_from_the_primary(databases):
+    read_sessions, router, _ = make_sessions(databases)
+    primary_sessions = sessionmaker(bind=databases["primary"], class_=RoutingSession)
+
+    with read_sessions() as db:
+        assert body(db) == "replica"
+    with primary_sessions() as db:
+        assert body(db) == "primary"
+    assert router.status()["replicas"][0]["sessions"] == 1
+
+def test_session_reads_its_own_writes_after_writing(databases):
+    read_sessions, _, _ = make_sessions(databases)
+
+    with read_sessions() as db:
+        assert body(db) == "replica"
+        db.execute(notes.update().where(notes.c.id == 1).values(body="written"))
+        assert body(db) == "written"
+        db.commit()
+        assert body(db) == "written"
+    with databases["replica"].connect() as connection:
+        assert connection.execute(text("SELECT body FROM notes")).scalar() == "replica"
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary_until_it_recovers(databases):
+    read_sessions, router, lags = make_sessions(databases, lag=30.0)
+
+    with read_sessions() as db:
+        assert body(db) == "primary"
+    lags["lag"] = 0.5
+    with read_sessions() as db:
+        assert body(db) == "primary"  # sessions use the last check's result
+    router.check_replicas()
+    with read_sessions() as db:
+        assert body(db) == "replica"
+
+    lags["lag"] = ConnectionError("replica down")
+    router.check_replicas()
+    with read_sessions() as db:
+        assert body(db) == "primary"
+    status = router.status()
+    assert status["primaryFallbacks"] == 3
+    assert status["replicas"][0]["error"] == "replica down"
+
+def test_choosing_does_not_wait_for_a_hanging_lag_check(databases):
+    probing, release = threading.Event(), threading.Event()
+    def probe(engine):
+        probing.set()
+        release.wait(5)
+        return 0.0
+    router = ReplicaRouter([databases["replica"]], max_lag_seconds=5, check_interval=60, lag_probe=probe)
+
+    assert router.choose() is None  # starts the check, which hangs like an unreachable replica
+    assert probing.wait(5)
+    assert router.choose() is None
+    release.set()
+    router.shutdown(timeout=5)
+    assert router.choose() is databases["replica"]
+    assert router.status()["primaryFallbacks"] == 2
@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.geo_index import GeoGridIndex, GeoEntry, haversine_km
+
+AMSTERDAM = (52.3730796, 4.8924534)
+HAARLEM = (52.3873878, 4.6462194)
+UTRECHT = (52.0907374, 5.1214201)
+
+def _entry(cv_id, location, pools=("pool-1",), visible=True, willing=False):
+    return GeoEntry(cv_id, location[0], location[1], frozenset(pools), visible, willing)
+
+@pytest.fixture
+def grid():
+    grid = GeoGridIndex(cell_size_deg=0.1)
+    grid.upsert(_entry("cv-ams", AMSTERDAM))
+    grid.upsert(_entry("cv-haa", HAARLEM, pools=("pool-2",), willing=True))
+    grid.upsert(_entry("cv-utr", UTRECHT))
+    grid.upsert(_entry("cv-hidden", AMSTERDAM, visible=False))
+    return grid
+
+def test_query_radius_returns_nearest_first(grid):
+    results = grid.query_radius(AMSTERDAM[0], AMSTERDAM[1], 25)
+    
+    assert [entry.cv_id for entry, _ in results] == ["cv-ams", "cv-haa"]
+    assert results[1][1] == pytest.approx(haversine_km(*AMSTERDAM, *HAARLEM))
+
+def test_query_radius_applies_filters(grid):
+    by_pool = grid.query_radius(AMSTERDAM[0], AMSTERDAM[1], 50, talent_pool_id="pool-1")
+    willing = grid.query_radius(AMSTERDAM[0], AMSTERDAM[1], 50, willing_to_travel=True)
+    any_visibility = grid.query_radius(AMSTERDAM[0], AMSTERDAM[1], 1, visible_in_talent_pool=None)
+    
+    assert {entry.cv_id for entry, _ in by_pool} == {"cv-ams", "cv-utr"}
+    assert [entry.cv_id for entry, _ in willing] == ["cv-haa"]
+    assert {entry.cv_id for entry, _ in any_visibility} == {"cv-ams", "cv-hidden"}
+
+def test_upsert_moves_entry_and_remove_drops_it(grid):
+    grid.upsert(_entry("cv-ams", UTRECHT))
+    assert [e.cv_id for e in grid.query_bbox(52.3, 4.8, 52.5, 5.0)] == []
+    
+    grid.remove("cv-utr")
+    assert [e.cv_id for e in grid.query_bbox(52.0, 5.0, 52.2, 5.2)] == ["cv-ams"]
+    assert len(grid) == 3
@@ -0,0 +1,40 @@
+import time
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from app.database import Base
+from app.ids import uuid7, uuid7_millis
+from app.services.key_migration import rekeyable_tables
+import app.models  # noqa: F401
+
+def test_uuid7_layout():
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+    
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert before <= uuid7_millis(value) <= after
+    with pytest.raises(ValueError):
+        uuid7_millis(uuid.uuid4())
+
+def test_uuid7_is_strictly_increasing_within_a_millisecond_and_when_the_clock_goes_back():
+    with patch("app.ids.time.time_ns", return_value=1_700_000_000_000 * 1_000_000):
+        same_ms = [uuid7() for _ in range(5000)]
+    with patch("app.ids.time.time_ns", return_value=1_600_000_000_000 * 1_000_000):
+        clock_back = uuid7()
+    
+    assert same_ms == sorted(same_ms) and len(set(same_ms)) == len(same_ms)
+    # The counter overflowed into the following milliseconds instead of wrapping
+    assert uuid7_millis(same_ms[-1]) > 1_700_000_000_000
+    assert clock_back > same_ms[-1]
+    # Canonical text form sorts the same way, as in a text or uuid index
+    assert [str(v) for v in same_ms] == sorted(str(v) for v in same_ms)
+
+def test_rekeyable_tables_skip_referenced_tables():
+    names = {table.name for table in rekeyable_tables(Base.metadata)}
+    
+    assert {"experiences", "talent_pool_memberships", "match_feedbacks", "cv_addresses"} <= names
+    assert not names & {"users", "cv_profiles", "profile_change_logs", "pool_manifests", "pool_manifest_entries"}
@@ -0,0 +1,55 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.job_offer_stats import JobOfferStatusCount
+from app.services import job_offer_stats
+from app.services.job_offer_stats import (
+    apply_status_delta, get_job_offer_stats, rebuild_job_offer_stats,
+    status_delta, APPLICATION_STATUS, MATCH_STATUS
+)
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    JobOfferStatusCount.__table__.create(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+def test_status_delta_is_signed_and_sparse():
+    before = Counter({("job-1", MATCH_STATUS, "good-match"): 1, ("job-1", MATCH_STATUS, "not-a-match"): 1})
+    after = Counter({("job-1", MATCH_STATUS, "good-match"): 1, ("job-2", MATCH_STATUS, "good-match"): 1})
+    
+    assert status_delta(before, after) == {
+        ("job-1", MATCH_STATUS, "not-a-match"): -1,
+        ("job-2", MATCH_STATUS, "good-match"): 1,
+    }
+
+def test_apply_delta_and_rebuild(db, monkeypatch):
+    apply_status_delta(db, {("job-1", APPLICATION_STATUS, "in-progress"): 2})
+    apply_status_delta(db, {("job-1", APPLICATION_STATUS, "in-progress"): -1, ("job-1", MATCH_STATUS, "good-match"): 1})
+    db.commit()
+    
+    assert get_job_offer_stats(db, "job-1") == {
+        APPLICATION_STATUS: {"in-progress": 1},
+        MATCH_STATUS: {"good-match": 1},
+    }
+    
+    # Source tables only hold one application status, so the match counter has drifted
+    recount = Counter({("job-1", APPLICATION_STATUS, "in-progress"): 1})
+    monkeypatch.setattr(job_offer_stats, "compute_status_counts", lambda db: recount)
+    
+    mismatches = rebuild_job_offer_stats(db, check_only=True)
+    assert mismatches == {("job-1", MATCH_STATUS, "good-match"): (1, 0)}
+    
+    rebuild_job_offer_stats(db)
+    assert rebuild_job_offer_stats(db, check_only=True) == {}
+    assert get_job_offer_stats(db, "job-1")[MATCH_STATUS] == {}
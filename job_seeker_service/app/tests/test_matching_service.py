@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.database import _create_engine
+from app.json_codec import RawJSON, loads
+from app.models.profile import CVProfile, ProfileChangeLog
+from app.services.change_log import SNAPSHOT, record_change
+from app.services.json_patch import apply_patch
+from app.services.matching_service import build_partner_request
+
+@pytest.fixture
+def db():
+    engine = _create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    for model in (CVProfile, ProfileChangeLog):
+        model.__table__.create(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def log_entry(payload):
+    return SimpleNamespace(
+        id=1, cv_id="cv-1", operation="UPDATE", payload_kind=SNAPSHOT, payload=payload,
+        base_version=None, version=2
+    )
+
+def test_stored_payload_is_sent_without_loading_the_profile():
+    with patch("app.services.matching_service.profile_cache") as cache, \
+            patch("app.services.matching_service.profile_exists", return_value=True) as exists:
+        body, headers = build_partner_request(None, log_entry({"cvId": "cv-1", "rating": 2}))
+    
+    cache.get_or_load.assert_not_called()
+    exists.assert_called_once_with(None, "cv-1")
+    assert loads(body) == {
+        "cvId": "cv-1", "operation": "UPDATE", "version": 2, "profile": {"cvId": "cv-1", "rating": 2}
+    }
+    assert headers["X-Idempotency-Key"] == "cv-1_UPDATE_1"
+
+def test_profile_is_loaded_only_without_a_payload():
+    with patch("app.services.matching_service.profile_cache") as cache, \
+            patch("app.services.matching_service.profile_exists") as exists:
+        cache.get_or_load.return_value = RawJSON(b'{"cvId":"cv-1"}')
+        body, _ = build_partner_request(None, log_entry(None))
+        cache.get_or_load.return_value = None
+        missing = build_partner_request(None, log_entry(None))
+    
+    exists.assert_not_called()
+    assert body == b'{"cvId":"cv-1","operation":"UPDATE","version":2,"profile":{"cvId":"cv-1"}}'
+    assert missing is None
+
+def test_payload_of_a_removed_profile_is_not_sent():
+    with patch("app.services.matching_service.profile_exists", return_value=False):
+        assert build_partner_request(None, log_entry({"cvId": "cv-1"})) is None
+
+def test_deletes_and_unversioned_changes():
+    delete = SimpleNamespace(**dict(vars(log_entry(None)), operation="DELETE", version=3))
+    legacy = SimpleNamespace(**dict(vars(log_entry({"cvId": "cv-1"})), version=None))
+    
+    body, _ = build_partner_request(None, delete)
+    assert body == b'{"cvId":"cv-1","operation":"DELETE","version":3}'
+    with patch("app.services.matching_service.profile_exists", return_value=True):
+        body, _ = build_partner_request(None, legacy)
+    assert body == b'{"cvId":"cv-1","operation":"UPDATE","profile":{"cvId":"cv-1"}}'
+
+def test_delta_is_computed_from_the_version_the_partner_acknowledged(db, monkeypatch):
+    monkeypatch.setattr(settings, "MATCHING_PARTNER_SUPPORTS_DELTAS", True)
+    db.add(CVProfile(cv_id="cv-1"))
+    documents = [{"cvId": "cv-1", "rating": rating, "skills": ["sql"] * 20} for rating in (1, 2, 3)]
+    entries = []
+    for document in documents:
+        entries.append(record_change(db, "cv-1", "UPDATE", document=document))
+        db.commit()
+    
+    # Nothing acknowledged yet: a full push of version 3
+    body, headers = build_partner_request(db, entries[2], allow_delta=True)
+    assert loads(body) == {"cvId": "cv-1", "operation": "UPDATE", "version": 3, "profile": documents[2]}
+    
+    # Version 1 delivered, version 2 never was: the patch goes from 1 to 3
+    entries[0].synced_to_matching_partner = True
+    db.commit()
+    body, headers = build_partner_request(db, entries[2], allow_delta=True)
+    sent = loads(body)
+    assert (sent["baseVersion"], sent["version"]) == (1, 3)
+    assert apply_patch(dict(documents[0]), sent["patch"]) == documents[2]
+    assert headers["X-Idempotency-Key"].endswith("_delta")
+    
+    # Version 2 delivered too: its stored patch against 2 is sent as is
+    entries[1].synced_to_matching_partner = True
+    db.commit()
+    sent = loads(build_partner_request(db, entries[2], allow_delta=True)[0])
+    assert (sent["baseVersion"], sent["patch"]) == (2, entries[2].payload)
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.merkle import DEPTH, MerkleTree, ProfileTreeCache, bucket_of, mismatched_buckets, profile_hash_rows
+
+def test_children_hash_up_to_the_root():
+    tree = MerkleTree.build([(f"cv-{i}", f"hash-{i}") for i in range(1000)])
+    
+    assert tree.count == 1000
+    assert len(tree.children("")) == 16
+    bucket = bucket_of("cv-1")
+    assert len(bucket) == DEPTH
+    assert tree.children(bucket[:2])[bucket] == tree.node(bucket) is not None
+    assert tree.node("") == tree.root
+
+def test_changed_hash_is_found_in_its_bucket():
+    entries = [(f"cv-{i}", f"hash-{i}") for i in range(1000)]
+    local = MerkleTree.build(entries)
+    remote = MerkleTree.build(entries[:-1] + [("cv-999", "other")])
+    
+    buckets = mismatched_buckets(
+        local, remote.root, lambda prefixes: {k: v for p in prefixes for k, v in remote.children(p).items()}
+    )
+    
+    assert buckets == [bucket_of("cv-999")]
+
+def test_tree_cache_rebuilds_after_ttl():
+    now = [0.0]
+    cache = ProfileTreeCache(ttl_seconds=60, clock=lambda: now[0])
+    
+    with patch("app.services.merkle.profile_hash_rows", return_value=[("cv-1", "a")]) as rows:
+        first = cache.get(None)
+        now[0] = 30
+        assert cache.get(None) is first
+        now[0] = 61
+        assert cache.get(None) is not first
+    
+    assert rows.call_count == 2
+
+def test_tombstoned_profiles_are_not_hashed():
+    db = MagicMock()
+    
+    profile_hash_rows(db, buckets=["abc"])
+    
+    sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "cv_profiles.tombstoned_at IS NULL" in sql
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+import msgpack
+import orjson
+import pytest
+
+from app.api.schemas import BulkSyncRequest
+from app.msgpack_codec import is_msgpack, unpackb, MessagePackDecodeError
+from app.services.trusted_ingest import parse_trusted_bulk, parse_trusted_document
+
+def load_sample():
+    with open("app/tests/test_data/bulk_data_sample.json", "rb") as f:
+        return f.read()
+
+def as_msgpack(json_body: bytes) -> bytes:
+    """Encode the sample as the talent pool sender does, with datetimes as timestamps"""
+    document = orjson.loads(json_body)
+    for profile in document["profiles"]:
+        profile["lastModifiedDt"] = datetime.fromisoformat(profile["lastModifiedDt"].replace("Z", "+00:00"))
+    return msgpack.packb(document, datetime=True)
+
+def test_is_msgpack_matches_media_type_only():
+    assert is_msgpack("application/msgpack")
+    assert is_msgpack("Application/X-MsgPack; charset=binary")
+    assert not is_msgpack("application/json")
+    assert not is_msgpack(None)
+
+def test_msgpack_body_decodes_to_the_same_profiles_as_json():
+    json_body = load_sample()
+    document = unpackb(as_msgpack(json_body))
+    
+    assert document["profiles"][0]["lastModifiedDt"] == datetime(2025, 1, 29, 9, 49, 41, 228000, tzinfo=timezone.utc)
+    assert isinstance(document["profiles"][0]["cvAddress"]["geoLocation"][0], float)
+    
+    from_json = parse_trusted_bulk(json_body)
+    from_msgpack = parse_trusted_document(document)
+    assert [p.dict() for p, _ in from_msgpack] == [p.dict() for p, _ in from_json]
+    
+    # The stored payloads only differ in how the timestamp is spelled
+    def payloads(parsed):
+        documents = [orjson.loads(bytes(raw)) for _, raw in parsed]
+        for document in documents:
+            document["lastModifiedDt"] = datetime.fromisoformat(document["lastModifiedDt"].replace("Z", "+00:00"))
+        return documents
+    assert payloads(from_msgpack) == payloads(from_json)
+    
+    assert BulkSyncRequest.parse_obj(document) == BulkSyncRequest.parse_raw(json_body)
+
+def test_unpackb_rejects_invalid_input():
+    with pytest.raises(MessagePackDecodeError):
+        unpackb(b"\xc1")
+    with pytest.raises(MessagePackDecodeError):
+        unpackb(msgpack.packb({"profiles": []})[:-1] + b"\x92")
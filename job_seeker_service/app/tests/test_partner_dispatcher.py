@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from app.services.partner_dispatcher import (
+    BULK, INTERACTIVE, RECONCILIATION, LaneScheduler, PartnerDispatcher, PartnerPush, parse_lane_weights
+)
+
+WEIGHTS = {INTERACTIVE: 8, BULK: 2, RECONCILIATION: 1}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def fill(scheduler, lane, count):
+    for i in range(count):
+        scheduler.push(PartnerPush(lane, f"{lane}-{i}", "UPDATE"))
+
+def drain(scheduler, count):
+    return [scheduler.pop().lane for _ in range(count)]
+
+def test_parse_lane_weights():
+    assert parse_lane_weights("interactive=8, bulk=2,reconciliation=0.5") == {
+        INTERACTIVE: 8, BULK: 2, RECONCILIATION: 0.5
+    }
+    with pytest.raises(ValueError):
+        parse_lane_weights("interactive=8,bulk=2")
+    with pytest.raises(ValueError):
+        parse_lane_weights("interactive=8,bulk=2,reconciliation=1,urgent=9")
+
+def test_lanes_share_sends_by_weight():
+    scheduler = LaneScheduler(WEIGHTS, max_wait_seconds=0, clock=FakeClock())
+    for lane in (RECONCILIATION, BULK, INTERACTIVE):
+        fill(scheduler, lane, 100)
+    
+    lanes = drain(scheduler, 110)
+    
+    assert (lanes.count(INTERACTIVE), lanes.count(BULK), lanes.count(RECONCILIATION)) == (80, 20, 10)
+    assert lanes[0] == INTERACTIVE
+
+def test_interactive_push_overtakes_a_bulk_backlog():
+    scheduler = LaneScheduler(WEIGHTS, max_wait_seconds=0, clock=FakeClock())
+    fill(scheduler, BULK, 1000)
+    drain(scheduler, 500)
+    
+    # The interactive lane was idle, so it neither banked credit nor waits behind the backlog
+    fill(scheduler, INTERACTIVE, 20)
+    lanes = drain(scheduler, 25)
+    
+    assert lanes[0] == INTERACTIVE
+    assert lanes.count(BULK) == 5
+
+def test_long_waiting_push_is_promoted():
+    clock = FakeClock()
+    scheduler = LaneScheduler({INTERACTIVE: 1000, BULK: 1, RECONCILIATION: 0.01}, max_wait_seconds=60, clock=clock)
+    fill(scheduler, RECONCILIATION, 2)
+    clock.now = 30
+    fill(scheduler, INTERACTIVE, 5000)
+    # One reconciliation push puts the lane 100 virtual seconds, 100000 interactive pushes, behind
+    assert drain(scheduler, 12).count(RECONCILIATION) == 1
+    
+    clock.now = 61
+    push = scheduler.pop()
+    
+    assert push.lane == RECONCILIATION
+    status = scheduler.status()
+    assert status[RECONCILIATION]["promoted"] == 1
+    assert status[RECONCILIATION]["waitSeconds"]["max"] == 61
+    assert status[INTERACTIVE]["depth"] == 4989
+    assert status[INTERACTIVE]["oldestWaitSeconds"] == 31
+    # Then the weights apply again
+    assert drain(scheduler, 100).count(RECONCILIATION) == 0
+
+def test_dispatcher_sends_pushes_and_reports_latency():
+    sent = []
+    done = threading.Event()
+    remaining = [3]
+    
+    def on_done():
+        remaining[0] -= 1
+        if not remaining[0]:
+            done.set()
+    
+    dispatcher = PartnerDispatcher(WEIGHTS, max_wait_seconds=60, workers=2, send=lambda push: sent.append(push.cv_id))
+    dispatcher.submit(BULK, "cv-1", "INSERT", on_done=on_done)
+    dispatcher.submit(INTERACTIVE, "cv-2", "UPDATE", on_done=on_done)
+    dispatcher.submit(RECONCILIATION, "cv-3", "UPDATE", on_done=on_done)
+    assert done.wait(5)
+    dispatcher.shutdown(timeout=5)
+    
+    assert sorted(sent) == ["cv-1", "cv-2", "cv-3"]
+    status = dispatcher.status()
+    assert status["inProgress"] == 0
+    assert all(lane["completed"] == 1 and lane["latencySeconds"]["max"] is not None for lane in status["lanes"].values())
+    with pytest.raises(ValueError):
+        dispatcher.submit("urgent", "cv-4", "UPDATE")
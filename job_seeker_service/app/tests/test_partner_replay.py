@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import orjson
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import partner_sync_api
+from app.config import settings
+from app.database import _create_engine, get_read_db
+from app.models.partner_sync import PartnerSyncDeadLetter
+from app.models.profile import CVProfile, ProfileChangeLog
+from app.services.matching_service import PartnerSendResult, post_to_partner, record_dead_letter
+from app.services.partner_replay import (
+    ReplayRegistry, TokenBucket, dead_letter_query, push_change_logs, replay_dead_letters
+)
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+@pytest.fixture
+def sessions():
+    engine = _create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    for model in (CVProfile, ProfileChangeLog, PartnerSyncDeadLetter):
+        model.__table__.create(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db(sessions):
+    session = sessions()
+    yield session
+    session.close()
+
+def logged_change(db, cv_id, timestamp=T0, synced=False, profile=True, version=1):
+    if profile:
+        db.add(CVProfile(cv_id=cv_id))
+    log_entry = ProfileChangeLog(
+        cv_id=cv_id, operation="UPDATE", timestamp=timestamp, payload={"cvId": cv_id},
+        version=version, synced_to_matching_partner=synced
+    )
+    db.add(log_entry)
+    db.flush()
+    return log_entry
+
+def failed_change(db, cv_id, **kwargs):
+    log_entry = logged_change(db, cv_id, **kwargs)
+    record_dead_letter(db, log_entry, PartnerSendResult(False, 503, "http_5xx", "unavailable"), attempts=3)
+    db.commit()
+    return log_entry
+
+def mocked_partner(accepted):
+    """A partner that accepts the profiles in accepted and answers 503 for the others"""
+    def post(url, data=None, headers=None, timeout=None):
+        if orjson.loads(data)["cvId"] in accepted:
+            return MagicMock(status_code=202)
+        return MagicMock(status_code=503, text="unavailable")
+    http = MagicMock()
+    http.post.side_effect = post
+    return http
+
+def dead_letters_by_cv_id(db):
+    db.expire_all()
+    return {d.cv_id: d for d in db.query(PartnerSyncDeadLetter)}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_token_bucket_paces_acquires_to_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+    
+    for _ in range(12):
+        bucket.acquire()
+    
+    # Two tokens of burst, then one every 0.1 seconds
+    assert abs(clock.now - 1.0) < 1e-9
+
+def test_post_to_partner_classifies_failures():
+    http = MagicMock()
+    http.post.return_value = MagicMock(status_code=202)
+    assert post_to_partner(b"{}", {}, http=http).ok
+    
+    http.post.return_value = MagicMock(status_code=503, text="unavailable")
+    result = post_to_partner(b"{}", {}, http=http)
+    assert (result.ok, result.status_code, result.error_class) == (False, 503, "http_5xx")
+    
+    http.post.return_value = MagicMock(status_code=422, text="invalid")
+    assert post_to_partner(b"{}", {}, http=http).error_class == "http_4xx"
+    
+    http.post.side_effect = requests.Timeout("read timed out")
+    result = post_to_partner(b"{}", {}, http=http)
+    assert (result.error_class, result.status_code) == ("timeout", None)
+    
+    http.post.side_effect = requests.ConnectionError("refused")
+    assert post_to_partner(b"{}", {}, http=http).error_class == "connection"
+
+def test_replay_registry_keeps_newest_replays():
+    registry = ReplayRegistry(max_entries=2)
+    first, second, third = registry.start(), registry.start(), registry.start()
+    
+    assert registry.get(first.replay_id) is None
+    assert registry.get(third.replay_id) is third
+    assert second.to_dict()["status"] == "running"
+
+def test_replay_resolves_delivered_and_superseded_entries_and_keeps_failures(db):
+    delivered = failed_change(db, "cv-1")
+    failed_change(db, "cv-2")
+    failed_change(db, "cv-3")
+    logged_change(db, "cv-3", timestamp=T0 + timedelta(minutes=1), synced=True, profile=False, version=2)
+    failed_change(db, "cv-4", profile=False)
+    http = mocked_partner(accepted={"cv-1"})
+    
+    progress = replay_dead_letters(
+        db, dead_letter_query(db), rate_per_second=1000, concurrency=2, batch_size=2, http=http
+    )
+    
+    assert (progress.total, progress.processed, progress.status) == (4, 4, "finished")
+    assert (progress.replayed, progress.superseded, progress.failed) == (1, 1, 2)
+    assert http.post.call_count == 2
+    dead_letters = dead_letters_by_cv_id(db)
+    assert (dead_letters["cv-1"].resolution, dead_letters["cv-1"].replay_count) == ("replayed", 1)
+    assert dead_letters["cv-1"].resolved_at is not None and delivered.synced_to_matching_partner
+    assert dead_letters["cv-2"].resolved_at is None
+    assert (dead_letters["cv-2"].attempt_count, dead_letters["cv-2"].replay_count) == (4, 1)
+    assert dead_letters["cv-3"].resolution == "superseded" and dead_letters["cv-3"].replay_count == 0
+    assert (dead_letters["cv-4"].error_class, dead_letters["cv-4"].resolved_at) == ("profile_not_found", None)
+    assert dead_letter_query(db).count() == 2
+
+def test_push_change_logs_records_dead_letters_for_failed_entries(db):
+    entries = [logged_change(db, "cv-1"), logged_change(db, "cv-2"), logged_change(db, "cv-3", profile=False)]
+    db.commit()
+    
+    counts = push_change_logs(
+        db, [entry.id for entry in entries], rate_per_second=1000, concurrency=2, batch_size=2,
+        http=mocked_partner(accepted={"cv-1"})
+    )
+    
+    assert counts == {"sent": 1, "failed": 2}
+    assert [entry.synced_to_matching_partner for entry in entries] == [True, False, False]
+    dead_letters = dead_letters_by_cv_id(db)
+    assert sorted(dead_letters) == ["cv-2", "cv-3"]
+    assert (dead_letters["cv-2"].error_class, dead_letters["cv-2"].attempt_count) == ("http_5xx", 1)
+    assert (dead_letters["cv-3"].error_class, dead_letters["cv-3"].attempt_count) == ("profile_not_found", 0)
+
+def test_dead_letter_endpoints_list_and_replay(sessions, db, monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "test-internal-token")
+    failed_change(db, "cv-1")
+    failed_change(db, "cv-2")
+    app = FastAPI()
+    app.include_router(partner_sync_api.router, prefix="/api")
+    def override_get_read_db():
+        session = sessions()
+        try:
+            yield session
+        finally:
+            session.close()
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    client = TestClient(app)
+    headers = {"X-Internal-Token": "test-internal-token"}
+    
+    assert client.get("/api/partner-sync/dead-letters").status_code == 403
+    listed = client.get("/api/partner-sync/dead-letters", headers=headers).json()
+    assert (listed["total"], listed["byErrorClass"]) == (2, {"http_5xx": 2})
+    assert {entry["cvId"] for entry in listed["entries"]} == {"cv-1", "cv-2"}
+    
+    # The replay runs as a background task, which the test client finishes before returning
+    with patch.object(partner_sync_api, "SessionLocal", sessions), \
+            patch("app.services.partner_replay.pooled_session", return_value=mocked_partner(accepted={"cv-1"})):
+        started = client.post(
+            "/api/partner-sync/dead-letters/replay", json={"cvId": ["cv-1"], "ratePerSecond": 1000}, headers=headers
+        )
+    assert started.status_code == 202
+    status = client.get(f"/api/partner-sync/replays/{started.json()['replayId']}", headers=headers).json()
+    assert (status["status"], status["total"], status["replayed"], status["failed"]) == ("finished", 1, 1, 0)
+    
+    listed = client.get("/api/partner-sync/dead-letters", headers=headers).json()
+    assert [entry["cvId"] for entry in listed["entries"]] == ["cv-2"]
+    listed = client.get(
+        "/api/partner-sync/dead-letters", params={"include_resolved": True, "cv_id": "cv-1"}, headers=headers
+    ).json()
+    assert [(entry["resolution"], entry["replayCount"]) for entry in listed["entries"]] == [("replayed", 1)]
+    assert client.get("/api/partner-sync/replays/unknown", headers=headers).status_code == 404
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.services.change_log import SNAPSHOT
+from app.services.partner_replay import push_change_logs
+from app.services.pool_manifest import removal_change_logs
+
+def test_removal_change_logs_delete_tombstoned_profiles():
+    rows = removal_change_logs(["cv-2", "cv-1", "cv-2"], ["cv-2"], {"cv-1": 4, "cv-2": None}, "tp")
+    
+    assert [(r["cv_id"], r["operation"], r["version"]) for r in rows] == [("cv-1", "UPDATE", 5), ("cv-2", "DELETE", 1)]
+    assert all(r["payload"] is None and r["payload_kind"] == SNAPSHOT for r in rows)
+    assert all(not r["synced_to_matching_partner"] and r["traceparent"] == "tp" for r in rows)
+    assert rows[0]["id"] != rows[1]["id"]
+
+def test_push_change_logs_marks_sent_and_dead_letters_failures():
+    entries = [SimpleNamespace(id=i, cv_id=f"cv-{i}", synced_to_matching_partner=False) for i in range(3)]
+    db = MagicMock()
+    db.query.return_value.filter.return_value.filter.return_value.all.side_effect = [entries[:2], entries[2:]]
+    http = MagicMock()
+    http.post.side_effect = [MagicMock(status_code=202), MagicMock(status_code=503, text="unavailable")]
+    
+    with patch("app.services.partner_replay.build_partner_request") as build, \
+            patch("app.services.partner_replay.record_dead_letter") as dead_letter:
+        build.side_effect = [(b"{}", {}), (b"{}", {}), None]
+        counts = push_change_logs(db, [0, 1, 2], rate_per_second=1000, concurrency=1, batch_size=2, http=http)
+    
+    assert counts == {"sent": 1, "failed": 2}
+    assert [e.synced_to_matching_partner for e in entries] == [True, False, False]
+    assert [c.args[2].error_class for c in dead_letter.call_args_list] == ["http_5xx", "profile_not_found"]
+    assert db.commit.call_count == 2
@@ -1,16 +1,16 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, get_db
+from app.database import Base, _create_engine, get_db, get_read_db
 from app.main import app
 import json
 
-# Setup in-memory SQLite database for testing
+# Setup in-memory SQLite database for testing, with the app's JSON column codec
+# so pre-encoded payloads of the trusted fast path are written as in production
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
+engine = _create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
@@ -29,6 +29,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 client = TestClient(app)
 
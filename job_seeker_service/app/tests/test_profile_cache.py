@@ -0,0 +1,103 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from app.db_routing import RoutingSession
+from app.json_codec import RawJSON
+from app.services.profile_cache import LRUDocumentCache, ProfileCache
+
+class FakeSharedTier:
+    def __init__(self):
+        self.items = {}
+    
+    def get(self, cv_id):
+        return self.items.get(cv_id)
+    
+    def put(self, cv_id, version, document):
+        self.items[cv_id] = (version, document)
+    
+    def invalidate(self, cv_id):
+        self.items.pop(cv_id, None)
+    
+    def invalidate_many(self, cv_ids):
+        for cv_id in cv_ids:
+            self.invalidate(cv_id)
+
+def test_lru_evicts_least_recently_used_by_count_and_bytes():
+    cache = LRUDocumentCache(max_entries=2, max_bytes=100)
+    cache.put("cv-1", "v1", RawJSON(b'{"a":1}'))
+    cache.put("cv-2", "v1", RawJSON(b'{"b":2}'))
+    cache.get("cv-1")
+    cache.put("cv-3", "v1", RawJSON(b'{"c":3}'))
+    
+    assert cache.get("cv-2") is None
+    assert cache.get("cv-1") == ("v1", b'{"a":1}')
+    assert cache.evictions == 1
+    
+    cache.put("cv-4", "v1", RawJSON(b"x" * 95))
+    assert len(cache) == 1
+    assert cache.size_bytes == 95
+    assert cache.get("cv-1", version="v2") is None
+
+def test_shared_tier_fills_local_and_invalidation_clears_both():
+    shared = FakeSharedTier()
+    cache = ProfileCache(max_entries=10, max_bytes=1000, refresh_interval=60, redis_tier=shared)
+    shared.put("cv-1", "v1", RawJSON(b'{"cvId":"cv-1"}'))
+    
+    assert cache.get("cv-1") == b'{"cvId":"cv-1"}'
+    assert cache.get("cv-1") == b'{"cvId":"cv-1"}'
+    assert cache.get("cv-2") is None
+    
+    cache.invalidate("cv-1")
+    assert cache.get("cv-1") is None
+    
+    stats = cache.stats()
+    assert (stats["hits"], stats["sharedHits"], stats["misses"], stats["invalidations"]) == (1, 1, 2, 1)
+
+def test_entry_loaded_before_a_write_is_not_served_after_it():
+    shared = FakeSharedTier()
+    cache = ProfileCache(max_entries=10, max_bytes=1000, refresh_interval=60, redis_tier=shared)
+    cache.sync_invalidations = MagicMock()
+    versions = iter([3, 4, 4])
+    documents = iter([{"cvId": "cv-1", "rating": 1}, {"cvId": "cv-1", "rating": 2}])
+    
+    # The write of version 4 commits while version 3 is being loaded; its invalidation
+    # comes first and the load stores the old document afterwards
+    with patch("app.services.profile_cache.latest_version", side_effect=lambda db, cv_id: next(versions)), \
+            patch("app.services.profile_cache.load_profile", return_value=MagicMock()), \
+            patch("app.services.profile_cache.assemble_profile_document", side_effect=lambda p: next(documents)):
+        assert cache.get_or_load(MagicMock(), "cv-1") == b'{"cvId":"cv-1","rating":1}'
+        assert cache.get_or_load(MagicMock(), "cv-1") == b'{"cvId":"cv-1","rating":2}'
+        assert cache.get_or_load(MagicMock(), "cv-1") == b'{"cvId":"cv-1","rating":2}'
+    
+    assert shared.items["cv-1"][0] == "4"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_changes_polled_from_other_workers_clear_the_shared_tier():
+    shared = FakeSharedTier()
+    cache = ProfileCache(max_entries=10, max_bytes=1000, refresh_interval=0, redis_tier=shared)
+    cache.put("cv-1", "1", RawJSON(b"{}"))
+    cache.put("cv-2", "1", RawJSON(b"{}"))
+    cache.cursor.start_at(datetime(2026, 1, 1))
+    cache.cursor.poll = MagicMock(return_value={"cv-1": "UPDATE"})
+    
+    cache.sync_invalidations(MagicMock())
+    
+    assert list(shared.items) == ["cv-2"]
+    assert cache.local.get("cv-1") is None
+
+def test_documents_read_from_a_replica_stay_out_of_the_shared_tier():
+    shared = FakeSharedTier()
+    cache = ProfileCache(max_entries=10, max_bytes=1000, refresh_interval=60, redis_tier=shared)
+    cache.sync_invalidations = MagicMock()
+    replica_session = RoutingSession(read_only=True)
+    replica_session._replica = MagicMock()
+    
+    with patch("app.services.profile_cache.latest_version", return_value=3), \
+            patch("app.services.profile_cache.load_profile", return_value=MagicMock()), \
+            patch("app.services.profile_cache.assemble_profile_document", return_value={"cvId": "cv-1"}):
+        cache.get_or_load(replica_session, "cv-1")
+        assert cache.local.get("cv-1") == ("3", b'{"cvId":"cv-1"}') and shared.items == {}
+        cache.local.clear()
+        cache.get_or_load(RoutingSession(), "cv-1")
+    
+    assert shared.items["cv-1"] == ("3", b'{"cvId":"cv-1"}')
@@ -0,0 +1,104 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+from app.api.schemas import BulkSyncRequest
+from app.config import settings
+from app.json_codec import RawJSON, dumps, loads
+from app.models.profile import (
+    ApplicationStatus, CVAddress, CVProfile, Certificate, Education, Experience, Hobby, Language,
+    MatchFeedback, SoftSkill, TalentPoolMembership, User
+)
+from app.services.profile_cache import ProfileCache
+from app.services.profile_documents import (
+    assemble_profile_document, decode_document, document_from_data, document_mismatch, encode_document,
+    store_document
+)
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "test_data", "bulk_data_sample.json")
+
+def sample_profile_data():
+    with open(SAMPLE) as f:
+        return BulkSyncRequest.parse_obj(json.load(f)).profiles[0]
+
+def profile_rows(data) -> CVProfile:
+    """The ORM rows create_profile writes for data, without a database"""
+    items = data.cvItems
+    return CVProfile(
+        cv_id=data.cvId,
+        last_modified_dt=data.lastModifiedDt.replace(tzinfo=None),
+        working_hours=data.cvProfile.workingHours,
+        willing_to_travel=data.cvProfile.willingToTravel,
+        visible_in_talent_pool=data.visibleInTalentPool,
+        user=User(user_id=data.user.userId, candidate_code=data.user.candidateCode),
+        address=CVAddress(geo_location=data.cvAddress.geoLocation),
+        experiences=[Experience(
+            profession_nm=e["professionNm"], company=e["company"], start_d=e.get("startD"),
+            end_d=e.get("endD"), location=e.get("location"), description=e.get("description")
+        ) for e in items.get("experience", [])],
+        educations=[Education(
+            educational_institution_nm=e["educationalInstitutionNm"], degree_code=e["degreeCode"],
+            degree_code_job_digger=e["degreeCodeJobDigger"], field_of_study_nm=e["fieldOfStudyNm"],
+            educational_institution_location=e["educationalInstitutionLocation"], start_d=e.get("startD"),
+            end_d=e.get("endD"), education_completed=e.get("educationCompleted"),
+            education_specialization_description=e.get("educationSpecializationDescription")
+        ) for e in items.get("education", [])],
+        hobbies=[Hobby(hobby_nm=h["hobbyNm"]) for h in items.get("hobby", [])],
+        languages=[Language(skill_nm=l["skillNm"], rating=l.get("rating")) for l in items.get("language", [])],
+        soft_skills=[SoftSkill(
+            skill_id=s["skillId"], skill_nm=s["skillNm"],
+            related_line_item_type=s.get("relatedLineItemType"), rating=s.get("rating")
+        ) for s in items.get("softSkillKnowledge", [])],
+        certificates=[Certificate(certificate_id=c["certificateId"], skill_nm=c["skillNm"]) for c in items.get("certificate", [])],
+        talent_pools=[TalentPoolMembership(talent_pool_id=m.talentPoolId, talent_pool_name=m.talentPoolName) for m in data.memberOf],
+        application_statuses=[ApplicationStatus(job_offer_code=s.jobOfferCode, application_status=s.applicationStatus) for s in data.applicationStatus],
+        match_feedbacks=[MatchFeedback(job_offer_code=f.jobOfferCode, match_status=f.matchStatus) for f in data.matchFeedback],
+    )
+
+def test_document_from_data_matches_assembled_rows():
+    data = sample_profile_data()
+    profile = profile_rows(data)
+
+    built = document_from_data(data, data.cvAddress.geoLocation)
+
+    assert dumps(built) == dumps(assemble_profile_document(profile))
+
+def test_documents_round_trip_in_both_encodings():
+    document = dumps(document_from_data(sample_profile_data(), None))
+
+    assert decode_document(encode_document(document, "json"), "json") == document
+    compressed = encode_document(document, "zstd")
+    assert len(compressed) < len(document)
+    assert decode_document(compressed, "zstd") == document
+
+def test_document_mismatch_ignores_row_order_but_not_content():
+    data = sample_profile_data()
+    profile = profile_rows(data)
+    assert document_mismatch(profile) == "missing"
+
+    document = document_from_data(data, data.cvAddress.geoLocation)
+    document["memberOf"].reverse()
+    document["cvItems"]["softSkillKnowledge"].reverse()
+    store_document(profile, document, "zstd")
+    assert document_mismatch(profile) is None
+
+    profile.languages[0].rating = 5
+    assert document_mismatch(profile) == "stale"
+
+    profile.document_encoding = "json"
+    assert document_mismatch(profile).startswith("undecodable")
+
+def test_cache_serves_stored_document_without_assembling(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DOCUMENT_STORAGE", "zstd")
+    cache = ProfileCache(max_entries=10, max_bytes=10000, refresh_interval=60)
+    cache.sync_invalidations = MagicMock()
+    stored = RawJSON(b'{"cvId":"cv-1"}')
+
+    with patch("app.services.profile_cache.load_stored_document", return_value=(True, stored)), \
+            patch("app.services.profile_cache.latest_version", return_value=1), \
+            patch("app.services.profile_cache.load_profile") as load_profile:
+        assert cache.get_or_load(MagicMock(), "cv-1") == stored
+        assert loads(cache.get_or_load(MagicMock(), "cv-1")) == {"cvId": "cv-1"}
+
+    load_profile.assert_not_called()
+    assert (cache.stats()["storedDocumentReads"], cache.hits) == (1, 1)
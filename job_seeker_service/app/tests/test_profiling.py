@@ -0,0 +1,64 @@
+import marshal
+import time
+
+from app.profilers import collapse_call_graph, maybe_profile
+from app.profiling import ProfilingRegistry, capture_info
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+def test_armed_target_is_profiled_for_the_requested_number_of_runs():
+    registry = ProfilingRegistry(max_captures=5)
+    registry.arm("bulk", 2, "sampling", 1)
+    
+    for _ in range(3):
+        with maybe_profile(registry, "bulk") as capture:
+            busy_loop(0.05)
+    
+    captures = registry.captures()
+    assert len(captures) == 2
+    assert registry.armed() == []
+    assert "busy_loop" in captures[0].collapsed
+    stack, weight = captures[0].collapsed.splitlines()[-1].rsplit(" ", 1)
+    assert int(weight) > 0
+    assert captures[0].pstats is None
+
+def test_unarmed_target_yields_no_capture():
+    registry = ProfilingRegistry()
+    with maybe_profile(registry, "bulk") as capture:
+        pass
+    assert capture is None
+    assert registry.captures() == []
+
+def test_deterministic_capture_has_pstats_and_collapsed_stacks():
+    registry = ProfilingRegistry()
+    registry.arm("bulk", 1, "deterministic", 5)
+    with maybe_profile(registry, "bulk", profiles=3) as capture:
+        busy_loop(0.01)
+    
+    assert capture_info(capture)["attributes"] == {"profiles": 3}
+    stats = marshal.loads(capture.pstats)
+    assert any(func[2] == "busy_loop" for func in stats)
+    assert any("busy_loop" in line for line in capture.collapsed.splitlines())
+
+def test_collapse_call_graph_splits_time_across_callers():
+    main = ("app.py", 1, "main")
+    a = ("app.py", 10, "a")
+    b = ("app.py", 20, "b")
+    leaf = ("app.py", 30, "leaf")
+    # (primitive calls, calls, own time, cumulative time, callers)
+    stats = {
+        main: (1, 1, 0.1, 1.0, {}),
+        a: (1, 1, 0.1, 0.4, {main: (1, 1, 0.1, 0.4)}),
+        b: (1, 1, 0.2, 0.5, {main: (1, 1, 0.2, 0.5)}),
+        leaf: (2, 2, 0.6, 0.6, {a: (1, 1, 0.3, 0.3), b: (1, 1, 0.3, 0.3)}),
+    }
+    stacks = collapse_call_graph(stats)
+    assert stacks["main (app.py:1);a (app.py:10)"] == 100000
+    assert stacks["main (app.py:1);a (app.py:10);leaf (app.py:30)"] == 300000
+    assert stacks["main (app.py:1);b (app.py:20);leaf (app.py:30)"] == 300000
+    assert sum(stacks.values()) == 1000000
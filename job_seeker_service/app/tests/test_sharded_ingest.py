@@ -0,0 +1,71 @@
+import asyncio
+import copy
+import json
+
+import pytest
+from unittest.mock import patch
+
+from app.services.sharded_ingest import (
+    ShardBatchLostError, ShardedIngestor, ShardValidationError, partition, shard_of, validate_shard, write_shard, _validated
+)
+
+def sample_profiles():
+    with open("app/tests/test_data/bulk_data_sample.json") as f:
+        return json.load(f)["profiles"]
+
+def test_partition_keeps_request_order_within_each_shard():
+    docs = [{"cvId": f"cv-{i % 5}", "seq": i} for i in range(50)]
+    parts = partition(docs, 4)
+    
+    assert sum(len(part) for part in parts) == 50
+    for shard, part in enumerate(parts):
+        indexes = [index for index, _ in part]
+        assert indexes == sorted(indexes)
+        assert all(shard_of(doc["cvId"], 4) == shard for _, doc in part)
+    # Documents without a usable cvId go to the first shard
+    assert partition([{"cvId": None}, "garbage"], 4)[0] == [(0, {"cvId": None}), (1, "garbage")]
+
+def test_validate_shard_reports_errors_with_request_indexes():
+    valid = sample_profiles()[0]
+    invalid = copy.deepcopy(valid)
+    del invalid["user"]
+    
+    assert validate_shard("batch-ok", [(3, valid)], trusted=False) == []
+    assert len(_validated.pop("batch-ok")) == 1
+    
+    errors = validate_shard("batch-bad", [(3, valid), (7, invalid)], trusted=False)
+    assert [index for index, _ in errors] == [7]
+    assert errors[0][1][0]["loc"] == ("profiles", 7, "user")
+    assert "batch-bad" not in _validated
+    
+    errors = validate_shard("batch-trusted", [(7, invalid)], trusted=True)
+    assert errors[0][1].startswith("profiles[7]")
+
+def test_sharded_ingest_rejects_the_whole_request_when_one_shard_fails_validation():
+    docs = [dict(doc, cvId=f"cv-{i}") for i, doc in enumerate(sample_profiles() * 8)]
+    del docs[5]["cvProfile"]
+    ingestor = ShardedIngestor(shards=2, start_method="fork")
+    try:
+        with pytest.raises(ShardValidationError) as rejected:
+            asyncio.run(ingestor.ingest(docs, trusted=False))
+        assert [error["loc"][:2] for error in rejected.value.detail] == [("profiles", 5)]
+    finally:
+        ingestor.shutdown()
+
+def test_write_shard_fails_when_the_validated_batch_is_gone():
+    with pytest.raises(ShardBatchLostError):
+        write_shard("batch-lost", None)
+
+def validate_without_keeping(batch_id, items, trusted):
+    """Like a worker replaced between the phases: validation passed, the batch is not held"""
+    return []
+
+def test_sharded_ingest_reports_a_shard_that_lost_its_validated_batch():
+    ingestor = ShardedIngestor(shards=1, start_method="fork")
+    try:
+        with patch("app.services.sharded_ingest.validate_shard", validate_without_keeping):
+            results = asyncio.run(ingestor.ingest([{"cvId": "cv-1"}], trusted=False))
+        assert results[0].profiles == []
+        assert "are gone" in results[0].error
+    finally:
+        ingestor.shutdown()
@@ -0,0 +1,21 @@
+import filecmp
+import os
+
+import pytest
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TALENT_POOL_ROOT = os.path.join(os.path.dirname(SERVICE_ROOT), "talent_pool_service")
+
+# Modules both services keep a copy of, since each is built from its own directory
+SHARED_FILES = (
+    "app/db_routing.py",
+    "app/profilers.py",
+    "app/tracing.py",
+    "benchmarks/profiles.py",
+)
+
+@pytest.mark.skipif(not os.path.isdir(TALENT_POOL_ROOT), reason="talent pool service not checked out alongside")
+@pytest.mark.parametrize("path", SHARED_FILES)
+def test_copy_matches_the_talent_pool_service(path):
+    assert filecmp.cmp(os.path.join(SERVICE_ROOT, path), os.path.join(TALENT_POOL_ROOT, path), shallow=False), \
+        f"{path} differs between the job seeker and talent pool services"
@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.term_index import InvertedIndex, make_term, parse_term
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    index.update("cv-1", {make_term("skill", "Python"), make_term("language", "Dutch"), make_term("certificate", "NT2")})
+    index.update("cv-2", {make_term("skill", "python "), make_term("language", "English")})
+    index.update("cv-3", {make_term("skill", "Java"), make_term("language", "dutch")})
+    return index
+
+def test_parse_term_normalizes_and_validates():
+    assert parse_term("Language:  Dutch ") == "language:dutch"
+    with pytest.raises(ValueError):
+        parse_term("hobby:reading")
+
+def test_and_or_queries(index):
+    assert index.search(all_terms=["skill:python", "language:dutch"]) == (1, ["cv-1"])
+    assert index.search(any_terms=["skill:java", "certificate:nt2"]) == (2, ["cv-1", "cv-3"])
+    assert index.search(all_terms=["language:dutch"], any_terms=["skill:java", "skill:cobol"]) == (1, ["cv-3"])
+    assert index.search(all_terms=["skill:cobol"]) == (0, [])
+
+def test_pagination_and_incremental_update(index):
+    assert index.search(any_terms=["language:dutch", "language:english"], offset=1, limit=1) == (3, ["cv-2"])
+    
+    index.update("cv-1", {make_term("skill", "Go")})
+    index.remove("cv-3")
+    
+    assert index.search(all_terms=["language:dutch"]) == (0, [])
+    assert index.search(all_terms=["skill:go"]) == (1, ["cv-1"])
+    assert len(index) == 2
@@ -0,0 +1,32 @@
+from app.services.trace_stats import end_to_end_latencies, percentile, stage_latencies, summarize
+
+def span(name, trace_id, start, end, parent_id="parent", service="job-seeker-service"):
+    return {
+        "service": service, "name": name, "traceId": trace_id, "spanId": name, "parentId": parent_id,
+        "start": start, "end": end, "durationMs": (end - start) * 1000,
+    }
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) == 0.0
+
+def test_end_to_end_latency_runs_from_root_start_to_partner_push_end():
+    spans = [
+        span("sync.run", "t1", 10.0, 12.0, parent_id=None, service="talent-pool-service"),
+        span("bulk.ingest", "t1", 10.5, 10.7),
+        span("partner.push", "t1", 11.0, 11.5),
+        span("partner.push", "t1", 11.0, 13.0),
+        # No root span recorded for this trace
+        span("partner.push", "t2", 0.0, 1.0),
+    ]
+    assert end_to_end_latencies(spans) == [1500.0, 3000.0]
+    
+    rows = summarize(stage_latencies(spans), quantiles=(50,))
+    assert [row["stage"] for row in rows] == [
+        "job-seeker-service/bulk.ingest", "job-seeker-service/partner.push", "talent-pool-service/sync.run"
+    ]
+    assert rows[1]["count"] == 3
+    assert rows[1]["max"] == 2000.0
@@ -0,0 +1,119 @@
+"""
+Insert throughput and primary key index size with random (uuid4) and
+time-ordered (uuid7) keys.
+
+Loads a child table the way the bulk sync writes one: rows of many profiles,
+then rounds in which a share of the profiles have their rows deleted and
+re-inserted, as update_profile does every hour. Reports rows inserted per
+second and the size of the primary key index afterwards. Runs on a temporary
+SQLite file by default; pass a PostgreSQL DATABASE_URL for numbers matching
+production (the table is created and dropped there). SQLite rebalances
+b-tree pages across siblings, so its index sizes hide the half-empty pages
+that random inserts leave in a PostgreSQL index.
+
+    python -m benchmarks.primary_key_benchmark
+    python -m benchmarks.primary_key_benchmark --rows 500000 --rounds 5 --database-url postgresql://...
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, Uuid, create_engine, delete, insert, text
+
+from app.ids import uuid7
+
+ROWS_PER_PROFILE = 10
+BATCH = 2000
+
+
+def bench_table(name: str) -> Table:
+    return Table(
+        name, MetaData(),
+        Column("id", Uuid, primary_key=True),
+        Column("profile_id", Integer, nullable=False),
+        Column("skill_nm", String, nullable=False),
+        Index(f"ix_{name}_profile_id", "profile_id"),
+    )
+
+
+def index_bytes(connection, table: Table) -> int:
+    if connection.dialect.name == "postgresql":
+        return connection.execute(
+            text(f"SELECT pg_relation_size('{table.name}_pkey')")
+        ).scalar()
+    return connection.execute(
+        text("SELECT sum(pgsize) FROM dbstat WHERE name LIKE :name"),
+        {"name": f"sqlite_autoindex_{table.name}%"},
+    ).scalar()
+
+
+def insert_rows(connection, table: Table, new_key, profile_ids) -> int:
+    rows = [
+        {"id": new_key(), "profile_id": profile_id, "skill_nm": f"skill {i}"}
+        for profile_id in profile_ids for i in range(ROWS_PER_PROFILE)
+    ]
+    for start in range(0, len(rows), BATCH):
+        connection.execute(insert(table), rows[start:start + BATCH])
+    return len(rows)
+
+
+def run(engine, key_name: str, new_key, profiles: int, rounds: int, rewrite_share: float, seed: int) -> dict:
+    table = bench_table(f"pk_bench_{key_name}")
+    table.metadata.drop_all(engine)
+    table.metadata.create_all(engine)
+    rng = random.Random(seed)
+    try:
+        inserted, seconds = 0, 0.0
+        with engine.begin() as connection:
+            start = time.perf_counter()
+            inserted += insert_rows(connection, table, new_key, range(profiles))
+            seconds += time.perf_counter() - start
+        for _ in range(rounds):
+            rewritten = rng.sample(range(profiles), int(profiles * rewrite_share))
+            with engine.begin() as connection:
+                connection.execute(delete(table).where(table.c.profile_id.in_(rewritten)))
+                start = time.perf_counter()
+                inserted += insert_rows(connection, table, new_key, rewritten)
+                seconds += time.perf_counter() - start
+        with engine.connect() as connection:
+            size = index_bytes(connection, table)
+        return {"rows_per_second": inserted / seconds, "index_bytes": size}
+    finally:
+        table.metadata.drop_all(engine)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark uuid4 against uuid7 primary keys")
+    parser.add_argument("--rows", type=int, default=200000, help="rows in the initial load")
+    parser.add_argument("--rounds", type=int, default=3, help="rewrite rounds after the load")
+    parser.add_argument("--rewrite-share", type=float, default=0.5, help="share of profiles rewritten per round")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'pk_bench.db')}"
+        engine = create_engine(url)
+        profiles = args.rows // ROWS_PER_PROFILE
+        print(
+            f"{engine.dialect.name}: {profiles * ROWS_PER_PROFILE:,} rows, then {args.rounds} rounds "
+            f"rewriting {args.rewrite_share:.0%} of {profiles:,} profiles\n"
+        )
+        print(f"{'key':>6}{'rows/s':>12}{'pk index':>14}")
+        results = {}
+        for key_name, new_key in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+            results[key_name] = run(engine, key_name, new_key, profiles, args.rounds, args.rewrite_share, args.seed)
+            result = results[key_name]
+            print(f"{key_name:>6}{result['rows_per_second']:>12,.0f}{result['index_bytes'] / 1024 / 1024:>11.1f} MiB")
+        engine.dispose()
+
+    speedup = results["uuid7"]["rows_per_second"] / results["uuid4"]["rows_per_second"]
+    size_ratio = results["uuid7"]["index_bytes"] / results["uuid4"]["index_bytes"]
+    print(f"\nuuid7: {speedup:.2f}x the insert rate, {size_ratio:.2f}x the primary key index size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Scaling of sharded bulk ingest with the number of worker processes.
+
+Runs one bulk request's worth of synthetic profiles through ShardedIngestor
+with 1..N shards and reports profiles per second and the speedup over one
+shard. The default "validate" stage runs phase one only (Pydantic or trusted
+validation in the workers) and needs no database; "write" also writes the
+profiles to DATABASE_URL, which must be a PostgreSQL database with the schema.
+
+    python -m benchmarks.sharded_ingest_benchmark
+    python -m benchmarks.sharded_ingest_benchmark --profiles 20000 --max-processes 8 --trusted
+    python -m benchmarks.sharded_ingest_benchmark --stage write --profiles 5000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.services.sharded_ingest import ShardedIngestor
+from benchmarks.profiles import synthetic_profiles
+
+def run_round(ingestor: ShardedIngestor, docs: list, trusted: bool, dry_run: bool) -> float:
+    start = time.perf_counter()
+    asyncio.run(ingestor.ingest(docs, trusted, dry_run=dry_run))
+    return time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sharded bulk ingest scaling")
+    parser.add_argument("--profiles", type=int, default=10000, help="profiles per bulk request")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--stage", choices=("validate", "write"), default="validate")
+    parser.add_argument("--trusted", action="store_true", help="use the trusted sender validation")
+    args = parser.parse_args(argv)
+    
+    docs = synthetic_profiles(args.profiles)
+    print(
+        f"{args.profiles} profiles per request, {args.stage} stage, "
+        f"{'trusted' if args.trusted else 'pydantic'} validation, best of {args.rounds}, "
+        f"{os.cpu_count()} cores\n"
+    )
+    print(f"{'processes':>10}{'seconds':>10}{'profiles/s':>14}{'speedup':>10}")
+    
+    counts = sorted({2 ** i for i in range(args.max_processes.bit_length()) if 2 ** i <= args.max_processes}
+                    | {args.max_processes})
+    baseline = None
+    for processes in counts:
+        ingestor = ShardedIngestor(processes)
+        try:
+            # Start the workers outside the measured rounds
+            run_round(ingestor, docs[:processes * 10], args.trusted, dry_run=True)
+            best = min(
+                run_round(ingestor, docs, args.trusted, dry_run=args.stage == "validate")
+                for _ in range(args.rounds)
+            )
+        finally:
+            ingestor.shutdown()
+        baseline = baseline or best
+        print(f"{processes:>10}{best:>10.2f}{args.profiles / best:>14,.0f}{baseline / best:>10.2f}")
+
+if __name__ == "__main__":
+    main()
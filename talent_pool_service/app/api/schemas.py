@@ -1,5 +1,5 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class TalentPoolBase(BaseModel):
@@ -17,10 +17,25 @@ class TalentPool(TalentPoolBase):
     class Config:
         orm_mode = True
 
+class TalentPoolMemberUpsert(BaseModel):
+    last_modified_dt: datetime
+    visible_in_talent_pool: bool = True
+    profile: dict  # user, cvProfile, cvAddress, cvItems, applicationStatus, matchFeedback
+
+class TalentPoolMember(BaseModel):
+    talent_pool_id: str
+    cv_id: str
+    joined_at: datetime
+
+    class Config:
+        orm_mode = True
+
 class SyncJobBase(BaseModel):
-    data: dict
+    data: Optional[dict] = None
+    payload_format: str = "json"
     status: str = "pending"
     retry_count: int = 0
+    next_attempt_at: Optional[datetime] = None
     error_message: Optional[str] = None
 
 class SyncJobCreate(SyncJobBase):
@@ -32,4 +47,38 @@ class SyncJob(SyncJobBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class SyncLockStatus(BaseModel):
+    held: bool
+    run_id: Optional[str] = None
+    fencing_token: Optional[int] = None
+    acquired_at: Optional[datetime] = None
+    ttl_ms: Optional[int] = None
+
+class ProfilingArmRequest(BaseModel):
+    target: str
+    count: int = Field(1, ge=1, le=100)
+    mode: str = Field("sampling", regex="^(sampling|deterministic)$")
+    interval_ms: float = Field(5, ge=1, le=1000)
+
+class ProfilingArmedTarget(BaseModel):
+    target: str
+    remaining: int
+    mode: str
+    interval_ms: float
+
+class ProfileCaptureInfo(BaseModel):
+    capture_id: str
+    target: str
+    mode: str
+    started_at: datetime
+    duration_ms: float
+    stacks: int
+    has_pstats: bool
+    attributes: Dict[str, Any] = {}
+
+class ProfilingStatus(BaseModel):
+    targets: List[str]
+    armed: List[ProfilingArmedTarget]
+    captures: List[ProfileCaptureInfo]
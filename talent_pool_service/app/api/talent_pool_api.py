@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+import hmac
 import logging
 from typing import List
 
-from app.database import get_db
-from app.api.schemas import TalentPoolCreate, TalentPool
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.api.schemas import (
+    TalentPoolCreate, TalentPool, TalentPoolMemberUpsert, TalentPoolMember, SyncLockStatus,
+    ProfilingArmRequest, ProfilingArmedTarget, ProfilingStatus
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/talent-pools", response_model=List[TalentPool])
-async def get_talent_pools(db: Session = Depends(get_db)):
+async def get_talent_pools(db: Session = Depends(get_read_db)):
     """Get all talent pools"""
     from app.models.talent_pool import TalentPool as TalentPoolModel
     
@@ -43,7 +48,7 @@ async def create_talent_pool(talent_pool: TalentPoolCreate, db: Session = Depend
     return db_talent_pool
 
 @router.get("/talent-pools/{talent_pool_id}", response_model=TalentPool)
-async def get_talent_pool(talent_pool_id: str, db: Session = Depends(get_db)):
+async def get_talent_pool(talent_pool_id: str, db: Session = Depends(get_read_db)):
     """Get a specific talent pool by ID"""
     from app.models.talent_pool import TalentPool as TalentPoolModel
     
@@ -56,14 +61,151 @@ async def get_talent_pool(talent_pool_id: str, db: Session = Depends(get_db)):
     
     return talent_pool
 
+@router.put("/talent-pools/{talent_pool_id}/members/{cv_id}", response_model=TalentPoolMember)
+async def upsert_talent_pool_member(
+    talent_pool_id: str,
+    cv_id: str,
+    member: TalentPoolMemberUpsert,
+    db: Session = Depends(get_db)
+):
+    """Store a candidate profile and add it to a talent pool"""
+    from app.models.talent_pool import TalentPool as TalentPoolModel, MemberProfile, TalentPoolMember as TalentPoolMemberModel
+    from app.services.members import profile_content_hash
+    
+    talent_pool = db.query(TalentPoolModel).filter(
+        TalentPoolModel.talent_pool_id == talent_pool_id
+    ).first()
+    if not talent_pool:
+        raise HTTPException(status_code=404, detail="Talent pool not found")
+    
+    profile = db.query(MemberProfile).filter(MemberProfile.cv_id == cv_id).first()
+    if profile is None:
+        profile = MemberProfile(cv_id=cv_id)
+        db.add(profile)
+    profile.last_modified_dt = member.last_modified_dt
+    profile.visible_in_talent_pool = member.visible_in_talent_pool
+    profile.document = member.profile
+    profile.content_hash = profile_content_hash(
+        cv_id, member.last_modified_dt, member.visible_in_talent_pool, member.profile
+    )
+    db.flush()
+    
+    membership = db.query(TalentPoolMemberModel).filter(
+        TalentPoolMemberModel.talent_pool_id == talent_pool_id,
+        TalentPoolMemberModel.cv_id == cv_id
+    ).first()
+    if membership is None:
+        membership = TalentPoolMemberModel(talent_pool_id=talent_pool_id, cv_id=cv_id)
+        db.add(membership)
+    
+    db.commit()
+    db.refresh(membership)
+    return membership
+
+@router.delete("/talent-pools/{talent_pool_id}/members/{cv_id}", status_code=204)
+async def remove_talent_pool_member(talent_pool_id: str, cv_id: str, db: Session = Depends(get_db)):
+    """Remove a candidate from a talent pool"""
+    from app.models.talent_pool import TalentPoolMember as TalentPoolMemberModel
+    
+    deleted = db.query(TalentPoolMemberModel).filter(
+        TalentPoolMemberModel.talent_pool_id == talent_pool_id,
+        TalentPoolMemberModel.cv_id == cv_id
+    ).delete()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Talent pool member not found")
+    db.commit()
+
 @router.post("/trigger-sync")
 async def trigger_sync():
     """
-    Manually trigger the sync process (useful for testing)
+    Manually trigger the sync process (useful for testing).
+    If a sync run is already in progress, the request joins it instead of starting another.
     """
     from app.tasks.sync_tasks import sync_talent_pool_data
+    from app.services.sync_lock import sync_lease
+    
+    holder = sync_lease.holder()
+    if holder:
+        return {"message": "Sync already in progress", "run_id": holder["run_id"], "joined": True}
     
     # Start the sync task
     task = sync_talent_pool_data.delay()
     
-    return {"message": "Sync task started", "task_id": task.id}
\ No newline at end of file
+    return {"message": "Sync task started", "task_id": task.id, "joined": False}
+
+@router.get("/sync/lock", response_model=SyncLockStatus)
+async def get_sync_lock():
+    """Show which sync run currently holds the single-flight lease"""
+    from datetime import datetime
+    from app.services.sync_lock import sync_lease
+    
+    holder = sync_lease.holder()
+    if not holder:
+        return SyncLockStatus(held=False)
+    return SyncLockStatus(
+        held=True,
+        run_id=holder["run_id"],
+        fencing_token=holder["token"],
+        acquired_at=datetime.utcfromtimestamp(holder["acquired_at"]),
+        ttl_ms=holder["ttl_ms"]
+    )
+
+def require_admin_token(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if not settings.ADMIN_API_TOKEN or not token or \
+            not hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_API_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin_token)])
+async def get_profiling_status():
+    """Armed tasks and stored captures from all workers, newest first"""
+    from app.profiling import profiling_registry
+    
+    return ProfilingStatus(
+        targets=list(profiling_registry.targets),
+        armed=profiling_registry.armed(),
+        captures=profiling_registry.captures()
+    )
+
+@router.post("/admin/profiling/arm", response_model=ProfilingArmedTarget, dependencies=[Depends(require_admin_token)])
+async def arm_profiling(arm_request: ProfilingArmRequest):
+    """Profile the next `count` executions of a Celery task on any worker"""
+    from app.profiling import profiling_registry
+    
+    if arm_request.target not in profiling_registry.targets:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown target '{arm_request.target}', expected one of {', '.join(profiling_registry.targets)}"
+        )
+    logger.info(f"Profiling armed for {arm_request.count} {arm_request.mode} runs of {arm_request.target}")
+    return profiling_registry.arm(arm_request.target, arm_request.count, arm_request.mode, arm_request.interval_ms)
+
+@router.delete("/admin/profiling/arm/{target}", status_code=204, dependencies=[Depends(require_admin_token)])
+async def disarm_profiling(target: str):
+    from app.profiling import profiling_registry
+    
+    profiling_registry.disarm(target)
+    return Response(status_code=204)
+
+@router.get("/admin/profiling/captures/{capture_id}", dependencies=[Depends(require_admin_token)])
+async def download_profile_capture(capture_id: str, format: str = Query("collapsed", regex="^(collapsed|pstats)$")):
+    """
+    A capture as collapsed stacks (input for flamegraph.pl, speedscope or inferno),
+    or for deterministic captures as a pstats dump
+    """
+    from app.profiling import profiling_registry
+    
+    output = profiling_registry.get(capture_id, format)
+    if output is None:
+        raise HTTPException(status_code=404, detail=f"No {format} output for capture {capture_id}")
+    if format == "pstats":
+        return Response(
+            output,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{capture_id}.prof"'}
+        )
+    return Response(
+        output,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.folded"'}
+    )
@@ -14,11 +14,84 @@ class Settings:
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "talent_pool_db")
     DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
     
+    # Read replicas for read-only sessions (comma-separated URLs), the replication lag above
+    # which a replica is skipped, how often the lag is measured, and the connect timeout
+    # of replica connections; see app.db_routing
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+    REPLICA_CONNECT_TIMEOUT_SECONDS: int = int(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", "2"))
+    
     JOB_SEEKER_BULK_API_URL: str = os.getenv("JOB_SEEKER_BULK_API_URL", "http://job-seeker-service/api/bulk")
+    # Full-sync pool manifests, from which the job seeker service removes dropped members
+    JOB_SEEKER_MANIFEST_API_URL: str = os.getenv(
+        "JOB_SEEKER_MANIFEST_API_URL", "http://job-seeker-service/api/bulk/manifests"
+    )
+    # Merkle tree endpoints of the job seeker service, used by the reconciliation task
+    JOB_SEEKER_CONSISTENCY_API_URL: str = os.getenv(
+        "JOB_SEEKER_CONSISTENCY_API_URL", "http://job-seeker-service/api/consistency"
+    )
+    # Shared secret sent as X-Internal-Token so the job seeker service uses its trusted fast path
+    INTERNAL_API_TOKEN: str = os.getenv("INTERNAL_API_TOKEN", "")
+    
+    # Span export: none, file (JSON lines at TRACE_FILE_PATH) or http (batches to TRACE_COLLECTOR_URL),
+    # and the service name spans are tagged with
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "talent-pool-service")
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE_PATH: str = os.getenv("TRACE_FILE_PATH", "spans.jsonl")
+    TRACE_COLLECTOR_URL: str = os.getenv("TRACE_COLLECTOR_URL", "")
+    
+    # Encoding of SyncJob payloads and bulk request bodies: json or msgpack
+    SYNC_WIRE_FORMAT: str = os.getenv("SYNC_WIRE_FORMAT", "json")
+    
+    # Content-Encoding of bulk requests (zstd, gzip or identity) and its compression level
+    SYNC_COMPRESSION: str = os.getenv("SYNC_COMPRESSION", "zstd")
+    SYNC_COMPRESSION_LEVEL: int = int(os.getenv("SYNC_COMPRESSION_LEVEL", "3"))
+    
+    # Member fetch: rows per keyset page and rows per server-side cursor batch
+    MEMBER_FETCH_PAGE_SIZE: int = int(os.getenv("MEMBER_FETCH_PAGE_SIZE", "50000"))
+    MEMBER_FETCH_STREAM_BATCH_SIZE: int = int(os.getenv("MEMBER_FETCH_STREAM_BATCH_SIZE", "2000"))
+    
+    # Sync fan-out: members per pool shard subtask, profiles per SyncJob / bulk request,
+    # and Celery worker processes
+    SYNC_POOL_SHARD_SIZE: int = int(os.getenv("SYNC_POOL_SHARD_SIZE", "50000"))
+    SYNC_CHUNK_SIZE: int = int(os.getenv("SYNC_CHUNK_SIZE", "1000"))
+    SYNC_WORKER_CONCURRENCY: int = int(os.getenv("SYNC_WORKER_CONCURRENCY", str(os.cpu_count() or 1)))
+    
+    # Encoded member fragments kept between sync runs: entries and bytes per worker process,
+    # and an optional Redis tier shared by the workers with its TTL
+    SYNC_FRAGMENT_CACHE_MAX_ENTRIES: int = int(os.getenv("SYNC_FRAGMENT_CACHE_MAX_ENTRIES", "200000"))
+    SYNC_FRAGMENT_CACHE_MAX_BYTES: int = int(os.getenv("SYNC_FRAGMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    SYNC_FRAGMENT_CACHE_REDIS_URL: str = os.getenv("SYNC_FRAGMENT_CACHE_REDIS_URL", "")
+    SYNC_FRAGMENT_CACHE_REDIS_TTL_SECONDS: int = int(os.getenv("SYNC_FRAGMENT_CACHE_REDIS_TTL_SECONDS", str(3 * 3600)))
+    
+    # Retries of failed bulk requests: attempts per SyncJob, decorrelated jitter bounds,
+    # jobs claimed per sweep query, send tasks per dispatched group, and how long a
+    # claimed job waits for its send task before it becomes due again
+    SYNC_RETRY_MAX_ATTEMPTS: int = int(os.getenv("SYNC_RETRY_MAX_ATTEMPTS", "5"))
+    SYNC_RETRY_BASE_SECONDS: float = float(os.getenv("SYNC_RETRY_BASE_SECONDS", "30"))
+    SYNC_RETRY_CAP_SECONDS: float = float(os.getenv("SYNC_RETRY_CAP_SECONDS", "3600"))
+    SYNC_RETRY_CLAIM_BATCH_SIZE: int = int(os.getenv("SYNC_RETRY_CLAIM_BATCH_SIZE", "1000"))
+    SYNC_RETRY_DISPATCH_BATCH_SIZE: int = int(os.getenv("SYNC_RETRY_DISPATCH_BATCH_SIZE", "100"))
+    SYNC_RETRY_CLAIM_TIMEOUT_SECONDS: int = int(os.getenv("SYNC_RETRY_CLAIM_TIMEOUT_SECONDS", "900"))
     
     REDIS_HOST: str = os.getenv("REDIS_HOST", "redis")
     REDIS_PORT: str = os.getenv("REDIS_PORT", "6379")
     CELERY_BROKER_URL: str = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
     CELERY_RESULT_BACKEND: str = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+    
+    # Single-flight lease around sync runs; renewed by heartbeats from the run's subtasks
+    SYNC_LOCK_REDIS_URL: str = os.getenv("SYNC_LOCK_REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/0")
+    SYNC_LOCK_TTL_SECONDS: int = int(os.getenv("SYNC_LOCK_TTL_SECONDS", "300"))
+    
+    # Token for admin endpoints (X-Admin-Token); they are disabled while it is unset
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+    
+    # On-demand task profiling: arming state and captures in Redis, captures kept,
+    # how long an unused arming stays and how long captures are kept
+    PROFILING_REDIS_URL: str = os.getenv("PROFILING_REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/0")
+    PROFILING_MAX_CAPTURES: int = int(os.getenv("PROFILING_MAX_CAPTURES", "20"))
+    PROFILING_ARM_TTL_SECONDS: int = int(os.getenv("PROFILING_ARM_TTL_SECONDS", "86400"))
+    PROFILING_CAPTURE_TTL_SECONDS: int = int(os.getenv("PROFILING_CAPTURE_TTL_SECONDS", str(7 * 86400)))
 
 settings = Settings()
\ No newline at end of file
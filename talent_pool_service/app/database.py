@@ -3,11 +3,27 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from app.db_routing import ReplicaRouter, RoutingSession
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_router = ReplicaRouter(
+    [
+        create_engine(url.strip(), connect_args={"connect_timeout": settings.REPLICA_CONNECT_TIMEOUT_SECONDS})
+        for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+    ],
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_LAG_CHECK_SECONDS,
+)
+# Sync tasks keep using the primary: pool manifests are derived from the members they
+# read, and a lagging replica would get recently added members removed
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+# Sessions whose reads may be served by a replica; see app.db_routing
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession,
+    router=replica_router, read_only=True,
+)
 
 Base = declarative_base()
 
@@ -17,4 +33,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for read-only endpoints
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -3,7 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 from app.api import talent_pool_api
-from app.database import Base, engine
+from app.database import Base, engine, replica_router
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +28,10 @@ app.add_middleware(
 # Include routers
 app.include_router(talent_pool_api.router, prefix="/api", tags=["talent-pools"])
 
+@app.on_event("shutdown")
+def stop_replica_lag_checks():
+    replica_router.shutdown(timeout=5)
+
 @app.get("/", tags=["health"])
 async def health_check():
     return {"status": "healthy", "service": "talent-pool-service"}
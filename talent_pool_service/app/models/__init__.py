@@ -1,3 +1,3 @@
 # This file marks the models directory as a Python package
 # Import models to make them available when importing the package
-from app.models.talent_pool import TalentPool, SyncJob
\ No newline at end of file
+from app.models.talent_pool import TalentPool, MemberProfile, TalentPoolMember, SyncRun, SyncJob, SyncManifestPart
\ No newline at end of file
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime, JSON
+from sqlalchemy import Column, String, Boolean, Integer, Float, DateTime, JSON, LargeBinary, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 
@@ -14,13 +14,90 @@ class TalentPool(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class MemberProfile(Base):
+    """Candidate profile as pushed to the job seeker service, one row per cvId"""
+    __tablename__ = "member_profiles"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    cv_id = Column(String, unique=True, index=True, nullable=False)
+    last_modified_dt = Column(DateTime, default=datetime.utcnow)
+    visible_in_talent_pool = Column(Boolean, default=True)
+    # user, cvProfile, cvAddress, cvItems, applicationStatus and matchFeedback in bulk API shape
+    document = Column(JSON, nullable=False)
+    # Hash of the profile's own fields; see app.services.members.profile_content_hash
+    content_hash = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TalentPoolMember(Base):
+    """Membership of a candidate profile in a talent pool"""
+    __tablename__ = "talent_pool_members"
+    __table_args__ = (
+        # Keyset pagination walks (cv_id, talent_pool_id); pool filters use the second index
+        UniqueConstraint("cv_id", "talent_pool_id", name="uq_talent_pool_members_cv_pool"),
+        Index("ix_talent_pool_members_pool_cv", "talent_pool_id", "cv_id"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    talent_pool_id = Column(String, ForeignKey("talent_pools.talent_pool_id"), nullable=False)
+    cv_id = Column(String, ForeignKey("member_profiles.cv_id"), nullable=False)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+
+class SyncRun(Base):
+    """One execution of sync_talent_pool_data, fanned out over pool shards"""
+    __tablename__ = "sync_runs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String, default="running")  # running, dispatched, failed, fenced
+    fencing_token = Column(Integer, nullable=True)
+    pool_count = Column(Integer, default=0)
+    shard_count = Column(Integer, default=0)
+    profile_count = Column(Integer, default=0)
+    sync_job_count = Column(Integer, default=0)
+    summary = Column(JSON, nullable=True)
+    # W3C traceparent of the run's root span
+    traceparent = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
 class SyncJob(Base):
     __tablename__ = "sync_jobs"
+    __table_args__ = (
+        # Only jobs waiting for a retry are indexed, so the retry sweep stays cheap
+        # however many finished jobs accumulate
+        Index(
+            "ix_sync_jobs_retry_due", "next_attempt_at",
+            postgresql_where=text("status = 'retrying'"),
+            sqlite_where=text("status = 'retrying'"),
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    data = Column(JSON)
-    status = Column(String, default="pending")  # pending, success, failed
+    run_id = Column(UUID(as_uuid=True), ForeignKey("sync_runs.id"), nullable=True, index=True)
+    # {"profiles": [...]} as JSON in data, or encoded (JSON or MessagePack) in payload; see app.services.wire_format
+    data = Column(JSON, nullable=True)
+    payload = Column(LargeBinary, nullable=True)
+    payload_format = Column(String, default="json")  # json, msgpack
+    traceparent = Column(String, nullable=True)
+    # Partner push lane requested from the job seeker service: bulk or reconciliation
+    priority = Column(String, default="bulk")
+    status = Column(String, default="pending")  # pending, retrying, success, failed, fenced
     retry_count = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    backoff_seconds = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    error_message = Column(String, nullable=True)
\ No newline at end of file
+    error_message = Column(String, nullable=True)
+class SyncManifestPart(Base):
+    """
+    The cvIds of one shard of a pool in a sync run. Once all shards of the pool
+    succeeded, the parts are sent as the pool's manifest, from which the job
+    seeker service removes members dropped from the pool.
+    """
+    __tablename__ = "sync_manifest_parts"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    run_id = Column(UUID(as_uuid=True), ForeignKey("sync_runs.id"), nullable=False, index=True)
+    talent_pool_id = Column(String, nullable=False)
+    cv_ids = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,178 @@
+"""
+On-demand profiling of the next N executions of a code path.
+
+An admin arms a Celery task (e.g. "send_bulk_data_to_job_seeker") with a
+count and a mode. Each of the next N executions of the task, on any worker,
+is profiled, and the result is kept as a capture. The profilers and the
+capture format are in app.profilers.
+
+Arming and captures live in Redis so the API and all workers share them.
+Unarmed, a task costs one Redis script call per execution; Redis errors
+never fail the task, they just skip profiling.
+"""
+import functools
+import logging
+import time
+from typing import List, Optional
+
+import orjson
+import redis
+
+from app.config import settings
+from app.profilers import ProfileCapture, maybe_profile
+
+logger = logging.getLogger(__name__)
+
+
+def capture_info(capture: ProfileCapture) -> dict:
+    """Metadata of a capture, as stored in Redis and listed by the admin API"""
+    return {
+        "capture_id": capture.capture_id,
+        "target": capture.target,
+        "mode": capture.mode,
+        "started_at": capture.started_at,
+        "duration_ms": capture.duration_ms,
+        "stacks": capture.stacks,
+        "has_pstats": capture.pstats is not None,
+        "attributes": capture.attributes,
+    }
+
+
+_ERROR_BACKOFF_SECONDS = 30
+
+# Take one armed execution: decrement the remaining count and return the plan
+_CLAIM_SCRIPT = """
+local remaining = tonumber(redis.call('hget', KEYS[1], 'remaining') or '0')
+if remaining <= 0 then
+    return nil
+end
+if remaining == 1 then
+    local plan = redis.call('hmget', KEYS[1], 'mode', 'interval_ms')
+    redis.call('del', KEYS[1])
+    return plan
+end
+redis.call('hincrby', KEYS[1], 'remaining', -1)
+return redis.call('hmget', KEYS[1], 'mode', 'interval_ms')
+"""
+
+
+class RedisProfilingRegistry:
+    """Armed targets and the most recent captures, shared through Redis"""
+
+    def __init__(
+        self,
+        client,
+        targets,
+        max_captures: int = 20,
+        arm_ttl_seconds: int = 86400,
+        capture_ttl_seconds: int = 7 * 86400,
+        prefix: str = "talent-pool-profiling",
+    ):
+        self.client = client
+        self.targets = tuple(targets)
+        self.max_captures = max_captures
+        self.arm_ttl_seconds = arm_ttl_seconds
+        self.capture_ttl_seconds = capture_ttl_seconds
+        self.prefix = prefix
+        self.index_key = f"{prefix}:captures"
+        self._claim = client.register_script(_CLAIM_SCRIPT)
+        # After a Redis error, checks are skipped for a while instead of slowing every task
+        self._skip_until = 0.0
+
+    def _armed_key(self, target: str) -> str:
+        return f"{self.prefix}:armed:{target}"
+
+    def _capture_key(self, capture_id: str) -> str:
+        return f"{self.prefix}:capture:{capture_id}"
+
+    def arm(self, target: str, count: int, mode: str, interval_ms: float) -> dict:
+        key = self._armed_key(target)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"remaining": count, "mode": mode, "interval_ms": interval_ms})
+        # A forgotten arming does not linger
+        pipe.expire(key, self.arm_ttl_seconds)
+        pipe.execute()
+        return {"target": target, "remaining": count, "mode": mode, "interval_ms": interval_ms}
+
+    def disarm(self, target: str):
+        self.client.delete(self._armed_key(target))
+
+    def armed(self) -> List[dict]:
+        pipe = self.client.pipeline()
+        for target in self.targets:
+            pipe.hgetall(self._armed_key(target))
+        armed = []
+        for target, plan in zip(self.targets, pipe.execute()):
+            if plan:
+                armed.append({
+                    "target": target,
+                    "remaining": int(plan[b"remaining"]),
+                    "mode": plan[b"mode"].decode(),
+                    "interval_ms": float(plan[b"interval_ms"]),
+                })
+        return armed
+
+    def claim(self, target: str) -> Optional[dict]:
+        """Take one armed execution of target, or None if it is not armed"""
+        if time.monotonic() < self._skip_until:
+            return None
+        try:
+            plan = self._claim(keys=[self._armed_key(target)])
+        except redis.RedisError as e:
+            logger.warning(f"Profiling checks paused for {_ERROR_BACKOFF_SECONDS}s: {e}")
+            self._skip_until = time.monotonic() + _ERROR_BACKOFF_SECONDS
+            return None
+        if not plan:
+            return None
+        return {"mode": plan[0].decode(), "interval_ms": float(plan[1])}
+
+    def add(self, capture: ProfileCapture):
+        key = self._capture_key(capture.capture_id)
+        fields = {"meta": orjson.dumps(capture_info(capture)), "collapsed": capture.collapsed}
+        if capture.pstats is not None:
+            fields["pstats"] = capture.pstats
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self.capture_ttl_seconds)
+            pipe.lpush(self.index_key, capture.capture_id)
+            pipe.ltrim(self.index_key, 0, self.max_captures - 1)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not store profile capture {capture.capture_id}: {e}")
+
+    def captures(self) -> List[dict]:
+        """Metadata of the stored captures, newest first"""
+        capture_ids = self.client.lrange(self.index_key, 0, -1)
+        pipe = self.client.pipeline()
+        for capture_id in capture_ids:
+            pipe.hget(self._capture_key(capture_id.decode()), "meta")
+        return [orjson.loads(meta) for meta in pipe.execute() if meta is not None]
+
+    def get(self, capture_id: str, field: str) -> Optional[bytes]:
+        """The collapsed or pstats output of a capture"""
+        return self.client.hget(self._capture_key(capture_id), field)
+
+
+def profiled(target: str):
+    """Decorator for task functions: profile executions while target is armed"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with maybe_profile(profiling_registry, target):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Celery tasks that can be armed
+PROFILING_TARGETS = ("sync_talent_pool_data", "send_bulk_data_to_job_seeker")
+
+profiling_registry = RedisProfilingRegistry(
+    redis.Redis.from_url(settings.PROFILING_REDIS_URL),
+    PROFILING_TARGETS,
+    max_captures=settings.PROFILING_MAX_CAPTURES,
+    arm_ttl_seconds=settings.PROFILING_ARM_TTL_SECONDS,
+    capture_ttl_seconds=settings.PROFILING_CAPTURE_TTL_SECONDS,
+)
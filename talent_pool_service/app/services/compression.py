@@ -0,0 +1,22 @@
+import gzip
+from typing import Dict, Tuple
+
+import zstandard
+
+# Content-Encoding values the job seeker bulk API accepts
+SUPPORTED_ENCODINGS = ("zstd", "gzip", "identity")
+
+
+def compress_body(body: bytes, encoding: str, level: int) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Compress a request body; returns the encoded body and the headers to send with it.
+    encoding 'identity' (or 'none') sends the body unchanged.
+    """
+    encoding = (encoding or "identity").lower()
+    if encoding in ("identity", "none"):
+        return body, {}
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level), {"Content-Encoding": "gzip"}
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body), {"Content-Encoding": "zstd"}
+    raise ValueError(f"Unsupported sync compression '{encoding}', expected one of {', '.join(SUPPORTED_ENCODINGS)}")
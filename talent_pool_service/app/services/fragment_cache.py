@@ -0,0 +1,245 @@
+"""
+Encoded member fragments for the sync producer.
+
+Most members are unchanged between two hourly runs, so their encoded member
+documents are kept in a bounded LRU per worker process, optionally backed by
+a shared Redis tier. A fragment is valid for one version of a member: the
+profile's updated_at, lastModifiedDt and visibility and its memberOf list.
+Only members without a valid fragment have their document read from the
+database and encoded; sync payloads are assembled from the fragments by
+concatenation (see wire_format.assemble_sync_payload).
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.members import (
+    MemberKey, load_member_documents, member_content_hash, member_document, profile_content_hash
+)
+from app.services.wire_format import encode_member_fragment
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "sync-fragment:"
+
+
+def fragment_version(key: MemberKey) -> str:
+    """Digest of everything a member fragment is built from, apart from the document"""
+    return hashlib.blake2b(orjson.dumps([
+        key.updated_at.isoformat() if key.updated_at else None,
+        key.content_hash,
+        key.last_modified_dt.isoformat() if key.last_modified_dt else None,
+        key.visible_in_talent_pool,
+        key.member_of,
+    ]), digest_size=12).hexdigest()
+
+
+class FragmentStats:
+    """Cache outcome of the fragments of one shard or run"""
+
+    def __init__(self, hits: int = 0, shared_hits: int = 0, misses: int = 0, build_seconds: float = 0.0):
+        self.hits = hits
+        self.shared_hits = shared_hits
+        self.misses = misses
+        self.build_seconds = build_seconds
+
+    def add(self, other: "FragmentStats"):
+        self.hits += other.hits
+        self.shared_hits += other.shared_hits
+        self.misses += other.misses
+        self.build_seconds += other.build_seconds
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        # Hits are assumed to have cost what an average miss cost to load and encode
+        per_miss = self.build_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            "build_seconds": round(self.build_seconds, 3),
+            "estimated_seconds_saved": round((self.hits + self.shared_hits) * per_miss, 3),
+        }
+
+    @classmethod
+    def from_dict(cls, values: Optional[dict]) -> "FragmentStats":
+        values = values or {}
+        return cls(
+            values.get("hits", 0), values.get("shared_hits", 0),
+            values.get("misses", 0), values.get("build_seconds", 0.0)
+        )
+
+
+class LRUFragmentCache:
+    """Least recently used fragments, bounded by entry count and by total bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str, version: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, version: str, fragment: bytes):
+        if len(fragment) > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = (version, fragment)
+            self._bytes += len(fragment)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class RedisFragmentTier:
+    """Shared tier across worker processes; failures are logged and treated as misses"""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def get_many(self, keys: List[str]) -> List[Optional[Tuple[str, bytes]]]:
+        try:
+            values = self.client.mget([REDIS_KEY_PREFIX + key for key in keys])
+        except Exception as e:
+            logger.warning(f"Fragment cache Redis get failed: {e}")
+            return [None] * len(keys)
+        items = []
+        for value in values:
+            if value is None:
+                items.append(None)
+            else:
+                version, _, fragment = value.partition(b"\n")
+                items.append((version.decode("utf-8"), fragment))
+        return items
+
+    def put_many(self, items: List[Tuple[str, str, bytes]]):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, version, fragment in items:
+                pipe.set(REDIS_KEY_PREFIX + key, version.encode("utf-8") + b"\n" + fragment, ex=self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Fragment cache Redis set failed: {e}")
+
+
+class FragmentCache:
+    """Fragments per (wire format, cvId), valid for one fragment_version"""
+
+    def __init__(self, max_entries: int, max_bytes: int, redis_tier=None):
+        self.local = LRUFragmentCache(max_entries, max_bytes)
+        self.shared = redis_tier
+
+    def fragments(
+        self, db: Session, keys: List[MemberKey], wire_format: str, stats: Optional[FragmentStats] = None
+    ) -> List[bytes]:
+        """
+        Encoded member documents for keys, in order. Members whose profile was
+        deleted since their key was read are left out.
+        """
+        stats = stats if stats is not None else FragmentStats()
+        versions = [fragment_version(key) for key in keys]
+        cache_keys = [f"{wire_format}:{key.cv_id}" for key in keys]
+        found: Dict[int, bytes] = {}
+
+        missing = []
+        for i, (cache_key, version) in enumerate(zip(cache_keys, versions)):
+            fragment = self.local.get(cache_key, version)
+            if fragment is not None:
+                found[i] = fragment
+                stats.hits += 1
+            else:
+                missing.append(i)
+
+        if missing and self.shared is not None:
+            still_missing = []
+            for i, item in zip(missing, self.shared.get_many([cache_keys[i] for i in missing])):
+                if item is not None and item[0] == versions[i]:
+                    found[i] = item[1]
+                    self.local.put(cache_keys[i], item[0], item[1])
+                    stats.shared_hits += 1
+                else:
+                    still_missing.append(i)
+            missing = still_missing
+
+        if missing:
+            started = time.perf_counter()
+            documents = load_member_documents(db, [keys[i].cv_id for i in missing])
+            built = []
+            for i in missing:
+                key = keys[i]
+                loaded = documents.get(key.cv_id)
+                if loaded is None:
+                    continue
+                last_modified_dt, visible, updated_at, content_hash, document = loaded
+                member = member_document(key.cv_id, last_modified_dt, visible, document, key.member_of)
+                member["contentHash"] = member_content_hash(
+                    content_hash or profile_content_hash(key.cv_id, last_modified_dt, visible, document),
+                    key.member_of
+                )
+                fragment = encode_member_fragment(member, wire_format)
+                found[i] = fragment
+                # Cached under the version just read, which may be newer than the key's
+                version = fragment_version(key._replace(
+                    last_modified_dt=last_modified_dt, visible_in_talent_pool=visible,
+                    updated_at=updated_at, content_hash=content_hash
+                ))
+                self.local.put(cache_keys[i], version, fragment)
+                built.append((cache_keys[i], version, fragment))
+            if built and self.shared is not None:
+                self.shared.put_many(built)
+            stats.misses += len(missing)
+            stats.build_seconds += time.perf_counter() - started
+
+        return [found[i] for i in range(len(keys)) if i in found]
+
+
+def _create_fragment_cache() -> FragmentCache:
+    redis_tier = None
+    if settings.SYNC_FRAGMENT_CACHE_REDIS_URL:
+        redis_tier = RedisFragmentTier(
+            settings.SYNC_FRAGMENT_CACHE_REDIS_URL, settings.SYNC_FRAGMENT_CACHE_REDIS_TTL_SECONDS
+        )
+    return FragmentCache(
+        max_entries=settings.SYNC_FRAGMENT_CACHE_MAX_ENTRIES,
+        max_bytes=settings.SYNC_FRAGMENT_CACHE_MAX_BYTES,
+        redis_tier=redis_tier,
+    )
+
+
+member_fragment_cache = _create_fragment_cache()
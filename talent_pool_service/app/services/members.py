@@ -0,0 +1,264 @@
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import orjson
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.talent_pool import MemberProfile, TalentPool, TalentPoolMember
+
+logger = logging.getLogger(__name__)
+
+
+def member_document(cv_id, last_modified_dt, visible_in_talent_pool, document, member_of) -> dict:
+    """Bulk API shaped member profile"""
+    member = dict(document or {})
+    member["cvId"] = cv_id
+    member["lastModifiedDt"] = last_modified_dt.isoformat() if last_modified_dt else None
+    member["visibleInTalentPool"] = visible_in_talent_pool
+    member["memberOf"] = member_of
+    return member
+
+
+def profile_content_hash(cv_id, last_modified_dt, visible_in_talent_pool, document) -> str:
+    """Hash of a member profile's own fields, stored on MemberProfile when they are written"""
+    member = member_document(cv_id, last_modified_dt, visible_in_talent_pool, document, None)
+    return hashlib.blake2b(orjson.dumps(member, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+def member_content_hash(profile_hash: str, member_of: List[Dict[str, str]]) -> str:
+    """
+    contentHash sent with a member document: its profile hash combined with its
+    memberOf. The job seeker service stores it, and drift detection compares it.
+    """
+    return hashlib.blake2b(
+        profile_hash.encode("utf-8") + orjson.dumps(member_of, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).hexdigest()
+
+
+class MemberKey(NamedTuple):
+    """What identifies the current version of a member document, without the document"""
+    cv_id: str
+    last_modified_dt: Optional[datetime]
+    visible_in_talent_pool: Optional[bool]
+    updated_at: Optional[datetime]
+    content_hash: Optional[str]
+    member_of: List[Dict[str, str]]
+
+
+def _group_rows(rows: Iterable[Tuple]) -> Iterator[Tuple[tuple, List[Dict[str, str]]]]:
+    """Fold rows ordered by cv_id, one per membership, into (profile columns, memberOf) per profile"""
+    current = None
+    member_of: List[Dict[str, str]] = []
+    for row in rows:
+        profile_columns, (talent_pool_id, talent_pool_name) = tuple(row[:-2]), row[-2:]
+        if current is not None and current[0] != profile_columns[0]:
+            yield current, member_of
+            member_of = []
+        current = profile_columns
+        member_of.append({"talentPoolId": talent_pool_id, "talentPoolName": talent_pool_name})
+    if current is not None:
+        yield current, member_of
+
+
+def group_member_rows(rows: Iterable[Tuple]) -> Iterator[dict]:
+    """
+    Fold rows ordered by cv_id, one per membership, into one member document
+    per profile with all of its talent pools in memberOf.
+    Rows are (cv_id, last_modified_dt, visible_in_talent_pool, document, talent_pool_id, talent_pool_name).
+    """
+    for profile_columns, member_of in _group_rows(rows):
+        yield member_document(*profile_columns, member_of)
+
+
+def group_member_key_rows(rows: Iterable[Tuple]) -> Iterator[MemberKey]:
+    """
+    As group_member_rows, for rows with updated_at and content_hash in place of the document.
+    Rows are (cv_id, last_modified_dt, visible_in_talent_pool, updated_at, content_hash,
+    talent_pool_id, talent_pool_name).
+    """
+    for profile_columns, member_of in _group_rows(rows):
+        yield MemberKey(*profile_columns, member_of)
+
+
+_DOCUMENT_COLUMNS = (
+    MemberProfile.cv_id,
+    MemberProfile.last_modified_dt,
+    MemberProfile.visible_in_talent_pool,
+    MemberProfile.document,
+)
+_KEY_COLUMNS = (
+    MemberProfile.cv_id,
+    MemberProfile.last_modified_dt,
+    MemberProfile.visible_in_talent_pool,
+    MemberProfile.updated_at,
+    MemberProfile.content_hash,
+)
+
+
+def _member_rows_query(
+    talent_pool_ids: Optional[List[str]],
+    after: Optional[Tuple[str, str]],
+    page_size: int,
+    cv_id_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+    profile_columns: tuple = _DOCUMENT_COLUMNS,
+):
+    """One page of membership rows joined with profile and pool, in (cv_id, talent_pool_id) order"""
+    query = select(
+        *profile_columns,
+        TalentPool.talent_pool_id,
+        TalentPool.talent_pool_name,
+    ).select_from(TalentPoolMember)\
+        .join(MemberProfile, MemberProfile.cv_id == TalentPoolMember.cv_id)\
+        .join(TalentPool, TalentPool.talent_pool_id == TalentPoolMember.talent_pool_id)
+
+    if talent_pool_ids is not None:
+        # Members of the selected pools, but with every membership they have
+        selected = select(TalentPoolMember.cv_id).where(TalentPoolMember.talent_pool_id.in_(talent_pool_ids))
+        query = query.where(TalentPoolMember.cv_id.in_(selected))
+    if cv_id_range is not None:
+        lower, upper = cv_id_range
+        if lower is not None:
+            query = query.where(TalentPoolMember.cv_id > lower)
+        if upper is not None:
+            query = query.where(TalentPoolMember.cv_id <= upper)
+    if after is not None:
+        query = query.where(tuple_(TalentPoolMember.cv_id, TalentPoolMember.talent_pool_id) > after)
+
+    return query.order_by(TalentPoolMember.cv_id, TalentPoolMember.talent_pool_id).limit(page_size)
+
+
+def _iter_member_rows(
+    db: Session, talent_pool_ids, page_size: int, stream_batch_size: int, cv_id_range=None,
+    profile_columns: tuple = _DOCUMENT_COLUMNS,
+):
+    after = None
+    while True:
+        result = db.execute(
+            _member_rows_query(talent_pool_ids, after, page_size, cv_id_range, profile_columns),
+            execution_options={"stream_results": True, "yield_per": stream_batch_size},
+        )
+        count = 0
+        last_row = None
+        for row in result:
+            count += 1
+            last_row = row
+            yield tuple(row)
+        if count < page_size:
+            return
+        after = (last_row[0], last_row[-2])
+
+
+def iter_talent_pool_members(
+    db: Session,
+    talent_pool_ids: Optional[List[str]] = None,
+    page_size: Optional[int] = None,
+    stream_batch_size: Optional[int] = None,
+    cv_id_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+) -> Iterator[dict]:
+    """
+    Stream members of all (or the selected) talent pools as bulk API documents.
+    Each member is yielded once with all of its pools in memberOf. Pages are
+    keyset-paginated on (cv_id, talent_pool_id) and read through a server-side
+    cursor, so memory stays bounded for pools with hundreds of thousands of members.
+    cv_id_range (exclusive lower, inclusive upper; None for open) restricts the
+    fetch to one shard of the cv_id space.
+    """
+    rows = _iter_member_rows(
+        db,
+        list(talent_pool_ids) if talent_pool_ids is not None else None,
+        page_size or settings.MEMBER_FETCH_PAGE_SIZE,
+        stream_batch_size or settings.MEMBER_FETCH_STREAM_BATCH_SIZE,
+        cv_id_range,
+    )
+    return group_member_rows(rows)
+
+
+def iter_talent_pool_member_keys(
+    db: Session,
+    talent_pool_ids: Optional[List[str]] = None,
+    page_size: Optional[int] = None,
+    stream_batch_size: Optional[int] = None,
+    cv_id_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+) -> Iterator[MemberKey]:
+    """
+    As iter_talent_pool_members, but without reading the documents; see
+    load_member_documents for fetching those that are needed.
+    """
+    rows = _iter_member_rows(
+        db,
+        list(talent_pool_ids) if talent_pool_ids is not None else None,
+        page_size or settings.MEMBER_FETCH_PAGE_SIZE,
+        stream_batch_size or settings.MEMBER_FETCH_STREAM_BATCH_SIZE,
+        cv_id_range,
+        _KEY_COLUMNS,
+    )
+    return group_member_key_rows(rows)
+
+
+def load_member_documents(db: Session, cv_ids: List[str]) -> Dict[str, Tuple]:
+    """
+    (last_modified_dt, visible_in_talent_pool, updated_at, content_hash, document) per cv_id;
+    missing profiles are left out
+    """
+    if not cv_ids:
+        return {}
+    rows = db.execute(
+        select(
+            MemberProfile.cv_id,
+            MemberProfile.last_modified_dt,
+            MemberProfile.visible_in_talent_pool,
+            MemberProfile.updated_at,
+            MemberProfile.content_hash,
+            MemberProfile.document,
+        ).where(MemberProfile.cv_id.in_(cv_ids))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def backfill_content_hashes(db: Session, batch_size: int = 1000) -> int:
+    """Compute content_hash for profiles stored before it was maintained; returns the number updated"""
+    updated = 0
+    while True:
+        profiles = db.query(MemberProfile)\
+            .filter(MemberProfile.content_hash.is_(None))\
+            .order_by(MemberProfile.cv_id)\
+            .limit(batch_size)\
+            .all()
+        for profile in profiles:
+            profile.content_hash = profile_content_hash(
+                profile.cv_id, profile.last_modified_dt, profile.visible_in_talent_pool, profile.document
+            )
+        db.commit()
+        updated += len(profiles)
+        if len(profiles) < batch_size:
+            return updated
+
+
+def pool_shard_ranges(db: Session, talent_pool_id: str, shard_size: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split a pool's members into cv_id ranges of about shard_size members each.
+    Boundaries come from one pass over the (talent_pool_id, cv_id) index.
+    """
+    numbered = select(
+        TalentPoolMember.cv_id,
+        func.row_number().over(order_by=TalentPoolMember.cv_id).label("position"),
+    ).where(TalentPoolMember.talent_pool_id == talent_pool_id).subquery()
+    boundaries = [
+        row[0] for row in db.execute(
+            select(numbered.c.cv_id)
+            .where(numbered.c.position % shard_size == 0)
+            .order_by(numbered.c.cv_id)
+        )
+    ]
+
+    ranges = []
+    lower = None
+    for upper in boundaries:
+        ranges.append((lower, upper))
+        lower = upper
+    ranges.append((lower, None))
+    return ranges
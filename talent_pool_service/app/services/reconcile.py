@@ -0,0 +1,109 @@
+"""
+Drift detection between the talent pool and the job seeker service.
+
+Both sides keep a Merkle tree over (cvId, contentHash). The trees are compared
+top-down, requesting only the children of differing nodes, and the members
+of differing leaf buckets are compared one by one. Members whose hash the
+job seeker service does not hold are resent. Profiles it holds that are in no
+talent pool are reported as extraneous. When nothing drifted, the check is one
+request for the remote root hash.
+"""
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+import orjson
+import requests
+from sqlalchemy.orm import Session
+
+from app.services.members import MemberKey, iter_talent_pool_member_keys, member_content_hash
+from app.services.merkle import MerkleTree, bucket_of, mismatched_buckets
+
+logger = logging.getLogger(__name__)
+
+# Leaf buckets per bucket request, to bound the response size
+BUCKETS_PER_REQUEST = 64
+
+
+class JobSeekerTreeClient:
+    """The job seeker service's Merkle endpoints, counting requests and bytes"""
+
+    def __init__(self, base_url: str, token: str = "", http=requests, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["X-Internal-Token"] = token
+        self.http = http
+        self.timeout = timeout
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def _call(self, method: str, path: str, body=None) -> dict:
+        data = orjson.dumps(body) if body is not None else None
+        response = self.http.request(
+            method, f"{self.base_url}{path}", data=data, headers=self.headers, timeout=self.timeout
+        )
+        self.requests += 1
+        self.bytes_sent += len(data or b"")
+        self.bytes_received += len(response.content)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def root(self) -> dict:
+        return self._call("GET", "/merkle")
+
+    def children(self, prefixes: List[str]) -> Dict[str, Optional[str]]:
+        return self._call("POST", "/merkle/nodes", {"prefixes": prefixes})["nodes"]
+
+    def bucket_hashes(self, buckets: List[str]) -> Dict[str, Optional[str]]:
+        hashes = {}
+        for start in range(0, len(buckets), BUCKETS_PER_REQUEST):
+            response = self._call("POST", "/merkle/buckets", {"buckets": buckets[start:start + BUCKETS_PER_REQUEST]})
+            hashes.update((p["cvId"], p["contentHash"]) for p in response["profiles"])
+        return hashes
+
+    def traffic(self) -> dict:
+        return {"requests": self.requests, "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received}
+
+
+def sent_content_hash(key: MemberKey) -> str:
+    """The contentHash a member is sent with; members without a profile hash never match"""
+    return member_content_hash(key.content_hash or "", key.member_of)
+
+
+class DriftReport(NamedTuple):
+    members: int
+    buckets: List[str]
+    resend: List[MemberKey]
+    extraneous: List[str]
+
+    def to_dict(self) -> dict:
+        return {
+            "members": self.members,
+            "mismatched_buckets": len(self.buckets),
+            "resent": len(self.resend),
+            "extraneous": len(self.extraneous),
+        }
+
+
+def find_drift(db: Session, client: JobSeekerTreeClient) -> DriftReport:
+    """Compare the member tree with the job seeker service's tree; two passes over the member keys"""
+    tree = MerkleTree.build((key.cv_id, sent_content_hash(key)) for key in iter_talent_pool_member_keys(db))
+    remote_root = client.root()
+    if remote_root.get("depth") != tree.depth:
+        raise ValueError(f"Job seeker tree depth {remote_root.get('depth')} does not match {tree.depth}")
+
+    buckets = mismatched_buckets(tree, remote_root["root"], client.children)
+    if not buckets:
+        return DriftReport(tree.count, [], [], [])
+
+    remote = client.bucket_hashes(buckets)
+    selected = set(buckets)
+    resend = []
+    for key in iter_talent_pool_member_keys(db):
+        if bucket_of(key.cv_id, tree.depth) not in selected:
+            continue
+        if remote.pop(key.cv_id, None) != sent_content_hash(key):
+            resend.append(key)
+    # Whatever is left is held by the job seeker service but no longer in a talent pool
+    return DriftReport(tree.count, buckets, resend, sorted(remote))
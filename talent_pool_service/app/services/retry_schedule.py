@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.talent_pool import SyncJob
+
+RETRY_STATUS = "retrying"
+
+# Responses of the job seeker service's admission control; retried after their Retry-After
+THROTTLED_STATUS_CODES = (429, 503)
+
+
+def next_backoff(previous: Optional[float], base: float, cap: float, rng: random.Random = random) -> float:
+    """
+    Decorrelated jitter: the next delay is drawn between the base delay and three
+    times the previous one, capped. Retries of jobs that failed together spread out
+    instead of hitting the job seeker service in lockstep.
+    """
+    previous = previous or base
+    return min(cap, rng.uniform(base, previous * 3))
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or an HTTP date"""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is not None:
+        retry_at = retry_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (retry_at - (now or datetime.utcnow())).total_seconds())
+
+
+def schedule_retry(
+    sync_job: SyncJob,
+    error_message: str,
+    now: Optional[datetime] = None,
+    retry_after: Optional[float] = None,
+    rng: random.Random = random,
+):
+    """
+    Record a failed attempt on the job. Jobs below SYNC_RETRY_MAX_ATTEMPTS are left
+    for retry_failed_sync_jobs at next_attempt_at; the rest are marked failed.
+    retry_after is the delay the job seeker service asked for when it refused the
+    request under load. It replaces the backoff, with up to 10% jitter added, and
+    does not count as an attempt. The caller commits.
+    """
+    now = now or datetime.utcnow()
+    sync_job.error_message = error_message
+    if retry_after is not None:
+        delay = min(settings.SYNC_RETRY_CAP_SECONDS, retry_after * rng.uniform(1.0, 1.1))
+        sync_job.status = RETRY_STATUS
+        sync_job.next_attempt_at = now + timedelta(seconds=delay)
+        return
+    sync_job.retry_count = (sync_job.retry_count or 0) + 1
+    if sync_job.retry_count >= settings.SYNC_RETRY_MAX_ATTEMPTS:
+        sync_job.status = "failed"
+        sync_job.next_attempt_at = None
+        return
+    sync_job.backoff_seconds = next_backoff(
+        sync_job.backoff_seconds, settings.SYNC_RETRY_BASE_SECONDS, settings.SYNC_RETRY_CAP_SECONDS
+    )
+    sync_job.status = RETRY_STATUS
+    sync_job.next_attempt_at = now + timedelta(seconds=sync_job.backoff_seconds)
+
+
+def claim_due_sync_jobs(db: Session, limit: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Claim up to limit jobs whose next attempt is due, in a single UPDATE ... RETURNING.
+    A claim pushes next_attempt_at out by SYNC_RETRY_CLAIM_TIMEOUT_SECONDS instead of
+    clearing it, so a job whose send task is lost becomes due again. On PostgreSQL the
+    candidates are locked with SKIP LOCKED, so concurrent sweepers claim disjoint jobs.
+    """
+    now = now or datetime.utcnow()
+    due = select(SyncJob.id)\
+        .where(SyncJob.status == RETRY_STATUS, SyncJob.next_attempt_at <= now)\
+        .order_by(SyncJob.next_attempt_at)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)
+    stmt = update(SyncJob)\
+        .where(SyncJob.id.in_(due.scalar_subquery()))\
+        .values(
+            next_attempt_at=now + timedelta(seconds=settings.SYNC_RETRY_CLAIM_TIMEOUT_SECONDS),
+            updated_at=now,
+        )\
+        .returning(SyncJob.id)\
+        .execution_options(synchronize_session=False)
+    claimed = [str(job_id) for job_id in db.execute(stmt).scalars()]
+    db.commit()
+    return claimed
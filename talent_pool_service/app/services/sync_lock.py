@@ -0,0 +1,81 @@
+import json
+import logging
+import time
+from typing import Optional
+
+import redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Take the lease only if nobody holds it; the fencing token is incremented in
+# the same script so tokens are strictly increasing across holders.
+_ACQUIRE_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return nil
+end
+local token = redis.call('incr', KEYS[2])
+local holder = cjson.encode({run_id = ARGV[1], token = token, acquired_at = tonumber(ARGV[3])})
+redis.call('set', KEYS[1], holder, 'PX', ARGV[2])
+return token
+"""
+
+# Extend or release only while the caller's token still holds the lease
+_HEARTBEAT_SCRIPT = """
+local current = redis.call('get', KEYS[1])
+if not current or cjson.decode(current).token ~= tonumber(ARGV[1]) then
+    return 0
+end
+return redis.call('pexpire', KEYS[1], ARGV[2])
+"""
+
+_RELEASE_SCRIPT = """
+local current = redis.call('get', KEYS[1])
+if not current or cjson.decode(current).token ~= tonumber(ARGV[1]) then
+    return 0
+end
+return redis.call('del', KEYS[1])
+"""
+
+
+class SyncLease:
+    """
+    Single-flight lease for talent pool sync runs.
+    The holder keeps the lease alive with heartbeats; if it dies the lease
+    expires after ttl_seconds. Every acquisition gets a larger fencing token,
+    so work from a run whose lease was lost can be recognised and dropped.
+    """
+
+    def __init__(self, client, ttl_seconds: int, key: str = "talent-pool-sync:lease"):
+        self.client = client
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.key = key
+        self.fence_key = f"{key}:fence"
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+        self._heartbeat = client.register_script(_HEARTBEAT_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self, run_id: str) -> Optional[int]:
+        """Return the fencing token, or None if another run holds the lease"""
+        token = self._acquire(keys=[self.key, self.fence_key], args=[run_id, self.ttl_ms, int(time.time())])
+        return int(token) if token is not None else None
+
+    def heartbeat(self, token: int) -> bool:
+        """Extend the lease; False means it was lost and the caller must stop"""
+        return bool(self._heartbeat(keys=[self.key], args=[token, self.ttl_ms]))
+
+    def release(self, token: int) -> bool:
+        return bool(self._release(keys=[self.key], args=[token]))
+
+    def holder(self) -> Optional[dict]:
+        """The run currently holding the lease, with its token and remaining ttl"""
+        value = self.client.get(self.key)
+        if value is None:
+            return None
+        holder = json.loads(value)
+        holder["ttl_ms"] = self.client.pttl(self.key)
+        return holder
+
+
+sync_lease = SyncLease(redis.Redis.from_url(settings.SYNC_LOCK_REDIS_URL), settings.SYNC_LOCK_TTL_SECONDS)
@@ -0,0 +1,96 @@
+from typing import List, Tuple
+
+import msgpack
+import orjson
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+WIRE_FORMATS = ("json", "msgpack")
+
+# Phrases in a 4xx response of a receiver that could not decode a body, as
+# opposed to rejecting its contents (pydantic's JSON parse error included)
+UNREADABLE_BODY_MARKERS = ("unsupported", "value_error.json", "invalid json")
+
+
+def packb(value) -> bytes:
+    """Encode to MessagePack; timezone-aware datetimes become timestamp extension values"""
+    return msgpack.packb(value, datetime=True)
+
+
+def unpackb(data: bytes):
+    return msgpack.unpackb(data, timestamp=3)
+
+
+def encode_sync_payload(profiles: list, wire_format: str) -> dict:
+    """
+    SyncJob column values for a chunk of member documents.
+    MessagePack chunks are encoded once here and later sent as stored.
+    """
+    if wire_format == "msgpack":
+        return {"data": None, "payload": packb({"profiles": profiles}), "payload_format": "msgpack"}
+    if wire_format != "json":
+        raise ValueError(f"Unsupported sync wire format '{wire_format}', expected one of {', '.join(WIRE_FORMATS)}")
+    return {"data": {"profiles": profiles}, "payload_format": "json"}
+
+
+def encode_member_fragment(member: dict, wire_format: str) -> bytes:
+    """One member document encoded on its own, to be spliced into a sync payload"""
+    if wire_format == "msgpack":
+        return packb(member)
+    if wire_format != "json":
+        raise ValueError(f"Unsupported sync wire format '{wire_format}', expected one of {', '.join(WIRE_FORMATS)}")
+    return orjson.dumps(member)
+
+
+def assemble_sync_payload(fragments: List[bytes], wire_format: str) -> dict:
+    """
+    SyncJob column values for a chunk of encoded member fragments.
+    The {"profiles": [...]} envelope is written around the fragments by concatenation;
+    both formats are stored in payload and sent as stored.
+    """
+    if wire_format == "msgpack":
+        packer = msgpack.Packer()
+        envelope = packer.pack_map_header(1) + packer.pack("profiles") + packer.pack_array_header(len(fragments))
+        return {"data": None, "payload": envelope + b"".join(fragments), "payload_format": "msgpack"}
+    if wire_format != "json":
+        raise ValueError(f"Unsupported sync wire format '{wire_format}', expected one of {', '.join(WIRE_FORMATS)}")
+    return {"data": None, "payload": b'{"profiles":[' + b",".join(fragments) + b"]}", "payload_format": "json"}
+
+
+def sync_job_document(sync_job) -> dict:
+    """The decoded {"profiles": [...]} document of a SyncJob, whatever its stored format"""
+    if sync_job.payload_format == "msgpack":
+        return unpackb(sync_job.payload)
+    if sync_job.payload is not None:
+        return orjson.loads(sync_job.payload)
+    return sync_job.data
+
+
+def sync_job_body(sync_job) -> Tuple[bytes, str]:
+    """Request body and Content-Type of a SyncJob in the format it was stored in"""
+    if sync_job.payload_format == "msgpack":
+        return bytes(sync_job.payload), MSGPACK_CONTENT_TYPE
+    if sync_job.payload is not None:
+        return bytes(sync_job.payload), JSON_CONTENT_TYPE
+    return orjson.dumps(sync_job.data), JSON_CONTENT_TYPE
+
+
+def sync_job_json_body(sync_job) -> bytes:
+    """Plain JSON body of a SyncJob, for receivers that do not accept MessagePack"""
+    if sync_job.payload_format != "msgpack" and sync_job.payload is not None:
+        return bytes(sync_job.payload)
+    return orjson.dumps(sync_job_document(sync_job))
+
+
+def body_format_rejected(response) -> bool:
+    """
+    Whether the receiver refused a body for its Content-Encoding or Content-Type:
+    a 415, or a 4xx whose body says the encoding or format is not understood.
+    Validation errors of the profiles themselves are not.
+    """
+    if response.status_code == 415:
+        return True
+    if not 400 <= response.status_code < 500 or not isinstance(response.text, str):
+        return False
+    text = response.text.lower()
+    return any(marker in text for marker in UNREADABLE_BODY_MARKERS)
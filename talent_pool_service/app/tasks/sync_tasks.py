@@ -1,25 +1,59 @@
 import requests
 import logging
-import json
-from celery import shared_task
+import orjson
+import time
+import uuid
+from datetime import datetime
+from celery import shared_task, group, chord
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
 from app.config import settings
-from app.models.talent_pool import SyncJob, TalentPool
+from app.profiling import profiled
+from app.models.talent_pool import SyncJob, SyncManifestPart, SyncRun, TalentPool
+from app.services.compression import compress_body
+from app.services.fragment_cache import FragmentStats, member_fragment_cache
+from app.services.members import backfill_content_hashes, iter_talent_pool_member_keys, pool_shard_ranges
+from app.services.reconcile import JobSeekerTreeClient, find_drift
+from app.services.retry_schedule import (
+    THROTTLED_STATUS_CODES, claim_due_sync_jobs, parse_retry_after, schedule_retry
+)
+from app.services.sync_lock import sync_lease
+from app.tracing import (
+    TRACEPARENT_HEADER, Span, epoch_seconds, format_traceparent, new_root_context,
+    parse_traceparent, record_span, start_span
+)
+from app.services.wire_format import (
+    JSON_CONTENT_TYPE, assemble_sync_payload, body_format_rejected, sync_job_body, sync_job_json_body
+)
 
 logger = logging.getLogger(__name__)
 
 @shared_task
+@profiled("sync_talent_pool_data")
 def sync_talent_pool_data():
     """
     Scheduled background task that pushes talent pool data to the job seeker environment.
+    Fans out into one subtask per pool shard via a Celery chord; the chord callback
+    records the run summary and dispatches the bulk requests.
+    Only one run at a time: the run holds a Redis lease until its chord callback.
     """
     logger.info("Starting talent pool data synchronization")
     
+    run_id = str(uuid.uuid4())
+    fencing_token = sync_lease.acquire(run_id)
+    if fencing_token is None:
+        holder = sync_lease.holder()
+        running_id = holder["run_id"] if holder else None
+        logger.info(f"Sync run {running_id} is still in progress, skipping")
+        return {"status": "skipped", "message": "Sync already in progress", "run_id": running_id}
+    
+    # The root span is recorded by finalize_sync_run once the run is complete
+    root = new_root_context()
+    schedule_span = Span("sync.schedule", root, runId=run_id)
+    dispatched = False
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        
         # Fetch all talent pools
         talent_pools = db.query(TalentPool).all()
         
@@ -27,55 +61,315 @@ def sync_talent_pool_data():
             logger.info("No talent pools found to sync")
             return {"status": "success", "message": "No talent pools found to sync"}
         
-        # Prepare data for bulk API
-        profiles_data = []
         
-        for talent_pool in talent_pools:
-            members_data = get_talent_pool_members(talent_pool.talent_pool_id)
-            
-            for member_data in members_data:
-                # Add talent pool info to each member's profile
-                if "memberOf" not in member_data:
-                    member_data["memberOf"] = []
-                
-                member_data["memberOf"].append({
-                    "talentPoolId": talent_pool.talent_pool_id,
-                    "talentPoolName": talent_pool.talent_pool_name
-                })
-                
-                profiles_data.append(member_data)
-        
-        # Create a bulk payload
-        bulk_payload = {"profiles": profiles_data}
-        
-        # Create a sync job record
-        sync_job = SyncJob(
-            data=bulk_payload,
-            status="pending"
+        run_pool_ids = sorted(talent_pool.talent_pool_id for talent_pool in talent_pools)
+        shards = [
+            (talent_pool_id, lower, upper)
+            for talent_pool_id in run_pool_ids
+            for lower, upper in pool_shard_ranges(db, talent_pool_id, settings.SYNC_POOL_SHARD_SIZE)
+        ]
+        
+        sync_run = SyncRun(
+            id=uuid.UUID(run_id),
+            status="running",
+            fencing_token=fencing_token,
+            pool_count=len(run_pool_ids),
+            shard_count=len(shards),
+            traceparent=format_traceparent(root)
         )
-        db.add(sync_job)
+        db.add(sync_run)
         db.commit()
         
-        # Send data to Job Seeker Bulk API
-        send_bulk_data_to_job_seeker.delay(sync_job.id)
+        header = group(
+            sync_talent_pool_shard.s(
+                run_id, talent_pool_id, lower, upper, run_pool_ids, fencing_token, format_traceparent(root)
+            )
+            for talent_pool_id, lower, upper in shards
+        )
+        chord(header)(finalize_sync_run.s(run_id, fencing_token, format_traceparent(root)))
+        schedule_span.set(pools=len(run_pool_ids), shards=len(shards))
+        dispatched = True
         
-        return {"status": "success", "message": f"Scheduled sync for {len(profiles_data)} profiles"}
+        return {
+            "status": "success",
+            "message": f"Scheduled sync of {len(run_pool_ids)} talent pools in {len(shards)} shards",
+            "run_id": run_id
+        }
         
     except Exception as e:
         logger.exception("Error during talent pool data synchronization")
         return {"status": "error", "message": str(e)}
     finally:
+        # Once the chord is dispatched, its callback releases the lease
+        if not dispatched:
+            sync_lease.release(fencing_token)
+        schedule_span.finish()
+        db.close()
+
+class LeaseLostError(Exception):
+    """The run's lease expired and another run took over"""
+
+def owning_pool_id(member_of, run_pool_ids):
+    """
+    The pool whose shard sends a member, given its memberOf. Members in several
+    pools are sent once, by the first of their pools taking part in the run.
+    """
+    pool_ids = [m["talentPoolId"] for m in member_of if m["talentPoolId"] in run_pool_ids]
+    return min(pool_ids) if pool_ids else None
+
+def store_sync_job(db: Session, member_keys, run_id=None, traceparent=None, fragment_stats=None, priority="bulk"):
+    """
+    Store members as one SyncJob, encoded through the fragment cache.
+    priority is the job seeker service's partner push lane for them.
+    Returns the job id and its number of profiles, or None if none of the members still exist.
+    """
+    fragments = member_fragment_cache.fragments(db, member_keys, settings.SYNC_WIRE_FORMAT, fragment_stats)
+    if not fragments:
+        return None
+    sync_job = SyncJob(
+        run_id=run_id,
+        status="pending",
+        traceparent=traceparent,
+        priority=priority,
+        **assemble_sync_payload(fragments, settings.SYNC_WIRE_FORMAT)
+    )
+    db.add(sync_job)
+    db.commit()
+    return str(sync_job.id), len(fragments)
+
+@shared_task
+def sync_talent_pool_shard(
+    run_id, talent_pool_id, cv_id_after, cv_id_upto, run_pool_ids, fencing_token=None, traceparent=None
+):
+    """
+    Fetch one shard of a talent pool and store it as SyncJobs of SYNC_CHUNK_SIZE profiles.
+    Members are encoded through the fragment cache, so only documents changed since
+    they were last encoded are read and encoded.
+    Returns counts and job ids for the chord callback; errors are reported, not raised,
+    so one failing shard does not discard the others.
+    Each chunk renews the run's lease and stops the shard if the lease was lost.
+    The cvIds of all the shard's members, sent by this shard or not, are stored
+    as a part of the pool's manifest.
+    """
+    span = Span("sync.shard", parse_traceparent(traceparent), runId=run_id, talentPoolId=talent_pool_id)
+    db = SessionLocal()
+    try:
+        run_pool_ids = set(run_pool_ids)
+        sync_job_ids = []
+        profile_count = 0
+        fragment_stats = FragmentStats()
+        chunk = []
+        manifest_cv_ids = []
+        
+        def flush_chunk():
+            nonlocal profile_count
+            if fencing_token is not None and not sync_lease.heartbeat(fencing_token):
+                raise LeaseLostError(f"Lease of sync run {run_id} was lost")
+            stored = store_sync_job(db, chunk, run_id, traceparent, fragment_stats)
+            if stored is not None:
+                sync_job_ids.append(stored[0])
+                profile_count += stored[1]
+        
+        members = iter_talent_pool_member_keys(db, [talent_pool_id], cv_id_range=(cv_id_after, cv_id_upto))
+        for member_key in members:
+            manifest_cv_ids.append(member_key.cv_id)
+            if owning_pool_id(member_key.member_of, run_pool_ids) != talent_pool_id:
+                continue
+            chunk.append(member_key)
+            if len(chunk) >= settings.SYNC_CHUNK_SIZE:
+                flush_chunk()
+                chunk = []
+        if chunk:
+            flush_chunk()
+        
+        db.add(SyncManifestPart(run_id=run_id, talent_pool_id=talent_pool_id, cv_ids=manifest_cv_ids))
+        db.commit()
+        
+        span.set(
+            profiles=profile_count, syncJobs=len(sync_job_ids),
+            fragmentHits=fragment_stats.hits + fragment_stats.shared_hits, fragmentMisses=fragment_stats.misses
+        )
+        return {
+            "talent_pool_id": talent_pool_id,
+            "profiles": profile_count,
+            "sync_job_ids": sync_job_ids,
+            "fragment_cache": fragment_stats.to_dict()
+        }
+    
+    except Exception as e:
+        logger.exception(f"Error syncing shard of talent pool {talent_pool_id}")
+        span.set(error=type(e).__name__)
+        return {"talent_pool_id": talent_pool_id, "profiles": 0, "sync_job_ids": [], "error": str(e)}
+    
+    finally:
+        span.finish()
         db.close()
 
 @shared_task
+def finalize_sync_run(shard_results, run_id, fencing_token=None, traceparent=None):
+    """
+    Chord callback: aggregate shard results into the SyncRun summary,
+    dispatch the bulk requests and release the run's lease.
+    Once the bulk requests were sent, the manifests of the pools whose shards all
+    succeeded follow (see send_pool_manifests).
+    A run whose lease was taken over is recorded as fenced and sends nothing.
+    Records the run's root span, from the run start to the end of this callback.
+    """
+    root = parse_traceparent(traceparent)
+    span = Span("sync.finalize", root, runId=run_id)
+    started_at = None
+    db = SessionLocal()
+    try:
+        fenced = fencing_token is not None and not sync_lease.heartbeat(fencing_token)
+        
+        profiles_per_pool = {}
+        errors = []
+        sync_job_ids = []
+        fragment_stats = FragmentStats()
+        for result in shard_results:
+            pool_id = result["talent_pool_id"]
+            profiles_per_pool[pool_id] = profiles_per_pool.get(pool_id, 0) + result["profiles"]
+            sync_job_ids.extend(result["sync_job_ids"])
+            fragment_stats.add(FragmentStats.from_dict(result.get("fragment_cache")))
+            if result.get("error"):
+                errors.append({"talent_pool_id": pool_id, "error": result["error"]})
+        
+        sync_run = db.query(SyncRun).filter(SyncRun.id == run_id).first()
+        if fenced:
+            logger.warning(f"Sync run {run_id} lost its lease; not dispatching {len(sync_job_ids)} sync jobs")
+            db.query(SyncJob).filter(SyncJob.run_id == run_id).update({SyncJob.status: "fenced"})
+            sync_job_ids = []
+        
+        if sync_run:
+            if fenced:
+                sync_run.status = "fenced"
+            else:
+                sync_run.status = "failed" if errors and not sync_job_ids else "dispatched"
+            sync_run.profile_count = sum(profiles_per_pool.values())
+            sync_run.sync_job_count = len(sync_job_ids)
+            sync_run.summary = {
+                "profiles_per_pool": profiles_per_pool,
+                "errors": errors,
+                "fragment_cache": fragment_stats.to_dict()
+            }
+            sync_run.finished_at = datetime.utcnow()
+            started_at = sync_run.started_at
+        db.commit()
+        
+        failed_pool_ids = {error["talent_pool_id"] for error in errors}
+        manifest_pool_ids = [] if fenced else sorted(set(profiles_per_pool) - failed_pool_ids)
+        send_manifests = send_pool_manifests.si(run_id, manifest_pool_ids, traceparent)
+        if sync_job_ids:
+            sends = group(send_bulk_data_to_job_seeker.s(sync_job_id) for sync_job_id in sync_job_ids)
+            if manifest_pool_ids:
+                chord(sends)(send_manifests)
+            else:
+                sends.apply_async()
+        elif manifest_pool_ids:
+            send_manifests.apply_async()
+        
+        fragment_summary = fragment_stats.to_dict()
+        logger.info(
+            f"Sync run {run_id}: {sum(profiles_per_pool.values())} profiles in "
+            f"{len(sync_job_ids)} sync jobs, {len(errors)} failed shards; "
+            f"fragment cache hit rate {fragment_summary['hit_rate']:.1%}, "
+            f"about {fragment_summary['estimated_seconds_saved']:.1f}s of encoding saved"
+        )
+        return {
+            "status": "fenced" if fenced else ("success" if not errors else "partial"),
+            "run_id": run_id,
+            "profiles": sum(profiles_per_pool.values()),
+            "sync_jobs": len(sync_job_ids),
+            "errors": errors,
+            "manifest_pools": manifest_pool_ids,
+            "fragment_cache": fragment_summary
+        }
+    
+    finally:
+        if fencing_token is not None:
+            sync_lease.release(fencing_token)
+        span.finish()
+        if root is not None and isinstance(started_at, datetime):
+            record_span("sync.run", None, start=epoch_seconds(started_at), end=span.end, context=root, runId=run_id)
+        db.close()
+
+@shared_task
+def send_pool_manifests(run_id, talent_pool_ids, traceparent=None):
+    """
+    Send the manifest of each of the given pools of a run: the cvIds of all its
+    members, from which the job seeker service removes the members that were
+    dropped from the pool. Runs after the run's bulk requests; while one of them is
+    still waiting for a retry the manifests are skipped, since a member moved to
+    another pool would otherwise be deleted and re-added. Removals missed this way
+    are covered by the next run's manifests.
+    """
+    db = SessionLocal()
+    sent, failed = [], []
+    try:
+        undelivered = db.query(SyncJob)\
+            .filter(SyncJob.run_id == run_id)\
+            .filter(SyncJob.status != "success")\
+            .count()
+        if undelivered:
+            logger.info(f"Sync run {run_id} has {undelivered} undelivered sync jobs; not sending pool manifests")
+            return {"status": "skipped", "run_id": run_id, "undelivered": undelivered}
+        
+        for talent_pool_id in talent_pool_ids:
+            parts = db.query(SyncManifestPart.id, SyncManifestPart.cv_ids)\
+                .filter(SyncManifestPart.run_id == run_id)\
+                .filter(SyncManifestPart.talent_pool_id == talent_pool_id)\
+                .all()
+            cv_ids = [cv_id for _, part_cv_ids in parts for cv_id in part_cv_ids]
+            try:
+                send_pool_manifest(run_id, talent_pool_id, cv_ids, traceparent)
+            except Exception as e:
+                logger.warning(f"Manifest of pool {talent_pool_id} in sync run {run_id} failed: {e}")
+                failed.append(talent_pool_id)
+                continue
+            sent.append(talent_pool_id)
+            db.query(SyncManifestPart)\
+                .filter(SyncManifestPart.id.in_([part_id for part_id, _ in parts]))\
+                .delete(synchronize_session=False)
+            db.commit()
+        
+        return {"status": "success" if not failed else "partial", "run_id": run_id, "sent": sent, "failed": failed}
+    
+    finally:
+        db.close()
+
+def send_pool_manifest(run_id, talent_pool_id, cv_ids, traceparent=None):
+    """POST one pool's manifest to the job seeker service; raises on failure"""
+    with start_span(
+        "sync.manifest", parse_traceparent(traceparent), runId=run_id, talentPoolId=talent_pool_id
+    ) as span:
+        body = orjson.dumps({"talentPoolId": talent_pool_id, "runId": run_id, "cvIds": cv_ids})
+        compressed, encoding_headers = compress_body(body, settings.SYNC_COMPRESSION, settings.SYNC_COMPRESSION_LEVEL)
+        headers = {"Content-Type": JSON_CONTENT_TYPE, TRACEPARENT_HEADER: span.traceparent, **encoding_headers}
+        if settings.INTERNAL_API_TOKEN:
+            headers["X-Internal-Token"] = settings.INTERNAL_API_TOKEN
+        
+        response = requests.post(settings.JOB_SEEKER_MANIFEST_API_URL, data=compressed, headers=headers, timeout=120)
+        span.set(members=len(cv_ids), bytes=len(compressed), statusCode=response.status_code)
+        response.raise_for_status()
+        result = response.json()
+        span.set(removed=result.get("removed"), tombstoned=result.get("tombstoned"))
+    logger.info(
+        f"Manifest of pool {talent_pool_id} ({len(cv_ids)} members): "
+        f"{result.get('removed')} removed, {result.get('tombstoned')} tombstoned"
+    )
+    return result
+
+@shared_task
+@profiled("send_bulk_data_to_job_seeker")
 def send_bulk_data_to_job_seeker(sync_job_id):
     """
     Task to send bulk data to the Job Seeker API.
-    Implements retry and error handling.
+    A failed attempt is scheduled for retry with jittered backoff; retry_failed_sync_jobs
+    picks it up once it is due. A 429 / 503 with Retry-After from the job seeker
+    service's admission control is retried after the requested delay instead.
     """
-    MAX_RETRIES = 3
-    
     db = SessionLocal()
+    sync_job = None
     try:
         # Get the sync job
         sync_job = db.query(SyncJob).filter(SyncJob.id == sync_job_id).first()
@@ -87,157 +381,159 @@ def send_bulk_data_to_job_seeker(sync_job_id):
             logger.info(f"Sync job {sync_job_id} already completed successfully")
             return
         
-        # Send data to Job Seeker Bulk API
-        response = requests.post(
-            settings.JOB_SEEKER_BULK_API_URL,
-            json=sync_job.data,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
+        # Time spent waiting since the job was stored, including retry backoff
+        parent = parse_traceparent(sync_job.traceparent)
+        if parent is not None and sync_job.created_at is not None:
+            record_span(
+                "sync_job.queue", parent, start=epoch_seconds(sync_job.created_at), end=time.time(),
+                syncJobId=str(sync_job_id), attempt=sync_job.retry_count
+            )
+        
+        with start_span("sync_job.send", parent, syncJobId=str(sync_job_id)) as span:
+            body, content_type = sync_job_body(sync_job)
+            headers = {"Content-Type": content_type, TRACEPARENT_HEADER: span.traceparent}
+            if settings.INTERNAL_API_TOKEN:
+                headers["X-Internal-Token"] = settings.INTERNAL_API_TOKEN
+                # Resends queue behind regular sync data at the job seeker service
+                if sync_job.priority == "reconciliation":
+                    headers["X-Sync-Priority"] = "reconciliation"
+            
+            compressed, encoding_headers = compress_body(body, settings.SYNC_COMPRESSION, settings.SYNC_COMPRESSION_LEVEL)
+            
+            # Send data to Job Seeker Bulk API
+            response = requests.post(
+                settings.JOB_SEEKER_BULK_API_URL,
+                data=compressed,
+                headers={**headers, **encoding_headers},
+                timeout=30
+            )
+            if body_format_rejected(response) and (encoding_headers or content_type != JSON_CONTENT_TYPE):
+                # Receivers without compression or MessagePack support fail to parse the body;
+                # resend it as plain JSON. Profiles failing validation take the retry path below
+                logger.warning(
+                    f"Job seeker API rejected {content_type} body with {settings.SYNC_COMPRESSION} encoding, "
+                    f"sending sync job {sync_job_id} as plain JSON"
+                )
+                headers["Content-Type"] = JSON_CONTENT_TYPE
+                response = requests.post(
+                    settings.JOB_SEEKER_BULK_API_URL,
+                    data=sync_job_json_body(sync_job),
+                    headers=headers,
+                    timeout=30
+                )
+            span.set(bytes=len(compressed), statusCode=response.status_code)
         
         if response.status_code in (200, 201, 202, 204):
             # Update sync job status
             sync_job.status = "success"
+            sync_job.next_attempt_at = None
             db.commit()
             logger.info(f"Sync job {sync_job_id} completed successfully")
+        elif response.status_code in THROTTLED_STATUS_CODES and \
+                parse_retry_after(response.headers.get("Retry-After")) is not None:
+            # Refused under load: come back when the job seeker service asked us to
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            logger.info(f"Sync job {sync_job_id} throttled with {response.status_code}, retrying in {retry_after:.0f}s")
+            schedule_retry(
+                sync_job, f"Throttled with status code {response.status_code}", retry_after=retry_after
+            )
+            db.commit()
         else:
             # Handle error
             error_msg = f"API returned status code {response.status_code}: {response.text}"
             logger.warning(f"Sync job {sync_job_id} failed: {error_msg}")
-            
-            sync_job.retry_count += 1
-            if sync_job.retry_count >= MAX_RETRIES:
-                sync_job.status = "failed"
-                sync_job.error_message = error_msg
-            else:
-                sync_job.error_message = error_msg
-            
+            schedule_retry(sync_job, error_msg)
             db.commit()
-            
-            # If we haven't reached max retries, schedule a retry
-            if sync_job.retry_count < MAX_RETRIES:
-                send_bulk_data_to_job_seeker.apply_async(
-                    args=[sync_job_id],
-                    countdown=60 * (2 ** (sync_job.retry_count - 1))  # Exponential backoff
-                )
     
     except Exception as e:
         logger.exception(f"Error in sync job {sync_job_id}")
-        
-        # Update sync job with error
-        sync_job.retry_count += 1
-        if sync_job.retry_count >= MAX_RETRIES:
-            sync_job.status = "failed"
-            sync_job.error_message = str(e)
-        else:
-            sync_job.error_message = str(e)
-        
-        db.commit()
-        
-        # If we haven't reached max retries, schedule a retry
-        if sync_job.retry_count < MAX_RETRIES:
-            send_bulk_data_to_job_seeker.apply_async(
-                args=[sync_job_id],
-                countdown=60 * (2 ** (sync_job.retry_count - 1))  # Exponential backoff
-            )
+        if sync_job is not None:
+            db.rollback()
+            schedule_retry(sync_job, str(e))
+            db.commit()
     
     finally:
         db.close()
 
 @shared_task
-def retry_failed_sync_jobs():
+def reconcile_with_job_seeker():
     """
-    Task to retry failed sync jobs that haven't reached max retries.
+    Scheduled drift check against the job seeker service: compare the Merkle trees
+    over (cvId, contentHash) and resend only the members it does not hold as sent.
+    Skipped while a sync run is in progress, since its members would show as drift.
     """
-    MAX_RETRIES = 3
+    if sync_lease.holder() is not None:
+        logger.info("Sync run in progress, skipping reconciliation")
+        return {"status": "skipped", "message": "Sync run in progress"}
     
+    client = JobSeekerTreeClient(settings.JOB_SEEKER_CONSISTENCY_API_URL, settings.INTERNAL_API_TOKEN)
     db = SessionLocal()
     try:
-        # Find failed sync jobs with retry count less than max
-        failed_jobs = db.query(SyncJob).filter(
-            SyncJob.status == "failed",
-            SyncJob.retry_count < MAX_RETRIES
-        ).all()
-        
-        for job in failed_jobs:
-            logger.info(f"Retrying failed sync job {job.id}")
-            
-            # Reset status to pending
-            job.status = "pending"
-            db.commit()
-            
-            # Schedule retry
-            send_bulk_data_to_job_seeker.delay(job.id)
+        backfilled = backfill_content_hashes(db)
+        report = find_drift(db, client)
+        
+        sync_job_ids = []
+        for start in range(0, len(report.resend), settings.SYNC_CHUNK_SIZE):
+            stored = store_sync_job(
+                db, report.resend[start:start + settings.SYNC_CHUNK_SIZE], priority="reconciliation"
+            )
+            if stored is not None:
+                sync_job_ids.append(stored[0])
+        if sync_job_ids:
+            group(send_bulk_data_to_job_seeker.s(sync_job_id) for sync_job_id in sync_job_ids).apply_async()
+        if report.extraneous:
+            logger.warning(
+                f"{len(report.extraneous)} profiles at the job seeker service are in no talent pool, "
+                f"e.g. {', '.join(report.extraneous[:5])}"
+            )
         
-        return {"status": "success", "message": f"Scheduled {len(failed_jobs)} jobs for retry"}
+        traffic = client.traffic()
+        logger.info(
+            f"Reconciliation of {report.members} members: {len(report.buckets)} mismatched buckets, "
+            f"{len(report.resend)} resent in {len(sync_job_ids)} sync jobs, "
+            f"{traffic['bytes_sent'] + traffic['bytes_received']} bytes in {traffic['requests']} requests"
+        )
+        return {
+            "status": "success",
+            **report.to_dict(),
+            "sync_jobs": len(sync_job_ids),
+            "backfilled_hashes": backfilled,
+            "traffic": traffic
+        }
     
     except Exception as e:
-        logger.exception("Error during retry of failed sync jobs")
-        return {"status": "error", "message": str(e)}
+        logger.exception("Error during reconciliation with the job seeker service")
+        return {"status": "error", "message": str(e), "traffic": client.traffic()}
     
     finally:
         db.close()
 
-def get_talent_pool_members(talent_pool_id):
+@shared_task
+def retry_failed_sync_jobs():
     """
-    Helper function to get members of a talent pool.
-    In a real application, this would be a database query.
-    This is a simplified example that returns mock data.
+    Sweep for sync jobs whose next attempt is due.
+    Jobs are claimed in batches with a single UPDATE ... RETURNING and their send
+    tasks are dispatched as groups of SYNC_RETRY_DISPATCH_BATCH_SIZE.
     """
+    db = SessionLocal()
+    try:
+        claimed_total = 0
+        while True:
+            claimed = claim_due_sync_jobs(db, settings.SYNC_RETRY_CLAIM_BATCH_SIZE)
+            for start in range(0, len(claimed), settings.SYNC_RETRY_DISPATCH_BATCH_SIZE):
+                batch = claimed[start:start + settings.SYNC_RETRY_DISPATCH_BATCH_SIZE]
+                group(send_bulk_data_to_job_seeker.s(sync_job_id) for sync_job_id in batch).apply_async()
+            claimed_total += len(claimed)
+            if len(claimed) < settings.SYNC_RETRY_CLAIM_BATCH_SIZE:
+                break
+        
+        if claimed_total:
+            logger.info(f"Retrying {claimed_total} sync jobs")
+        return {"status": "success", "message": f"Scheduled {claimed_total} jobs for retry"}
     
-    return [
-        {
-            "cvId": f"cv-{talent_pool_id}-1",
-            "lastModifiedDt": "2025-01-29T09:49:41.228Z",
-            "user": {
-                "userId": f"user-{talent_pool_id}-1",
-                "candidateCode": "WBJ-101"
-            },
-            "cvProfile": {
-                "workingHours": 36,
-                "willingToTravel": False
-            },
-            "cvAddress": {
-                "geoLocation": [52.3730796, 4.8924534]
-            },
-            "cvItems": {
-                "experience": [
-                    {
-                        "professionNm": "Data Consultant",
-                        "company": "ABC Corp",
-                        "startD": "2020-01-01",
-                        "endD": "2022-12-31",
-                        "location": "Amsterdam",
-                        "description": "Worked on data analytics projects"
-                    }
-                ],
-                "education": [
-                    {
-                        "educationalInstitutionNm": "University of Amsterdam",
-                        "degreeCode": "MSc",
-                        "degreeCodeJobDigger": "WO",
-                        "fieldOfStudyNm": "Data Science",
-                        "educationalInstitutionLocation": "Amsterdam",
-                        "startD": "2015-09-01",
-                        "endD": "2019-06-30",
-                        "educationCompleted": True,
-                        "educationSpecializationDescription": "Focus on machine learning"
-                    }
-                ]
-            },
-            "visibleInTalentPool": True,
-            "applicationStatus": [
-                {
-                    "jobOfferCode": "2784631350_1",
-                    "applicationStatus": "in-progress"
-                }
-            ],
-            "matchFeedback": [
-                {
-                    "jobOfferCode": "2784631350_1",
-                    "matchStatus": "good-match"
-                }
-            ]
-        },
-        # More members would be here in a real application
-    ]
\ No newline at end of file
+    except Exception as e:
+        logger.exception("Error during retry of failed sync jobs")
+        return {"status": "error", "message": str(e)}
+    
+    finally:
+        db.close()
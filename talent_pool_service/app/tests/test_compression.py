@@ -0,0 +1,24 @@
+import gzip
+
+import pytest
+import zstandard
+
+from app.services.compression import compress_body
+
+BODY = b'{"profiles":[' + b",".join([b'{"cvId":"cv-%d","description":"Data analyst"}' % i for i in range(200)]) + b"]}"
+
+def test_compress_body_round_trips_and_sets_content_encoding():
+    body, headers = compress_body(BODY, "gzip", 6)
+    assert headers == {"Content-Encoding": "gzip"}
+    assert gzip.decompress(body) == BODY
+    
+    body, headers = compress_body(BODY, "zstd", 3)
+    assert headers == {"Content-Encoding": "zstd"}
+    assert zstandard.ZstdDecompressor().decompress(body) == BODY
+    assert len(body) < len(BODY) / 5
+    
+    assert compress_body(BODY, "none", 0) == (BODY, {})
+
+def test_compress_body_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        compress_body(BODY, "brotli", 5)
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db_routing import ReplicaRouter, RoutingSession
+
+metadata = MetaData()
+pools = Table("pools", metadata, Column("talent_pool_id", String, primary_key=True))
+
+
+def test_pool_reads_use_the_replica_until_the_session_writes(tmp_path):
+    """Two SQLite files stand in for the primary and its replica"""
+    engines = {}
+    for name in ("primary", "replica"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        metadata.create_all(engines[name])
+        with engines[name].begin() as connection:
+            connection.execute(insert(pools).values(talent_pool_id=f"{name}-pool"))
+    lag = {"seconds": 0.0}
+    router = ReplicaRouter(
+        [engines["replica"]], max_lag_seconds=5, check_interval=0,
+        lag_probe=lambda engine: lag["seconds"], monitor=False,
+    )
+    router.check_replicas()
+    read_sessions = sessionmaker(bind=engines["primary"], class_=RoutingSession, router=router, read_only=True)
+    pool_ids = select(pools.c.talent_pool_id).order_by(pools.c.talent_pool_id)
+
+    with read_sessions() as db:
+        assert db.execute(pool_ids).scalars().all() == ["replica-pool"]
+        db.execute(insert(pools).values(talent_pool_id="new-pool"))
+        assert db.execute(pool_ids).scalars().all() == ["new-pool", "primary-pool"]
+
+    lag["seconds"] = 60.0
+    router.check_replicas()
+    with read_sessions() as db:
+        assert db.execute(pool_ids).scalars().all() == ["primary-pool"]
+    assert router.status()["primaryFallbacks"] == 1
+
+    for engine in engines.values():
+        engine.dispose()
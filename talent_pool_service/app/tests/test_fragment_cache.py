@@ -0,0 +1,65 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import orjson
+
+from app.services.fragment_cache import FragmentCache, FragmentStats, LRUFragmentCache
+from app.services.members import MemberKey, member_content_hash
+
+MODIFIED = datetime(2025, 1, 29, 9, 49, 41)
+POOL_A = [{"talentPoolId": "pool-a", "talentPoolName": "Pool A"}]
+
+def key(cv_id, updated_at=MODIFIED, member_of=POOL_A):
+    return MemberKey(cv_id, MODIFIED, True, updated_at, "hash-1", member_of)
+
+def loader(documents):
+    def load(db, cv_ids):
+        return {cv_id: (MODIFIED, True, documents[cv_id][0], "hash-1", documents[cv_id][1]) for cv_id in cv_ids if cv_id in documents}
+    return load
+
+def test_unchanged_members_are_served_from_the_cache():
+    documents = {"cv-1": (MODIFIED, {"user": {"userId": "u-1"}}), "cv-2": (MODIFIED, {})}
+    cache = FragmentCache(max_entries=100, max_bytes=1 << 20)
+    
+    with patch("app.services.fragment_cache.load_member_documents", side_effect=loader(documents)) as load:
+        first_stats, second_stats = FragmentStats(), FragmentStats()
+        first = cache.fragments(None, [key("cv-1"), key("cv-2")], "json", first_stats)
+        second = cache.fragments(None, [key("cv-1"), key("cv-2")], "json", second_stats)
+    
+    assert first == second
+    assert orjson.loads(first[0]) == {
+        "user": {"userId": "u-1"}, "cvId": "cv-1", "lastModifiedDt": "2025-01-29T09:49:41",
+        "visibleInTalentPool": True, "memberOf": POOL_A, "contentHash": member_content_hash("hash-1", POOL_A),
+    }
+    assert load.call_count == 1
+    assert (first_stats.misses, second_stats.hits) == (2, 2)
+    assert second_stats.to_dict()["hit_rate"] == 1.0
+
+def test_changed_or_deleted_members_are_rebuilt():
+    later = datetime(2025, 2, 1)
+    documents = {"cv-1": (MODIFIED, {"v": 1}), "cv-2": (MODIFIED, {})}
+    cache = FragmentCache(max_entries=100, max_bytes=1 << 20)
+    
+    with patch("app.services.fragment_cache.load_member_documents", side_effect=loader(documents)):
+        cache.fragments(None, [key("cv-1"), key("cv-2")], "json")
+        documents["cv-1"] = (later, {"v": 2})
+        del documents["cv-2"]
+        stats = FragmentStats()
+        fragments = cache.fragments(
+            None, [key("cv-1", updated_at=later), key("cv-2", member_of=POOL_A * 2)], "json", stats
+        )
+    
+    assert [orjson.loads(f)["v"] for f in fragments] == [2]
+    assert (stats.hits, stats.misses) == (0, 2)
+
+def test_lru_is_bounded_by_bytes():
+    cache = LRUFragmentCache(max_entries=10, max_bytes=10)
+    cache.put("a", "v1", b"12345")
+    cache.put("b", "v1", b"12345")
+    cache.get("a", "v1")
+    cache.put("c", "v1", b"123")
+    
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == b"12345"
+    assert cache.get("a", "v2") is None
+    assert cache.size_bytes == 8
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from app.services.members import group_member_rows
+
+def test_group_member_rows_merges_memberships_per_profile():
+    modified = datetime(2025, 1, 29, 9, 49, 41)
+    document = {"user": {"userId": "user-1", "candidateCode": "WBJ-101"}}
+    rows = [
+        ("cv-1", modified, True, document, "pool-a", "Pool A"),
+        ("cv-1", modified, True, document, "pool-b", "Pool B"),
+        ("cv-2", None, False, {}, "pool-a", "Pool A"),
+    ]
+    
+    members = list(group_member_rows(rows))
+    
+    assert [m["cvId"] for m in members] == ["cv-1", "cv-2"]
+    assert members[0]["memberOf"] == [
+        {"talentPoolId": "pool-a", "talentPoolName": "Pool A"},
+        {"talentPoolId": "pool-b", "talentPoolName": "Pool B"},
+    ]
+    assert members[0]["lastModifiedDt"] == "2025-01-29T09:49:41"
+    assert members[0]["user"] == document["user"]
+    assert members[1]["visibleInTalentPool"] is False
+
+def test_group_member_rows_handles_empty_input():
+    assert list(group_member_rows([])) == []
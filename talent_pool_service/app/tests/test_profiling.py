@@ -0,0 +1,38 @@
+import time
+from unittest.mock import patch
+
+from app.profiling import capture_info, profiled
+
+class InMemoryRegistry:
+    def __init__(self, remaining):
+        self.remaining = remaining
+        self.captures = []
+    
+    def claim(self, target):
+        if self.remaining == 0:
+            return None
+        self.remaining -= 1
+        return {"mode": "sampling", "interval_ms": 1}
+    
+    def add(self, capture):
+        self.captures.append(capture)
+
+@profiled("send_bulk_data_to_job_seeker")
+def slow_task(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+    return "done"
+
+def test_profiled_task_is_captured_only_while_armed():
+    registry = InMemoryRegistry(remaining=1)
+    with patch("app.profiling.profiling_registry", registry):
+        assert slow_task(0.05) == "done"
+        assert slow_task(0.01) == "done"
+    
+    assert len(registry.captures) == 1
+    capture = registry.captures[0]
+    assert capture.target == "send_bulk_data_to_job_seeker"
+    assert capture.duration_ms >= 50
+    assert "slow_task" in capture.collapsed
+    assert capture_info(capture)["has_pstats"] is False
@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock, patch
+
+import orjson
+import pytest
+
+from app.services.members import MemberKey
+from app.services.merkle import MerkleTree, bucket_of, mismatched_buckets
+from app.services.reconcile import JobSeekerTreeClient, find_drift, sent_content_hash
+
+POOL_A = [{"talentPoolId": "pool-a", "talentPoolName": "Pool A"}]
+
+def keys(count):
+    return [MemberKey(f"cv-{i}", None, True, None, f"hash-{i}", POOL_A) for i in range(count)]
+
+class FakeJobSeeker:
+    """The job seeker side of the Merkle endpoints over a dict of cvId -> contentHash"""
+    
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.tree = MerkleTree.build(hashes.items())
+    
+    def request(self, method, url, data=None, headers=None, timeout=None):
+        body = orjson.loads(data) if data else None
+        if url.endswith("/merkle"):
+            result = {"depth": self.tree.depth, "root": self.tree.root, "profiles": self.tree.count}
+        elif url.endswith("/merkle/nodes"):
+            result = {"nodes": {k: v for p in body["prefixes"] for k, v in self.tree.children(p).items()}}
+        else:
+            result = {"profiles": [
+                {"cvId": cv_id, "contentHash": h} for cv_id, h in self.hashes.items() if bucket_of(cv_id) in body["buckets"]
+            ]}
+        return MagicMock(content=orjson.dumps(result), raise_for_status=lambda: None)
+
+def test_tree_is_independent_of_order():
+    entries = [(f"cv-{i}", f"hash-{i}") for i in range(500)]
+    
+    assert MerkleTree.build(entries).root == MerkleTree.build(reversed(entries)).root
+    assert MerkleTree.build(entries).root != MerkleTree.build(entries[:-1]).root
+    assert MerkleTree.build([]).root is None
+
+def test_mismatched_buckets_descends_into_differing_nodes_only():
+    entries = {f"cv-{i}": f"hash-{i}" for i in range(2000)}
+    local = MerkleTree.build(entries.items())
+    remote = MerkleTree.build({**entries, "cv-7": "changed", "cv-extra": "x"}.items())
+    fetched = []
+    
+    def fetch_children(prefixes):
+        fetched.append(prefixes)
+        return {k: v for p in prefixes for k, v in remote.children(p).items()}
+    
+    assert mismatched_buckets(local, remote.root, fetch_children) == sorted({bucket_of("cv-7"), bucket_of("cv-extra")})
+    assert len(fetched) == local.depth
+    assert mismatched_buckets(local, local.root, fetch_children) == []
+
+@patch("app.services.reconcile.iter_talent_pool_member_keys")
+def test_find_drift_costs_one_request_without_drift(mock_keys):
+    members = keys(3000)
+    mock_keys.side_effect = lambda db: iter(members)
+    client = JobSeekerTreeClient("http://js/api/consistency", http=FakeJobSeeker(
+        {key.cv_id: sent_content_hash(key) for key in members}
+    ))
+    
+    report = find_drift(None, client)
+    
+    assert (report.members, report.resend, report.extraneous) == (3000, [], [])
+    assert client.requests == 1
+    assert client.bytes_received < 200
+
+@patch("app.services.reconcile.iter_talent_pool_member_keys")
+def test_find_drift_resends_mismatched_members(mock_keys):
+    members = keys(3000)
+    mock_keys.side_effect = lambda db: iter(members)
+    remote = {key.cv_id: sent_content_hash(key) for key in members}
+    remote["cv-10"] = "stale"
+    del remote["cv-20"]
+    remote["cv-gone"] = "x"
+    client = JobSeekerTreeClient("http://js/api/consistency", http=FakeJobSeeker(remote))
+    
+    report = find_drift(None, client)
+    
+    assert sorted(key.cv_id for key in report.resend) == ["cv-10", "cv-20"]
+    assert report.extraneous == ["cv-gone"]
+    assert client.bytes_sent + client.bytes_received < 8 * 1024
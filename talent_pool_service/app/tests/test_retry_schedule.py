@@ -0,0 +1,55 @@
+import random
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.talent_pool import SyncJob
+from app.services.retry_schedule import claim_due_sync_jobs, next_backoff, parse_retry_after, schedule_retry
+from app.config import settings
+
+def test_next_backoff_stays_within_base_and_cap():
+    rng = random.Random(42)
+    delay = None
+    for _ in range(50):
+        previous = delay
+        delay = next_backoff(previous, base=30, cap=600, rng=rng)
+        assert 30 <= delay <= 600
+        assert delay <= max(30, (previous or 30) * 3)
+
+def test_schedule_retry_marks_job_failed_after_max_attempts():
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    job = SyncJob(status="pending", retry_count=0)
+    
+    schedule_retry(job, "API returned status code 503", now=now)
+    assert job.status == "retrying"
+    assert job.next_attempt_at == now + timedelta(seconds=job.backoff_seconds)
+    
+    job.retry_count = settings.SYNC_RETRY_MAX_ATTEMPTS - 1
+    schedule_retry(job, "API returned status code 503", now=now)
+    assert job.status == "failed"
+    assert job.next_attempt_at is None
+
+def test_claim_due_sync_jobs_claims_in_one_update_returning():
+    db = MagicMock()
+    db.execute.return_value.scalars.return_value = ["job-1", "job-2"]
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    
+    claimed = claim_due_sync_jobs(db, limit=500, now=now)
+    
+    assert claimed == ["job-1", "job-2"]
+    db.execute.assert_called_once()
+    db.commit.assert_called_once()
+    sql = str(db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE sync_jobs SET next_attempt_at=")
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY sync_jobs.next_attempt_at" in sql
+    assert sql.endswith("RETURNING sync_jobs.id")
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    assert parse_retry_after("30", now) == 30.0
+    assert parse_retry_after("Mon, 01 Jan 2024 12:01:30 GMT", now) == 90.0
+    assert parse_retry_after("Mon, 01 Jan 2024 11:00:00 GMT", now) == 0.0
+    assert parse_retry_after("soon", now) is None
+    assert parse_retry_after(None, now) is None
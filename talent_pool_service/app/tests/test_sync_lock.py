@@ -0,0 +1,36 @@
+import fakeredis
+import pytest
+
+from app.services.sync_lock import SyncLease
+
+@pytest.fixture
+def lease():
+    return SyncLease(fakeredis.FakeRedis(), ttl_seconds=30)
+
+def test_second_acquire_fails_until_the_lease_is_released(lease):
+    token = lease.acquire("run-1")
+    
+    assert lease.acquire("run-2") is None
+    assert lease.holder()["run_id"] == "run-1" and lease.holder()["token"] == token
+    assert 0 < lease.holder()["ttl_ms"] <= 30000
+    assert lease.release(token)
+    # Fencing tokens keep increasing across holders
+    assert lease.acquire("run-2") > token
+
+def test_heartbeat_with_a_stale_token_fails(lease):
+    stale = lease.acquire("run-1")
+    lease.client.delete(lease.key)  # the lease expired while run-1 stalled
+    current = lease.acquire("run-2")
+    
+    assert not lease.heartbeat(stale)
+    assert lease.heartbeat(current)
+    assert lease.holder()["run_id"] == "run-2"
+
+def test_release_by_a_non_holder_is_a_no_op(lease):
+    token = lease.acquire("run-1")
+    
+    assert not lease.release(token + 1)
+    assert lease.holder()["token"] == token
+    assert lease.release(token)
+    assert lease.holder() is None
+    assert not lease.release(token)
@@ -1,10 +1,22 @@
+import orjson
 import pytest
+from datetime import datetime
 from unittest.mock import patch, MagicMock
-from app.tasks.sync_tasks import sync_talent_pool_data, send_bulk_data_to_job_seeker
+from app.models.talent_pool import SyncJob, SyncManifestPart
+from app.services.members import MemberKey
+from app.services.wire_format import sync_job_document
+from app.tasks.sync_tasks import (
+    sync_talent_pool_data, sync_talent_pool_shard, finalize_sync_run, send_pool_manifests,
+    send_bulk_data_to_job_seeker, retry_failed_sync_jobs
+)
 
 @patch('app.tasks.sync_tasks.SessionLocal')
-@patch('app.tasks.sync_tasks.send_bulk_data_to_job_seeker')
-def test_sync_talent_pool_data(mock_send_task, mock_session):
+@patch('app.tasks.sync_tasks.chord')
+@patch('app.tasks.sync_tasks.pool_shard_ranges')
+@patch('app.tasks.sync_tasks.sync_lease')
+def test_sync_talent_pool_data(mock_lease, mock_shard_ranges, mock_chord, mock_session):
+    mock_lease.acquire.return_value = 7
+    
     # Create mock session and query results
     mock_db = MagicMock()
     mock_session.return_value = mock_db
@@ -16,21 +28,126 @@ def test_sync_talent_pool_data(mock_send_task, mock_session):
     
     mock_db.query().all.return_value = [mock_talent_pool]
     
-    # Mock the sync job creation
-    mock_sync_job = MagicMock()
-    mock_sync_job.id = "test-job-id"
-    mock_db.add.return_value = None
-    mock_db.commit.return_value = None
+    # The pool is split into two shards
+    mock_shard_ranges.return_value = [(None, "cv-500"), ("cv-500", None)]
     
     # Call the function
     result = sync_talent_pool_data()
     
     # Check the results
     assert result["status"] == "success"
-    assert "Scheduled sync" in result["message"]
+    assert "Scheduled sync of 1 talent pools in 2 shards" in result["message"]
+    
+    # Verify that one subtask per shard was fanned out under a chord
+    header = mock_chord.call_args[0][0]
+    assert len(header.tasks) == 2
+    mock_chord.return_value.assert_called_once()
+    
+    # The lease stays held until the chord callback releases it
+    mock_lease.release.assert_not_called()
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.sync_lease')
+def test_sync_talent_pool_data_skips_while_another_run_holds_the_lease(mock_lease, mock_session):
+    mock_lease.acquire.return_value = None
+    mock_lease.holder.return_value = {"run_id": "running-run", "token": 3}
+    
+    result = sync_talent_pool_data()
+    
+    assert result["status"] == "skipped"
+    assert result["run_id"] == "running-run"
+    mock_session.assert_not_called()
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.member_fragment_cache')
+@patch('app.tasks.sync_tasks.iter_talent_pool_member_keys')
+@patch('app.tasks.sync_tasks.settings')
+def test_sync_talent_pool_shard_chunks_owned_members(mock_settings, mock_iter_keys, mock_cache, mock_session):
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    mock_settings.SYNC_CHUNK_SIZE = 2
+    mock_settings.SYNC_WIRE_FORMAT = "json"
+    
+    def member(cv_id, *pool_ids):
+        return MemberKey(cv_id, None, True, None, None, [{"talentPoolId": p, "talentPoolName": p} for p in pool_ids])
     
-    # Verify that the background task was called
-    mock_send_task.delay.assert_called_once()
+    mock_iter_keys.return_value = iter([
+        member("cv-1", "pool-b"),
+        member("cv-2", "pool-a", "pool-b"),  # sent by pool-a's shard
+        member("cv-3", "pool-b"),
+        member("cv-4", "pool-b", "pool-z"),  # pool-z is not part of this run
+    ])
+    mock_cache.fragments.side_effect = lambda db, keys, wire_format, stats: [
+        orjson.dumps({"cvId": key.cv_id}) for key in keys
+    ]
+    
+    result = sync_talent_pool_shard("run-1", "pool-b", None, None, ["pool-a", "pool-b"])
+    
+    assert result["profiles"] == 3
+    assert len(result["sync_job_ids"]) == 2
+    added = [call.args[0] for call in mock_db.add.call_args_list]
+    chunks = [sync_job_document(row)["profiles"] for row in added if isinstance(row, SyncJob)]
+    assert [[m["cvId"] for m in chunk] for chunk in chunks] == [["cv-1", "cv-3"], ["cv-4"]]
+    # The manifest part lists every member of the shard, including those sent by other pools
+    parts = [row for row in added if isinstance(row, SyncManifestPart)]
+    assert [(p.talent_pool_id, p.cv_ids) for p in parts] == [("pool-b", ["cv-1", "cv-2", "cv-3", "cv-4"])]
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.sync_lease')
+@patch('app.tasks.sync_tasks.chord')
+@patch('app.tasks.sync_tasks.send_pool_manifests')
+def test_finalize_sync_run_sends_manifests_of_complete_pools(mock_manifests, mock_chord, mock_lease, mock_session):
+    mock_session.return_value = MagicMock()
+    mock_lease.heartbeat.return_value = True
+    shard_results = [
+        {"talent_pool_id": "pool-a", "profiles": 2, "sync_job_ids": ["job-1"]},
+        {"talent_pool_id": "pool-a", "profiles": 0, "sync_job_ids": []},
+        {"talent_pool_id": "pool-b", "profiles": 1, "sync_job_ids": ["job-2"]},
+        {"talent_pool_id": "pool-b", "profiles": 0, "sync_job_ids": [], "error": "boom"},
+    ]
+    
+    result = finalize_sync_run(shard_results, "run-1", fencing_token=7)
+    
+    # pool-b had a failed shard, so its manifest would be incomplete
+    assert result["manifest_pools"] == ["pool-a"]
+    mock_manifests.si.assert_called_once_with("run-1", ["pool-a"], None)
+    # The manifests follow the bulk requests
+    assert len(mock_chord.call_args[0][0].tasks) == 2
+    mock_chord.return_value.assert_called_once_with(mock_manifests.si.return_value)
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+def test_send_pool_manifests_waits_for_undelivered_sync_jobs(mock_post, mock_session):
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    mock_db.query.return_value.filter.return_value.filter.return_value.count.return_value = 1
+    
+    result = send_pool_manifests("run-1", ["pool-a"])
+    
+    assert result["status"] == "skipped"
+    mock_post.assert_not_called()
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+@patch('app.tasks.sync_tasks.settings')
+def test_send_pool_manifests_posts_the_pool_members(mock_settings, mock_post, mock_session):
+    mock_settings.SYNC_COMPRESSION = "none"
+    mock_settings.SYNC_COMPRESSION_LEVEL = 3
+    mock_settings.INTERNAL_API_TOKEN = "secret"
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    filtered = mock_db.query.return_value.filter.return_value.filter.return_value
+    filtered.count.return_value = 0
+    filtered.all.return_value = [("part-1", ["cv-1", "cv-2"]), ("part-2", ["cv-3"])]
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = {"removed": 1, "tombstoned": 0}
+    
+    result = send_pool_manifests("run-1", ["pool-a"])
+    
+    assert result == {"status": "success", "run_id": "run-1", "sent": ["pool-a"], "failed": []}
+    body = orjson.loads(mock_post.call_args.kwargs["data"])
+    assert body == {"talentPoolId": "pool-a", "runId": "run-1", "cvIds": ["cv-1", "cv-2", "cv-3"]}
+    assert mock_post.call_args.kwargs["headers"]["X-Internal-Token"] == "secret"
 
 @patch('app.tasks.sync_tasks.SessionLocal')
 @patch('app.tasks.sync_tasks.requests.post')
@@ -44,6 +161,7 @@ def test_send_bulk_data_to_job_seeker_success(mock_post, mock_session):
     mock_sync_job.id = "test-job-id"
     mock_sync_job.status = "pending"
     mock_sync_job.data = {"profiles": []}
+    mock_sync_job.payload = None
     mock_sync_job.retry_count = 0
     
     mock_db.query().filter().first.return_value = mock_sync_job
@@ -61,4 +179,168 @@ def test_send_bulk_data_to_job_seeker_success(mock_post, mock_session):
     
     # Verify that the sync job was updated
     assert mock_sync_job.status == "success"
-    mock_db.commit.assert_called_once()
\ No newline at end of file
+    mock_db.commit.assert_called_once()
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+def test_send_bulk_data_to_job_seeker_failure_schedules_retry(mock_post, mock_session):
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    
+    mock_sync_job = MagicMock()
+    mock_sync_job.status = "pending"
+    mock_sync_job.data = {"profiles": []}
+    mock_sync_job.payload = None
+    mock_sync_job.retry_count = 0
+    mock_sync_job.backoff_seconds = None
+    mock_db.query().filter().first.return_value = mock_sync_job
+    
+    mock_post.return_value = MagicMock(status_code=503, text="unavailable")
+    
+    with patch('app.tasks.sync_tasks.send_bulk_data_to_job_seeker.apply_async') as mock_apply_async:
+        send_bulk_data_to_job_seeker("test-job-id")
+    
+    # The retry is left to the sweep instead of being queued by the failing task
+    mock_apply_async.assert_not_called()
+    assert mock_sync_job.status == "retrying"
+    assert mock_sync_job.retry_count == 1
+    assert mock_sync_job.next_attempt_at is not None
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+def test_send_bulk_data_to_job_seeker_honours_retry_after(mock_post, mock_session):
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    
+    mock_sync_job = MagicMock()
+    mock_sync_job.status = "pending"
+    mock_sync_job.data = {"profiles": []}
+    mock_sync_job.payload = None
+    mock_sync_job.retry_count = 2
+    mock_sync_job.backoff_seconds = 30.0
+    mock_db.query().filter().first.return_value = mock_sync_job
+    
+    mock_post.return_value = MagicMock(status_code=429, text="busy", headers={"Retry-After": "120"})
+    
+    before = datetime.utcnow()
+    send_bulk_data_to_job_seeker("test-job-id")
+    
+    # Throttling does not use up an attempt and replaces the backoff
+    assert mock_sync_job.status == "retrying"
+    assert mock_sync_job.retry_count == 2
+    assert mock_sync_job.backoff_seconds == 30.0
+    delay = (mock_sync_job.next_attempt_at - before).total_seconds()
+    assert 120 <= delay <= 133
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.group')
+@patch('app.tasks.sync_tasks.claim_due_sync_jobs')
+@patch('app.tasks.sync_tasks.settings')
+def test_retry_failed_sync_jobs_dispatches_claimed_jobs_in_batches(mock_settings, mock_claim, mock_group, mock_session):
+    mock_settings.SYNC_RETRY_CLAIM_BATCH_SIZE = 3
+    mock_settings.SYNC_RETRY_DISPATCH_BATCH_SIZE = 2
+    mock_claim.side_effect = [["job-1", "job-2", "job-3"], ["job-4"]]
+    
+    result = retry_failed_sync_jobs()
+    
+    assert result["message"] == "Scheduled 4 jobs for retry"
+    assert mock_claim.call_count == 2
+    batches = [list(call.args[0]) for call in mock_group.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 1, 1]
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+def test_send_bulk_data_to_job_seeker_falls_back_to_plain_json_on_415(mock_post, mock_session):
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    
+    mock_sync_job = MagicMock()
+    mock_sync_job.status = "pending"
+    mock_sync_job.data = {"profiles": []}
+    mock_sync_job.payload = None
+    mock_db.query().filter().first.return_value = mock_sync_job
+    
+    mock_post.side_effect = [MagicMock(status_code=415), MagicMock(status_code=202)]
+    
+    with patch('app.tasks.sync_tasks.settings.SYNC_COMPRESSION', "gzip"):
+        send_bulk_data_to_job_seeker("test-job-id")
+    
+    first, second = mock_post.call_args_list
+    assert first.kwargs["headers"]["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in second.kwargs["headers"]
+    assert second.kwargs["data"] == b'{"profiles":[]}'
+    assert mock_sync_job.status == "success"
+
+@patch('app.tasks.sync_tasks.schedule_retry')
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+def test_send_bulk_data_to_job_seeker_retries_a_422_for_invalid_profiles(mock_post, mock_session, mock_retry):
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    
+    mock_sync_job = MagicMock()
+    mock_sync_job.status = "pending"
+    mock_sync_job.data = {"profiles": [{"cvId": "cv-1"}]}
+    mock_sync_job.payload = None
+    mock_db.query().filter().first.return_value = mock_sync_job
+    
+    mock_post.return_value = MagicMock(
+        status_code=422, text='{"detail":[{"loc":["profiles",0,"user"],"msg":"field required"}]}'
+    )
+    
+    with patch('app.tasks.sync_tasks.settings.SYNC_COMPRESSION', "gzip"):
+        send_bulk_data_to_job_seeker("test-job-id")
+    
+    assert mock_post.call_count == 1
+    assert mock_retry.call_args.args[1].startswith("API returned status code 422")
+    
+    # A receiver that cannot parse the body answers with a JSON decode error instead
+    mock_post.reset_mock()
+    mock_post.side_effect = [
+        MagicMock(status_code=422, text='{"detail":[{"msg":"Invalid JSON","type":"value_error.json"}]}'),
+        MagicMock(status_code=202),
+    ]
+    with patch('app.tasks.sync_tasks.settings.SYNC_COMPRESSION', "gzip"):
+        send_bulk_data_to_job_seeker("test-job-id")
+    
+    assert mock_post.call_count == 2
+    assert mock_sync_job.status == "success"
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+def test_send_bulk_data_to_job_seeker_sends_stored_msgpack_payload(mock_post, mock_session):
+    from app.services.wire_format import encode_sync_payload
+    
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    
+    mock_sync_job = MagicMock()
+    mock_sync_job.status = "pending"
+    for column, value in encode_sync_payload([{"cvId": "cv-1"}], "msgpack").items():
+        setattr(mock_sync_job, column, value)
+    mock_db.query().filter().first.return_value = mock_sync_job
+    
+    mock_post.return_value = MagicMock(status_code=202)
+    
+    with patch('app.tasks.sync_tasks.settings.SYNC_COMPRESSION', "identity"):
+        send_bulk_data_to_job_seeker("test-job-id")
+    
+    kwargs = mock_post.call_args.kwargs
+    assert kwargs["headers"]["Content-Type"] == "application/msgpack"
+    assert kwargs["data"] == mock_sync_job.payload
+    assert mock_sync_job.status == "success"
+
+@patch('app.tasks.sync_tasks.SessionLocal')
+@patch('app.tasks.sync_tasks.requests.post')
+@patch('app.tasks.sync_tasks.settings')
+def test_send_bulk_data_to_job_seeker_requests_the_reconciliation_lane(mock_settings, mock_post, mock_session):
+    mock_settings.SYNC_COMPRESSION = "none"
+    mock_settings.INTERNAL_API_TOKEN = "secret"
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    mock_sync_job = MagicMock(status="pending", data={"profiles": []}, payload=None, priority="reconciliation")
+    mock_db.query().filter().first.return_value = mock_sync_job
+    mock_post.return_value = MagicMock(status_code=202)
+    
+    send_bulk_data_to_job_seeker("test-job-id")
+    
+    assert mock_post.call_args.kwargs["headers"]["X-Sync-Priority"] == "reconciliation"
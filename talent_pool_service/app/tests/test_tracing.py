@@ -0,0 +1,31 @@
+import orjson
+
+from app.tracing import FileExporter, Span, format_traceparent, parse_traceparent, record_span
+
+def test_traceparent_round_trips_and_rejects_invalid_headers():
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    context = parse_traceparent(header)
+    assert context.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert context.span_id == "00f067aa0ba902b7"
+    assert context.sampled
+    assert format_traceparent(context) == header
+    
+    assert parse_traceparent(None) is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+
+def test_child_span_continues_the_trace_and_is_written_as_json_line(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr("app.tracing.exporter", FileExporter(str(path)))
+    
+    root = Span("sync.run")
+    child = record_span("sync_job.queue", root.context, start=100.0, end=100.25, attempt=1)
+    root.finish()
+    
+    assert parse_traceparent(child.traceparent).trace_id == root.trace_id
+    lines = [orjson.loads(line) for line in path.read_bytes().splitlines()]
+    assert [line["name"] for line in lines] == ["sync_job.queue", "sync.run"]
+    assert lines[0]["parentId"] == root.span_id
+    assert lines[0]["durationMs"] == 250.0
+    assert lines[0]["attributes"] == {"attempt": 1}
+    assert lines[1]["parentId"] is None
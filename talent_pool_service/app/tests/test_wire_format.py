@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from app.services.members import group_member_rows
+from app.services.wire_format import (
+    assemble_sync_payload, encode_member_fragment, encode_sync_payload, packb, unpackb,
+    sync_job_body, sync_job_document, sync_job_json_body,
+    JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE
+)
+
+def sample_members():
+    document = {
+        "user": {"userId": "user-1", "candidateCode": "WBJ-101"},
+        "cvProfile": {"workingHours": 36, "willingToTravel": False},
+        "cvAddress": {"geoLocation": [52.3730796, 4.8924534]},
+        "cvItems": {
+            "experience": [{"professionNm": "Data Analyst", "company": "abc", "startD": None,
+                            "endD": None, "location": None, "description": "Dashboards " * 20}],
+            "language": [{"skillNm": "English", "rating": 2}],
+        },
+        "applicationStatus": [{"jobOfferCode": "JO-1", "applicationStatus": "applied"}],
+        "matchFeedback": [],
+    }
+    rows = [
+        ("cv-1", datetime(2025, 1, 29, 9, 49, 41), True, document, "pool-a", "Pool A"),
+        ("cv-1", datetime(2025, 1, 29, 9, 49, 41), True, document, "pool-b", "Pool B"),
+        ("cv-2", None, False, {}, "pool-a", "Pool A"),
+    ]
+    return list(group_member_rows(rows))
+
+def stored_job(wire_format, members):
+    return SimpleNamespace(**{"payload": None, **encode_sync_payload(members, wire_format)})
+
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+def test_sync_job_payload_round_trips(wire_format):
+    members = sample_members()
+    sync_job = stored_job(wire_format, members)
+    
+    assert sync_job.payload_format == wire_format
+    assert sync_job_document(sync_job) == {"profiles": members}
+    assert orjson.loads(sync_job_json_body(sync_job)) == {"profiles": members}
+
+def test_msgpack_sync_job_is_sent_as_stored():
+    sync_job = stored_job("msgpack", sample_members())
+    body, content_type = sync_job_body(sync_job)
+    
+    assert content_type == MSGPACK_CONTENT_TYPE
+    assert body == sync_job.payload
+    assert sync_job_body(stored_job("json", sample_members()))[1] == JSON_CONTENT_TYPE
+
+def test_msgpack_keeps_floats_and_timestamps():
+    value = {"geoLocation": [52.3730796, 4.8924534], "at": datetime(2025, 1, 29, 9, 49, 41, 228000, tzinfo=timezone.utc)}
+    
+    assert unpackb(packb(value)) == value
+
+def test_encode_sync_payload_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        encode_sync_payload([], "protobuf")
+
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+def test_assembled_fragments_match_the_encoded_payload(wire_format):
+    members = sample_members()
+    fragments = [encode_member_fragment(member, wire_format) for member in members]
+    sync_job = SimpleNamespace(**assemble_sync_payload(fragments, wire_format))
+    
+    assert sync_job_document(sync_job) == {"profiles": members}
+    assert sync_job_body(sync_job) == sync_job_body(stored_job(wire_format, members))
+    assert orjson.loads(sync_job_json_body(sync_job)) == {"profiles": members}
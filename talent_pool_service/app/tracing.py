@@ -0,0 +1,229 @@
+"""
+Lightweight tracing with W3C ``traceparent`` propagation.
+
+The talent pool service starts a trace per sync run, stores its context on
+the SyncRun and SyncJobs and sends it as a traceparent header with every bulk
+request. The job seeker service carries it through bulk ingest, stores it on
+ProfileChangeLog and continues it in the matching partner push. Spans are
+tagged with TRACE_SERVICE_NAME. Finished spans go to the exporter chosen by
+TRACE_EXPORTER:
+- "file": JSON lines appended to TRACE_FILE_PATH.
+- "http": batches posted to TRACE_COLLECTOR_URL.
+- "none": spans are dropped.
+
+Both services keep an identical copy of this module, like app.db_routing.
+"""
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+import orjson
+import requests
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = settings.TRACE_SERVICE_NAME
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """Parse a version 00 traceparent header; invalid or all-zero ids yield None"""
+    if not header or not isinstance(header, str):
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def new_root_context() -> SpanContext:
+    """Ids for a root span that is recorded after its children have started"""
+    return SpanContext(new_trace_id(), new_span_id())
+
+
+def epoch_seconds(value: datetime) -> float:
+    """Epoch seconds of a naive UTC datetime as stored by the models"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+class Span:
+    """A timed operation; start and end are epoch seconds so spans from different processes line up"""
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional[SpanContext] = None,
+        start: Optional[float] = None,
+        context: Optional[SpanContext] = None,
+        **attributes
+    ):
+        """context fixes the span's own ids, for spans whose children were started before it is recorded"""
+        self.name = name
+        self.trace_id = context.trace_id if context else (parent.trace_id if parent else new_trace_id())
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = context.span_id if context else new_span_id()
+        self.sampled = parent.sampled if parent else True
+        self.start = start if start is not None else time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self._started = time.perf_counter()
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id, self.sampled)
+
+    @property
+    def traceparent(self) -> str:
+        return format_traceparent(self.context)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, end: Optional[float] = None):
+        if self.end is not None:
+            return
+        # Measure with the monotonic clock; only the start is taken from the wall clock
+        self.end = end if end is not None else self.start + (time.perf_counter() - self._started)
+        if self.sampled:
+            exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "service": SERVICE_NAME,
+            "name": self.name,
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "durationMs": round((self.end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+@contextmanager
+def start_span(name: str, parent: Optional[SpanContext] = None, **attributes):
+    """Time the enclosed block as a span; an escaping exception is recorded on it"""
+    span = Span(name, parent, **attributes)
+    try:
+        yield span
+    except Exception as e:
+        span.set(error=type(e).__name__)
+        raise
+    finally:
+        span.finish()
+
+
+def record_span(
+    name: str,
+    parent: Optional[SpanContext],
+    start: float,
+    end: float,
+    context: Optional[SpanContext] = None,
+    **attributes
+) -> Span:
+    """Export a span for an interval measured elsewhere, such as time spent queued"""
+    span = Span(name, parent, start=start, context=context, **attributes)
+    span.finish(end=max(start, end))
+    return span
+
+
+class NullExporter:
+    def export(self, span: Span):
+        pass
+
+    def flush(self):
+        pass
+
+
+class FileExporter:
+    """Appends one JSON line per span"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = orjson.dumps(span.to_dict()) + b"\n"
+        try:
+            with self._lock, open(self.path, "ab") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"Could not write span to {self.path}: {e}")
+
+    def flush(self):
+        pass
+
+
+class HttpExporter:
+    """Posts spans to a collector in batches; export failures are logged and the batch dropped"""
+
+    def __init__(self, url: str, batch_size: int = 100, flush_interval: float = 2.0):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._buffer.append(span.to_dict())
+            due = len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return
+        try:
+            requests.post(self.url, data=orjson.dumps(batch), headers={"Content-Type": "application/json"}, timeout=5)
+        except Exception as e:
+            logger.warning(f"Could not export {len(batch)} spans to {self.url}: {e}")
+
+
+def _create_exporter():
+    if settings.TRACE_EXPORTER == "file":
+        return FileExporter(settings.TRACE_FILE_PATH)
+    if settings.TRACE_EXPORTER == "http":
+        return HttpExporter(settings.TRACE_COLLECTOR_URL)
+    return NullExporter()
+
+
+exporter = _create_exporter()
+# Buffered spans are sent when the process exits
+atexit.register(exporter.flush)
@@ -0,0 +1,59 @@
+"""
+CPU versus bytes trade-off of bulk request compression.
+
+Encodes synthetic SyncJob payloads of SYNC_CHUNK_SIZE profiles and reports, per
+codec and level, the compression ratio and the compress / decompress throughput
+in MB of JSON per second.
+
+    python -m benchmarks.compression_benchmark
+    python -m benchmarks.compression_benchmark --profiles 1000 --rounds 5
+"""
+import argparse
+import gzip
+import time
+
+import orjson
+import zstandard
+
+from app.services.compression import compress_body
+from benchmarks.profiles import synthetic_profiles
+
+CODECS = [("identity", 0)] + [("gzip", level) for level in (1, 6, 9)] + [("zstd", level) for level in (1, 3, 6, 12, 19)]
+
+def decompress(encoding: str, body: bytes) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompress(body)
+    return body
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk request compression")
+    parser.add_argument("--profiles", type=int, default=1000, help="profiles per request")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args(argv)
+    
+    body = orjson.dumps({"profiles": synthetic_profiles(args.profiles)})
+    mb = len(body) / 1e6
+    print(f"{args.profiles} profiles, {len(body):,} bytes of JSON\n")
+    print(f"{'codec':<10}{'level':>6}{'bytes':>14}{'ratio':>8}{'compress MB/s':>16}{'decompress MB/s':>18}")
+    
+    for encoding, level in CODECS:
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            compressed, _ = compress_body(body, encoding, level)
+        compress_s = (time.perf_counter() - start) / args.rounds
+        
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            assert decompress(encoding, compressed) == body
+        decompress_s = (time.perf_counter() - start) / args.rounds
+        
+        print(
+            f"{encoding:<10}{level:>6}{len(compressed):>14,}{len(body) / len(compressed):>8.1f}"
+            f"{mb / compress_s if compress_s else float('inf'):>16.0f}"
+            f"{mb / decompress_s if decompress_s else float('inf'):>18.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
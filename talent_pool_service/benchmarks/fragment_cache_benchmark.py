@@ -0,0 +1,71 @@
+"""
+Producer cost of one sync run with and without the member fragment cache.
+
+Member documents are stored as JSON text, so a miss pays for decoding the
+document column as the database driver would, building the member dict and
+encoding it. A warm run re-encodes only the members changed since the
+previous run (--changed).
+
+    python -m benchmarks.fragment_cache_benchmark
+    python -m benchmarks.fragment_cache_benchmark --profiles 20000 --changed 0.05 --wire-format msgpack
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import orjson
+
+from app.services.fragment_cache import FragmentCache, FragmentStats
+from app.services.members import MemberKey
+from app.services.wire_format import assemble_sync_payload
+from benchmarks.profiles import synthetic_profiles
+
+CHUNK_SIZE = 1000
+MEMBER_OF = [{"talentPoolId": "pool-a", "talentPoolName": "Pool A"}]
+
+def run(cache: FragmentCache, keys, stored, wire_format):
+    def load(db, cv_ids):
+        return {cv_id: (stored[cv_id][0], True, stored[cv_id][0], None, orjson.loads(stored[cv_id][1])) for cv_id in cv_ids}
+    
+    stats = FragmentStats()
+    start = time.perf_counter()
+    with patch("app.services.fragment_cache.load_member_documents", side_effect=load):
+        for i in range(0, len(keys), CHUNK_SIZE):
+            assemble_sync_payload(cache.fragments(None, keys[i:i + CHUNK_SIZE], wire_format, stats), wire_format)
+    return time.perf_counter() - start, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sync producer's member fragment cache")
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--changed", type=float, default=0.05, help="share of members changed between runs")
+    parser.add_argument("--wire-format", default="json", choices=["json", "msgpack"])
+    args = parser.parse_args(argv)
+    
+    modified = datetime(2025, 1, 29, 9, 49, 41)
+    stored = {p["cvId"]: (modified, orjson.dumps(p)) for p in synthetic_profiles(args.profiles)}
+    keys = [MemberKey(cv_id, modified, True, modified, None, MEMBER_OF) for cv_id in stored]
+    cache = FragmentCache(max_entries=args.profiles, max_bytes=1 << 30)
+    
+    cold_s, cold = run(cache, keys, stored, args.wire_format)
+    
+    rng = random.Random(1)
+    later = modified + timedelta(hours=1)
+    for i in rng.sample(range(len(keys)), int(len(keys) * args.changed)):
+        cv_id = keys[i].cv_id
+        stored[cv_id] = (later, stored[cv_id][1])
+        keys[i] = keys[i]._replace(updated_at=later)
+    warm_s, warm = run(cache, keys, stored, args.wire_format)
+    
+    print(f"{args.profiles} members, {args.changed:.0%} changed, {args.wire_format}\n")
+    print(f"{'run':<8}{'seconds':>10}{'members/s':>12}{'hit rate':>10}{'est. saved s':>14}")
+    for name, seconds, stats in (("cold", cold_s, cold), ("warm", warm_s, warm)):
+        summary = stats.to_dict()
+        print(
+            f"{name:<8}{seconds:>10.3f}{args.profiles / seconds:>12,.0f}"
+            f"{summary['hit_rate']:>10.1%}{summary['estimated_seconds_saved']:>14.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Synthetic member documents in bulk API shape, shared by the benchmarks.
+The job seeker and talent pool services keep identical copies.
+"""
+import random
+
+WORDS = (
+    "data analyst consultant engineer python sql reporting dashboards stakeholder management "
+    "cloud migration team lead agile scrum healthcare logistics finance retail amsterdam utrecht "
+    "rotterdam customer support warehouse planning marketing communication research"
+).split()
+
+def synthetic_profile(i: int, rng: random.Random) -> dict:
+    def text(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+    
+    return {
+        "cvId": f"00000000-0000-0000-0000-{i:012d}",
+        "lastModifiedDt": "2025-01-29T09:49:41.228Z",
+        "user": {"userId": f"user-{i}", "candidateCode": f"WBJ-{i}"},
+        "cvProfile": {"workingHours": rng.choice([24, 32, 36, 40]), "willingToTravel": rng.random() < 0.5},
+        "cvAddress": {"geoLocation": [52 + rng.random(), 4 + rng.random()]},
+        "cvItems": {
+            "experience": [
+                {"professionNm": text(3), "company": text(1), "startD": "2019-01-01", "endD": None,
+                 "location": text(1), "description": text(60)}
+                for _ in range(rng.randint(1, 4))
+            ],
+            "education": [
+                {"educationalInstitutionNm": text(3), "degreeCode": "HBO-Master", "degreeCodeJobDigger": "HBO",
+                 "fieldOfStudyNm": text(4), "educationalInstitutionLocation": text(1), "startD": None,
+                 "endD": None, "educationCompleted": True, "educationSpecializationDescription": text(20)}
+            ],
+            "language": [{"skillNm": rng.choice(["English", "Dutch", "German"]), "rating": rng.randint(1, 5)}],
+            "softSkillKnowledge": [
+                {"skillId": f"skill-{rng.randint(1, 500)}", "skillNm": text(2), "relatedLineItemType": ["experience"], "rating": 3}
+                for _ in range(rng.randint(2, 8))
+            ],
+        },
+        "visibleInTalentPool": True,
+        "memberOf": [{"talentPoolId": "pool-1", "talentPoolName": "Pool 1"}],
+        "applicationStatus": [],
+        "matchFeedback": [],
+    }
+
+
+def synthetic_profiles(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [synthetic_profile(i, rng) for i in range(count)]
@@ -0,0 +1,64 @@
+"""
+Encode / decode throughput of the bulk sync wire formats.
+
+Compares the former requests.post(json=...) encoding, orjson and MessagePack on
+synthetic SyncJob payloads, and the matching decoders on the receiving side.
+
+    python -m benchmarks.wire_format_benchmark
+    python -m benchmarks.wire_format_benchmark --profiles 1000 --rounds 10
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+import orjson
+import requests
+
+from app.services.wire_format import packb, unpackb
+from benchmarks.profiles import synthetic_profiles
+
+def requests_json_body(document) -> bytes:
+    """Body as built by requests.post(json=document)"""
+    return requests.Request("POST", "http://job-seeker-service/api/bulk", json=document).prepare().body
+
+def best_of(rounds: int, fn, *args) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk sync wire formats")
+    parser.add_argument("--profiles", type=int, default=1000, help="profiles per request")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+    
+    profiles = synthetic_profiles(args.profiles)
+    # MessagePack carries timestamps natively; the JSON encoders get ISO strings
+    msgpack_document = {"profiles": [
+        {**p, "lastModifiedDt": datetime(2025, 1, 29, 9, 49, 41, 228000, tzinfo=timezone.utc)} for p in profiles
+    ]}
+    json_document = {"profiles": profiles}
+    
+    formats = [
+        ("requests json=", lambda: requests_json_body(json_document), json.loads),
+        ("orjson", lambda: orjson.dumps(json_document), orjson.loads),
+        ("msgpack", lambda: packb(msgpack_document), unpackb),
+    ]
+    
+    print(f"{args.profiles} profiles per request, best of {args.rounds}\n")
+    print(f"{'format':<16}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}{'encode prof/s':>16}{'decode prof/s':>16}")
+    for name, encode, decode in formats:
+        body = encode()
+        encode_s = best_of(args.rounds, encode)
+        decode_s = best_of(args.rounds, decode, body)
+        print(
+            f"{name:<16}{len(body):>12,}{encode_s * 1000:>12.1f}{decode_s * 1000:>12.1f}"
+            f"{args.profiles / encode_s:>16,.0f}{args.profiles / decode_s:>16,.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,11 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Pool shard subtasks are long-running; hand them out one at a time so
+    # they spread evenly over the workers
+    worker_concurrency=settings.SYNC_WORKER_CONCURRENCY,
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
 )
 
 # Configure periodic tasks
@@ -26,7 +31,13 @@ celery_app.conf.beat_schedule = {
     },
     "retry-failed-sync-jobs": {
         "task": "app.tasks.sync_tasks.retry_failed_sync_jobs",
-        "schedule": 900.0,  # Every 15 minutes (in seconds)
+        # Retries are scheduled per job via next_attempt_at; the sweep only dispatches due ones
+        "schedule": 30.0,  # Every 30 seconds
+    },
+    "reconcile-with-job-seeker": {
+        "task": "app.tasks.sync_tasks.reconcile_with_job_seeker",
+        # Drift between the hourly runs; a clean check costs one small request
+        "schedule": 6 * 3600.0,  # Every 6 hours
     },
 }
 